@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark do indice de dominios descartaveis.
+
+Gera uma lista sintetica (padrao: 100 mil dominios), mede o tempo de
+carga do arquivo e a vazao de consultas (acertos exatos, subdominios e
+dominios legitimos).
+
+Uso:
+    python scripts/benchmark_disposable_domains.py
+    python scripts/benchmark_disposable_domains.py --domains 100000 --lookups 1000000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adiciona o diretório src ao PYTHONPATH para imports funcionarem
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def benchmark(domain_count: int, lookup_count: int) -> None:
+    from app.services.disposable_domains import load_domain_index
+
+    rng = random.Random(42)
+    tlds = ["com", "net", "org", "io", "com.br", "xyz"]
+    domains = [f"temp{i}{rng.randrange(10**6)}.{rng.choice(tlds)}" for i in range(domain_count)]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(domains))
+        path = f.name
+
+    start = time.perf_counter()
+    index = load_domain_index(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    Path(path).unlink()
+
+    queries = []
+    for _ in range(lookup_count):
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(rng.choice(domains))
+        elif kind < 0.5:
+            queries.append(f"mx{rng.randrange(100)}.{rng.choice(domains)}")
+        else:
+            queries.append(f"empresa{rng.randrange(10**6)}.com.br")
+
+    start = time.perf_counter()
+    hits = sum(query in index for query in queries)
+    elapsed = time.perf_counter() - start
+
+    print(f"Dominios no indice: {len(index)} (carga em {load_ms:.0f} ms)")
+    print(f"Consultas: {lookup_count} ({hits} bloqueadas) em {elapsed:.2f}s")
+    print(f"Vazao: {lookup_count / elapsed:,.0f} consultas/s ({elapsed / lookup_count * 1e6:.2f} us cada)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do indice de dominios descartaveis")
+    parser.add_argument("--domains", type=int, default=100_000, help="Tamanho da lista")
+    parser.add_argument("--lookups", type=int, default=500_000, help="Consultas")
+    args = parser.parse_args()
+    benchmark(args.domains, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazao do EmailService sem SES.
+
+Envia N emails de newsletter pelo transporte mbox (arquivo local) com o
+mesmo caminho do envio real e mostra emails/s:
+- bulk: template montado uma vez + envio em lote (caminho das campanhas)
+- single: HTML montado e enviado por destinatario (email de teste)
+
+Uso:
+    python scripts/benchmark_email.py --count 2000 --mbox /tmp/outbox.mbox
+    python scripts/benchmark_email.py --mode single
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório src ao PYTHONPATH para imports funcionarem
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+async def benchmark(count: int, mbox_path: str, mode: str) -> None:
+    from app.services.email import EmailService, MboxTransport
+
+    service = EmailService(transport=MboxTransport(mbox_path))
+    await service.start()
+    message = {
+        "subject": "Benchmark",
+        "heading": "Novidades da semana",
+        "content_html": "<p>Conteudo de teste</p>",
+    }
+    emails = [f"user{i}@example.com" for i in range(count)]
+
+    start = time.perf_counter()
+    if mode == "bulk":
+        await service.create_newsletter_template("benchmark", **message)
+        results = await service.send_newsletter_bulk("benchmark", emails)
+        sent = sum(error is None for error in results.values())
+    else:
+        results = await asyncio.gather(*(
+            service.send_newsletter_email(to_email=email, **message) for email in emails
+        ))
+        sent = sum(results)
+    elapsed = time.perf_counter() - start
+    await service.close()
+
+    print(f"Enviados ({mode}): {sent}/{count} em {elapsed:.2f}s ({count / elapsed:.0f} emails/s)")
+    print(f"Arquivo: {mbox_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--mbox", default="var/mail/benchmark.mbox")
+    parser.add_argument("--mode", choices=("bulk", "single"), default="bulk")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.count, args.mbox, args.mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark da importacao/exportacao de inscritos da newsletter em CSV.
+
+Gera um CSV sintetico (padrao: 100 mil linhas), importa em lotes e exporta
+de volta, medindo o tempo de cada etapa. Usa SQLite em memoria por padrao;
+com --database-url mede contra outro banco (ex.: PostgreSQL de dev, com as
+tabelas ja criadas; os inscritos gerados NAO sao removidos).
+
+Uso:
+    python scripts/benchmark_newsletter_import.py
+    python scripts/benchmark_newsletter_import.py --rows 100000
+    python scripts/benchmark_newsletter_import.py --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Adiciona o diretório src ao PYTHONPATH para imports funcionarem
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+async def benchmark(row_count: int, database_url: str | None) -> None:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models import NewsletterSignup  # noqa: F401
+    from app.repositories.newsletter import NewsletterRepository
+    from app.services.newsletter_csv import export_subscribers_csv, import_subscribers_csv
+
+    engine = create_async_engine(database_url or "sqlite+aiosqlite:///:memory:")
+    if database_url is None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    run = uuid.uuid4().hex[:8]
+    content = "email,nome\n" + "".join(
+        f"bench{i}.{run}@example{i % 50}.com,Pessoa {i}\n" for i in range(row_count)
+    )
+    # ~1% de linhas repetidas e invalidas, como numa lista real
+    content += "".join(f"bench{i}.{run}@example{i % 50}.com\n" for i in range(0, row_count, 100))
+    content += "".join(f"invalido{i}\n" for i in range(0, row_count, 100))
+    data = content.encode("utf-8")
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        result = await import_subscribers_csv(NewsletterRepository(db), io.BytesIO(data))
+        import_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size = 0
+    async for chunk in export_subscribers_csv(session_factory):
+        size += len(chunk)
+    export_elapsed = time.perf_counter() - start
+
+    await engine.dispose()
+
+    print(f"CSV: {len(data) / 1024 / 1024:.1f} MB")
+    print(
+        f"Importacao: {result.imported} importados, {result.duplicates} repetidos, "
+        f"{result.invalid} invalidos em {import_elapsed:.2f}s "
+        f"({result.imported / import_elapsed:,.0f} linhas/s)"
+    )
+    print(f"Exportacao: {size / 1024 / 1024:.1f} MB em {export_elapsed:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da importacao/exportacao CSV da newsletter")
+    parser.add_argument("--rows", type=int, default=100_000, help="Linhas no CSV")
+    parser.add_argument("--database-url", default=None, help="Banco async (padrao: SQLite em memoria)")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.rows, args.database_url))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,10 @@ from fastapi import APIRouter, Header, HTTPException, status
 
 from app.api.deps import DBSession
 from app.config import settings
+from app.core.rate_limit import get_rate_limit_metrics
 from app.services import paperclip
 from app.services.dashboard import get_dashboard_metrics
+from app.services.llm_telemetry import get_llm_telemetry
 from app.services.paperclip import get_paperclip_metrics
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
@@ -69,6 +71,56 @@ async def dashboard_metrics(
     return await get_dashboard_metrics(db)
 
 
+@router.get("/llm", summary="Telemetria das chamadas ao LLM")
+async def llm_telemetry(
+    x_dashboard_token: str | None = Header(default=None, alias="X-Dashboard-Token"),
+    authorization: str | None = Header(default=None),
+):
+    """
+    Retorna contadores e histogramas das chamadas ao LLM deste processo,
+    por modelo e caso de uso (zerados a cada deploy/restart).
+
+    **Autenticação**: o mesmo token de `/metrics`.
+
+    Por item:
+    - `calls`, `errors`, `cached`: chamadas, falhas e respostas do cache.
+    - `prompt_tokens`, `completion_tokens`, `cost_usd`: consumo acumulado.
+    - `avg_latency_ms` e `latency_ms`: media e histograma (buckets `le_<ms>`).
+    - `total_tokens`: histograma de tokens por chamada.
+
+    Exemplo:
+        curl "https://geek.bidu.guru/api/v1/dashboard/llm" \\
+            -H "X-Dashboard-Token: $DASHBOARD_TOKEN"
+    """
+    _authorize(x_dashboard_token, authorization)
+    return {"models": get_llm_telemetry()}
+
+
+@router.get("/rate-limits", summary="Metricas do rate limiting")
+async def rate_limit_metrics(
+    x_dashboard_token: str | None = Header(default=None, alias="X-Dashboard-Token"),
+    authorization: str | None = Header(default=None),
+):
+    """
+    Retorna o backend do rate limiting e os contadores por rota deste
+    processo (zerados a cada deploy/restart).
+
+    **Autenticação**: o mesmo token de `/metrics`.
+
+    Campos:
+    - `storage`: "redis" ou "memory" (RATE_LIMIT_STORAGE).
+    - `degraded`: True se o Redis falhou e os limites estao sendo contados
+      so na memoria deste processo.
+    - `routes`: por rota, `checked` (verificacoes) e `blocked` (respostas 429).
+
+    Exemplo:
+        curl "https://geek.bidu.guru/api/v1/dashboard/rate-limits" \\
+            -H "X-Dashboard-Token: $DASHBOARD_TOKEN"
+    """
+    _authorize(x_dashboard_token, authorization)
+    return get_rate_limit_metrics()
+
+
 @router.get("/paperclip", summary="Estado dos agentes do Paperclip")
 async def paperclip_metrics(
     x_dashboard_token: str | None = Header(default=None, alias="X-Dashboard-Token"),
@@ -34,16 +34,14 @@ Uso alternativo (mais controle):
     6. PATCH /instagram/products/{id}/mark-posted - Registra publicacao
 """
 
+import asyncio
 import base64
-import mimetypes
 import re
 import uuid as uuid_module
 from io import BytesIO
 from pathlib import Path
 from uuid import UUID
 
-import httpx
-
 from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
 from fastapi.responses import HTMLResponse
 from PIL import Image
@@ -51,8 +49,11 @@ from PIL import Image
 from app.api.deps import ProductRepo
 from app.config import settings
 from app.core.deps import require_role
+from app.core.image_executor import run_image_task
 from app.models.user import UserRole
-from app.services.upload import UPLOAD_DIR, UPLOAD_URL_PREFIX
+from app.services.html_renderer import RendererUnavailableError, render_html
+from app.services.remote_image_cache import CachedImage, ImageFetchError, fetch_image
+from app.services.upload import UPLOAD_DIR, UPLOAD_URL_PREFIX, read_upload
 from app.schemas.instagram import (
     GenerateImageRequest,
     GenerateImageResponse,
@@ -76,157 +77,69 @@ router = APIRouter(prefix="/instagram", tags=["instagram"])
 # Roles permitidos para acessar estes endpoints
 ALLOWED_ROLES = [UserRole.ADMIN, UserRole.AUTOMATION]
 
-# Diretorio de arquivos estaticos (para conversao de imagens/fontes para base64)
-STATIC_DIR = Path(__file__).parent.parent.parent.parent / "static"
+
+# Caminho (na origem do renderer) pelo qual o template acessa a imagem do produto
+PRODUCT_IMAGE_RENDER_PATH = "/render-assets/product-image"
 
 
 # =============================================================================
-# Funcoes Auxiliares para Conversao de Imagens/Fontes para Base64
+# Funcoes Auxiliares para a Imagem do Produto
 # =============================================================================
 
 
-def _file_to_data_uri(file_path: Path) -> str:
+async def _fetch_product_image(url: str) -> CachedImage:
     """
-    Converte arquivo local para data URI base64.
+    Obtem a imagem do produto via cache local em disco.
 
-    Usado para embutir imagens e fontes diretamente no HTML,
-    permitindo que o Playwright renderize sem precisar de servidor web.
-
-    Args:
-        file_path: Caminho absoluto para o arquivo
-
-    Returns:
-        Data URI no formato: data:mime/type;base64,<conteudo>
-
-    Raises:
-        FileNotFoundError: Se o arquivo nao existir
-    """
-    if not file_path.exists():
-        raise FileNotFoundError(f"Arquivo nao encontrado: {file_path}")
-
-    # Determina o tipo MIME
-    mime_type, _ = mimetypes.guess_type(str(file_path))
-    if not mime_type:
-        # Fallback para tipos comuns
-        suffix = file_path.suffix.lower()
-        mime_map = {
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".gif": "image/gif",
-            ".webp": "image/webp",
-            ".ttf": "font/ttf",
-            ".woff": "font/woff",
-            ".woff2": "font/woff2",
-        }
-        mime_type = mime_map.get(suffix, "application/octet-stream")
-
-    # Le e converte para base64
-    with open(file_path, "rb") as f:
-        content = f.read()
-
-    b64_content = base64.b64encode(content).decode("utf-8")
-    return f"data:{mime_type};base64,{b64_content}"
-
-
-async def _url_to_data_uri(url: str) -> str:
-    """
-    Baixa imagem de URL externa e converte para data URI base64.
-
-    Usado para embutir imagem do produto diretamente no HTML,
-    permitindo que o Playwright renderize sem fazer requests externos.
+    A imagem e baixada uma unica vez (com revalidacao por ETag/Last-Modified)
+    e entregue ao Playwright por um route local, sem data URI base64.
 
     Args:
         url: URL da imagem (pode ser absoluta ou relativa)
 
     Returns:
-        Data URI no formato: data:mime/type;base64,<conteudo>
+        CachedImage com o caminho local da imagem
 
     Raises:
         HTTPException: Se falhar ao baixar a imagem
     """
-    # Trata URLs relativas (ex: /uploads/products/xxx.jpg)
-    # Prefixa com a URL base da aplicacao para formar URL absoluta
-    if url.startswith("/"):
-        url = f"{settings.app_url}{url}"
-
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
-            response.raise_for_status()
-
-            # Determina tipo MIME do response ou da URL
-            content_type = response.headers.get("content-type", "").split(";")[0]
-            if not content_type or content_type == "application/octet-stream":
-                # Tenta determinar pela extensao da URL
-                mime_type, _ = mimetypes.guess_type(url)
-                content_type = mime_type or "image/png"
-
-            b64_content = base64.b64encode(response.content).decode("utf-8")
-            return f"data:{content_type};base64,{b64_content}"
-
-    except httpx.HTTPError as e:
+        return await fetch_image(url)
+    except ImageFetchError as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Erro ao baixar imagem do produto: {str(e)}",
         )
 
 
-def _prepare_template_with_embedded_assets(
-    html_content: str,
-    product_image_data_uri: str,
-) -> str:
+def _replace_product_image_src(html_content: str, product_image_src: str) -> str:
     """
-    Prepara HTML do template com todos os assets embutidos como data URIs.
+    Substitui o src da imagem do produto no HTML do template.
+
+    O template usa {{ product_image_url }} que ja foi renderizado com a URL real.
+    Como a URL pode variar, localizamos a tag <img> com class="product-image".
 
-    Substitui referencias a arquivos estaticos locais (/static/...) e
-    a imagem do produto por data URIs base64, permitindo renderizacao
-    offline com Playwright.
+    Fontes e imagens estaticas (/static/...) nao precisam ser tratadas: o
+    renderer compartilhado (app.services.html_renderer) as serve de um
+    cache em memoria carregado no startup.
 
     Args:
-        html_content: HTML do template com referencias a arquivos
-        product_image_data_uri: Data URI da imagem do produto
+        html_content: HTML renderizado do template
+        product_image_src: Novo src da imagem do produto
 
     Returns:
-        HTML com todos os assets embutidos como base64
+        HTML com o src da imagem do produto substituido
     """
-    # Mapeamento de arquivos estaticos locais para seus caminhos
-    # Inclui templates de Post (instagram_01.png) e Story (instagram_02.png)
-    static_files = {
-        "/static/images/template/instagram_01.png": STATIC_DIR / "images" / "template" / "instagram_01.png",
-        "/static/images/template/instagram_02.png": STATIC_DIR / "images" / "template" / "instagram_02.png",
-        "/static/logo/mascot-only.png": STATIC_DIR / "logo" / "mascot-only.png",
-        "/static/fonts/Bungee-Regular.ttf": STATIC_DIR / "fonts" / "Bungee-Regular.ttf",
-        "/static/fonts/PressStart2P-Regular.ttf": STATIC_DIR / "fonts" / "PressStart2P-Regular.ttf",
-    }
-
-    # Substitui cada arquivo estatico por seu data URI
-    for url_path, file_path in static_files.items():
-        if url_path in html_content:
-            try:
-                data_uri = _file_to_data_uri(file_path)
-                html_content = html_content.replace(url_path, data_uri)
-            except FileNotFoundError:
-                # Se arquivo nao existir, mantem URL original (fallback)
-                pass
-
-    # Substitui a imagem do produto
-    # O template usa {{ product_image_url }} que ja foi renderizado com a URL real
-    # Precisamos encontrar essa URL e substituir pelo data URI
-    # Como a URL pode variar, usamos a tag <img> com class="product-image"
+    def replace_product_image(match):
+        return match.group(1) + product_image_src + match.group(3)
 
     # Pattern para encontrar o src da imagem do produto
     # Exemplo: <img src="https://..." alt="..." class="product-image">
     pattern = r'(<img\s+[^>]*class="product-image"[^>]*src=")([^"]+)(")'
-
-    def replace_product_image(match):
-        return match.group(1) + product_image_data_uri + match.group(3)
-
     html_content = re.sub(pattern, replace_product_image, html_content)
 
     # Tenta pattern alternativo caso src venha antes de class
     pattern_alt = r'(<img\s+src=")([^"]+)("[^>]*class="product-image")'
-
     html_content = re.sub(pattern_alt, replace_product_image, html_content)
 
     return html_content
@@ -692,9 +605,11 @@ async def generate_instagram_image(
             detail="Produto nao possui imagem principal (main_image_url)",
         )
 
-    # Baixa a imagem do produto e converte para data URI
-    # Isso e necessario pois o Playwright nao carrega URLs externas com set_content()
-    product_image_data_uri = await _url_to_data_uri(product.main_image_url)
+    # Obtem a imagem do produto do cache local (baixa apenas se necessario)
+    product_image = await _fetch_product_image(product.main_image_url)
+    render_files = {
+        PRODUCT_IMAGE_RENDER_PATH: (product_image.path, product_image.content_type),
+    }
 
     # Prepara dados do preco (com formatacao de milhar usando ponto)
     price_integer = None
@@ -721,7 +636,7 @@ async def generate_instagram_image(
     template_data = {
         "request": request_obj,
         "product_name": product.name,
-        "product_image_url": product.main_image_url,  # Sera substituido por data URI
+        "product_image_url": product.main_image_url,  # Sera substituido pelo route local
         "price": product.price,
         "price_integer": price_integer,
         "price_cents": price_cents,
@@ -738,69 +653,22 @@ async def generate_instagram_image(
     html_post = templates.get_template("instagram/post_produto.html").render(
         **template_data
     )
-    html_post = _prepare_template_with_embedded_assets(
-        html_content=html_post,
-        product_image_data_uri=product_image_data_uri,
-    )
+    html_post = _replace_product_image_src(html_post, PRODUCT_IMAGE_RENDER_PATH)
 
     # Template do Story (1080x1920)
     html_story = templates.get_template("instagram/story_produto.html").render(
         **template_data
     )
-    html_story = _prepare_template_with_embedded_assets(
-        html_content=html_story,
-        product_image_data_uri=product_image_data_uri,
-    )
+    html_story = _replace_product_image_src(html_story, PRODUCT_IMAGE_RENDER_PATH)
 
-    # Converte HTML para imagem usando Playwright
+    # Converte HTML para imagem no browser compartilhado
+    # Post e Story sao renderizados em paralelo (paginas do mesmo Chromium)
     try:
-        from playwright.async_api import async_playwright
-    except ImportError:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Playwright nao instalado. Execute: pip install playwright && playwright install chromium",
+        screenshot_post, screenshot_story = await asyncio.gather(
+            render_html(html_post, width=1080, height=1080, files=render_files),
+            render_html(html_story, width=1080, height=1920, files=render_files),
         )
 
-    # Flags do Chromium para ambiente containerizado
-    # NOTA: --single-process foi removido pois causa crash ao criar multiplas paginas
-    chromium_args = [
-        "--no-sandbox",  # Necessario para rodar em containers
-        "--disable-setuid-sandbox",
-        "--disable-dev-shm-usage",  # Usa /tmp em vez de /dev/shm
-        "--disable-gpu",  # GPU nao disponivel em containers
-        "--disable-software-rasterizer",
-        "--disable-extensions",
-        "--disable-background-networking",
-        "--disable-sync",
-        "--no-first-run",
-        "--no-zygote",  # Evita fork de processos
-    ]
-
-    try:
-        async with async_playwright() as p:
-            # --- Gera imagem do POST (1080x1080) ---
-            # Usa browser separado para cada imagem (mais estavel em containers)
-            browser_post = await p.chromium.launch(headless=True, args=chromium_args)
-            page_post = await browser_post.new_page(
-                viewport={"width": 1080, "height": 1080}
-            )
-            await page_post.set_content(html_post, wait_until="load")
-            await page_post.wait_for_timeout(500)  # Aguarda fontes carregarem
-            screenshot_post = await page_post.screenshot(type="png", full_page=False)
-            await page_post.close()
-            await browser_post.close()
-
-            # --- Gera imagem do STORY (1080x1920) ---
-            browser_story = await p.chromium.launch(headless=True, args=chromium_args)
-            page_story = await browser_story.new_page(
-                viewport={"width": 1080, "height": 1920}
-            )
-            await page_story.set_content(html_story, wait_until="load")
-            await page_story.wait_for_timeout(500)  # Aguarda fontes carregarem
-            screenshot_story = await page_story.screenshot(type="png", full_page=False)
-            await page_story.close()
-            await browser_story.close()
-
         # Diretorio de upload
         instagram_upload_dir = UPLOAD_DIR / "instagram"
         instagram_upload_dir.mkdir(parents=True, exist_ok=True)
@@ -853,6 +721,11 @@ async def generate_instagram_image(
             file_size_kb=post_size_kb,
         )
 
+    except RendererUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -899,46 +772,14 @@ async def convert_html_to_image(request: HtmlToImageRequest):
         }
     """
     try:
-        from playwright.async_api import async_playwright
-    except ImportError:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Playwright nao instalado. Execute: pip install playwright && playwright install chromium",
+        # Renderiza no browser compartilhado, aguardando fontes e imagens
+        screenshot = await render_html(
+            request.html,
+            width=request.width,
+            height=request.height,
+            image_type=request.format,
         )
 
-    # Flags do Chromium para ambiente containerizado
-    chromium_args = [
-        "--no-sandbox",
-        "--disable-setuid-sandbox",
-        "--disable-dev-shm-usage",
-        "--disable-gpu",
-        "--disable-software-rasterizer",
-        "--disable-extensions",
-        "--disable-background-networking",
-        "--disable-sync",
-        "--no-first-run",
-        "--no-zygote",
-    ]
-
-    try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True, args=chromium_args)
-            page = await browser.new_page(
-                viewport={"width": request.width, "height": request.height}
-            )
-
-            # Define conteudo HTML
-            await page.set_content(request.html, wait_until="networkidle")
-
-            # Captura screenshot
-            screenshot = await page.screenshot(
-                type=request.format,
-                full_page=False,
-            )
-
-            await page.close()
-            await browser.close()
-
         # Converte para base64
         image_base64 = base64.b64encode(screenshot).decode("utf-8")
         file_size_kb = len(screenshot) // 1024
@@ -952,6 +793,11 @@ async def convert_html_to_image(request: HtmlToImageRequest):
             file_size_kb=file_size_kb,
         )
 
+    except RendererUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -959,6 +805,40 @@ async def convert_html_to_image(request: HtmlToImageRequest):
         )
 
 
+def _resize_to_jpeg(
+    contents: bytes,
+    width: int,
+    height: int,
+    quality: int,
+    maintain_aspect: bool,
+) -> tuple[bytes, int, int]:
+    """
+    Redimensiona imagem e codifica em JPEG (sincrono, CPU-bound).
+
+    Returns:
+        Tupla (bytes JPEG, largura final, altura final)
+    """
+    img = Image.open(BytesIO(contents))
+
+    # JPEG: decodifica direto em escala reduzida quando a foto e bem maior que o alvo
+    img.draft("RGB", (width, height))
+
+    # Converte para RGB se necessario
+    if img.mode in ("RGBA", "P"):
+        img = img.convert("RGB")
+
+    # Calcula novo tamanho
+    if maintain_aspect:
+        img.thumbnail((width, height), Image.Resampling.LANCZOS)
+    else:
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+    # Salva em buffer
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue(), img.width, img.height
+
+
 @router.post(
     "/utils/resize-image",
     response_model=ResizeImageResponse,
@@ -1002,30 +882,16 @@ async def resize_image(
             detail=f"Formato invalido. Permitidos: {allowed_types}",
         )
 
+    # Le em blocos com limite de tamanho (antes de qualquer processamento)
+    contents = await read_upload(file)
+
     try:
-        # Lê imagem
-        contents = await file.read()
-        img = Image.open(BytesIO(contents))
-
-        # Converte para RGB se necessario
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
-
-        # Calcula novo tamanho
-        if maintain_aspect:
-            img.thumbnail((width, height), Image.Resampling.LANCZOS)
-            new_width, new_height = img.size
-        else:
-            img = img.resize((width, height), Image.Resampling.LANCZOS)
-            new_width, new_height = width, height
-
-        # Salva em buffer
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG", quality=quality, optimize=True)
-        buffer.seek(0)
+        # Decode/resize/encode no executor de imagens (fora do event loop)
+        image_bytes, new_width, new_height = await run_image_task(
+            _resize_to_jpeg, contents, width, height, quality, maintain_aspect
+        )
 
         # Converte para base64
-        image_bytes = buffer.getvalue()
         image_base64 = base64.b64encode(image_bytes).decode("utf-8")
         file_size_kb = len(image_bytes) // 1024
 
@@ -43,8 +43,11 @@ from app.schemas import (
     NewsletterVerifyResponse,
     PaginatedResponse,
 )
+from app.models.email_outbox import OutboxKind
+from app.repositories.email_outbox import EmailOutboxRepository
+from app.repositories.newsletter import NewsletterRepository, invalidate_newsletter_stats
 from app.services.antispam import validate_newsletter_submission
-from app.services.email import email_service
+from app.services.email_outbox import notify_email_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +93,23 @@ def get_client_ip(request: Request) -> str:
 # =============================================================================
 
 
+async def _enqueue_verification_email(repo: NewsletterRepository, email: str, token: str) -> None:
+    """
+    Grava o email de verificacao na fila, no mesmo commit do token.
+
+    O envio e feito em background pelo EmailOutboxWorker (com retentativas),
+    entao a resposta nao espera o SES.
+    """
+    await EmailOutboxRepository(repo.db).enqueue(
+        OutboxKind.NEWSLETTER_VERIFICATION.value,
+        email,
+        {"verification_url": f"{settings.app_url}/api/v1/newsletter/verify/{token}"},
+    )
+    await repo.db.commit()
+    notify_email_outbox()
+    logger.info("Email de verificacao enfileirado para %s", email)
+
+
 @router.post("/subscribe", response_model=NewsletterPublicResponse)
 async def subscribe(
     data: NewsletterSubscribe,
@@ -101,6 +121,8 @@ async def subscribe(
 
     Implementa double opt-in: após inscrição, um email de verificação
     é enviado e o usuário só é considerado inscrito após confirmar.
+    O email vai para a fila (email_outbox) no mesmo commit do token e é
+    enviado em background; a resposta não espera o SES.
 
     Comportamento:
     - Se email é novo: cria inscrição pendente + envia email de verificação
@@ -161,15 +183,7 @@ async def subscribe(
         elif existing.is_active and not existing.email_verified:
             # Inscrito mas não verificou - reenvia email
             token = existing.generate_verification_token()
-            await repo.db.commit()
-            await repo.db.refresh(existing)
-
-            # Envia email de verificação
-            verification_url = f"{settings.app_url}/api/v1/newsletter/verify/{token}"
-            await email_service.send_verification_email(
-                to_email=data.email,
-                verification_url=verification_url,
-            )
+            await _enqueue_verification_email(repo, data.email, token)
 
             return NewsletterPublicResponse(
                 message="Email de verificacao reenviado! Verifique sua caixa de entrada.",
@@ -183,14 +197,7 @@ async def subscribe(
             # Gera novo token se não estava verificado
             if not existing.email_verified:
                 token = existing.generate_verification_token()
-                await repo.db.commit()
-                await repo.db.refresh(existing)
-
-                verification_url = f"{settings.app_url}/api/v1/newsletter/verify/{token}"
-                await email_service.send_verification_email(
-                    to_email=data.email,
-                    verification_url=verification_url,
-                )
+                await _enqueue_verification_email(repo, data.email, token)
 
             return NewsletterPublicResponse(
                 message="Inscricao reativada! Verifique seu email para confirmar.",
@@ -212,37 +219,14 @@ async def subscribe(
 
     # Gera token de verificação
     token = signup.generate_verification_token()
-    await repo.db.commit()
-    await repo.db.refresh(signup)
+    await _enqueue_verification_email(repo, data.email, token)
 
-    # Envia email de verificação
-    verification_url = f"{settings.app_url}/api/v1/newsletter/verify/{token}"
-    email_sent = await email_service.send_verification_email(
-        to_email=data.email,
-        verification_url=verification_url,
+    return NewsletterPublicResponse(
+        message="Inscricao realizada! Verifique seu email para confirmar.",
+        email=data.email,
+        needs_verification=True,
     )
 
-    if email_sent:
-        logger.info("Email de verificacao enviado para %s", data.email)
-        return NewsletterPublicResponse(
-            message="Inscricao realizada! Verifique seu email para confirmar.",
-            email=data.email,
-            needs_verification=True,
-        )
-    else:
-        # Email não foi enviado (provavelmente SES não configurado)
-        # Em dev, permite inscrição direta para facilitar testes
-        logger.warning(
-            "Falha ao enviar email de verificacao para %s. "
-            "Verifique as credenciais AWS SES.",
-            data.email,
-        )
-        return NewsletterPublicResponse(
-            message="Inscricao realizada! Verifique seu email para confirmar.",
-            email=data.email,
-            needs_verification=True,
-        )
-
 
 @router.get("/verify/{token}")
 async def verify_email(token: str, repo: NewsletterRepo, request: Request):
@@ -290,6 +274,7 @@ async def verify_email(token: str, repo: NewsletterRepo, request: Request):
     consent_ip = get_client_ip(request)
     signup.verify_email(consent_ip=consent_ip)
     await repo.db.commit()
+    invalidate_newsletter_stats()
     await repo.db.refresh(signup)
 
     logger.info(
@@ -340,6 +325,7 @@ async def verify_email_api(token: str, repo: NewsletterRepo, request: Request):
     consent_ip = get_client_ip(request)
     signup.verify_email(consent_ip=consent_ip)
     await repo.db.commit()
+    invalidate_newsletter_stats()
     await repo.db.refresh(signup)
 
     return NewsletterVerifyResponse(
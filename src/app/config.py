@@ -42,6 +42,15 @@ class Settings(BaseSettings):
     # -------------------------------------------------------------------------
     redis_url: str = "redis://redis:6379/0"
 
+    # Onde ficam os contadores de rate limiting: "redis" (compartilhado entre
+    # workers, com fallback em memoria se o Redis cair) ou "memory" (por processo)
+    rate_limit_storage: Literal["redis", "memory"] = "redis"
+
+    # Proxies cujos X-Forwarded-For/X-Real-IP sao aceitos para identificar o
+    # cliente (IPs ou redes, separados por virgula). Padrao: loopback e redes
+    # privadas (proxy reverso na rede Docker)
+    trusted_proxies: str = "127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+
     # -------------------------------------------------------------------------
     # Seguranca
     # -------------------------------------------------------------------------
@@ -83,6 +92,28 @@ class Settings(BaseSettings):
     # Diretorio para uploads persistentes (em producao, monte um volume aqui)
     # Se nao definido, usa o diretorio padrao dentro do projeto
     upload_dir: str | None = None
+    # Threads dedicadas ao processamento de imagens (decode/resize/encode)
+    image_processing_workers: int = 2
+
+    # -------------------------------------------------------------------------
+    # Cache de imagens remotas (imagens de produtos usadas na renderizacao)
+    # -------------------------------------------------------------------------
+    # Diretorio do cache em disco (se nao definido, usa diretorio temporario)
+    image_cache_dir: str | None = None
+    # Tamanho maximo total do cache em MB (entradas mais antigas sao removidas)
+    image_cache_max_mb: int = 200
+    # Tamanho maximo de uma unica imagem baixada em MB
+    image_cache_max_file_mb: int = 10
+    # Tempo (segundos) em que uma entrada e usada sem revalidar com a origem
+    image_cache_revalidate_seconds: int = 3600
+
+    # -------------------------------------------------------------------------
+    # Cache de imagens geradas para Instagram (static/generated/instagram)
+    # -------------------------------------------------------------------------
+    # Tamanho maximo total em MB (remove as menos acessadas ao exceder)
+    instagram_cache_max_mb: int = 500
+    # Idade maxima de uma imagem gerada em dias
+    instagram_cache_max_age_days: int = 30
 
     # -------------------------------------------------------------------------
     # Google Analytics 4 & Search Console
@@ -122,6 +153,32 @@ class Settings(BaseSettings):
     # Cache de respostas (em minutos, 0 = desabilitado)
     llm_cache_ttl: int = 60
 
+    # Telemetria: previews das respostas em INFO para esta fracao das chamadas
+    # (0 = so em DEBUG); llm_verbose liga o log detalhado do LiteLLM
+    llm_log_sample_rate: float = 0.0
+    llm_verbose: bool = False
+
+    # Failover entre providers (cadeia: modelo da config + fallback_models)
+    llm_max_retries: int = 2  # Retentativas por modelo em erros transitorios
+    llm_retry_base_delay: float = 0.5  # Base do backoff exponencial com jitter (segundos)
+    llm_hedge_default_delay: float = 3.0  # Espera antes do hedge sem historico de latencia
+    llm_failover_error_threshold: int = 3  # Erros seguidos para mover o modelo ao fim da cadeia
+    llm_failover_cooldown_seconds: int = 60  # Tempo ate o modelo voltar a posicao original
+
+    # Registro em memoria das configs de IA (segundos ate recarregar do banco)
+    ai_config_cache_ttl: int = 300
+
+    # Fila de logs de IA (gravados em lote fora da request)
+    ai_log_batch_size: int = 50  # Logs por INSERT
+    ai_log_flush_seconds: float = 2.0  # Espera maxima antes de gravar
+    ai_log_queue_max: int = 10_000  # Acima disso novos logs sao descartados
+
+    # Enriquecimento em lote do catalogo (job ai_catalog_enrichment)
+    ai_enrichment_max_items: int = 50  # Campos gerados por execucao
+    ai_enrichment_workers: int = 4  # Chamadas simultaneas
+    ai_enrichment_requests_per_minute: int = 30  # Limite por provider
+    ai_enrichment_write_batch: int = 10  # Resultados por UPDATE em lote
+
     # -------------------------------------------------------------------------
     # Amazon SES (Email)
     # -------------------------------------------------------------------------
@@ -137,6 +194,34 @@ class Settings(BaseSettings):
     # Token de validacao expira em X horas (padrao: 48h)
     email_verification_expire_hours: int = 48
 
+    # Transporte: "ses" (envio real) ou "mbox" (grava em arquivo local, para
+    # desenvolvimento e benchmark offline)
+    email_transport: str = "ses"
+    email_mbox_path: str = "var/mail/outbox.mbox"
+    email_max_connections: int = 20  # Pool de conexoes do cliente SES
+    email_max_concurrency: int = 20  # Envios simultaneos por processo
+
+    # Campanhas de newsletter (envio em background)
+    newsletter_send_rate: int = 14  # Emails por segundo (limite de envio da conta SES)
+    newsletter_send_concurrency: int = 8  # Envios simultaneos
+    newsletter_send_batch_size: int = 200  # Destinatarios lidos/gravados por lote
+    newsletter_send_max_attempts: int = 3  # Tentativas por destinatario
+    newsletter_campaign_lease_seconds: int = 120  # Sem renovacao, outro processo retoma
+
+    # Fila de emails transacionais (verificacao da newsletter), enviada em background
+    email_outbox_batch_size: int = 20  # Emails pegos por vez
+    email_outbox_poll_seconds: float = 30.0  # Intervalo de varredura (retentativas, outros processos)
+    email_outbox_max_attempts: int = 5  # Tentativas por email
+    email_outbox_retry_seconds: int = 60  # Espera apos a 1a falha (dobra a cada tentativa)
+
+    # -------------------------------------------------------------------------
+    # Anti-spam
+    # -------------------------------------------------------------------------
+    # Lista de dominios descartaveis (um por linha). Se vazio, usa a lista que
+    # acompanha a aplicacao (app/data/disposable_domains.txt). O arquivo e
+    # recarregado quando muda, sem deploy
+    disposable_domains_path: str | None = None
+
     # -------------------------------------------------------------------------
     # Propriedades computadas
     # -------------------------------------------------------------------------
@@ -0,0 +1,63 @@
+"""
+Cliente HTTP async compartilhado (httpx).
+
+Um unico AsyncClient com pool de conexoes reaproveitado pela aplicacao,
+evitando handshake TCP/TLS e resolucao DNS a cada download externo
+(ex: imagens de produtos na Amazon/Mercado Livre).
+
+Uso:
+    from app.core.http_client import get_http_client
+
+    response = await get_http_client().get(url)
+"""
+
+import logging
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Limites do pool de conexoes
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+
+# Timeout padrao (segundos) para requests externos
+HTTP_TIMEOUT = 30.0
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna cliente HTTP compartilhado, criando se necessario.
+
+    Returns:
+        AsyncClient com pool de conexoes e redirects habilitados
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            headers={"User-Agent": f"{settings.app_name} (+{settings.app_url})"},
+        )
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente HTTP compartilhado (shutdown da aplicacao)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("Cliente HTTP compartilhado encerrado")
@@ -0,0 +1,76 @@
+"""
+Executor dedicado para processamento de imagens (Pillow).
+
+Decode, resize e encode de imagens sao CPU-bound e, rodando direto no
+handler async, travam o event loop inteiro (inclusive trafego publico).
+Este modulo concentra esse trabalho em um pool de threads pequeno e
+separado do executor padrao do asyncio:
+
+- Concorrencia limitada: varios admins enviando imagens ao mesmo tempo
+  ocupam no maximo `image_processing_workers` threads; o excedente espera
+  na fila sem consumir CPU.
+- Pillow libera o GIL durante decode/resize/encode, entao o event loop
+  continua atendendo requests enquanto as imagens sao processadas.
+
+Uso:
+    from app.core.image_executor import run_image_task
+
+    resized = await run_image_task(resize_image, content, (800, 800))
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+_image_executor: ThreadPoolExecutor | None = None
+
+
+def get_image_executor() -> ThreadPoolExecutor:
+    """
+    Retorna o executor de imagens, criando se necessario.
+
+    Returns:
+        ThreadPoolExecutor com `image_processing_workers` threads
+    """
+    global _image_executor
+
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.image_processing_workers),
+            thread_name_prefix="image",
+        )
+
+    return _image_executor
+
+
+async def run_image_task(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Executa funcao sincrona de processamento de imagem no executor dedicado.
+
+    Args:
+        func: Funcao CPU-bound (ex: resize_image)
+        *args, **kwargs: Argumentos repassados para a funcao
+
+    Returns:
+        Retorno da funcao
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_image_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_image_executor() -> None:
+    """Encerra o executor de imagens (shutdown da aplicacao)."""
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=True, cancel_futures=True)
+        _image_executor = None
+        logger.info("Executor de imagens encerrado")
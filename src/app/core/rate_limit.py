@@ -2,13 +2,230 @@
 Rate Limiting com SlowAPI.
 
 Protege endpoints contra abuso e ataques de força bruta.
+
+- Contadores no Redis (estrategia moving-window), compartilhados entre
+  workers e preservados entre deploys. Se o Redis cair, os mesmos limites
+  passam a ser contados na memoria do processo ate ele voltar.
+- Chave por IP do cliente: X-Forwarded-For so e considerado quando a
+  conexao vem de um proxy confiavel (settings.trusted_proxies).
+- Contadores por rota (verificacoes e bloqueios) em
+  GET /api/v1/dashboard/rate-limits.
 """
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import ipaddress
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import Request
+from limits.storage import MemoryStorage, MovingWindowSupport, RedisStorage, Storage
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Apos falha do Redis, conta so na memoria local por este tempo (segundos)
+STORAGE_RETRY_SECONDS = 30
+
+# Timeouts curtos: o SlowAPI chama o Redis de forma sincrona na request
+REDIS_SOCKET_TIMEOUT_SECONDS = 0.5
+
+
+# =============================================================================
+# Storage com fallback
+# =============================================================================
+
+
+class FailoverRedisStorage(Storage, MovingWindowSupport):
+    """
+    Storage do `limits` que usa o Redis e, se ele falhar, a memoria local.
+
+    Diferente do `in_memory_fallback` do SlowAPI (que troca os limites de
+    cada rota por uma lista unica), aqui os limites das rotas continuam
+    valendo no modo degradado, so que contados por processo.
+
+    URI: "failover+redis://host:port/db".
+    """
+
+    STORAGE_SCHEME = ["failover+redis"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.primary = RedisStorage(uri.removeprefix("failover+"), **options)
+        self.fallback = MemoryStorage()
+        self._retry_at = 0.0
+
+    @property
+    def base_exceptions(self) -> type[Exception] | tuple[type[Exception], ...]:
+        return self.primary.base_exceptions
+
+    @property
+    def degraded(self) -> bool:
+        """Se os limites estao sendo contados so na memoria local."""
+        return time.monotonic() < self._retry_at
+
+    def _call(self, method: str, *args, **kwargs):
+        if not self.degraded:
+            try:
+                return getattr(self.primary, method)(*args, **kwargs)
+            except self.primary.base_exceptions as e:
+                logger.warning("Rate limit sem Redis, usando memoria local: %s", e)
+                self._retry_at = time.monotonic() + STORAGE_RETRY_SECONDS
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self._call("incr", key, expiry, amount=amount)
+
+    def get(self, key: str) -> int:
+        return self._call("get", key)
+
+    def get_expiry(self, key: str) -> float:
+        return self._call("get_expiry", key)
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        return self._call("acquire_entry", key, limit, expiry, amount=amount)
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        return self._call("get_moving_window", key, limit, expiry)
+
+    def check(self) -> bool:
+        return self.primary.check() or self.fallback.check()
+
+    def reset(self) -> int | None:
+        self.fallback.reset()
+        return self._call("reset")
+
+    def clear(self, key: str) -> None:
+        self.fallback.clear(key)
+        self._call("clear", key)
+
+
+# =============================================================================
+# Chave por IP
+# =============================================================================
+
+
+@lru_cache
+def _trusted_networks(value: str) -> tuple:
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return tuple(networks)
+
+
+def _is_trusted_proxy(ip: str) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(settings.trusted_proxies))
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    IP do cliente, considerando apenas proxies confiaveis.
+
+    Se a conexao vem de um proxy confiavel, percorre o X-Forwarded-For da
+    direita para a esquerda e retorna o primeiro IP que nao e proxy (os
+    valores a esquerda podem ter sido forjados pelo cliente). Sem proxy
+    confiavel os headers sao ignorados.
+    """
+    peer = request.client.host if request.client else None
+    if peer and _is_trusted_proxy(peer):
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            for hop in reversed(hops):
+                if not _is_trusted_proxy(hop):
+                    return hop
+            if hops:
+                return hops[0]
+
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+
+    return peer or "unknown"
+
+
+# =============================================================================
+# Metricas por rota
+# =============================================================================
+
+
+@dataclass
+class RouteLimitStats:
+    """Contadores de rate limiting de uma rota (por processo)."""
+
+    checked: int = 0
+    blocked: int = 0
+
+
+_route_stats: dict[str, RouteLimitStats] = {}
+
+
+def _route_stats_for(request: Request) -> RouteLimitStats:
+    # Template da rota ("/posts/{slug}") para nao abrir um contador por URL
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or request.url.path
+    stats = _route_stats.get(path)
+    if stats is None:
+        stats = _route_stats[path] = RouteLimitStats()
+    return stats
+
+
+def rate_limit_key(request: Request) -> str:
+    """key_func do limiter: IP do cliente (conta a verificacao da rota)."""
+    _route_stats_for(request).checked += 1
+    return get_client_ip(request)
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Resposta 429 do SlowAPI, contando o bloqueio da rota."""
+    _route_stats_for(request).blocked += 1
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+def get_rate_limit_metrics() -> dict:
+    """Backend em uso e contadores por rota, das mais bloqueadas para as menos."""
+    storage = limiter._storage
+    routes = [
+        {"route": path, "checked": stats.checked, "blocked": stats.blocked}
+        for path, stats in _route_stats.items()
+    ]
+    return {
+        "storage": settings.rate_limit_storage,
+        "degraded": getattr(storage, "degraded", False),
+        "routes": sorted(routes, key=lambda row: (-row["blocked"], -row["checked"])),
+    }
+
+
+# =============================================================================
+# Limiter global
+# =============================================================================
+
+
+def _create_limiter() -> Limiter:
+    if settings.rate_limit_storage == "redis":
+        return Limiter(
+            key_func=rate_limit_key,
+            strategy="moving-window",
+            storage_uri=f"failover+{settings.redis_url}",
+            storage_options={
+                "socket_connect_timeout": REDIS_SOCKET_TIMEOUT_SECONDS,
+                "socket_timeout": REDIS_SOCKET_TIMEOUT_SECONDS,
+            },
+        )
+    return Limiter(key_func=rate_limit_key, strategy="moving-window", storage_uri="memory://")
+
 
 # Limiter global usando IP como chave
-limiter = Limiter(key_func=get_remote_address)
+limiter = _create_limiter()
 
 
 # Constantes de limite
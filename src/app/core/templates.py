@@ -6,9 +6,10 @@ Inclui filtros customizados para Markdown, formatacao, etc.
 
 from pathlib import Path
 from fastapi.templating import Jinja2Templates
-from markupsafe import Markup
+from markupsafe import Markup, escape
 
 from app.config import settings
+from app.services.image_derivatives import get_manifest
 from app.utils.markdown import markdown_to_html
 
 
@@ -51,6 +52,7 @@ def setup_templates(directory: Path) -> Jinja2Templates:
     templates.env.globals["google_site_verification"] = settings.google_site_verification
     templates.env.globals["is_production"] = settings.is_production
     templates.env.globals["app_name"] = settings.app_name
+    templates.env.globals["responsive_image"] = responsive_image
     templates.env.globals["static_v"] = _compute_static_version(
         directory.parent / "static"
     )
@@ -83,3 +85,48 @@ def _format_price_filter(value: float, currency: str = "R$") -> str:
         return ""
 
     return f"{currency} {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def responsive_image(
+    src: str | None,
+    alt: str = "",
+    sizes: str = "100vw",
+    **attrs,
+) -> Markup:
+    """
+    Gera <picture> com srcset WebP/AVIF a partir do manifesto de derivados.
+
+    Imagens sem derivados (externas ou antigas) viram um <img> simples.
+    Atributos extras vao para o <img> (use class_ para "class").
+
+    Uso no template:
+        {{ responsive_image(product.main_image_url, product.name,
+                            sizes="(max-width: 640px) 50vw, 300px",
+                            class_="product-card-image", loading="lazy") }}
+    """
+    if not src:
+        return Markup("")
+
+    manifest = get_manifest(src)
+
+    img_attrs = {"src": src, "alt": alt}
+    for key, value in attrs.items():
+        if value is None or value is False:
+            continue
+        img_attrs[key.rstrip("_").replace("_", "-")] = value
+
+    img = "<img " + " ".join(
+        f'{key}="{escape(value)}"' for key, value in img_attrs.items()
+    ) + ">"
+
+    if not manifest:
+        return Markup(img)
+
+    sources = []
+    for mime_type, variants in manifest["sources"].items():
+        srcset = ", ".join(f"{v['url']} {v['width']}w" for v in variants)
+        sources.append(
+            f'<source type="{escape(mime_type)}" srcset="{escape(srcset)}" '
+            f'sizes="{escape(sizes)}">'
+        )
+    return Markup(f"<picture>{''.join(sources)}{img}</picture>")
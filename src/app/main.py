@@ -10,16 +10,22 @@ from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
+from app.core.http_client import close_http_client
+from app.core.image_executor import shutdown_image_executor
 from app.core.logging import setup_logging, get_logger
 from app.core.middleware import AdminTokenRenewalMiddleware, SecurityHeadersMiddleware
-from app.core.rate_limit import limiter
+from app.core.rate_limit import limiter, rate_limit_exceeded_handler
 from app.database import check_database_connection
+from app.services.ai_log_sink import close_ai_log_sink
+from app.services.email import close_email_service, email_service
+from app.services.email_outbox import close_email_outbox, get_email_outbox
+from app.services.html_renderer import close_browser, preload_assets
+from app.services.newsletter_campaigns import close_campaign_dispatcher, get_campaign_dispatcher
 
 # -----------------------------------------------------------------------------
 # Logging Estruturado (JSON em producao)
@@ -42,17 +48,49 @@ async def lifespan(app: FastAPI):
     logger.info(f"Ambiente: {settings.environment}")
     logger.info(f"Debug: {settings.debug}")
 
+    # Abre o cliente SES compartilhado (pool de conexoes reaproveitado)
+    try:
+        await email_service.start()
+    except Exception as e:
+        logger.error(f"Falha ao abrir o cliente de email: {e}")
+
     # Verificar conexao com banco
     if await check_database_connection():
         logger.info("Conexao com banco de dados OK")
+        # Retoma campanhas de newsletter interrompidas pelo ultimo shutdown
+        try:
+            resumed = await get_campaign_dispatcher().resume_pending()
+            if resumed:
+                logger.info(f"Campanhas de newsletter retomadas: {resumed}")
+        except Exception as e:
+            logger.error(f"Falha ao retomar campanhas de newsletter: {e}")
     else:
         logger.error("Falha na conexao com banco de dados!")
 
+    # Envia os emails de verificacao enfileirados (inclusive os pendentes).
+    # Inicia mesmo sem banco no boot: o loop trata os erros e tenta de novo
+    # a cada email_outbox_poll_seconds.
+    get_email_outbox().start()
+
+    # Pre-carrega fontes/imagens dos templates usados na renderizacao HTML
+    logger.info(f"Assets de renderizacao carregados: {preload_assets()}")
+
     yield
 
     # Shutdown
     logger.info(f"Encerrando {settings.app_name}...")
 
+    # Encerra os envios de newsletter e da fila de emails (terminam o lote
+    # atual) e o cliente SES, grava os logs de IA pendentes, fecha o Chromium
+    # compartilhado (se foi lancado), o pool HTTP e o executor de imagens
+    await close_campaign_dispatcher()
+    await close_email_outbox()
+    await close_email_service()
+    await close_ai_log_sink()
+    await close_browser()
+    await close_http_client()
+    shutdown_image_executor()
+
 
 # -----------------------------------------------------------------------------
 # Aplicacao FastAPI
@@ -90,7 +128,7 @@ app.add_middleware(
 
 # Rate Limiting
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 
 # -----------------------------------------------------------------------------
@@ -109,11 +147,16 @@ class CacheControlStaticFiles(StaticFiles):
     CSS/JS antigos depois de um deploy (HTML novo + estilo velho). Assets
     versionados (?v=) podem ser cacheados por 1 ano; os demais devem ser
     revalidados a cada uso (304 via ETag, barato).
+
+    Arquivos em IMMUTABLE_PREFIXES tem nome derivado do conteudo (hash),
+    entao tambem sao cacheados por 1 ano mesmo sem ?v=.
     """
 
+    IMMUTABLE_PREFIXES = ("generated/instagram/",)
+
     async def get_response(self, path: str, scope):
         response = await super().get_response(path, scope)
-        if b"v=" in scope.get("query_string", b""):
+        if b"v=" in scope.get("query_string", b"") or path.startswith(self.IMMUTABLE_PREFIXES):
             response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
         else:
             response.headers["Cache-Control"] = "no-cache"
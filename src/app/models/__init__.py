@@ -15,6 +15,13 @@ from app.models.post_product import PostProduct
 from app.models.click import AffiliateClick
 from app.models.session import Session
 from app.models.newsletter import NewsletterSignup
+from app.models.email_outbox import EmailOutbox, OutboxKind, OutboxStatus
+from app.models.newsletter_campaign import (
+    CampaignStatus,
+    NewsletterCampaign,
+    NewsletterCampaignRecipient,
+    RecipientStatus,
+)
 from app.models.redirect import Redirect
 from app.models.ai_config import AIConfig, AIProvider, AIUseCase
 from app.models.instagram_post import InstagramPostHistory
@@ -43,6 +50,13 @@ __all__ = [
     "AffiliateClick",
     "Session",
     "NewsletterSignup",
+    "NewsletterCampaign",
+    "NewsletterCampaignRecipient",
+    "CampaignStatus",
+    "RecipientStatus",
+    "EmailOutbox",
+    "OutboxKind",
+    "OutboxStatus",
     "Redirect",
     "AIConfig",
     "AIProvider",
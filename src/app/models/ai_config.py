@@ -14,7 +14,7 @@ from sqlalchemy import Boolean, Enum, Float, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
-from app.models.base import TimestampMixin, UUIDMixin
+from app.models.base import JSONBType, TimestampMixin, UUIDMixin
 
 
 class AIProvider(str, enum.Enum):
@@ -162,6 +162,17 @@ class AIConfig(Base, UUIDMixin, TimestampMixin):
     temperature: Mapped[float] = mapped_column(Float, nullable=False, default=0.7)
     max_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=500)
 
+    # Cache de respostas (minutos): None = padrao global (LLM_CACHE_TTL),
+    # 0 = desabilitado (casos de uso criativos)
+    cache_ttl_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Failover: modelos (formato LiteLLM, ex: openrouter/openai/gpt-4o-mini)
+    # tentados em ordem se o principal falhar
+    fallback_models: Mapped[list | None] = mapped_column(JSONBType, nullable=True)
+
+    # Hedging: dispara o proximo modelo se o atual passar do p95 de latencia
+    hedge_requests: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
     # Ativo/inativo
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
 
@@ -2,29 +2,64 @@
 Modelo de Log de chamadas LLM.
 
 Registra todas as chamadas ao LLM para debug, auditoria e analise de custos.
+
+System prompts se repetem em quase todas as chamadas de um caso de uso, entao
+sao gravados uma unica vez em `ai_prompts` (chave = sha256 do conteudo) e o
+log guarda apenas o hash.
+
+Totais de uso/custo ficam pre-agregados em `ai_usage_daily` (dia x caso de
+uso x modelo), atualizado a cada insercao de log; o dashboard le dali em vez
+de agregar a tabela de logs inteira.
 """
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
+    Date,
     DateTime,
     Float,
+    ForeignKey,
     Integer,
     Numeric,
     String,
     Text,
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
 
 
+class AIPrompt(Base):
+    """
+    Prompt deduplicado pelo hash do conteudo.
+
+    Atributos:
+        hash: sha256 hex do conteudo (primary key)
+        content: Texto do prompt
+        created_at: Primeira vez que o prompt foi usado
+    """
+
+    __tablename__ = "ai_prompts"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    content: Mapped[str] = mapped_column(Text(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+
+    def __repr__(self) -> str:
+        return f"<AIPrompt {self.hash[:12]}>"
+
+
 class AILog(Base):
     """
     Log de chamadas ao LLM.
@@ -39,7 +74,8 @@ class AILog(Base):
         model: Modelo usado
         temperature: Temperature configurado
         max_tokens: Max tokens configurado
-        system_prompt: System prompt enviado
+        system_prompt: System prompt enviado (logs antigos; novos usam o hash)
+        system_prompt_hash: Hash do system prompt em ai_prompts
         user_prompt: User prompt enviado
         response_content: Conteudo da resposta
         finish_reason: Razao de finalizacao
@@ -49,6 +85,7 @@ class AILog(Base):
         cost_usd: Custo em USD
         latency_ms: Latencia em milissegundos
         success: Se a chamada foi bem sucedida
+        cached: Se a resposta veio do cache (sem chamada ao provider)
         error_message: Mensagem de erro se falhou
         user_id: ID do usuario admin que disparou
     """
@@ -109,7 +146,13 @@ class AILog(Base):
     system_prompt: Mapped[Optional[str]] = mapped_column(
         Text(),
         nullable=True,
-        comment="System prompt enviado",
+        comment="System prompt enviado (logs antigos; novos usam system_prompt_hash)",
+    )
+    system_prompt_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        ForeignKey("ai_prompts.hash"),
+        nullable=True,
+        comment="Hash do system prompt deduplicado em ai_prompts",
     )
     user_prompt: Mapped[str] = mapped_column(
         Text(),
@@ -163,6 +206,13 @@ class AILog(Base):
         default=True,
         comment="Se a chamada foi bem sucedida",
     )
+    cached: Mapped[bool] = mapped_column(
+        Boolean(),
+        nullable=False,
+        default=False,
+        server_default="false",
+        comment="Resposta servida pelo cache (sem chamada ao provider)",
+    )
     error_message: Mapped[Optional[str]] = mapped_column(
         Text(),
         nullable=True,
@@ -176,6 +226,70 @@ class AILog(Base):
         comment="ID do usuario admin",
     )
 
+    system_prompt_ref: Mapped[Optional[AIPrompt]] = relationship(lazy="selectin")
+
+    @property
+    def system_prompt_text(self) -> str | None:
+        """System prompt do log (inline nos antigos, deduplicado nos novos)."""
+        if self.system_prompt:
+            return self.system_prompt
+        return self.system_prompt_ref.content if self.system_prompt_ref else None
+
     def __repr__(self) -> str:
         status = "OK" if self.success else "ERRO"
         return f"<AILog {self.use_case} [{status}] {self.model}>"
+
+
+class AIUsageDaily(Base):
+    """
+    Rollup diario de uso de IA (dia x caso de uso x modelo).
+
+    Mantido incrementalmente pelo AILogRepository a cada log inserido.
+
+    Atributos:
+        day: Dia (UTC) das chamadas
+        use_case: Caso de uso
+        model: Modelo usado
+        calls: Total de chamadas
+        success_count: Chamadas bem sucedidas
+        error_count: Chamadas com erro
+        cached_count: Respostas servidas pelo cache
+        prompt_tokens / completion_tokens / total_tokens: Tokens somados
+        cost_usd: Custo somado (chamadas com sucesso)
+        latency_ms_total: Soma das latencias (media = total / calls)
+    """
+
+    __tablename__ = "ai_usage_daily"
+
+    day: Mapped[date] = mapped_column(Date(), primary_key=True)
+    use_case: Mapped[str] = mapped_column(String(50), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    calls: Mapped[int] = mapped_column(Integer(), nullable=False, default=0, server_default="0")
+    success_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    error_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    cached_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    prompt_tokens: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    completion_tokens: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    total_tokens: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    cost_usd: Mapped[Decimal] = mapped_column(
+        Numeric(precision=12, scale=6), nullable=False, default=Decimal("0"), server_default="0"
+    )
+    latency_ms_total: Mapped[int] = mapped_column(
+        BigInteger(), nullable=False, default=0, server_default="0"
+    )
+
+    def __repr__(self) -> str:
+        return f"<AIUsageDaily {self.day} {self.use_case} {self.model} calls={self.calls}>"
@@ -0,0 +1,90 @@
+"""
+Modelo da fila persistente de emails transacionais (outbox).
+
+A request grava o email a enviar nesta tabela, na mesma transacao da
+alteracao que o originou (ex.: token de verificacao da newsletter), e
+retorna sem esperar o SES. O EmailOutboxWorker envia em background, com
+retentativas; como a fila esta no banco, nada se perde em deploy ou queda.
+
+Fluxo de status:
+    pending -> sent
+            -> failed (apos esgotar as tentativas)
+"""
+
+import enum
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.base import JSONBType, TimestampMixin, UUIDMixin, utc_now
+
+
+class OutboxKind(str, enum.Enum):
+    """Tipos de email da fila (cada um tem um envio no worker)."""
+
+    NEWSLETTER_VERIFICATION = "newsletter_verification"
+
+
+class OutboxStatus(str, enum.Enum):
+    """Status de um email da fila."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(Base, UUIDMixin, TimestampMixin):
+    """
+    Email transacional aguardando envio.
+
+    Atributos:
+        kind: Tipo do email (OutboxKind)
+        to_email: Destinatario
+        payload: Dados do envio (ex.: {"verification_url": ...})
+        status: pending, sent ou failed
+        attempts: Tentativas feitas
+        last_error: Erro da ultima tentativa
+        next_attempt_at: Quando o email pode ser (re)enviado
+        locked_until / claimed_by: Lease do worker que pegou o email;
+            vencido, outro processo pode envia-lo
+        sent_at: Quando o envio foi aceito
+    """
+
+    __tablename__ = "email_outbox"
+
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    to_email: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONBType, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default=OutboxStatus.PENDING.value,
+        server_default=OutboxStatus.PENDING.value,
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utc_now
+    )
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    claimed_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )
+    sent_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        Index("idx_email_outbox_due", "status", "next_attempt_at"),
+        Index("idx_email_outbox_to_email", "to_email", "kind"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<EmailOutbox {self.kind} -> {self.to_email} ({self.status})>"
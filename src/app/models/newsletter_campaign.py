@@ -0,0 +1,154 @@
+"""
+Modelos de Campanha de Newsletter.
+
+Uma campanha guarda o conteudo do email e o progresso do envio; cada
+destinatario tem uma linha propria (newsletter_campaign_recipients) com o
+status do envio. O envio roda em background (CampaignDispatcher), entao
+campanhas interrompidas (deploy, queda) sao retomadas a partir das linhas
+ainda pendentes.
+
+Fluxo de status da campanha:
+    queued -> sending -> completed
+                      -> cancelled (pelo admin)
+"""
+
+import enum
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.base import TimestampMixin, UUIDMixin
+
+
+class CampaignStatus(str, enum.Enum):
+    """Status de uma campanha."""
+
+    QUEUED = "queued"
+    SENDING = "sending"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class RecipientStatus(str, enum.Enum):
+    """Status do envio para um destinatario."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NewsletterCampaign(Base, UUIDMixin, TimestampMixin):
+    """
+    Campanha de email para os inscritos da newsletter.
+
+    Atributos:
+        subject, heading, preview_text, cta_text, cta_url: Conteudo do email
+        content: Conteudo original em Markdown
+        content_html: Conteudo convertido para HTML (uma vez, na criacao)
+        status: queued, sending, completed ou cancelled
+        total_recipients: Destinatarios registrados na criacao
+        sent_count / failed_count: Progresso (atualizado a cada lote)
+        created_by: Email do admin que criou a campanha
+        started_at / finished_at: Inicio e fim do envio
+        locked_until / claimed_by: Lease do dispatcher que esta enviando
+            (validade e token do dono); vencido, a campanha pode ser
+            retomada por outro processo
+    """
+
+    __tablename__ = "newsletter_campaigns"
+
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    heading: Mapped[str] = mapped_column(String(255), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    content_html: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    preview_text: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    cta_text: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    cta_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default=CampaignStatus.QUEUED.value,
+        server_default=CampaignStatus.QUEUED.value,
+    )
+    total_recipients: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    sent_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    failed_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+    created_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True,
+        comment="Lease do dispatcher que esta enviando a campanha",
+    )
+    claimed_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True,
+        comment="Token do dispatcher que detem o lease",
+    )
+
+    __table_args__ = (
+        Index("idx_newsletter_campaigns_status", "status"),
+        Index("idx_newsletter_campaigns_created_at", "created_at"),
+    )
+
+    @property
+    def pending_count(self) -> int:
+        """Destinatarios ainda nao processados."""
+        return max(0, self.total_recipients - self.sent_count - self.failed_count)
+
+    def __repr__(self) -> str:
+        return f"<NewsletterCampaign {self.subject!r} ({self.status})>"
+
+
+class NewsletterCampaignRecipient(Base):
+    """
+    Destinatario de uma campanha e o status do envio para ele.
+
+    Atributos:
+        campaign_id, email: Chave primaria composta
+        status: pending, sent ou failed
+        attempts: Tentativas de envio feitas
+        last_error: Erro da ultima tentativa (se houver)
+        sent_at: Quando o envio foi aceito pelo SES
+    """
+
+    __tablename__ = "newsletter_campaign_recipients"
+
+    campaign_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("newsletter_campaigns.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    email: Mapped[str] = mapped_column(String(255), primary_key=True)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default=RecipientStatus.PENDING.value,
+        server_default=RecipientStatus.PENDING.value,
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        Index("idx_newsletter_campaign_recipients_status", "campaign_id", "status"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<NewsletterCampaignRecipient {self.email} ({self.status})>"
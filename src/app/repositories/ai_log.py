@@ -1,16 +1,28 @@
 """
 Repositorio para logs de chamadas LLM.
+
+System prompts sao deduplicados em ai_prompts (ver app/models/ai_log.py):
+o log guarda apenas o hash sha256 do conteudo. Toda insercao tambem soma
+seus contadores no rollup diario (AIUsageRepository.record).
 """
 
+import hashlib
 import uuid
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import select, desc
+from sqlalchemy import desc, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.ai_log import AILog
+from app.models.ai_log import AILog, AIPrompt
+from app.repositories.ai_usage import AIUsageRepository
+
+
+def hash_prompt(content: str) -> str:
+    """Hash (sha256 hex) usado como chave do prompt em ai_prompts."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
 class AILogRepository:
@@ -19,6 +31,16 @@ class AILogRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def _store_prompts(self, prompts: dict[str, str]) -> None:
+        """Insere os prompts (hash -> conteudo) que ainda nao existem."""
+        if not prompts:
+            return
+        await self.db.execute(
+            pg_insert(AIPrompt)
+            .values([{"hash": h, "content": c} for h, c in prompts.items()])
+            .on_conflict_do_nothing(index_elements=[AIPrompt.hash])
+        )
+
     async def create(
         self,
         use_case: str,
@@ -39,6 +61,7 @@ class AILogRepository:
         cost_usd: Decimal | None = None,
         latency_ms: int | None = None,
         success: bool = True,
+        cached: bool = False,
         error_message: str | None = None,
         user_id: uuid.UUID | None = None,
     ) -> AILog:
@@ -63,12 +86,18 @@ class AILogRepository:
             cost_usd: Custo em USD
             latency_ms: Latencia em milissegundos
             success: Se a chamada foi bem sucedida
+            cached: Se a resposta veio do cache (custo 0)
             error_message: Mensagem de erro se falhou
             user_id: ID do usuario admin
 
         Returns:
             AILog criado
         """
+        system_prompt_hash = None
+        if system_prompt:
+            system_prompt_hash = hash_prompt(system_prompt)
+            await self._store_prompts({system_prompt_hash: system_prompt})
+
         log = AILog(
             use_case=use_case,
             provider=provider,
@@ -76,7 +105,7 @@ class AILogRepository:
             user_prompt=user_prompt,
             entity_type=entity_type,
             entity_id=entity_id,
-            system_prompt=system_prompt,
+            system_prompt_hash=system_prompt_hash,
             temperature=temperature,
             max_tokens=max_tokens,
             response_content=response_content,
@@ -87,14 +116,59 @@ class AILogRepository:
             cost_usd=cost_usd,
             latency_ms=latency_ms,
             success=success,
+            cached=cached,
             error_message=error_message,
             user_id=user_id,
         )
         self.db.add(log)
+        await AIUsageRepository(self.db).record([{
+            "use_case": use_case,
+            "model": model,
+            "success": success,
+            "cached": cached,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "cost_usd": cost_usd,
+            "latency_ms": latency_ms,
+        }])
         await self.db.commit()
         await self.db.refresh(log)
         return log
 
+    async def add_many(self, records: list[dict]) -> int:
+        """
+        Insere varios logs em uma unica instrucao (sem commit).
+
+        Usado pela fila de logs (app/services/ai_log_sink.py) e por jobs em
+        lote. Os system prompts distintos do lote sao gravados uma vez em
+        ai_prompts.
+
+        Args:
+            records: Dicts com os mesmos campos aceitos por create()
+
+        Returns:
+            Quantidade de logs inseridos
+        """
+        if not records:
+            return 0
+
+        prompts: dict[str, str] = {}
+        rows = []
+        for record in records:
+            row = dict(record)
+            system_prompt = row.pop("system_prompt", None)
+            row["system_prompt_hash"] = None
+            if system_prompt:
+                row["system_prompt_hash"] = hash_prompt(system_prompt)
+                prompts[row["system_prompt_hash"]] = system_prompt
+            rows.append(row)
+
+        await self._store_prompts(prompts)
+        await self.db.execute(insert(AILog), rows)
+        await AIUsageRepository(self.db).record(rows)
+        return len(rows)
+
     async def get_all(
         self,
         limit: int = 100,
@@ -146,7 +220,10 @@ class AILogRepository:
         use_case: str | None = None,
         success: bool | None = None,
     ) -> int:
-        """Conta logs com filtros opcionais."""
+        """
+        Conta logs com filtros opcionais (agrega a tabela de logs inteira;
+        para totais do dashboard use AIUsageRepository.get_totals).
+        """
         from sqlalchemy import func
         query = select(func.count(AILog.id))
 
@@ -163,7 +240,10 @@ class AILogRepository:
         start_date: datetime | None = None,
         end_date: datetime | None = None,
     ) -> Decimal:
-        """Calcula custo total no periodo."""
+        """
+        Calcula custo total no periodo a partir dos logs brutos (para totais
+        do dashboard use AIUsageRepository.get_totals).
+        """
         from sqlalchemy import func
         query = select(func.sum(AILog.cost_usd)).where(AILog.success == True)
 
@@ -0,0 +1,143 @@
+"""
+Repositorio do rollup diario de uso de IA (ai_usage_daily).
+
+O rollup e mantido incrementalmente: cada lote de logs inserido pelo
+AILogRepository soma seus contadores aqui na mesma transacao (upsert por
+dia x caso de uso x modelo). Leituras de totais/custo usam so esta tabela,
+cujo tamanho cresce com dias x modelos e nao com o numero de chamadas.
+"""
+
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ai_log import AIUsageDaily
+
+# Contadores somados no upsert
+USAGE_COUNTERS = (
+    "calls",
+    "success_count",
+    "error_count",
+    "cached_count",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "cost_usd",
+    "latency_ms_total",
+)
+
+
+class AIUsageRepository:
+    """Repositorio para o rollup de uso de IA."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(self, logs: Iterable[dict[str, Any]], day: date | None = None) -> None:
+        """
+        Soma logs recem-inseridos no rollup (sem commit).
+
+        Args:
+            logs: Dicts com os campos do AILog (use_case, model, success, ...)
+            day: Dia das chamadas (padrao: hoje em UTC)
+        """
+        day = day or datetime.now(UTC).date()
+        buckets: dict[tuple[str, str], dict[str, Any]] = {}
+
+        for log in logs:
+            key = (log["use_case"], log["model"])
+            row = buckets.setdefault(key, {
+                "day": day,
+                "use_case": key[0],
+                "model": key[1],
+                **{name: 0 for name in USAGE_COUNTERS},
+                "cost_usd": Decimal("0"),
+            })
+            success = log.get("success", True)
+            row["calls"] += 1
+            row["success_count"] += 1 if success else 0
+            row["error_count"] += 0 if success else 1
+            row["cached_count"] += 1 if log.get("cached") else 0
+            row["prompt_tokens"] += log.get("prompt_tokens") or 0
+            row["completion_tokens"] += log.get("completion_tokens") or 0
+            row["total_tokens"] += log.get("total_tokens") or 0
+            if success:
+                row["cost_usd"] += log.get("cost_usd") or Decimal("0")
+            row["latency_ms_total"] += log.get("latency_ms") or 0
+
+        if not buckets:
+            return
+
+        stmt = pg_insert(AIUsageDaily).values(list(buckets.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AIUsageDaily.day, AIUsageDaily.use_case, AIUsageDaily.model],
+            set_={
+                name: getattr(AIUsageDaily, name) + getattr(stmt.excluded, name)
+                for name in USAGE_COUNTERS
+            },
+        )
+        await self.db.execute(stmt)
+
+    async def get_totals(
+        self,
+        use_case: str | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> dict[str, Any]:
+        """
+        Totais de chamadas, erros, tokens e custo no periodo.
+
+        Args:
+            use_case: Filtrar por caso de uso
+            start_date: Dia inicial (inclusive)
+            end_date: Dia final (inclusive)
+
+        Returns:
+            Dict com calls, success_count, error_count, cached_count,
+            total_tokens, cost_usd e avg_latency_ms
+        """
+        query = select(
+            *(func.coalesce(func.sum(getattr(AIUsageDaily, name)), 0).label(name)
+              for name in USAGE_COUNTERS)
+        )
+        if use_case:
+            query = query.where(AIUsageDaily.use_case == use_case)
+        if start_date:
+            query = query.where(AIUsageDaily.day >= start_date)
+        if end_date:
+            query = query.where(AIUsageDaily.day <= end_date)
+
+        row = (await self.db.execute(query)).one()
+        totals = dict(row._mapping)
+        totals["cost_usd"] = Decimal(str(totals["cost_usd"]))
+        totals["avg_latency_ms"] = (
+            int(totals["latency_ms_total"] / totals["calls"]) if totals["calls"] else 0
+        )
+        return totals
+
+    async def get_breakdown(self, days: int = 30, limit: int = 10) -> list[dict[str, Any]]:
+        """
+        Custo e chamadas por caso de uso x modelo nos ultimos `days` dias,
+        do mais caro para o mais barato.
+        """
+        since = datetime.now(UTC).date() - timedelta(days=days - 1)
+        query = (
+            select(
+                AIUsageDaily.use_case,
+                AIUsageDaily.model,
+                func.sum(AIUsageDaily.calls).label("calls"),
+                func.sum(AIUsageDaily.error_count).label("error_count"),
+                func.sum(AIUsageDaily.total_tokens).label("total_tokens"),
+                func.sum(AIUsageDaily.cost_usd).label("cost_usd"),
+            )
+            .where(AIUsageDaily.day >= since)
+            .group_by(AIUsageDaily.use_case, AIUsageDaily.model)
+            .order_by(func.sum(AIUsageDaily.cost_usd).desc(), func.sum(AIUsageDaily.calls).desc())
+            .limit(limit)
+        )
+        result = await self.db.execute(query)
+        return [dict(row._mapping) for row in result]
@@ -0,0 +1,139 @@
+"""
+Repositorio da fila de emails transacionais (email_outbox).
+
+`enqueue` nao faz commit: o email entra na mesma transacao da alteracao
+que o originou. O EmailOutboxWorker pega os emails vencidos com `claim_due`
+(lease por UPDATE condicional, como nas campanhas) e grava o resultado.
+"""
+
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import utc_now
+from app.models.email_outbox import EmailOutbox, OutboxStatus
+from app.repositories.base import BaseRepository
+
+
+class EmailOutboxRepository(BaseRepository[EmailOutbox]):
+    """Repositorio com operacoes da fila de emails."""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(EmailOutbox, db)
+
+    async def enqueue(self, kind: str, to_email: str, payload: dict) -> None:
+        """
+        Agenda um email para envio imediato (sem commit).
+
+        Se ja houver um email do mesmo tipo pendente (e nao em envio) para o
+        destinatario, ele e substituido (ex.: reenvio de verificacao com
+        token novo), em vez de enviar dois.
+        """
+        now = utc_now()
+        result = await self.db.execute(
+            update(EmailOutbox)
+            .where(
+                EmailOutbox.to_email == to_email,
+                EmailOutbox.kind == kind,
+                EmailOutbox.status == OutboxStatus.PENDING.value,
+                or_(EmailOutbox.locked_until.is_(None), EmailOutbox.locked_until < now),
+            )
+            .values(payload=payload, next_attempt_at=now, attempts=0, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            self.db.add(EmailOutbox(kind=kind, to_email=to_email, payload=payload, next_attempt_at=now))
+
+    async def claim_due(self, limit: int, lease_seconds: int) -> list[EmailOutbox]:
+        """
+        Pega ate `limit` emails vencidos sem lease valido.
+
+        Um UPDATE marca os emails com um token proprio; so os marcados por
+        este processo sao retornados (dois workers nao pegam o mesmo email).
+        """
+        now = utc_now()
+        claim = uuid.uuid4()
+        available = or_(EmailOutbox.locked_until.is_(None), EmailOutbox.locked_until < now)
+        due = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status == OutboxStatus.PENDING.value,
+                EmailOutbox.next_attempt_at <= now,
+                available,
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+        )
+        await self.db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()), available)
+            .values(locked_until=now + timedelta(seconds=lease_seconds), claimed_by=claim)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+        result = await self.db.execute(select(EmailOutbox).where(EmailOutbox.claimed_by == claim))
+        return list(result.scalars().all())
+
+    async def record_results(
+        self,
+        results: dict[uuid.UUID, str | None],
+        max_attempts: int,
+        retry_seconds: int,
+    ) -> None:
+        """
+        Grava o resultado dos envios (erro ou None por id de email pego).
+
+        Falhas sao reagendadas com espera exponencial
+        (retry_seconds * 2^(tentativas - 1)) ate `max_attempts`.
+        """
+        now = utc_now()
+        sent = [message_id for message_id, error in results.items() if error is None]
+        if sent:
+            await self.db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(sent))
+                .values(
+                    status=OutboxStatus.SENT.value,
+                    attempts=EmailOutbox.attempts + 1,
+                    last_error=None,
+                    sent_at=now,
+                    locked_until=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        failed = {message_id: error for message_id, error in results.items() if error is not None}
+        if failed:
+            messages = await self.db.execute(
+                select(EmailOutbox.id, EmailOutbox.attempts).where(EmailOutbox.id.in_(failed))
+            )
+            for message_id, attempts in messages.all():
+                attempts += 1
+                await self.db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == message_id)
+                    .values(
+                        attempts=attempts,
+                        last_error=failed[message_id][:500],
+                        status=(
+                            OutboxStatus.FAILED.value
+                            if attempts >= max_attempts
+                            else OutboxStatus.PENDING.value
+                        ),
+                        next_attempt_at=now + timedelta(seconds=retry_seconds * 2 ** (attempts - 1)),
+                        locked_until=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+        await self.db.commit()
+
+    async def count_pending(self) -> int:
+        """Emails aguardando envio."""
+        result = await self.db.execute(
+            select(func.count(EmailOutbox.id)).where(EmailOutbox.status == OutboxStatus.PENDING.value)
+        )
+        return result.scalar_one()
@@ -5,15 +5,31 @@ Suporta double opt-in: inscritos precisam verificar email antes de
 serem considerados ativos para receber newsletters.
 """
 
+import time
 from datetime import UTC, datetime, timedelta
-from typing import Optional
+from typing import Any, Optional
+from uuid import UUID
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import NewsletterSignup
 from app.repositories.base import BaseRepository
 
+# Estatisticas em cache por alguns segundos (por processo): as paginas do
+# admin nao refazem o agregado a cada request. Alteracoes de inscritos
+# feitas por este processo invalidam o cache na hora.
+NEWSLETTER_STATS_TTL_SECONDS = 5.0
+
+_stats_cache: tuple[float, dict] | None = None
+
+
+def invalidate_newsletter_stats() -> None:
+    """Descarta as estatisticas em cache (apos inscrever/verificar/desinscrever)."""
+    global _stats_cache
+    _stats_cache = None
+
 
 class NewsletterRepository(BaseRepository[NewsletterSignup]):
     """Repositorio com operacoes especificas de NewsletterSignup."""
@@ -21,6 +37,16 @@ class NewsletterRepository(BaseRepository[NewsletterSignup]):
     def __init__(self, db: AsyncSession):
         super().__init__(NewsletterSignup, db)
 
+    async def create(self, obj_in: dict[str, Any]) -> NewsletterSignup:
+        signup = await super().create(obj_in)
+        invalidate_newsletter_stats()
+        return signup
+
+    async def delete(self, id: UUID) -> bool:
+        deleted = await super().delete(id)
+        invalidate_newsletter_stats()
+        return deleted
+
     async def get_by_email(self, email: str) -> NewsletterSignup | None:
         """Busca inscricao por email."""
         result = await self.db.execute(
@@ -68,6 +94,21 @@ class NewsletterRepository(BaseRepository[NewsletterSignup]):
         )
         return list(result.scalars().all())
 
+    async def get_verified_by_ids(self, ids: list[UUID]) -> list[NewsletterSignup]:
+        """Inscritos ativos e verificados entre os IDs informados (uma consulta)."""
+        if not ids:
+            return []
+        result = await self.db.execute(
+            select(NewsletterSignup)
+            .where(
+                NewsletterSignup.id.in_(ids),
+                NewsletterSignup.is_active == True,  # noqa: E712
+                NewsletterSignup.email_verified == True,  # noqa: E712
+            )
+            .order_by(NewsletterSignup.email)
+        )
+        return list(result.scalars().all())
+
     async def get_pending_verification(
         self, skip: int = 0, limit: int = 100
     ) -> list[NewsletterSignup]:
@@ -138,6 +179,7 @@ class NewsletterRepository(BaseRepository[NewsletterSignup]):
             signup.verify_email()
             await self.db.commit()
             await self.db.refresh(signup)
+            invalidate_newsletter_stats()
         return signup
 
     async def unsubscribe(self, email: str) -> NewsletterSignup | None:
@@ -148,8 +190,85 @@ class NewsletterRepository(BaseRepository[NewsletterSignup]):
             signup.unsubscribed_at = datetime.now(UTC)
             await self.db.commit()
             await self.db.refresh(signup)
+            invalidate_newsletter_stats()
         return signup
 
+    async def unsubscribe_by_ids(self, ids: list[UUID]) -> int:
+        """Desinscreve varios inscritos em um UPDATE. Retorna quantos mudaram."""
+        if not ids:
+            return 0
+        result = await self.db.execute(
+            update(NewsletterSignup)
+            .where(
+                NewsletterSignup.id.in_(ids),
+                NewsletterSignup.is_active == True,  # noqa: E712
+            )
+            .values(is_active=False, unsubscribed_at=datetime.now(UTC))
+        )
+        await self.db.commit()
+        invalidate_newsletter_stats()
+        return result.rowcount
+
+    async def delete_by_ids(self, ids: list[UUID]) -> int:
+        """Remove varios inscritos em um DELETE. Retorna quantos removeu."""
+        if not ids:
+            return 0
+        result = await self.db.execute(
+            delete(NewsletterSignup).where(NewsletterSignup.id.in_(ids))
+        )
+        await self.db.commit()
+        invalidate_newsletter_stats()
+        return result.rowcount
+
+    async def insert_new(self, rows: list[dict[str, Any]]) -> int:
+        """
+        Insere varios inscritos em um INSERT ... ON CONFLICT (email) DO NOTHING.
+
+        Emails ja cadastrados sao ignorados. Faz commit. Retorna quantos
+        foram inseridos.
+        """
+        if not rows:
+            return 0
+        # Mesmo comando para todos os lotes (compilado uma vez); o SQLAlchemy
+        # agrupa as linhas em INSERTs de varios VALUES. RETURNING traz so as
+        # linhas inseridas.
+        table = NewsletterSignup.__table__
+        result = await self.db.execute(
+            pg_insert(table)
+            .on_conflict_do_nothing(index_elements=[table.c.email])
+            .returning(table.c.id),
+            rows,
+        )
+        inserted = len(result.all())
+        await self.db.commit()
+        invalidate_newsletter_stats()
+        return inserted
+
+    async def get_export_batch(self, limit: int, after_email: str | None = None) -> list:
+        """
+        Proximo lote de inscritos ordenado por email (paginacao pela chave).
+
+        Retorna linhas so com as colunas exportadas (sem carregar objetos ORM).
+        """
+        query = (
+            select(
+                NewsletterSignup.email,
+                NewsletterSignup.name,
+                NewsletterSignup.source,
+                NewsletterSignup.is_active,
+                NewsletterSignup.email_verified,
+                NewsletterSignup.subscribed_at,
+                NewsletterSignup.verified_at,
+                NewsletterSignup.unsubscribed_at,
+            )
+            .order_by(NewsletterSignup.email)
+            .limit(limit)
+        )
+        if after_email is not None:
+            query = query.where(NewsletterSignup.email > after_email)
+        result = await self.db.execute(query)
+        return list(result.all())
+
     async def resubscribe(self, email: str) -> NewsletterSignup | None:
         """Reinscreve por email (mantem status de verificacao)."""
         signup = await self.get_by_email(email)
@@ -158,51 +277,51 @@ class NewsletterRepository(BaseRepository[NewsletterSignup]):
             signup.unsubscribed_at = None
             await self.db.commit()
             await self.db.refresh(signup)
+            invalidate_newsletter_stats()
         return signup
 
-    async def get_stats(self) -> dict:
-        """Retorna estatisticas de newsletter."""
+    async def get_stats(self, use_cache: bool = True) -> dict:
+        """
+        Retorna estatisticas de newsletter.
+
+        Todos os contadores saem de um unico agregado
+        (COUNT(*) FILTER (WHERE ...)), em uma leitura da tabela. O resultado
+        fica em cache por NEWSLETTER_STATS_TTL_SECONDS.
+        """
+        global _stats_cache
+        if use_cache and _stats_cache is not None and _stats_cache[0] > time.monotonic():
+            return dict(_stats_cache[1])
+
         now = datetime.now(UTC)
         today = now.replace(hour=0, minute=0, second=0, microsecond=0)
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
 
-        total = await self.count()
-        active = await self.count_active()
-        verified = await self.count_verified()
-        pending = await self.count_pending_verification()
-
-        # Inscricoes hoje
+        active = NewsletterSignup.is_active == True  # noqa: E712
+        verified = NewsletterSignup.email_verified == True  # noqa: E712
+        count = func.count(NewsletterSignup.id)
         result = await self.db.execute(
-            select(func.count())
-            .select_from(NewsletterSignup)
-            .where(NewsletterSignup.subscribed_at >= today)
-        )
-        today_count = result.scalar_one()
-
-        # Inscricoes na semana
-        result = await self.db.execute(
-            select(func.count())
-            .select_from(NewsletterSignup)
-            .where(NewsletterSignup.subscribed_at >= week_ago)
-        )
-        week_count = result.scalar_one()
-
-        # Inscricoes no mes
-        result = await self.db.execute(
-            select(func.count())
-            .select_from(NewsletterSignup)
-            .where(NewsletterSignup.subscribed_at >= month_ago)
+            select(
+                count,
+                count.filter(active),
+                count.filter(and_(active, verified)),
+                count.filter(and_(active, ~verified)),
+                count.filter(NewsletterSignup.subscribed_at >= today),
+                count.filter(NewsletterSignup.subscribed_at >= week_ago),
+                count.filter(NewsletterSignup.subscribed_at >= month_ago),
+            )
         )
-        month_count = result.scalar_one()
+        total, active_count, verified_count, pending, today_count, week_count, month_count = result.one()
 
-        return {
+        stats = {
             "total_subscribers": total,
-            "active_subscribers": active,
-            "verified_subscribers": verified,
+            "active_subscribers": active_count,
+            "verified_subscribers": verified_count,
             "pending_verification": pending,
-            "unsubscribed": total - active,
+            "unsubscribed": total - active_count,
             "subscriptions_today": today_count,
             "subscriptions_week": week_count,
             "subscriptions_month": month_count,
         }
+        _stats_cache = (time.monotonic() + NEWSLETTER_STATS_TTL_SECONDS, stats)
+        return dict(stats)
@@ -0,0 +1,375 @@
+"""
+Repositorio para campanhas de newsletter e seus destinatarios.
+
+Os destinatarios sao copiados dos inscritos por um unico INSERT ... SELECT
+na criacao da campanha (sem carregar os inscritos em memoria). O envio e
+feito pelo CampaignDispatcher, que le os pendentes em lotes e grava o
+resultado de cada lote com um UPDATE em lote.
+
+Exclusividade do envio: o dispatcher so processa a campanha enquanto
+detem o lease (`locked_until` + token `claimed_by`), adquirido por UPDATE
+condicional. Renovar, liberar e concluir exigem o token e o lease ainda
+valido: se um lote demorar mais que o lease e outro processo assumir a
+campanha, a renovacao do antigo dono falha e ele para de enviar. Um
+processo que morre deixa o lease expirar e a campanha pode ser retomada
+por outro.
+"""
+
+import uuid
+from datetime import timedelta
+from typing import Sequence
+from uuid import UUID
+
+from sqlalchemy import bindparam, case, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import NewsletterSignup
+from app.models.base import utc_now
+from app.models.newsletter_campaign import (
+    CampaignStatus,
+    NewsletterCampaign,
+    NewsletterCampaignRecipient,
+    RecipientStatus,
+)
+from app.repositories.base import BaseRepository
+
+# Status em que a campanha ainda tem envio a fazer
+_OPEN_STATUSES = (CampaignStatus.QUEUED.value, CampaignStatus.SENDING.value)
+
+
+class NewsletterCampaignRepository(BaseRepository[NewsletterCampaign]):
+    """Repositorio com operacoes de campanha, lease e destinatarios."""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(NewsletterCampaign, db)
+
+    # -------------------------------------------------------------------------
+    # Criacao e consulta
+    # -------------------------------------------------------------------------
+
+    async def create_with_recipients(
+        self,
+        data: dict,
+        subscriber_ids: Sequence[UUID] | None = None,
+    ) -> NewsletterCampaign | None:
+        """
+        Cria a campanha e registra os destinatarios (inscritos ativos e
+        verificados; opcionalmente so os `subscriber_ids`).
+
+        Returns:
+            A campanha criada, ou None se nao houver destinatarios
+            (nada e gravado nesse caso).
+        """
+        campaign = NewsletterCampaign(**data)
+        self.db.add(campaign)
+        await self.db.flush()
+
+        audience = select(
+            literal(campaign.id, NewsletterCampaignRecipient.campaign_id.type),
+            NewsletterSignup.email,
+        ).where(
+            NewsletterSignup.is_active == True,  # noqa: E712
+            NewsletterSignup.email_verified == True,  # noqa: E712
+        )
+        if subscriber_ids is not None:
+            audience = audience.where(NewsletterSignup.id.in_(subscriber_ids))
+
+        result = await self.db.execute(
+            insert(NewsletterCampaignRecipient).from_select(["campaign_id", "email"], audience)
+        )
+        if not result.rowcount:
+            await self.db.rollback()
+            return None
+
+        campaign.total_recipients = result.rowcount
+        await self.db.commit()
+        await self.db.refresh(campaign)
+        return campaign
+
+    async def get_recent(self, limit: int = 10) -> list[NewsletterCampaign]:
+        """Campanhas mais recentes primeiro."""
+        result = await self.db.execute(
+            select(NewsletterCampaign)
+            .order_by(NewsletterCampaign.created_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_resumable_ids(self) -> list[UUID]:
+        """Campanhas com envio a fazer e sem lease valido (ninguem enviando)."""
+        result = await self.db.execute(
+            select(NewsletterCampaign.id)
+            .where(
+                NewsletterCampaign.status.in_(_OPEN_STATUSES),
+                or_(
+                    NewsletterCampaign.locked_until.is_(None),
+                    NewsletterCampaign.locked_until < utc_now(),
+                ),
+            )
+            .order_by(NewsletterCampaign.created_at)
+        )
+        return list(result.scalars().all())
+
+    async def get_pending_batch(
+        self, campaign_id: UUID, limit: int, after_email: str | None = None
+    ) -> list[str]:
+        """
+        Proximo lote de emails pendentes, em ordem de email.
+
+        Paginacao por chave (`after_email`) sobre a PK (campaign_id, email):
+        cada lote continua de onde o anterior parou, sem OFFSET nem
+        reordenar os pendentes a cada consulta.
+        """
+        query = select(NewsletterCampaignRecipient.email).where(
+            NewsletterCampaignRecipient.campaign_id == campaign_id,
+            NewsletterCampaignRecipient.status == RecipientStatus.PENDING.value,
+        )
+        if after_email is not None:
+            query = query.where(NewsletterCampaignRecipient.email > after_email)
+        result = await self.db.execute(
+            query.order_by(NewsletterCampaignRecipient.email).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_failed_recipients(
+        self, campaign_id: UUID, limit: int = 50
+    ) -> list[NewsletterCampaignRecipient]:
+        """Destinatarios que esgotaram as tentativas (para exibir no admin)."""
+        result = await self.db.execute(
+            select(NewsletterCampaignRecipient)
+            .where(
+                NewsletterCampaignRecipient.campaign_id == campaign_id,
+                NewsletterCampaignRecipient.status == RecipientStatus.FAILED.value,
+            )
+            .order_by(NewsletterCampaignRecipient.email)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    # -------------------------------------------------------------------------
+    # Lease do dispatcher
+    # -------------------------------------------------------------------------
+
+    async def acquire_lease(self, campaign_id: UUID, lease_seconds: int) -> UUID | None:
+        """
+        Assume o envio da campanha se ninguem detiver o lease.
+
+        Returns:
+            Token do lease (exigido para renovar, liberar e concluir), ou
+            None se outro processo detem o lease ou a campanha foi encerrada
+        """
+        now = utc_now()
+        claim = uuid.uuid4()
+        result = await self.db.execute(
+            update(NewsletterCampaign)
+            .where(
+                NewsletterCampaign.id == campaign_id,
+                NewsletterCampaign.status.in_(_OPEN_STATUSES),
+                or_(
+                    NewsletterCampaign.locked_until.is_(None),
+                    NewsletterCampaign.locked_until < now,
+                ),
+            )
+            .values(
+                status=CampaignStatus.SENDING.value,
+                locked_until=now + timedelta(seconds=lease_seconds),
+                claimed_by=claim,
+                started_at=func.coalesce(NewsletterCampaign.started_at, now),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return claim if result.rowcount == 1 else None
+
+    @staticmethod
+    def _held_by(campaign_id: UUID, claim: UUID) -> tuple:
+        """Condicao de lease valido e detido por `claim`, com a campanha em envio."""
+        return (
+            NewsletterCampaign.id == campaign_id,
+            NewsletterCampaign.status == CampaignStatus.SENDING.value,
+            NewsletterCampaign.claimed_by == claim,
+            NewsletterCampaign.locked_until > utc_now(),
+        )
+
+    async def renew_lease(self, campaign_id: UUID, claim: UUID, lease_seconds: int) -> bool:
+        """
+        Estende o lease. False se a campanha nao esta mais em envio
+        (cancelada pelo admin) ou se o lease venceu ou passou a outro
+        processo - nos dois casos o dispatcher deve parar.
+        """
+        result = await self.db.execute(
+            update(NewsletterCampaign)
+            .where(*self._held_by(campaign_id, claim))
+            .values(locked_until=utc_now() + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def release_lease(self, campaign_id: UUID, claim: UUID) -> None:
+        """Libera o lease (shutdown) para a campanha ser retomada logo."""
+        await self.db.execute(
+            update(NewsletterCampaign)
+            .where(*self._held_by(campaign_id, claim))
+            .values(locked_until=None, claimed_by=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    # -------------------------------------------------------------------------
+    # Progresso
+    # -------------------------------------------------------------------------
+
+    async def record_results(
+        self,
+        campaign_id: UUID,
+        sent: Sequence[str],
+        failed: dict[str, str],
+        max_attempts: int,
+    ) -> None:
+        """
+        Grava o resultado de um bloco enviado e atualiza os contadores da
+        campanha.
+
+        Falhas voltam para 'pending' ate atingirem `max_attempts`, quando
+        passam a 'failed'. Os envios ja aconteceram, entao sao gravados
+        mesmo que o lease tenha sido perdido; so destinatarios ainda
+        pendentes sao atualizados.
+        """
+        table = NewsletterCampaignRecipient.__table__
+        now = utc_now()
+
+        if sent:
+            await self.db.execute(
+                update(table)
+                .where(
+                    table.c.campaign_id == campaign_id,
+                    table.c.email.in_(sent),
+                    table.c.status == RecipientStatus.PENDING.value,
+                )
+                .values(
+                    status=RecipientStatus.SENT.value,
+                    attempts=table.c.attempts + 1,
+                    last_error=None,
+                    sent_at=now,
+                )
+            )
+
+        if failed:
+            await self.db.execute(
+                update(table)
+                .where(
+                    table.c.campaign_id == campaign_id,
+                    table.c.email == bindparam("b_email"),
+                    table.c.status == RecipientStatus.PENDING.value,
+                )
+                .values(
+                    attempts=table.c.attempts + 1,
+                    last_error=bindparam("b_error"),
+                    status=case(
+                        (table.c.attempts + 1 >= max_attempts, RecipientStatus.FAILED.value),
+                        else_=RecipientStatus.PENDING.value,
+                    ),
+                ),
+                [{"b_email": email, "b_error": error[:500]} for email, error in failed.items()],
+            )
+
+        await self._refresh_counters(campaign_id)
+        await self.db.commit()
+
+    async def _refresh_counters(self, campaign_id: UUID) -> None:
+        """Recalcula sent_count/failed_count a partir dos destinatarios."""
+        recipients = NewsletterCampaignRecipient
+
+        def count_status(status: RecipientStatus):
+            return (
+                select(func.count())
+                .where(
+                    recipients.campaign_id == campaign_id,
+                    recipients.status == status.value,
+                )
+                .scalar_subquery()
+            )
+
+        await self.db.execute(
+            update(NewsletterCampaign)
+            .where(NewsletterCampaign.id == campaign_id)
+            .values(
+                sent_count=count_status(RecipientStatus.SENT),
+                failed_count=count_status(RecipientStatus.FAILED),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def finish(self, campaign_id: UUID, claim: UUID) -> bool:
+        """
+        Marca a campanha como concluida e libera o lease.
+
+        Returns:
+            False se o lease nao e mais de `claim` (ou a campanha foi cancelada)
+        """
+        result = await self.db.execute(
+            update(NewsletterCampaign)
+            .where(*self._held_by(campaign_id, claim))
+            .values(
+                status=CampaignStatus.COMPLETED.value,
+                finished_at=utc_now(),
+                locked_until=None,
+                claimed_by=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def cancel(self, campaign_id: UUID) -> bool:
+        """
+        Cancela uma campanha em aberto. O dispatcher para ao renovar o
+        lease no fim do bloco atual.
+        """
+        result = await self.db.execute(
+            update(NewsletterCampaign)
+            .where(
+                NewsletterCampaign.id == campaign_id,
+                NewsletterCampaign.status.in_(_OPEN_STATUSES),
+            )
+            .values(status=CampaignStatus.CANCELLED.value, finished_at=utc_now())
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def retry_failed(self, campaign_id: UUID) -> int:
+        """
+        Devolve os destinatarios com falha de uma campanha concluida para a
+        fila e reabre a campanha.
+
+        Returns:
+            Quantidade de destinatarios reenfileirados
+        """
+        reopened = await self.db.execute(
+            update(NewsletterCampaign)
+            .where(
+                NewsletterCampaign.id == campaign_id,
+                NewsletterCampaign.status == CampaignStatus.COMPLETED.value,
+                NewsletterCampaign.failed_count > 0,
+            )
+            .values(status=CampaignStatus.QUEUED.value, finished_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if reopened.rowcount != 1:
+            await self.db.rollback()
+            return 0
+
+        result = await self.db.execute(
+            update(NewsletterCampaignRecipient)
+            .where(
+                NewsletterCampaignRecipient.campaign_id == campaign_id,
+                NewsletterCampaignRecipient.status == RecipientStatus.FAILED.value,
+            )
+            .values(status=RecipientStatus.PENDING.value, attempts=0)
+            .execution_options(synchronize_session=False)
+        )
+        await self._refresh_counters(campaign_id)
+        await self.db.commit()
+        return result.rowcount
@@ -12,7 +12,7 @@ from pathlib import Path
 from typing import Annotated, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, Response, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
 from sqlalchemy import func
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
@@ -1129,6 +1129,9 @@ async def update_ai_config(
     user_prompt: str = Form(None),
     temperature: float = Form(0.7),
     max_tokens: int = Form(500),
+    cache_ttl_minutes: str = Form(None),
+    fallback_models: str = Form(None),
+    hedge_requests: str = Form(None),
     is_active: str = Form(None),
 ):
     """Atualiza configuracao de IA."""
@@ -1136,6 +1139,56 @@ async def update_ai_config(
     if not config:
         raise HTTPException(status_code=404, detail="Configuracao nao encontrada")
 
+    # Placeholders sao validados ao salvar (em tempo de execucao ficariam literais)
+    from app.services.prompt_template import PROMPT_PLACEHOLDERS, find_unknown_placeholders
+
+    errors = []
+    unknown = find_unknown_placeholders(user_prompt)
+    if unknown:
+        errors.append(
+            "Placeholders desconhecidos no template: "
+            + ", ".join(f"{{{{{name}}}}}" for name in unknown)
+            + ". Disponiveis: "
+            + ", ".join(sorted(PROMPT_PLACEHOLDERS))
+        )
+
+    # Vazio = padrao global; 0 = cache desabilitado
+    cache_ttl = None
+    if cache_ttl_minutes and cache_ttl_minutes.strip():
+        try:
+            cache_ttl = max(0, int(cache_ttl_minutes))
+        except ValueError:
+            errors.append("TTL do cache deve ser um numero inteiro de minutos.")
+
+    if errors:
+        return templates.TemplateResponse(
+            request=request,
+            name="admin/ai-configs/form.html",
+            context={
+                "title": f"Editar: {config.name} - Admin",
+                "current_user": current_user,
+                "config": config,
+                "active_page": "ai-configs",
+                # Mantem tudo o que foi digitado para correcao
+                "form": {
+                    "name": name,
+                    "description": description or "",
+                    "provider": provider,
+                    "model": model,
+                    "system_prompt": system_prompt,
+                    "user_prompt": user_prompt or "",
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "cache_ttl_minutes": cache_ttl_minutes or "",
+                    "fallback_models": fallback_models or "",
+                    "hedge_requests": hedge_requests == "true",
+                    "is_active": is_active == "true",
+                },
+                "error": " ".join(errors),
+            },
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
     # Atualiza campos
     update_data = {
         "name": name,
@@ -1146,11 +1199,22 @@ async def update_ai_config(
         "user_prompt": user_prompt or None,
         "temperature": temperature,
         "max_tokens": max_tokens,
+        "cache_ttl_minutes": cache_ttl,
+        # Um modelo por linha (formato LiteLLM)
+        "fallback_models": [
+            line.strip() for line in (fallback_models or "").splitlines() if line.strip()
+        ] or None,
+        "hedge_requests": hedge_requests == "true",
         "is_active": is_active == "true",
     }
 
     await repo.update(config, update_data)
 
+    # Proxima geracao ja usa a config editada
+    from app.services.ai_config_registry import invalidate_ai_config_cache
+
+    invalidate_ai_config_cache()
+
     # Redireciona para a lista com mensagem de sucesso
     return RedirectResponse(
         url="/admin/ai-configs",
@@ -1179,6 +1243,7 @@ async def list_ai_logs(
         success: Filtra por status (1=sucesso, 0=erro)
     """
     from app.repositories.ai_log import AILogRepository
+    from app.repositories.ai_usage import AIUsageRepository
     from app.models.ai_config import AIUseCase
 
     repo = AILogRepository(db)
@@ -1197,11 +1262,13 @@ async def list_ai_logs(
         success=success_filter,
     )
 
-    # Estatisticas
-    total_logs = await repo.count()
-    success_count = await repo.count(success=True)
-    error_count = await repo.count(success=False)
-    total_cost = await repo.get_total_cost()
+    # Estatisticas (rollup diario, sem agregar a tabela de logs)
+    usage_repo = AIUsageRepository(db)
+    totals = await usage_repo.get_totals(use_case=use_case or None)
+    usage_breakdown = await usage_repo.get_breakdown(days=30)
+
+    # Latencia/erros por modelo (failover), medidos neste processo
+    from app.services.llm import get_provider_metrics
 
     # Lista de use_cases para o filtro
     use_cases = [uc.value for uc in AIUseCase]
@@ -1217,10 +1284,12 @@ async def list_ai_logs(
             "use_cases": use_cases,
             "selected_use_case": use_case,
             "selected_success": success,
-            "total_logs": total_logs,
-            "success_count": success_count,
-            "error_count": error_count,
-            "total_cost": total_cost,
+            "total_logs": totals["calls"],
+            "success_count": totals["success_count"],
+            "error_count": totals["error_count"],
+            "total_cost": totals["cost_usd"],
+            "usage_breakdown": usage_breakdown,
+            "provider_metrics": get_provider_metrics(),
         },
     )
 
@@ -1493,21 +1562,13 @@ async def send_newsletter_form(
 
     Pode receber IDs pre-selecionados via query params.
     """
-    from uuid import UUID
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
 
     # Conta verificados
-    total_verified = await repo.count_verified()
-
-    # Se tem IDs selecionados, busca os inscritos
-    selected_subscribers = []
-    if selected_ids:
-        for sid in selected_ids:
-            try:
-                subscriber = await repo.get(UUID(sid))
-                if subscriber and subscriber.is_active and subscriber.email_verified:
-                    selected_subscribers.append(subscriber)
-            except ValueError:
-                pass
+    total_verified = (await repo.get_stats())["verified_subscribers"]
+
+    # Se tem IDs selecionados, busca os inscritos (uma consulta)
+    selected_subscribers = await repo.get_verified_by_ids(_parse_uuids(selected_ids))
 
     return templates.TemplateResponse(
         request=request,
@@ -1518,6 +1579,7 @@ async def send_newsletter_form(
             "total_verified": total_verified,
             "selected_ids": selected_ids or [],
             "selected_subscribers": selected_subscribers,
+            "campaigns": await NewsletterCampaignRepository(repo.db).get_recent(),
             "current_year": datetime.now().year,
             "active_page": "newsletter",
         },
@@ -1544,43 +1606,91 @@ async def send_newsletter_submit(
     Processa envio de email em massa.
 
     Modos de envio:
-    - is_test=true: Envia apenas para test_email
-    - recipient_type=all: Envia para todos os verificados
-    - recipient_type=selected: Envia para IDs selecionados
+    - is_test=true: Envia apenas para test_email (na propria request)
+    - recipient_type=all: Cria campanha para todos os verificados
+    - recipient_type=selected: Cria campanha para os IDs selecionados
+
+    Campanhas sao enviadas em background (CampaignDispatcher); a request
+    redireciona para a pagina de progresso da campanha.
     """
-    from uuid import UUID
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
     from app.services.email import email_service
+    from app.services.newsletter_campaigns import get_campaign_dispatcher
+    from app.utils.markdown import markdown_to_html
 
-    # Determina destinatarios
-    recipients = []
+    content_html = markdown_to_html(content) if content else ""
+    campaign_repo = NewsletterCampaignRepository(repo.db)
 
+    # Modo teste: um unico email, enviado na hora
     if is_test == "true" and test_email:
-        # Modo teste: apenas um email
-        recipients = [test_email]
-    elif recipient_type == "all":
-        # Todos os verificados
-        verified = await repo.get_active_subscribers(limit=10000)
-        recipients = [s.email for s in verified]
-    elif recipient_type == "selected" and selected_ids:
-        # Apenas selecionados
-        for sid in selected_ids:
-            try:
-                subscriber = await repo.get(UUID(sid))
-                if subscriber and subscriber.is_active and subscriber.email_verified:
-                    recipients.append(subscriber.email)
-            except ValueError:
-                pass
-
-    if not recipients:
+        sent = await email_service.send_newsletter_email(
+            to_email=test_email,
+            subject=subject,
+            heading=heading,
+            content_html=content_html,
+            preview_text=preview_text,
+            cta_text=cta_text,
+            cta_url=cta_url,
+        )
+        result = (
+            {"success": f"Email de teste enviado para {test_email}!"}
+            if sent
+            else {"error": f"Falha ao enviar o email de teste para {test_email}."}
+        )
         return templates.TemplateResponse(
             request=request,
             name="admin/newsletter/send.html",
             context={
                 "title": "Enviar Email - Admin",
                 "current_user": current_user,
-                "total_verified": await repo.count_verified(),
+                "total_verified": (await repo.get_stats())["verified_subscribers"],
                 "selected_ids": [],
                 "selected_subscribers": [],
+                "campaigns": await campaign_repo.get_recent(),
+                "current_year": datetime.now().year,
+                "active_page": "newsletter",
+                **result,
+                "subject": subject,
+                "heading": heading,
+                "content": content,
+                "preview_text": preview_text,
+                "cta_text": cta_text,
+                "cta_url": cta_url,
+            },
+        )
+
+    # Destinatarios: todos os verificados ou apenas os selecionados
+    subscriber_ids = None
+    if recipient_type == "selected":
+        subscriber_ids = _parse_uuids(selected_ids)
+
+    campaign = None
+    if recipient_type == "all" or subscriber_ids:
+        campaign = await campaign_repo.create_with_recipients(
+            {
+                "subject": subject,
+                "heading": heading,
+                "content": content,
+                "content_html": content_html,
+                "preview_text": preview_text or None,
+                "cta_text": cta_text or None,
+                "cta_url": cta_url or None,
+                "created_by": current_user.email,
+            },
+            subscriber_ids=subscriber_ids,
+        )
+
+    if campaign is None:
+        return templates.TemplateResponse(
+            request=request,
+            name="admin/newsletter/send.html",
+            context={
+                "title": "Enviar Email - Admin",
+                "current_user": current_user,
+                "total_verified": (await repo.get_stats())["verified_subscribers"],
+                "selected_ids": [],
+                "selected_subscribers": [],
+                "campaigns": await campaign_repo.get_recent(),
                 "current_year": datetime.now().year,
                 "active_page": "newsletter",
                 "error": "Nenhum destinatario encontrado.",
@@ -1593,52 +1703,127 @@ async def send_newsletter_submit(
             },
         )
 
-    # Envia emails
-    success_count = 0
-    error_count = 0
+    get_campaign_dispatcher().start(campaign.id)
 
-    for email_addr in recipients:
+    return RedirectResponse(
+        url=f"/admin/newsletter/campaigns/{campaign.id}",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
+def _parse_uuids(values: list[str] | None) -> list[UUID]:
+    """Converte IDs vindos do formulario, ignorando os invalidos."""
+    ids = []
+    for value in values or []:
         try:
-            sent = await email_service.send_newsletter_email(
-                to_email=email_addr,
-                subject=subject,
-                heading=heading,
-                content=content,
-                preview_text=preview_text,
-                cta_text=cta_text,
-                cta_url=cta_url,
-            )
-            if sent:
-                success_count += 1
-            else:
-                error_count += 1
-        except Exception as e:
-            error_count += 1
-
-    # Mensagem de resultado
-    if is_test == "true":
-        message = f"Email de teste enviado para {test_email}!"
-    else:
-        message = f"Enviado com sucesso para {success_count} destinatario(s)."
-        if error_count > 0:
-            message += f" {error_count} erro(s)."
+            ids.append(UUID(value))
+        except ValueError:
+            pass
+    return ids
+
+
+def _campaign_progress(campaign, running: bool) -> dict:
+    """Progresso da campanha (pagina e polling)."""
+    done = campaign.sent_count + campaign.failed_count
+    return {
+        "id": str(campaign.id),
+        "status": campaign.status,
+        "total": campaign.total_recipients,
+        "sent": campaign.sent_count,
+        "failed": campaign.failed_count,
+        "pending": campaign.pending_count,
+        "percent": round(100 * done / campaign.total_recipients) if campaign.total_recipients else 100,
+        "running": running,
+        "started_at": campaign.started_at.isoformat() if campaign.started_at else None,
+        "finished_at": campaign.finished_at.isoformat() if campaign.finished_at else None,
+    }
+
+
+@router.get("/newsletter/campaigns/{campaign_id}", response_class=HTMLResponse)
+async def newsletter_campaign_detail(
+    request: Request,
+    campaign_id: UUID,
+    current_user: AdminUser,
+    db: DBSession,
+):
+    """Pagina de progresso de uma campanha (atualizada por polling)."""
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+    from app.services.newsletter_campaigns import get_campaign_dispatcher
+
+    repo = NewsletterCampaignRepository(db)
+    campaign = await repo.get(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campanha nao encontrada")
+
+    running = get_campaign_dispatcher().is_running(campaign.id)
 
     return templates.TemplateResponse(
         request=request,
-        name="admin/newsletter/send.html",
+        name="admin/newsletter/campaign.html",
         context={
-            "title": "Enviar Email - Admin",
+            "title": "Campanha - Admin",
             "current_user": current_user,
-            "total_verified": await repo.count_verified(),
-            "selected_ids": [],
-            "selected_subscribers": [],
-            "current_year": datetime.now().year,
+            "campaign": campaign,
+            "progress": _campaign_progress(campaign, running),
+            "failed_recipients": await repo.get_failed_recipients(campaign.id),
             "active_page": "newsletter",
-            "success": message,
         },
     )
 
 
+@router.get("/newsletter/campaigns/{campaign_id}/progress")
+async def newsletter_campaign_progress(
+    campaign_id: UUID,
+    current_user: AdminUser,
+    db: DBSession,
+) -> dict:
+    """Progresso da campanha em JSON (polling da pagina da campanha)."""
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+    from app.services.newsletter_campaigns import get_campaign_dispatcher
+
+    campaign = await NewsletterCampaignRepository(db).get(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campanha nao encontrada")
+
+    return _campaign_progress(campaign, get_campaign_dispatcher().is_running(campaign.id))
+
+
+@router.post("/newsletter/campaigns/{campaign_id}/cancel")
+async def newsletter_campaign_cancel(
+    campaign_id: UUID,
+    current_user: AdminUser,
+    db: DBSession,
+):
+    """Cancela a campanha; o envio para ao fim do lote em andamento."""
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+
+    await NewsletterCampaignRepository(db).cancel(campaign_id)
+
+    return RedirectResponse(
+        url=f"/admin/newsletter/campaigns/{campaign_id}",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
+@router.post("/newsletter/campaigns/{campaign_id}/retry")
+async def newsletter_campaign_retry(
+    campaign_id: UUID,
+    current_user: AdminUser,
+    db: DBSession,
+):
+    """Reenvia para os destinatarios que falharam em uma campanha concluida."""
+    from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+    from app.services.newsletter_campaigns import get_campaign_dispatcher
+
+    if await NewsletterCampaignRepository(db).retry_failed(campaign_id):
+        get_campaign_dispatcher().start(campaign_id)
+
+    return RedirectResponse(
+        url=f"/admin/newsletter/campaigns/{campaign_id}",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
 @router.post("/newsletter/{subscriber_id}/resend")
 async def resend_verification(
     subscriber_id: UUID,
@@ -1722,31 +1907,65 @@ async def bulk_action(
     action: str = Form(...),
     selected_ids: list[str] = Form(None),
 ):
-    """Executa acao em massa nos inscritos selecionados."""
-    from uuid import UUID
+    """Executa acao em massa nos inscritos selecionados (um comando por acao)."""
+    ids = _parse_uuids(selected_ids)
 
-    if not selected_ids:
-        return RedirectResponse(
-            url="/admin/newsletter",
-            status_code=status.HTTP_303_SEE_OTHER,
-        )
+    if action == "unsubscribe":
+        await repo.unsubscribe_by_ids(ids)
+    elif action == "delete":
+        await repo.delete_by_ids(ids)
 
-    for sid in selected_ids:
-        try:
-            subscriber = await repo.get(UUID(sid))
-            if not subscriber:
-                continue
-
-            if action == "unsubscribe":
-                await repo.unsubscribe(subscriber.email)
-            elif action == "delete":
-                await repo.db.delete(subscriber)
-        except ValueError:
-            pass
+    return RedirectResponse(
+        url="/admin/newsletter",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
 
-    await repo.db.commit()
+
+@router.post("/newsletter/import")
+async def import_newsletter(
+    current_user: AdminUser,
+    repo: NewsletterRepo,
+    file: UploadFile = File(...),
+    verified: bool = Form(False),
+):
+    """
+    Importa inscritos de um CSV (migracao de outras ferramentas).
+
+    O arquivo e processado em lotes (um INSERT por lote); emails ja
+    inscritos sao ignorados. Nenhum email de verificacao e enviado.
+    """
+    from app.services.newsletter_csv import IMPORT_MAX_SIZE, import_subscribers_csv, upload_size
+
+    # Mede o arquivo recebido (o tamanho declarado pode faltar); sem
+    # tamanho conhecido, recusa
+    size = upload_size(file.file)
+    if size is None or size > IMPORT_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Arquivo muito grande. Tamanho maximo: {IMPORT_MAX_SIZE // (1024 * 1024)}MB",
+        )
+
+    result = await import_subscribers_csv(repo, file.file, verified=verified)
 
     return RedirectResponse(
-        url="/admin/newsletter",
+        url=(
+            f"/admin/newsletter?status=&imported={result.imported}"
+            f"&duplicates={result.duplicates}&invalid={result.invalid}"
+        ),
         status_code=status.HTTP_303_SEE_OTHER,
     )
+
+
+@router.get("/newsletter/export")
+async def export_newsletter(current_user: AdminUser):
+    """Exporta todos os inscritos em CSV (gerado em streaming, memoria constante)."""
+    from fastapi.responses import StreamingResponse
+
+    from app.services.newsletter_csv import export_subscribers_csv
+
+    filename = f"newsletter-{datetime.now():%Y%m%d}.csv"
+    return StreamingResponse(
+        export_subscribers_csv(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -5,6 +5,7 @@ Processa formularios de criacao, edicao e exclusao de:
 - Posts, Produtos, Categorias e Usuarios
 """
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone
@@ -27,6 +28,7 @@ from app.api.deps import (
     UserRepo,
 )
 from app.services.api_token import create_api_token
+from app.services.html_renderer import RendererUnavailableError, render_url
 from app.core.security import get_password_hash
 from app.models import User
 from app.models.post import PostStatus, PostType
@@ -867,86 +869,56 @@ async def generate_instagram_image(
     if badge:
         params["badge"] = badge
 
-    # Converte HTML para imagem usando Playwright
-    try:
-        from playwright.async_api import async_playwright
-    except ImportError:
-        return JSONResponse(
-            content={"detail": "Playwright nao instalado. Execute: pip install playwright && playwright install chromium"},
-            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    # Prepara cookies de autenticacao para o contexto do browser
+    playwright_cookies = [
+        {"name": name, "value": value, "domain": "localhost", "path": "/"}
+        for name, value in request.cookies.items()
+    ]
+
+    # Tipos a gerar: (chave, altura)
+    targets = [
+        (kind, height)
+        for kind, height in (("post", 1080), ("story", 1920))
+        if img_type in (kind, "both")
+    ]
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-
-            # Prepara cookies de autenticacao
-            cookies = request.cookies
-            playwright_cookies = []
-            if cookies:
-                for name, value in cookies.items():
-                    playwright_cookies.append({
-                        "name": name,
-                        "value": value,
-                        "domain": "localhost",
-                        "path": "/",
-                    })
-
-            result = {"success": True, "format": "png"}
-
-            # Gera imagem do POST se necessario
-            if img_type in ("post", "both"):
-                page_post = await browser.new_page(viewport={"width": 1080, "height": 1080})
-                if playwright_cookies:
-                    await page_post.context.add_cookies(playwright_cookies)
-
-                post_params = {**params, "type": "post"}
-                post_url = f"{base_url}{preview_path}?" + urlencode(post_params)
-                await page_post.goto(post_url, wait_until="networkidle", timeout=30000)
-                await page_post.wait_for_timeout(2000)
-                screenshot_post = await page_post.screenshot(type="png", full_page=False)
-                await page_post.close()
-
-                result["post"] = {
-                    "image_base64": base64.b64encode(screenshot_post).decode("utf-8"),
-                    "image_url": "",  # Admin nao salva no disco, apenas retorna base64
-                    "width": 1080,
-                    "height": 1080,
-                    "file_size_kb": len(screenshot_post) // 1024,
-                }
-
-            # Gera imagem do STORY se necessario
-            if img_type in ("story", "both"):
-                page_story = await browser.new_page(viewport={"width": 1080, "height": 1920})
-                if playwright_cookies:
-                    await page_story.context.add_cookies(playwright_cookies)
-
-                story_params = {**params, "type": "story"}
-                story_url = f"{base_url}{preview_path}?" + urlencode(story_params)
-                await page_story.goto(story_url, wait_until="networkidle", timeout=30000)
-                await page_story.wait_for_timeout(2000)
-                screenshot_story = await page_story.screenshot(type="png", full_page=False)
-                await page_story.close()
-
-                result["story"] = {
-                    "image_base64": base64.b64encode(screenshot_story).decode("utf-8"),
-                    "image_url": "",  # Admin nao salva no disco, apenas retorna base64
-                    "width": 1080,
-                    "height": 1920,
-                    "file_size_kb": len(screenshot_story) // 1024,
-                }
-
-            await browser.close()
-
-            # Campos legados para compatibilidade (usa dados do post)
-            if "post" in result:
-                result["image_base64"] = result["post"]["image_base64"]
-                result["width"] = 1080
-                result["height"] = 1080
-                result["file_size_kb"] = result["post"]["file_size_kb"]
+        # Renderiza no browser compartilhado (post e story em paralelo),
+        # aguardando fontes e imagens em vez de sleep fixo
+        screenshots = await asyncio.gather(*[
+            render_url(
+                f"{base_url}{preview_path}?" + urlencode({**params, "type": kind}),
+                width=1080,
+                height=height,
+                cookies=playwright_cookies,
+            )
+            for kind, height in targets
+        ])
+
+        result = {"success": True, "format": "png"}
+        for (kind, height), screenshot in zip(targets, screenshots):
+            result[kind] = {
+                "image_base64": base64.b64encode(screenshot).decode("utf-8"),
+                "image_url": "",  # Admin nao salva no disco, apenas retorna base64
+                "width": 1080,
+                "height": height,
+                "file_size_kb": len(screenshot) // 1024,
+            }
+
+        # Campos legados para compatibilidade (usa dados do post)
+        if "post" in result:
+            result["image_base64"] = result["post"]["image_base64"]
+            result["width"] = 1080
+            result["height"] = 1080
+            result["file_size_kb"] = result["post"]["file_size_kb"]
 
         return JSONResponse(content=result, status_code=http_status.HTTP_200_OK)
 
+    except RendererUnavailableError as e:
+        return JSONResponse(
+            content={"detail": str(e)},
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
     except Exception as e:
         logger.error(f"Erro ao gerar imagem Instagram: {e}")
         return JSONResponse(
@@ -1753,19 +1725,21 @@ async def api_generate_ai_content(
     - product_name: Nome do produto (opcional)
     - entity_type: Tipo da entidade para log (opcional, ex: post, category)
     - entity_id: UUID da entidade para log (opcional)
+    - use_cache: false para ignorar o cache de respostas (opcional, padrao true)
 
     Returns:
         JSON com:
         - generated_content: Conteudo gerado
         - model_used: Modelo que gerou
         - tokens_used: Tokens consumidos
+        - cached: Se veio do cache (custo 0)
     """
     import time
     import traceback
     from decimal import Decimal
 
     from app.models.ai_config import AIUseCase
-    from app.repositories.ai_log import AILogRepository
+    from app.services.ai_log_sink import submit_ai_log
     from app.services.ai_seo import AISEOService
     from app.services.llm import LLMError
 
@@ -1793,9 +1767,8 @@ async def api_generate_ai_content(
             status_code=http_status.HTTP_400_BAD_REQUEST,
         )
 
-    # Instancia servicos
+    # Instancia servicos (logs vao para a fila de gravacao em lote)
     ai_service = AISEOService(db)
-    log_repo = AILogRepository(db)
 
     # Extrai dados para logging
     entity_type = data.get("entity_type")
@@ -1815,13 +1788,14 @@ async def api_generate_ai_content(
             category=data.get("category"),
             product_name=data.get("product_name"),
             target_audience=data.get("target_audience"),
+            use_cache=data.get("use_cache", True),
         )
 
         # Calcula latencia em ms
         latency_ms = int((time.time() - start_time) * 1000)
 
         # Salva log de sucesso
-        await log_repo.create(
+        submit_ai_log(
             use_case=use_case_str,
             provider=result.get("_provider", "unknown"),
             model=result["model_used"],
@@ -1839,6 +1813,7 @@ async def api_generate_ai_content(
             cost_usd=Decimal(str(result.get("cost_usd", 0))),
             latency_ms=latency_ms,
             success=True,
+            cached=result.get("cached", False),
             user_id=current_user.id,
         )
 
@@ -1851,6 +1826,7 @@ async def api_generate_ai_content(
                 "completion_tokens": result.get("completion_tokens", 0),
                 "cost_usd": result.get("cost_usd", 0),
                 "use_case": result["use_case"],
+                "cached": result.get("cached", False),
             },
             status_code=http_status.HTTP_200_OK,
         )
@@ -1860,7 +1836,7 @@ async def api_generate_ai_content(
         latency_ms = int((time.time() - start_time) * 1000)
 
         # Salva log de erro de validacao
-        await log_repo.create(
+        submit_ai_log(
             use_case=use_case_str,
             provider="unknown",
             model="unknown",
@@ -1887,7 +1863,7 @@ async def api_generate_ai_content(
         latency_ms = int((time.time() - start_time) * 1000)
 
         # Salva log de erro LLM
-        await log_repo.create(
+        submit_ai_log(
             use_case=use_case_str,
             provider="unknown",
             model="unknown",
@@ -1918,7 +1894,7 @@ async def api_generate_ai_content(
         latency_ms = int((time.time() - start_time) * 1000)
 
         # Salva log de erro inesperado
-        await log_repo.create(
+        submit_ai_log(
             use_case=use_case_str,
             provider="unknown",
             model="unknown",
@@ -1941,6 +1917,305 @@ async def api_generate_ai_content(
         )
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """Formata um evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/api/ai/generate-stream")
+async def api_generate_ai_content_stream(
+    request: Request,
+    current_user: AdminUser,
+    db: DBSession,
+):
+    """
+    Gera conteudo com IA em streaming (Server-Sent Events).
+
+    Aceita o mesmo JSON de /api/ai/generate. Para textos longos (ex:
+    descricao de produto) o editor mostra os tokens conforme chegam, em vez
+    de esperar a geracao inteira.
+
+    Eventos:
+    - delta: {"content": trecho gerado}
+    - done: {"generated_content", "model_used", "tokens_used", "cost_usd", ...}
+    - error: {"detail", "error_type"}
+
+    O AILog e enfileirado ao final (sucesso ou erro). Erros de validacao e de
+    configuracao, detectados antes do primeiro token, retornam JSON 400/500
+    como em /api/ai/generate.
+    """
+    from decimal import Decimal
+
+    from fastapi.responses import StreamingResponse
+
+    from app.models.ai_config import AIUseCase
+    from app.services.ai_log_sink import submit_ai_log
+    from app.services.ai_seo import AISEOService
+
+    try:
+        data = await request.json()
+    except Exception:
+        return JSONResponse(
+            content={"detail": "JSON invalido"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    use_case_str = data.get("use_case")
+    try:
+        use_case = AIUseCase(use_case_str)
+    except ValueError:
+        return JSONResponse(
+            content={"detail": f"use_case invalido: {use_case_str}"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    entity_type = data.get("entity_type")
+    entity_id_str = data.get("entity_id")
+    entity_id = UUID(entity_id_str) if entity_id_str else None
+    user_id = current_user.id
+
+    def save_log(result: dict | None, error: Exception | None = None) -> None:
+        if error is None:
+            submit_ai_log(
+                use_case=use_case_str,
+                provider=result.get("_provider", "unknown"),
+                model=result["model_used"],
+                user_prompt=result.get("_user_prompt", ""),
+                entity_type=entity_type,
+                entity_id=entity_id,
+                system_prompt=result.get("_system_prompt"),
+                temperature=result.get("_temperature"),
+                max_tokens=result.get("_max_tokens"),
+                response_content=result["generated_content"],
+                finish_reason=result.get("finish_reason"),
+                prompt_tokens=result.get("prompt_tokens"),
+                completion_tokens=result.get("completion_tokens"),
+                total_tokens=result.get("tokens_used"),
+                cost_usd=Decimal(str(result.get("cost_usd", 0))),
+                latency_ms=result.get("_latency_ms"),
+                success=True,
+                user_id=user_id,
+            )
+        else:
+            submit_ai_log(
+                use_case=use_case_str,
+                provider="unknown",
+                model="unknown",
+                user_prompt=str(data),
+                entity_type=entity_type,
+                entity_id=entity_id,
+                success=False,
+                error_message=str(error),
+                user_id=user_id,
+            )
+
+    stream = AISEOService(db).generate_stream(
+        use_case,
+        title=data.get("title"),
+        subtitle=data.get("subtitle"),
+        content=data.get("content"),
+        keywords=data.get("keywords"),
+        category=data.get("category"),
+        product_name=data.get("product_name"),
+        target_audience=data.get("target_audience"),
+    )
+
+    # Aguarda o primeiro evento antes de responder: erros de configuracao
+    # ou de conexao com o provider ainda viram resposta JSON normal
+    try:
+        first_event = await anext(stream)
+    except Exception as e:
+        logger.error(f"Erro ao iniciar streaming AI ({use_case_str}): {e}")
+        save_log(None, e)
+        return JSONResponse(
+            content={"detail": str(e), "error_type": type(e).__name__},
+            status_code=(
+                http_status.HTTP_400_BAD_REQUEST
+                if isinstance(e, ValueError)
+                else http_status.HTTP_500_INTERNAL_SERVER_ERROR
+            ),
+        )
+
+    async def event_source():
+        event = first_event
+        try:
+            while True:
+                if event["type"] == "done":
+                    result = event["result"]
+                    save_log(result)
+                    yield _sse_event(
+                        "done",
+                        {k: v for k, v in result.items() if not k.startswith("_")},
+                    )
+                    return
+                yield _sse_event("delta", {"content": event["content"]})
+                event = await anext(stream)
+        except Exception as e:
+            logger.error(f"Erro no streaming AI ({use_case_str}): {e}")
+            save_log(None, e)
+            yield _sse_event("error", {"detail": str(e), "error_type": type(e).__name__})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # Evita buffering em proxies (nginx/Traefik) para o token chegar na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Maximo de campos por requisicao de geracao em lote
+AI_BATCH_MAX_USE_CASES = 10
+
+
+@router.post("/api/ai/generate-batch")
+async def api_generate_ai_content_batch(
+    request: Request,
+    current_user: AdminUser,
+    db: DBSession,
+):
+    """
+    Gera varios campos SEO de uma entidade em uma unica requisicao.
+
+    As configuracoes sao carregadas em uma query e as chamadas ao LLM rodam
+    em paralelo (limitadas por provider): "preencher todos os campos" leva
+    o tempo da chamada mais lenta, e nao a soma.
+
+    Aceita JSON com:
+    - use_cases: Lista de tipos de geracao (ex: ["post_seo_title", "post_tags"])
+    - title, subtitle, content, keywords, category, product_name,
+      target_audience: Contexto (opcionais, compartilhados por todos os campos)
+    - entity_type / entity_id: Entidade para log (opcionais)
+    - use_cache: false para ignorar o cache de respostas (opcional)
+
+    Returns:
+        JSON com:
+        - results: {use_case: {generated_content, model_used, tokens_used, ...}}
+          ou {use_case: {error: "..."}} para campos que falharam
+        - tokens_used / cost_usd: Totais do lote
+    """
+    from decimal import Decimal
+
+    from app.models.ai_config import AIUseCase
+    from app.services.ai_log_sink import submit_ai_log
+    from app.services.ai_seo import AISEOService
+
+    try:
+        data = await request.json()
+    except Exception:
+        return JSONResponse(
+            content={"detail": "JSON invalido"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    use_case_strs = data.get("use_cases")
+    if not use_case_strs or not isinstance(use_case_strs, list):
+        return JSONResponse(
+            content={"detail": "Campo 'use_cases' (lista) e obrigatorio"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Remove duplicados mantendo a ordem
+    use_case_strs = list(dict.fromkeys(use_case_strs))
+    if len(use_case_strs) > AI_BATCH_MAX_USE_CASES:
+        return JSONResponse(
+            content={"detail": f"Maximo de {AI_BATCH_MAX_USE_CASES} use_cases por requisicao"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        use_cases = [AIUseCase(value) for value in use_case_strs]
+    except ValueError as e:
+        return JSONResponse(
+            content={"detail": f"use_case invalido: {e}"},
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+        )
+
+    entity_type = data.get("entity_type")
+    entity_id_str = data.get("entity_id")
+    entity_id = UUID(entity_id_str) if entity_id_str else None
+
+    results = await AISEOService(db).generate_batch(
+        use_cases,
+        use_cache=data.get("use_cache", True),
+        title=data.get("title"),
+        subtitle=data.get("subtitle"),
+        content=data.get("content"),
+        keywords=data.get("keywords"),
+        category=data.get("category"),
+        product_name=data.get("product_name"),
+        target_audience=data.get("target_audience"),
+    )
+
+    # Registra um log por campo e monta a resposta
+    response_results = {}
+    total_tokens = 0
+    total_cost = 0.0
+
+    for use_case, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"Erro na geracao em lote ({use_case.value}): {result}")
+            submit_ai_log(
+                use_case=use_case.value,
+                provider="unknown",
+                model="unknown",
+                user_prompt=str(data),
+                entity_type=entity_type,
+                entity_id=entity_id,
+                success=False,
+                error_message=str(result),
+                user_id=current_user.id,
+            )
+            response_results[use_case.value] = {
+                "error": str(result),
+                "error_type": type(result).__name__,
+            }
+            continue
+
+        submit_ai_log(
+            use_case=use_case.value,
+            provider=result.get("_provider", "unknown"),
+            model=result["model_used"],
+            user_prompt=result.get("_user_prompt", ""),
+            entity_type=entity_type,
+            entity_id=entity_id,
+            system_prompt=result.get("_system_prompt"),
+            temperature=result.get("_temperature"),
+            max_tokens=result.get("_max_tokens"),
+            response_content=result["generated_content"],
+            finish_reason=result.get("finish_reason"),
+            prompt_tokens=result.get("prompt_tokens"),
+            completion_tokens=result.get("completion_tokens"),
+            total_tokens=result.get("tokens_used"),
+            cost_usd=Decimal(str(result.get("cost_usd", 0))),
+            latency_ms=result.get("_latency_ms"),
+            success=True,
+            cached=result.get("cached", False),
+            user_id=current_user.id,
+        )
+
+        total_tokens += result.get("tokens_used", 0)
+        total_cost += result.get("cost_usd", 0)
+        response_results[use_case.value] = {
+            "generated_content": result["generated_content"],
+            "model_used": result["model_used"],
+            "tokens_used": result.get("tokens_used", 0),
+            "prompt_tokens": result.get("prompt_tokens", 0),
+            "completion_tokens": result.get("completion_tokens", 0),
+            "cost_usd": result.get("cost_usd", 0),
+            "use_case": result["use_case"],
+            "cached": result.get("cached", False),
+        }
+
+    return JSONResponse(
+        content={
+            "results": response_results,
+            "tokens_used": total_tokens,
+            "cost_usd": round(total_cost, 6),
+        },
+        status_code=http_status.HTTP_200_OK,
+    )
+
+
 # -----------------------------------------------------------------------------
 # API: Atualizar custos de IA do Post
 # -----------------------------------------------------------------------------
@@ -31,6 +31,15 @@ class AIConfigBase(BaseModel):
     system_prompt: str = Field(..., min_length=10, description="System prompt para o modelo")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="Temperatura de geracao")
     max_tokens: int = Field(default=500, ge=50, le=8000, description="Max tokens na resposta")
+    cache_ttl_minutes: int | None = Field(
+        None, ge=0, description="TTL do cache de respostas (None = padrao global, 0 = sem cache)"
+    )
+    fallback_models: list[str] | None = Field(
+        None, description="Modelos (formato LiteLLM) tentados em ordem se o principal falhar"
+    )
+    hedge_requests: bool = Field(
+        default=False, description="Dispara o proximo modelo se o atual passar do p95 de latencia"
+    )
     is_active: bool = Field(default=True, description="Se a configuracao esta ativa")
 
 
@@ -50,6 +59,9 @@ class AIConfigUpdate(BaseModel):
     system_prompt: str | None = Field(None, min_length=10)
     temperature: float | None = Field(None, ge=0.0, le=2.0)
     max_tokens: int | None = Field(None, ge=50, le=8000)
+    cache_ttl_minutes: int | None = Field(None, ge=0)
+    fallback_models: list[str] | None = None
+    hedge_requests: bool | None = None
     is_active: bool | None = None
 
 
@@ -0,0 +1,108 @@
+"""
+Registro em memoria das configuracoes de IA ativas.
+
+As configs (AIConfig) mudam raramente - so quando o admin edita uma - mas
+eram lidas do banco a cada geracao. O registro carrega todas as configs
+ativas em uma unica query e as mantem em memoria por caso de uso:
+
+- Recarrega apos AI_CONFIG_CACHE_TTL segundos (cobre outros workers/processos)
+- Invalidado na hora pela edicao no admin (update_ai_config)
+
+As configs em cache sao copias desanexadas da sessao (transientes), entao
+podem ser usadas por qualquer request sem acessar o banco.
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.ai_config import AIConfig, AIUseCase
+from app.repositories.ai_config import AIConfigRepository
+
+logger = logging.getLogger(__name__)
+
+
+def _detach(config: AIConfig) -> AIConfig:
+    """Copia transiente da config (sem vinculo com a sessao de origem)."""
+    columns = AIConfig.__table__.columns.keys()
+    return AIConfig(**{name: getattr(config, name) for name in columns})
+
+
+class AIConfigRegistry:
+    """Cache das configuracoes de IA ativas, indexado por caso de uso."""
+
+    def __init__(self, ttl_seconds: float | None = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else settings.ai_config_cache_ttl
+        )
+        self._configs: dict[AIUseCase, AIConfig] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def _ensure_loaded(self, db: AsyncSession) -> None:
+        """Carrega as configs ativas se o cache estiver vazio ou expirado."""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            # Outra task pode ter recarregado enquanto esperava o lock
+            if self._is_fresh():
+                return
+            configs = await AIConfigRepository(db).get_all_active()
+            self._configs = {config.use_case: _detach(config) for config in configs}
+            self._loaded_at = time.monotonic()
+            logger.debug(f"Configs de IA carregadas: {len(self._configs)} ativas")
+
+    async def get(self, db: AsyncSession, use_case: AIUseCase) -> AIConfig | None:
+        """
+        Retorna a config ativa do caso de uso.
+
+        Args:
+            db: Sessao usada apenas se for preciso (re)carregar o cache
+            use_case: Caso de uso
+
+        Returns:
+            Config ativa ou None
+        """
+        await self._ensure_loaded(db)
+        return self._configs.get(use_case)
+
+    async def get_many(
+        self, db: AsyncSession, use_cases: list[AIUseCase]
+    ) -> dict[AIUseCase, AIConfig]:
+        """Configs ativas de varios casos de uso (casos sem config ficam de fora)."""
+        await self._ensure_loaded(db)
+        return {
+            use_case: self._configs[use_case]
+            for use_case in use_cases
+            if use_case in self._configs
+        }
+
+    def invalidate(self) -> None:
+        """Descarta o cache; a proxima leitura recarrega do banco."""
+        self._loaded_at = None
+
+
+_ai_config_registry: AIConfigRegistry | None = None
+
+
+def get_ai_config_registry() -> AIConfigRegistry:
+    """Retorna o registro de configs de IA do processo."""
+    global _ai_config_registry
+    if _ai_config_registry is None:
+        _ai_config_registry = AIConfigRegistry()
+    return _ai_config_registry
+
+
+def invalidate_ai_config_cache() -> None:
+    """Invalida o registro apos editar uma config no admin."""
+    if _ai_config_registry is not None:
+        _ai_config_registry.invalidate()
@@ -0,0 +1,400 @@
+"""
+Enriquecimento em lote do catalogo com IA.
+
+Preenche campos vazios de produtos e posts importados (descricao longa,
+titulo e meta description SEO) usando as configuracoes de AIConfig, sem
+o fluxo manual campo a campo do admin. Executado pelo job agendado
+`ai_catalog_enrichment` (ver app/services/jobs.py).
+
+Pipeline de uma execucao:
+1. Selecao: busca entidades com o campo vazio, paginando por id a partir
+   do checkpoint salvo (app_settings), ate `ai_enrichment_max_items`.
+2. Geracao: pool de workers async (`ai_enrichment_workers`) chama o LLM
+   via AISEOService.generate_with_config, respeitando um token bucket por
+   provider (`ai_enrichment_requests_per_minute`). Os workers nao acessam
+   o banco (a sessao nao suporta uso concorrente).
+3. Escrita: os resultados sao gravados em UPDATEs em lote (executemany)
+   a cada `ai_enrichment_write_batch` itens, somando tokens/custo nas
+   colunas ai_* da entidade e registrando cada chamada em AILog. Cada
+   lote e commitado, entao uma execucao interrompida perde no maximo um
+   lote; itens gravados deixam de ser selecionados.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.ai_config import AIConfig, AIUseCase
+from app.models.post import Post
+from app.models.product import Product
+from app.repositories.ai_log import AILogRepository
+from app.services.ai_config_registry import get_ai_config_registry
+from app.services.ai_seo import AISEOService
+from app.services.settings_store import AI_ENRICHMENT_CHECKPOINT, get_setting, set_setting
+from app.utils.throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Alvos de enriquecimento
+# =============================================================================
+
+
+@dataclass(frozen=True)
+class EnrichmentTarget:
+    """Campo de uma entidade que pode ser preenchido por IA."""
+
+    key: str
+    entity_type: str
+    model: type
+    column: str
+    use_case: AIUseCase
+
+
+ENRICHMENT_TARGETS: tuple[EnrichmentTarget, ...] = (
+    EnrichmentTarget(
+        "product.long_description", "product", Product, "long_description",
+        AIUseCase.PRODUCT_DESCRIPTION,
+    ),
+    EnrichmentTarget(
+        "post.seo_title", "post", Post, "seo_title", AIUseCase.POST_SEO_TITLE,
+    ),
+    EnrichmentTarget(
+        "post.seo_description", "post", Post, "seo_description",
+        AIUseCase.POST_SEO_DESCRIPTION,
+    ),
+)
+
+
+@dataclass
+class EnrichmentItem:
+    """Um campo a gerar para uma entidade, com o contexto do prompt."""
+
+    target: EnrichmentTarget
+    entity_id: uuid.UUID
+    context: dict[str, Any]
+
+
+@dataclass
+class EnrichmentOutcome:
+    """Resultado da geracao de um item (result ou error preenchido)."""
+
+    item: EnrichmentItem
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    latency_ms: int = 0
+
+
+@dataclass
+class EnrichmentSummary:
+    """Resumo de uma execucao (retornado pelo job)."""
+
+    selected: int = 0
+    updated: int = 0
+    failed: int = 0
+    skipped_no_config: int = 0
+    tokens_used: int = 0
+    cost_usd: Decimal = field(default_factory=lambda: Decimal("0"))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "selected": self.selected,
+            "updated": self.updated,
+            "failed": self.failed,
+            "skipped_no_config": self.skipped_no_config,
+            "tokens_used": self.tokens_used,
+            "cost_usd": float(self.cost_usd),
+        }
+
+
+# =============================================================================
+# Servico
+# =============================================================================
+
+
+class CatalogEnrichmentService:
+    """Seleciona campos vazios do catalogo, gera com IA e grava em lote."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.ai_service = AISEOService(db)
+        self._buckets: dict[str, TokenBucket] = {}
+
+    # -------------------------------------------------------------------------
+    # Checkpoint
+    # -------------------------------------------------------------------------
+
+    async def _load_checkpoint(self) -> dict[str, str]:
+        raw = await get_setting(self.db, AI_ENRICHMENT_CHECKPOINT)
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            logger.warning("Checkpoint de enriquecimento invalido, reiniciando")
+            return {}
+
+    async def _save_checkpoint(self, checkpoint: dict[str, str]) -> None:
+        await set_setting(
+            self.db,
+            AI_ENRICHMENT_CHECKPOINT,
+            json.dumps(checkpoint),
+            description="Cursor do job de enriquecimento do catalogo com IA",
+        )
+
+    # -------------------------------------------------------------------------
+    # Selecao
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _context(entity_type: str, entity: Any) -> dict[str, Any]:
+        """Monta os campos de contexto do prompt para a entidade."""
+        if entity_type == "product":
+            return {
+                "title": entity.name,
+                "product_name": entity.name,
+                "content": entity.short_description,
+                "price": f"{entity.price:.2f}" if entity.price is not None else None,
+                "platform": entity.platform.value if entity.platform else None,
+                "keywords": entity.tags or None,
+            }
+        return {
+            "title": entity.title,
+            "subtitle": entity.subtitle,
+            "content": entity.content,
+            "keywords": entity.tags or None,
+        }
+
+    async def select_pending(
+        self, checkpoint: dict[str, str], limit: int
+    ) -> list[EnrichmentItem]:
+        """
+        Seleciona ate `limit` campos vazios, paginando por id a partir do
+        checkpoint de cada alvo. Atualiza `checkpoint` com o ultimo id
+        selecionado; quando um alvo chega ao fim, o cursor volta ao inicio
+        (itens que falharam sao tentados de novo no proximo ciclo).
+        """
+        items: list[EnrichmentItem] = []
+
+        for target in ENRICHMENT_TARGETS:
+            remaining = limit - len(items)
+            if remaining <= 0:
+                break
+
+            model = target.model
+            column = getattr(model, target.column)
+            query = (
+                select(model)
+                .where(or_(column.is_(None), column == ""))
+                .order_by(model.id)
+                .limit(remaining)
+            )
+            cursor = checkpoint.get(target.key)
+            if cursor:
+                query = query.where(model.id > uuid.UUID(cursor))
+
+            entities = list((await self.db.execute(query)).scalars().all())
+            items.extend(
+                EnrichmentItem(target, entity.id, self._context(target.entity_type, entity))
+                for entity in entities
+            )
+
+            if len(entities) < remaining:
+                checkpoint.pop(target.key, None)
+            else:
+                checkpoint[target.key] = str(entities[-1].id)
+
+        return items
+
+    # -------------------------------------------------------------------------
+    # Geracao
+    # -------------------------------------------------------------------------
+
+    def _bucket(self, provider: str) -> TokenBucket:
+        if provider not in self._buckets:
+            self._buckets[provider] = TokenBucket(
+                settings.ai_enrichment_requests_per_minute,
+                capacity=settings.ai_enrichment_workers,
+            )
+        return self._buckets[provider]
+
+    async def _generate(self, item: EnrichmentItem, config: AIConfig) -> EnrichmentOutcome:
+        await self._bucket(config.provider.value).acquire()
+        start = time.monotonic()
+        try:
+            result = await self.ai_service.generate_with_config(config, **item.context)
+        except Exception as exc:  # um item com erro nao interrompe o lote
+            logger.warning(
+                f"Enriquecimento falhou ({item.target.key} {item.entity_id}): {exc}"
+            )
+            return EnrichmentOutcome(
+                item, error=str(exc), latency_ms=int((time.monotonic() - start) * 1000)
+            )
+        outcome = EnrichmentOutcome(item, result=result, latency_ms=result["_latency_ms"])
+        if not result["generated_content"]:
+            outcome.error = "Resposta vazia"
+        return outcome
+
+    # -------------------------------------------------------------------------
+    # Escrita em lote
+    # -------------------------------------------------------------------------
+
+    def _ai_log(self, outcome: EnrichmentOutcome, config: AIConfig) -> dict[str, Any]:
+        result = outcome.result or {}
+        target = outcome.item.target
+        return dict(
+            use_case=target.use_case.value,
+            provider=config.provider.value,
+            model=result.get("model_used", config.full_model_name),
+            user_prompt=result.get("_user_prompt", ""),
+            system_prompt=result.get("_system_prompt", config.system_prompt),
+            temperature=config.temperature,
+            max_tokens=config.max_tokens,
+            entity_type=target.entity_type,
+            entity_id=outcome.item.entity_id,
+            response_content=result.get("generated_content"),
+            finish_reason=result.get("finish_reason"),
+            prompt_tokens=result.get("prompt_tokens"),
+            completion_tokens=result.get("completion_tokens"),
+            total_tokens=result.get("tokens_used"),
+            cost_usd=Decimal(str(result.get("cost_usd", 0))),
+            latency_ms=outcome.latency_ms,
+            success=outcome.error is None,
+            cached=result.get("cached", False),
+            error_message=outcome.error,
+        )
+
+    async def _flush(
+        self,
+        outcomes: list[EnrichmentOutcome],
+        configs: dict[AIUseCase, AIConfig],
+        summary: EnrichmentSummary,
+    ) -> None:
+        """Grava um lote: um UPDATE executemany por alvo + AILogs, um commit."""
+        if not outcomes:
+            return
+
+        await AILogRepository(self.db).add_many([
+            self._ai_log(outcome, configs[outcome.item.target.use_case])
+            for outcome in outcomes
+        ])
+
+        by_target: dict[EnrichmentTarget, list[dict[str, Any]]] = {}
+        for outcome in outcomes:
+            if outcome.error is not None:
+                summary.failed += 1
+                continue
+
+            result = outcome.result
+            target = outcome.item.target
+            value = result["generated_content"]
+            max_length = getattr(getattr(target.model, target.column).type, "length", None)
+            if max_length:
+                value = value[:max_length]
+
+            by_target.setdefault(target, []).append({
+                "b_id": outcome.item.entity_id,
+                "b_value": value,
+                "b_tokens": result["tokens_used"],
+                "b_prompt_tokens": result["prompt_tokens"],
+                "b_completion_tokens": result["completion_tokens"],
+                "b_cost": Decimal(str(result["cost_usd"])),
+            })
+            summary.tokens_used += result["tokens_used"]
+            summary.cost_usd += Decimal(str(result["cost_usd"]))
+
+        for target, rows in by_target.items():
+            table = target.model.__table__
+            column = table.c[target.column]
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                # Nao sobrescreve o que foi preenchido manualmente no meio tempo
+                .where(or_(column.is_(None), column == ""))
+                .values({
+                    target.column: bindparam("b_value"),
+                    "ai_tokens_used": table.c.ai_tokens_used + bindparam("b_tokens"),
+                    "ai_prompt_tokens": table.c.ai_prompt_tokens + bindparam("b_prompt_tokens"),
+                    "ai_completion_tokens": (
+                        table.c.ai_completion_tokens + bindparam("b_completion_tokens")
+                    ),
+                    "ai_cost_usd": table.c.ai_cost_usd + bindparam("b_cost"),
+                    "ai_generations_count": table.c.ai_generations_count + 1,
+                })
+            )
+            await self.db.execute(stmt, rows)
+            summary.updated += len(rows)
+
+        await self.db.commit()
+
+    # -------------------------------------------------------------------------
+    # Execucao
+    # -------------------------------------------------------------------------
+
+    async def run(self, max_items: int | None = None) -> EnrichmentSummary:
+        """
+        Executa uma rodada de enriquecimento.
+
+        Args:
+            max_items: Maximo de campos gerados (padrao: ai_enrichment_max_items)
+
+        Returns:
+            EnrichmentSummary com contagens, tokens e custo
+        """
+        summary = EnrichmentSummary()
+        checkpoint = await self._load_checkpoint()
+        items = await self.select_pending(
+            checkpoint, max_items or settings.ai_enrichment_max_items
+        )
+        summary.selected = len(items)
+
+        configs = await get_ai_config_registry().get_many(
+            self.db, [target.use_case for target in ENRICHMENT_TARGETS]
+        )
+        runnable = [item for item in items if item.target.use_case in configs]
+        summary.skipped_no_config = len(items) - len(runnable)
+
+        queue: asyncio.Queue[EnrichmentItem] = asyncio.Queue()
+        for item in runnable:
+            queue.put_nowait(item)
+        outcomes: asyncio.Queue[EnrichmentOutcome] = asyncio.Queue()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await outcomes.put(await self._generate(item, configs[item.target.use_case]))
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(max(1, settings.ai_enrichment_workers), len(runnable)))
+        ]
+        try:
+            batch: list[EnrichmentOutcome] = []
+            for _ in range(len(runnable)):
+                batch.append(await outcomes.get())
+                if len(batch) >= settings.ai_enrichment_write_batch:
+                    await self._flush(batch, configs, summary)
+                    batch = []
+            await self._flush(batch, configs, summary)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        # So avanca o cursor depois que a rodada inteira foi gravada
+        await self._save_checkpoint(checkpoint)
+
+        logger.info(f"Enriquecimento do catalogo: {summary.as_dict()}")
+        return summary
@@ -0,0 +1,151 @@
+"""
+Fila assincrona de logs de chamadas ao LLM (AILog).
+
+Gravar o log dentro da request (INSERT + commit + refresh por chamada)
+somava um round-trip ao banco em toda acao de IA. Aqui o log e apenas
+enfileirado (`submit_ai_log`, sincrono e sem I/O) e uma task em background
+grava em lote:
+
+- Um INSERT multi-linha a cada `ai_log_batch_size` logs ou a cada
+  `ai_log_flush_seconds`, o que vier primeiro, em sessao propria.
+- System prompts distintos do lote vao uma unica vez para ai_prompts
+  (AILogRepository.add_many).
+- Fila limitada (`ai_log_queue_max`): se o banco ficar indisponivel, logs
+  excedentes sao descartados com aviso em vez de acumular memoria.
+
+No shutdown, `close_ai_log_sink` grava o que estiver pendente.
+
+Uso:
+    from app.services.ai_log_sink import submit_ai_log
+
+    submit_ai_log(use_case="post_tags", provider="openai", model="gpt-4o-mini",
+                  user_prompt=prompt, total_tokens=120, success=True)
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable
+
+from app.config import settings
+from app.database import async_session_maker
+from app.repositories.ai_log import AILogRepository
+
+logger = logging.getLogger(__name__)
+
+# Marcador de encerramento da task de gravacao
+_STOP: dict[str, Any] = {}
+
+
+class AILogSink:
+    """Fila de logs de IA gravada em lote por uma task em background."""
+
+    def __init__(
+        self,
+        session_factory: Callable = async_session_maker,
+        batch_size: int | None = None,
+        flush_seconds: float | None = None,
+        max_queue: int | None = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.ai_log_batch_size
+        self.flush_seconds = flush_seconds or settings.ai_log_flush_seconds
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(
+            maxsize=max_queue or settings.ai_log_queue_max
+        )
+        self._task: asyncio.Task | None = None
+        self.loop = asyncio.get_running_loop()
+
+    def submit(self, **fields: Any) -> None:
+        """Enfileira um log (mesmos campos de AILogRepository.create)."""
+        try:
+            self._queue.put_nowait(fields)
+        except asyncio.QueueFull:
+            logger.warning(f"Fila de logs de IA cheia, log descartado: {fields.get('use_case')}")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ai-log-sink")
+
+    def pending(self) -> int:
+        """Quantidade de logs aguardando gravacao."""
+        return self._queue.qsize()
+
+    async def _run(self) -> None:
+        """Agrupa logs ate encher o lote ou estourar o tempo e grava."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    await self._write(batch)
+                    return
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: list[dict[str, Any]]) -> None:
+        """Grava um lote; erros sao registrados sem derrubar a task."""
+        try:
+            async with self.session_factory() as db:
+                await AILogRepository(db).add_many(batch)
+                await db.commit()
+        except Exception as exc:
+            logger.error(f"Falha ao gravar {len(batch)} logs de IA: {exc}")
+
+    async def flush(self) -> None:
+        """Grava imediatamente tudo o que estiver na fila (sem a task)."""
+        batch: list[dict[str, Any]] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+    async def close(self) -> None:
+        """Grava os logs pendentes e para a task de background."""
+        if self._task is not None and not self._task.done():
+            # Sinaliza o fim depois dos logs ja enfileirados
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        await self.flush()
+
+
+_ai_log_sink: AILogSink | None = None
+
+
+def get_ai_log_sink() -> AILogSink:
+    """Retorna a fila de logs de IA do event loop atual, criando se necessario."""
+    global _ai_log_sink
+    if _ai_log_sink is None or _ai_log_sink.loop is not asyncio.get_running_loop():
+        _ai_log_sink = AILogSink()
+    return _ai_log_sink
+
+
+def submit_ai_log(**fields: Any) -> None:
+    """Enfileira um log de chamada ao LLM para gravacao em lote."""
+    get_ai_log_sink().submit(**fields)
+
+
+async def close_ai_log_sink() -> None:
+    """Grava os logs pendentes e encerra a fila (shutdown da aplicacao)."""
+    global _ai_log_sink
+    if _ai_log_sink is not None:
+        pending = _ai_log_sink.pending()
+        await _ai_log_sink.close()
+        _ai_log_sink = None
+        logger.info(f"Fila de logs de IA encerrada ({pending} logs pendentes gravados)")
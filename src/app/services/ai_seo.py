@@ -7,64 +7,78 @@ para gerar titulos, descricoes e keywords otimizadas para SEO.
 Usa LiteLLM para compatibilidade com multiplos provedores.
 """
 
+import asyncio
 import logging
+import time
 from decimal import Decimal
-from typing import Any
+from typing import Any, AsyncIterator
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.ai_config import AIConfig, AIProvider, AIUseCase
 from app.repositories.ai_config import AIConfigRepository
+from app.services.ai_config_registry import get_ai_config_registry
 from app.services.llm import LLMService, LLMError, get_api_key_for_model
+from app.services.llm_pricing import calculate_cost
+from app.services.prompt_template import compile_prompt
 
 logger = logging.getLogger(__name__)
 
 
-# Precos por 1M tokens (em USD) - atualizado em Dez/2025
-# https://openai.com/api/pricing/
-MODEL_PRICING = {
-    # OpenAI GPT-5 Family
-    "gpt-5-nano": {"input": 0.05, "output": 0.40},
-    "gpt-5-mini": {"input": 0.15, "output": 0.60},
-    "gpt-5": {"input": 2.50, "output": 10.00},
-    # OpenAI Legacy
-    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
-    "gpt-4o": {"input": 2.50, "output": 10.00},
-    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
-    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
-    # Gemini (via OpenRouter ou direto)
-    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
-    "gemini-1.5-pro": {"input": 1.25, "output": 5.00},
-    "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
-    # Claude (via OpenRouter)
-    "claude-3-haiku": {"input": 0.25, "output": 1.25},
-    "claude-3-sonnet": {"input": 3.00, "output": 15.00},
-}
+# Maximo de chamadas simultaneas ao LLM por provider (geracao em lote)
+MAX_CONCURRENT_CALLS_PER_PROVIDER = 4
 
+_provider_semaphores: dict[str, asyncio.Semaphore] = {}
 
-def calculate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Decimal:
-    """
-    Calcula o custo em USD baseado no modelo e tokens usados.
 
-    Args:
-        model: Nome do modelo (ex: gpt-4o-mini)
-        prompt_tokens: Tokens do prompt (input)
-        completion_tokens: Tokens da resposta (output)
+def _get_provider_semaphore(provider: str) -> asyncio.Semaphore:
+    """Retorna o semaforo que limita chamadas simultaneas ao provider."""
+    if provider not in _provider_semaphores:
+        _provider_semaphores[provider] = asyncio.Semaphore(MAX_CONCURRENT_CALLS_PER_PROVIDER)
+    return _provider_semaphores[provider]
 
-    Returns:
-        Custo total em USD (Decimal com 6 casas)
-    """
-    # Normaliza nome do modelo (remove prefixos como openrouter/, gemini/)
-    model_key = model.split("/")[-1].split(":")[0]
 
-    # Busca preco do modelo ou usa um default conservador
-    pricing = MODEL_PRICING.get(model_key, {"input": 1.00, "output": 3.00})
+# Clientes LLM memorizados pelos parametros de construcao (uma entrada por
+# versao de config; editar a config muda a chave)
+MAX_LLM_CLIENTS = 64
 
-    # Calcula custo (precos sao por 1M tokens)
-    input_cost = (prompt_tokens / 1_000_000) * pricing["input"]
-    output_cost = (completion_tokens / 1_000_000) * pricing["output"]
+_llm_clients: dict[tuple, LLMService] = {}
 
-    return Decimal(str(round(input_cost + output_cost, 6)))
+
+def _get_llm_client(config: AIConfig) -> LLMService:
+    """Retorna o LLMService configurado para a config (cache_ttl None = padrao global)."""
+    key = (
+        config.use_case,
+        config.full_model_name,
+        config.temperature,
+        config.max_tokens,
+        config.cache_ttl_minutes,
+        tuple(config.fallback_models or ()),
+        bool(config.hedge_requests),
+    )
+    llm = _llm_clients.get(key)
+    if llm is None:
+        if len(_llm_clients) >= MAX_LLM_CLIENTS:
+            _llm_clients.clear()
+        llm = _llm_clients[key] = LLMService(
+            model=config.full_model_name,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens,
+            cache_ttl_minutes=config.cache_ttl_minutes,
+            fallback_models=config.fallback_models,
+            hedge=bool(config.hedge_requests),
+            use_case=config.use_case.value,
+        )
+    return llm
+
+
+# Abertura do prompt montado sem template (config sem user_prompt)
+DEFAULT_PROMPT_HEADERS = {
+    AIUseCase.SEO_TITLE: "Crie um titulo SEO otimizado para o seguinte conteudo:",
+    AIUseCase.SEO_DESCRIPTION: "Crie uma meta description SEO para o seguinte conteudo:",
+    AIUseCase.SEO_KEYWORDS: "Sugira palavras-chave SEO para o seguinte conteudo:",
+    AIUseCase.PRODUCT_DESCRIPTION: "Crie uma descricao de produto para:",
+}
 
 
 class AISEOService:
@@ -84,6 +98,8 @@ class AISEOService:
         """
         self.db = db
         self.repo = AIConfigRepository(db)
+        # Configs ativas em memoria (recarregadas por TTL ou edicao no admin)
+        self.configs = get_ai_config_registry()
 
     async def generate(
         self,
@@ -105,6 +121,8 @@ class AISEOService:
         occasion_date: str | None = None,
         # Campos extras (para extensibilidade)
         extra_context: dict[str, str] | None = None,
+        # Cache de respostas (False = sempre chama o provider)
+        use_cache: bool = True,
     ) -> dict[str, Any]:
         """
         Gera conteudo SEO usando a configuracao do caso de uso.
@@ -123,72 +141,142 @@ class AISEOService:
             occasion_name: Nome da ocasiao (Natal, Dia dos Pais, etc.)
             occasion_date: Data da ocasiao
             extra_context: Campos extras para placeholders customizados
+            use_cache: Se False, ignora o cache de respostas (regenerar)
 
         Returns:
             Dicionario com:
             - generated_content: Conteudo gerado
             - model_used: Modelo que gerou
             - tokens_used: Tokens consumidos (se disponivel)
+            - cached: Se veio do cache (tokens e custo 0)
 
         Raises:
             ValueError: Se a configuracao nao existe ou esta inativa
             LLMError: Se houver erro na geracao
         """
         # Busca configuracao ativa para o caso de uso
-        config = await self.repo.get_active_by_use_case(use_case)
+        config = await self.configs.get(self.db, use_case)
         if not config:
             raise ValueError(
                 f"Nenhuma configuracao ativa encontrada para: {use_case.value}"
             )
 
-        # System prompt vem direto do banco (somente instrucoes)
-        system_prompt = config.system_prompt
+        return await self.generate_with_config(
+            config,
+            use_cache=use_cache,
+            title=title,
+            subtitle=subtitle,
+            content=content,
+            keywords=keywords,
+            category=category,
+            target_audience=target_audience,
+            product_name=product_name,
+            price=price,
+            platform=platform,
+            occasion_name=occasion_name,
+            occasion_date=occasion_date,
+            extra_context=extra_context,
+        )
 
-        # User prompt: usa o template do banco ou constroi dinamicamente
-        if config.user_prompt:
-            # Usa o template do banco e substitui placeholders
-            user_prompt = self._replace_placeholders(
-                config.user_prompt,
-                title=title,
-                subtitle=subtitle,
-                content=content,
-                keywords=keywords,
-                category=category,
-                product_name=product_name,
-                price=price,
-                platform=platform,
-                occasion_name=occasion_name,
-                occasion_date=occasion_date,
-                target_audience=target_audience,
-                extra_context=extra_context,
-            )
-        else:
-            # Fallback: constroi user_prompt dinamicamente (retrocompatibilidade)
-            user_prompt = self._build_user_prompt(
-                use_case=use_case,
-                title=title,
-                content=content,
-                keywords=keywords,
-                category=category,
-                product_name=product_name,
-                target_audience=target_audience,
-            )
+    async def generate_batch(
+        self,
+        use_cases: list[AIUseCase],
+        *,
+        use_cache: bool = True,
+        **fields: Any,
+    ) -> dict[AIUseCase, dict[str, Any] | Exception]:
+        """
+        Gera varios campos de uma entidade de uma vez (ex: keyword, titulo,
+        description e tags de um post).
 
-        # Configura o servico LLM com os parametros da config
-        llm = LLMService(
-            model=config.full_model_name,
-            temperature=config.temperature,
-            max_tokens=config.max_tokens,
+        As configuracoes vem do registro em memoria e as chamadas ao
+        LLM disparadas em paralelo (limitadas por provider), entao o tempo
+        total e o da chamada mais lenta, e nao a soma de todas.
+
+        Args:
+            use_cases: Casos de uso a gerar
+            use_cache: Se False, ignora o cache de respostas
+            **fields: Mesmos campos de contexto aceitos por generate()
+                (title, content, keywords, category, product_name, ...)
+
+        Returns:
+            Dicionario caso de uso -> resultado (mesmo formato de generate())
+            ou a excecao daquele caso (ValueError sem config, LLMError).
+            Falha em um campo nao impede os demais.
+        """
+        configs = await self.configs.get_many(self.db, use_cases)
+
+        async def run(use_case: AIUseCase) -> dict[str, Any]:
+            config = configs.get(use_case)
+            if not config:
+                raise ValueError(
+                    f"Nenhuma configuracao ativa encontrada para: {use_case.value}"
+                )
+            return await self.generate_with_config(config, use_cache=use_cache, **fields)
+
+        results = await asyncio.gather(
+            *(run(use_case) for use_case in use_cases),
+            return_exceptions=True,
         )
+        return dict(zip(use_cases, results))
 
-        try:
-            # Gera o conteudo
-            response = await llm.generate(
-                prompt=user_prompt,
-                system=system_prompt,
-            )
+    async def generate_with_config(
+        self,
+        config: AIConfig,
+        *,
+        use_cache: bool = True,
+        title: str | None = None,
+        subtitle: str | None = None,
+        content: str | None = None,
+        keywords: list[str] | None = None,
+        category: str | None = None,
+        target_audience: str | None = None,
+        product_name: str | None = None,
+        price: str | None = None,
+        platform: str | None = None,
+        occasion_name: str | None = None,
+        occasion_date: str | None = None,
+        extra_context: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Gera conteudo com uma configuracao ja carregada.
+
+        Compartilhado por generate() e generate_batch(). A chamada ao LLM
+        respeita o limite de chamadas simultaneas do provider. Nao acessa o
+        banco, entao pode rodar em paralelo com a mesma sessao (ex: job de
+        enriquecimento em lote).
+        """
+        use_case = config.use_case
+        system_prompt, user_prompt = self._build_prompts(
+            config,
+            title=title,
+            subtitle=subtitle,
+            content=content,
+            keywords=keywords,
+            category=category,
+            target_audience=target_audience,
+            product_name=product_name,
+            price=price,
+            platform=platform,
+            occasion_name=occasion_name,
+            occasion_date=occasion_date,
+            extra_context=extra_context,
+        )
 
-            # Extrai informacoes de uso de tokens
+        llm = _get_llm_client(config)
+
+        try:
+            # Gera o conteudo (limitado por provider)
+            start_time = time.monotonic()
+            async with _get_provider_semaphore(config.provider.value):
+                response = await llm.generate(
+                    prompt=user_prompt,
+                    system=system_prompt,
+                    use_cache=use_cache,
+                )
+            latency_ms = int((time.monotonic() - start_time) * 1000)
+
+            # Extrai informacoes de uso de tokens (resposta do cache nao tem usage)
             tokens_used = 0
             prompt_tokens = 0
             completion_tokens = 0
@@ -209,18 +297,148 @@ class AISEOService:
                 "cost_usd": float(cost_usd),
                 "use_case": use_case.value,
                 "finish_reason": response.finish_reason,
+                "cached": response.cached,
                 # Dados para logging (prefixo _ indica campo interno)
                 "_system_prompt": system_prompt,
                 "_user_prompt": user_prompt,
                 "_provider": config.provider.value,
                 "_temperature": config.temperature,
                 "_max_tokens": config.max_tokens,
+                "_latency_ms": latency_ms,
             }
 
         except LLMError as e:
             logger.error(f"Erro ao gerar SEO ({use_case.value}): {e}")
             raise
 
+    async def generate_stream(
+        self,
+        use_case: AIUseCase,
+        **fields: Any,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Gera conteudo em streaming (textos longos, ex: descricao de produto).
+
+        Nao usa cache: o objetivo e mostrar os tokens conforme chegam, entao
+        a latencia percebida e o tempo ate o primeiro token.
+
+        Args:
+            use_case: Tipo de conteudo a gerar
+            **fields: Mesmos campos de contexto aceitos por generate()
+
+        Yields:
+            {"type": "delta", "content": str} para cada trecho gerado e, ao
+            final, {"type": "done", "result": dict} com o mesmo formato do
+            retorno de generate() (tokens/custo quando o provider informa)
+
+        Raises:
+            ValueError: Se a configuracao nao existe ou esta inativa
+            LLMError: Se houver erro na geracao
+        """
+        config = await self.configs.get(self.db, use_case)
+        if not config:
+            raise ValueError(
+                f"Nenhuma configuracao ativa encontrada para: {use_case.value}"
+            )
+
+        system_prompt, user_prompt = self._build_prompts(config, **fields)
+        # Instancia propria: generate_stream guarda uso/finish_reason no objeto
+        llm = LLMService(
+            model=config.full_model_name,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens,
+            fallback_models=config.fallback_models,
+            use_case=use_case.value,
+        )
+
+        start_time = time.monotonic()
+        parts: list[str] = []
+        async with _get_provider_semaphore(config.provider.value):
+            async for chunk in llm.generate_stream(prompt=user_prompt, system=system_prompt):
+                parts.append(chunk)
+                yield {"type": "delta", "content": chunk}
+        latency_ms = int((time.monotonic() - start_time) * 1000)
+
+        usage = llm.last_stream_usage or {}
+        model_used = llm.last_stream_model or llm.model
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        cost_usd = calculate_cost(model_used, prompt_tokens, completion_tokens)
+
+        yield {
+            "type": "done",
+            "result": {
+                "generated_content": "".join(parts).strip(),
+                "model_used": model_used,
+                "tokens_used": usage.get("total_tokens", 0),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": float(cost_usd),
+                "use_case": use_case.value,
+                "finish_reason": llm.last_stream_finish_reason,
+                "cached": False,
+                "_system_prompt": system_prompt,
+                "_user_prompt": user_prompt,
+                "_provider": config.provider.value,
+                "_temperature": config.temperature,
+                "_max_tokens": config.max_tokens,
+                "_latency_ms": latency_ms,
+            },
+        }
+
+    def _build_prompts(
+        self,
+        config: AIConfig,
+        *,
+        title: str | None = None,
+        subtitle: str | None = None,
+        content: str | None = None,
+        keywords: list[str] | None = None,
+        category: str | None = None,
+        target_audience: str | None = None,
+        product_name: str | None = None,
+        price: str | None = None,
+        platform: str | None = None,
+        occasion_name: str | None = None,
+        occasion_date: str | None = None,
+        extra_context: dict[str, str] | None = None,
+    ) -> tuple[str | None, str]:
+        """
+        Monta (system_prompt, user_prompt) a partir da configuracao.
+
+        O system prompt vem direto do banco (somente instrucoes). O user
+        prompt usa o template do banco com placeholders ou, sem template,
+        e construido dinamicamente (retrocompatibilidade).
+        """
+        if config.user_prompt:
+            user_prompt = self._replace_placeholders(
+                config.user_prompt,
+                title=title,
+                subtitle=subtitle,
+                content=content,
+                keywords=keywords,
+                category=category,
+                product_name=product_name,
+                price=price,
+                platform=platform,
+                occasion_name=occasion_name,
+                occasion_date=occasion_date,
+                target_audience=target_audience,
+                extra_context=extra_context,
+            )
+        else:
+            user_prompt = self._build_user_prompt(
+                use_case=config.use_case,
+                title=title,
+                content=content,
+                keywords=keywords,
+                category=category,
+                product_name=product_name,
+                target_audience=target_audience,
+            )
+
+        return config.system_prompt, user_prompt
+
     def _replace_placeholders(
         self,
         template: str,
@@ -245,6 +463,9 @@ class AISEOService:
         """
         Substitui placeholders no template por valores reais.
 
+        O template e compilado uma vez (ver prompt_template.compile_prompt);
+        cada chamada so preenche os slots.
+
         Placeholders suportados:
         - {{title}}: Titulo do conteudo
         - {{subtitle}}: Subtitulo do conteudo
@@ -259,46 +480,33 @@ class AISEOService:
         - {{occasion_date}}: Data da ocasiao
         - {{campo_extra}}: Qualquer campo em extra_context
         """
-        result = template
-
-        # Campos comuns
-        result = result.replace("{{title}}", title or "")
-        result = result.replace("{{subtitle}}", subtitle or "")
-        result = result.replace("{{category}}", category or "")
-        result = result.replace("{{target_audience}}", target_audience or "")
-        result = result.replace("{{keywords}}", ", ".join(keywords) if keywords else "")
-
         # Limita conteudo para nao exceder tokens (5000 chars ~= 1250 tokens)
         content_text = content[:5000] if content and len(content) > 5000 else (content or "")
-        result = result.replace("{{content}}", content_text)
-
-        # Campos de Product
-        result = result.replace("{{product_name}}", product_name or "")
-        result = result.replace("{{price}}", price or "")
-        result = result.replace("{{platform}}", platform or "")
-
-        # Campos de Occasion
-        result = result.replace("{{occasion_name}}", occasion_name or "")
-        result = result.replace("{{occasion_date}}", occasion_date or "")
-
-        # Campos extras customizados
-        if extra_context:
-            for key, value in extra_context.items():
-                result = result.replace(f"{{{{{key}}}}}", value or "")
-
-        # Remove linhas que ficaram apenas com labels sem valor
-        # Ex: "Titulo: " sem valor -> remove a linha
-        lines = result.split("\n")
-        cleaned_lines = []
-        for line in lines:
-            # Se a linha termina com ": " e nao tem mais nada, pula
-            stripped = line.strip()
-            if stripped and not stripped.endswith(":"):
-                cleaned_lines.append(line)
-            elif stripped and not stripped.endswith(": "):
-                cleaned_lines.append(line)
-
-        return "\n".join(cleaned_lines).strip()
+
+        # Campos extras customizados (nao sobrescrevem os padrao)
+        values = dict(extra_context or {})
+        values.update({
+            # Campos comuns
+            "title": title,
+            "subtitle": subtitle,
+            "category": category,
+            "target_audience": target_audience,
+            "keywords": ", ".join(keywords) if keywords else "",
+            "content": content_text,
+            # Campos de Product
+            "product_name": product_name,
+            "price": price,
+            "platform": platform,
+            # Campos de Occasion
+            "occasion_name": occasion_name,
+            "occasion_date": occasion_date,
+        })
+        result = compile_prompt(template).render(
+            {key: value or "" for key, value in values.items()}
+        )
+
+        # Remove linhas em branco (ex: campos opcionais sem valor)
+        return "\n".join(line for line in result.split("\n") if line.strip()).strip()
 
     def _build_user_prompt(
         self,
@@ -325,19 +533,8 @@ class AISEOService:
         Returns:
             Prompt formatado para o modelo
         """
-        parts = []
-
-        # Adiciona contexto baseado no caso de uso
-        if use_case == AIUseCase.SEO_TITLE:
-            parts.append("Crie um titulo SEO otimizado para o seguinte conteudo:")
-        elif use_case == AIUseCase.SEO_DESCRIPTION:
-            parts.append("Crie uma meta description SEO para o seguinte conteudo:")
-        elif use_case == AIUseCase.SEO_KEYWORDS:
-            parts.append("Sugira palavras-chave SEO para o seguinte conteudo:")
-        elif use_case == AIUseCase.PRODUCT_DESCRIPTION:
-            parts.append("Crie uma descricao de produto para:")
-        else:
-            parts.append("Gere conteudo para:")
+        # Contexto baseado no caso de uso
+        parts = [DEFAULT_PROMPT_HEADERS.get(use_case, "Gere conteudo para:")]
 
         # Adiciona o titulo se fornecido
         if title:
@@ -5,8 +5,10 @@ Implementa multiplas camadas de protecao:
 1. Honeypot: Campo invisivel que bots preenchem
 2. Rate Limiting por IP: Limita requisicoes por IP
 3. Rate Limiting por Email: Limita tentativas por email
+   (contadores no Redis, compartilhados entre workers; memoria local
+   como fallback)
 4. Tempo minimo de preenchimento: Bots sao muito rapidos
-5. Blocklist de dominios descartaveis
+5. Blocklist de dominios descartaveis (arquivo, ver disposable_domains)
 6. Validacao de User-Agent
 
 Referencia de mercado:
@@ -17,24 +19,19 @@ Referencia de mercado:
 import hashlib
 import logging
 import time
-from datetime import datetime, timedelta
-from typing import Optional
+from collections import deque
+from typing import Callable, Optional, Protocol
 
 from fastapi import HTTPException, Request, status
 
 from app.config import settings
+from app.core.rate_limit import get_client_ip
+from app.services.disposable_domains import get_disposable_domains
+from app.utils.cache import get_redis
 
 logger = logging.getLogger(__name__)
 
 
-# Cache em memoria para rate limiting (em producao, usar Redis)
-# Estrutura: {"ip_hash": {"count": int, "first_request": timestamp}}
-_rate_limit_cache: dict[str, dict] = {}
-
-# Cache para emails (limita reenvios de verificacao)
-_email_rate_cache: dict[str, dict] = {}
-
-
 # =============================================================================
 # Configuracoes Anti-Spam
 # =============================================================================
@@ -47,144 +44,161 @@ RATE_LIMIT_IP_WINDOW_SECONDS = 3600  # Janela de 1 hora
 RATE_LIMIT_EMAIL_MAX_REQUESTS = 3  # Max 3 tentativas por email
 RATE_LIMIT_EMAIL_WINDOW_SECONDS = 3600  # Por hora
 
+# Apos falha do Redis, usa so a memoria local por este tempo (segundos)
+RATE_LIMIT_REDIS_RETRY_SECONDS = 30
+
 # Tempo minimo de preenchimento do formulario (em segundos)
 MIN_FORM_FILL_TIME_SECONDS = 2
 
-# Lista de dominios de email descartavel/temporario (atualize conforme necessario)
-DISPOSABLE_EMAIL_DOMAINS = {
-    # Servicos mais conhecidos de email temporario
-    "10minutemail.com",
-    "10minutemail.net",
-    "guerrillamail.com",
-    "guerrillamail.org",
-    "guerrillamail.net",
-    "mailinator.com",
-    "maildrop.cc",
-    "tempmail.com",
-    "temp-mail.org",
-    "throwaway.email",
-    "fakeinbox.com",
-    "sharklasers.com",
-    "yopmail.com",
-    "yopmail.fr",
-    "trashmail.com",
-    "mailnesia.com",
-    "mailcatch.com",
-    "mintemail.com",
-    "dispostable.com",
-    "tempr.email",
-    "tempail.com",
-    "mohmal.com",
-    "getnada.com",
-    "emailondeck.com",
-    "spamgourmet.com",
-    "mytrashmail.com",
-    "getairmail.com",
-    "discard.email",
-    "discardmail.com",
-    "spambog.com",
-    "spambog.de",
-    "spambog.ru",
-    "mailexpire.com",
-    "tempinbox.com",
-    "fakemailgenerator.com",
-    "emailfake.com",
-    "crazymailing.com",
-    "tempsky.com",
-}
-
 
 # =============================================================================
-# Funcoes de Validacao
+# Backends de Rate Limiting
 # =============================================================================
 
 
-def _hash_ip(ip: str) -> str:
-    """Cria hash do IP para privacidade."""
-    return hashlib.sha256(ip.encode()).hexdigest()[:16]
+class RateLimitBackend(Protocol):
+    """Contador por janela fixa: cada chave zera ao fim da sua janela."""
+
+    async def hit(self, key: str, window_seconds: int) -> int:
+        """Registra uma tentativa e retorna o total na janela atual."""
+        ...
 
 
-def _get_client_ip(request: Request) -> str:
+class MemoryRateLimitBackend:
     """
-    Extrai IP do cliente considerando proxies.
+    Contadores em memoria do processo (fallback sem Redis).
 
-    Ordem de prioridade:
-    1. X-Forwarded-For (primeiro IP da lista)
-    2. X-Real-IP
-    3. client.host
+    As expiracoes ficam em uma fila por tamanho de janela, em ordem de
+    criacao; cada `hit` remove so as chaves vencidas do inicio da fila
+    (O(1) amortizado, sem varrer todas as entradas).
     """
-    # X-Forwarded-For pode ter multiplos IPs: "client, proxy1, proxy2"
-    forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
 
-    real_ip = request.headers.get("x-real-ip")
-    if real_ip:
-        return real_ip
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # chave -> [contagem, expira_em]
+        self._counters: dict[str, list] = {}
+        self._expirations: dict[int, deque[tuple[float, str]]] = {}
+
+    def _expire(self, now: float) -> None:
+        for queue in self._expirations.values():
+            while queue and queue[0][0] <= now:
+                expires_at, key = queue.popleft()
+                entry = self._counters.get(key)
+                if entry is not None and entry[1] == expires_at:
+                    del self._counters[key]
+
+    async def hit(self, key: str, window_seconds: int) -> int:
+        now = self.clock()
+        self._expire(now)
+
+        entry = self._counters.get(key)
+        if entry is None:
+            expires_at = now + window_seconds
+            self._counters[key] = [1, expires_at]
+            self._expirations.setdefault(window_seconds, deque()).append((expires_at, key))
+            return 1
+
+        entry[0] += 1
+        return entry[0]
+
+    def clear(self) -> None:
+        """Zera todos os contadores."""
+        self._counters.clear()
+        self._expirations.clear()
+
+
+class RedisRateLimitBackend:
+    """
+    Contadores no Redis, compartilhados entre workers e processos.
 
-    return request.client.host if request.client else "unknown"
+    INCR e EXPIRE rodam juntos em um script Lua (atomico). Se o Redis
+    estiver indisponivel, conta na memoria local e so tenta de novo apos
+    `RATE_LIMIT_REDIS_RETRY_SECONDS`.
+    """
 
+    SCRIPT = """
+    local count = redis.call('INCR', KEYS[1])
+    if count == 1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+    end
+    return count
+    """
 
-def _clean_expired_cache() -> None:
-    """Remove entradas expiradas dos caches."""
-    now = time.time()
+    def __init__(self, fallback: MemoryRateLimitBackend | None = None, prefix: str = "antispam"):
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self.prefix = prefix
+        self._client = None
+        self._script = None
+        self._retry_at = 0.0
+
+    async def hit(self, key: str, window_seconds: int) -> int:
+        if time.monotonic() >= self._retry_at:
+            try:
+                client = await get_redis()
+                if client is not self._client:
+                    self._client = client
+                    self._script = client.register_script(self.SCRIPT)
+                return int(await self._script(keys=[f"{self.prefix}:{key}"], args=[window_seconds]))
+            except Exception as e:
+                logger.warning("Rate limit sem Redis, usando memoria local: %s", e)
+                self._retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY_SECONDS
+        return await self.fallback.hit(key, window_seconds)
+
+
+_backend: RateLimitBackend | None = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Retorna o backend de rate limiting configurado (`rate_limit_storage`)."""
+    global _backend
+    if _backend is None:
+        if settings.rate_limit_storage == "redis":
+            _backend = RedisRateLimitBackend()
+        else:
+            _backend = MemoryRateLimitBackend()
+    return _backend
 
-    # Limpa cache de IP
-    expired_ips = [
-        key
-        for key, value in _rate_limit_cache.items()
-        if now - value.get("first_request", 0) > RATE_LIMIT_IP_WINDOW_SECONDS
-    ]
-    for key in expired_ips:
-        del _rate_limit_cache[key]
-
-    # Limpa cache de email
-    expired_emails = [
-        key
-        for key, value in _email_rate_cache.items()
-        if now - value.get("first_request", 0) > RATE_LIMIT_EMAIL_WINDOW_SECONDS
-    ]
-    for key in expired_emails:
-        del _email_rate_cache[key]
+
+def set_rate_limit_backend(backend: RateLimitBackend | None) -> None:
+    """Troca o backend (None volta ao configurado). Usado em testes."""
+    global _backend
+    _backend = backend
+
+
+# =============================================================================
+# Funcoes de Validacao
+# =============================================================================
+
+
+def _hash_ip(ip: str) -> str:
+    """Cria hash do IP para privacidade."""
+    return hashlib.sha256(ip.encode()).hexdigest()[:16]
 
 
-def check_rate_limit_ip(request: Request) -> None:
+async def check_rate_limit_ip(request: Request) -> None:
     """
     Verifica rate limit por IP.
 
     Raises:
         HTTPException 429: Se limite excedido
     """
-    _clean_expired_cache()
-
-    client_ip = _get_client_ip(request)
+    client_ip = get_client_ip(request)
     ip_hash = _hash_ip(client_ip)
-    now = time.time()
 
-    if ip_hash in _rate_limit_cache:
-        cache = _rate_limit_cache[ip_hash]
+    count = await get_rate_limit_backend().hit(f"ip:{ip_hash}", RATE_LIMIT_IP_WINDOW_SECONDS)
+    if count > RATE_LIMIT_IP_MAX_REQUESTS:
+        logger.warning(
+            "Rate limit excedido para IP: %s (hash: %s)",
+            client_ip,
+            ip_hash,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas. Aguarde alguns minutos.",
+        )
+
 
-        # Verifica se janela expirou
-        if now - cache["first_request"] > RATE_LIMIT_IP_WINDOW_SECONDS:
-            _rate_limit_cache[ip_hash] = {"count": 1, "first_request": now}
-        else:
-            cache["count"] += 1
-
-            if cache["count"] > RATE_LIMIT_IP_MAX_REQUESTS:
-                logger.warning(
-                    "Rate limit excedido para IP: %s (hash: %s)",
-                    client_ip,
-                    ip_hash,
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Muitas tentativas. Aguarde alguns minutos.",
-                )
-    else:
-        _rate_limit_cache[ip_hash] = {"count": 1, "first_request": now}
-
-
-def check_rate_limit_email(email: str) -> None:
+async def check_rate_limit_email(email: str) -> None:
     """
     Verifica rate limit por email.
 
@@ -193,27 +207,19 @@ def check_rate_limit_email(email: str) -> None:
     Raises:
         HTTPException 429: Se limite excedido
     """
-    _clean_expired_cache()
-
     email_lower = email.lower()
-    now = time.time()
-
-    if email_lower in _email_rate_cache:
-        cache = _email_rate_cache[email_lower]
-
-        if now - cache["first_request"] > RATE_LIMIT_EMAIL_WINDOW_SECONDS:
-            _email_rate_cache[email_lower] = {"count": 1, "first_request": now}
-        else:
-            cache["count"] += 1
-
-            if cache["count"] > RATE_LIMIT_EMAIL_MAX_REQUESTS:
-                logger.warning("Rate limit de email excedido para: %s", email_lower)
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Email de verificacao ja enviado. Verifique sua caixa de entrada ou aguarde.",
-                )
-    else:
-        _email_rate_cache[email_lower] = {"count": 1, "first_request": now}
+    # Chave com hash: o email nao fica em claro no Redis
+    email_hash = hashlib.sha256(email_lower.encode()).hexdigest()[:16]
+
+    count = await get_rate_limit_backend().hit(
+        f"email:{email_hash}", RATE_LIMIT_EMAIL_WINDOW_SECONDS
+    )
+    if count > RATE_LIMIT_EMAIL_MAX_REQUESTS:
+        logger.warning("Rate limit de email excedido para: %s", email_lower)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Email de verificacao ja enviado. Verifique sua caixa de entrada ou aguarde.",
+        )
 
 
 def check_honeypot(honeypot_value: Optional[str]) -> None:
@@ -289,7 +295,8 @@ def check_disposable_email(email: str) -> None:
     """
     domain = email.lower().split("@")[-1]
 
-    if domain in DISPOSABLE_EMAIL_DOMAINS:
+    # Inclui subdominios (x.mailinator.com); lista em app/data ou DISPOSABLE_DOMAINS_PATH
+    if domain in get_disposable_domains():
         logger.warning("Tentativa de uso de email descartavel: %s", domain)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -364,9 +371,9 @@ async def validate_newsletter_submission(
     1. User-Agent (rapida)
     2. Honeypot (rapida)
     3. Tempo minimo (rapida)
-    4. Rate limit IP (cache lookup)
-    5. Rate limit email (cache lookup)
-    6. Email descartavel (string comparison)
+    4. Rate limit IP (Redis ou memoria local)
+    5. Rate limit email (Redis ou memoria local)
+    6. Email descartavel (lookup no indice de dominios)
 
     Args:
         request: Request do FastAPI
@@ -387,10 +394,10 @@ async def validate_newsletter_submission(
     check_min_fill_time(timestamp)
 
     # 4. Rate limit por IP
-    check_rate_limit_ip(request)
+    await check_rate_limit_ip(request)
 
     # 5. Rate limit por email
-    check_rate_limit_email(email)
+    await check_rate_limit_email(email)
 
     # 6. Verifica email descartavel
     check_disposable_email(email)
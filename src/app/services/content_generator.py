@@ -85,6 +85,9 @@ class ContentGenerator:
             products=[...],
             keywords=["presentes gamer", "gifts gamer"]
         )
+
+    Posts (produto, listicle, guia, oferta) sao conteudo criativo e nao usam
+    o cache de respostas do LLM: gerar de novo deve produzir um texto novo.
     """
 
     def __init__(self, llm: LLMService | None = None):
@@ -135,6 +138,7 @@ class ContentGenerator:
             system=system,
             schema=GeneratedPost,
             temperature=SINGLE_PRODUCT_POST.temperature,
+            use_cache=False,
         )
 
     async def generate_listicle(
@@ -180,6 +184,7 @@ class ContentGenerator:
             system=system,
             schema=GeneratedPost,
             temperature=LISTICLE_TOP10.temperature,
+            use_cache=False,
         )
 
     async def generate_guide(
@@ -225,6 +230,7 @@ class ContentGenerator:
             system=system,
             schema=GeneratedPost,
             temperature=COMPREHENSIVE_GUIDE.temperature,
+            use_cache=False,
         )
 
     async def generate_deal_post(
@@ -268,6 +274,7 @@ class ContentGenerator:
             system=system,
             schema=GeneratedPost,
             temperature=DEAL_POST.temperature,
+            use_cache=False,
         )
 
     async def generate_product_description(
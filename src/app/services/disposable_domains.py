@@ -0,0 +1,114 @@
+"""
+Indice de dominios de email descartavel usado pelo anti-spam.
+
+A lista fica em arquivo (um dominio por linha), nao no codigo:
+- Padrao: app/data/disposable_domains.txt (vai junto com a aplicacao)
+- DISPOSABLE_DOMAINS_PATH aponta para outra lista (ex.: a lista publica
+  com dezenas de milhares de dominios, num volume)
+
+O indice e um frozenset: a consulta de "a.b.mailinator.com" testa
+"a.b.mailinator.com", "b.mailinator.com" e "mailinator.com" (uma busca
+por nivel do dominio, independente do tamanho da lista).
+
+O arquivo e recarregado quando muda (mtime conferido no maximo a cada
+DISPOSABLE_DOMAINS_CHECK_SECONDS), sem reiniciar a aplicacao.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DOMAINS_PATH = Path(__file__).resolve().parent.parent / "data" / "disposable_domains.txt"
+
+# Intervalo minimo entre verificacoes de mudanca no arquivo (segundos)
+DISPOSABLE_DOMAINS_CHECK_SECONDS = 60
+
+
+class DomainIndex:
+    """Conjunto de dominios com correspondencia por sufixo (subdominios)."""
+
+    __slots__ = ("domains",)
+
+    def __init__(self, domains):
+        self.domains = frozenset(domains)
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def __contains__(self, domain: str) -> bool:
+        domains = self.domains
+        if domain in domains:
+            return True
+        # Sufixos a partir de cada ponto: "a.b.c" -> "b.c", "c"
+        start = domain.find(".")
+        while start != -1:
+            if domain[start + 1:] in domains:
+                return True
+            start = domain.find(".", start + 1)
+        return False
+
+
+def load_domain_index(path: str | Path) -> DomainIndex:
+    """Le o arquivo de dominios (ignora linhas vazias e comentarios)."""
+    domains = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            domain = line.split("#", 1)[0].strip().lower().rstrip(".")
+            if domain:
+                domains.add(domain)
+    return DomainIndex(domains)
+
+
+class DisposableDomains:
+    """Indice carregado de um arquivo e recarregado quando ele muda."""
+
+    def __init__(self, path: str | Path, check_seconds: float = DISPOSABLE_DOMAINS_CHECK_SECONDS):
+        self.path = Path(path)
+        self.check_seconds = check_seconds
+        self._index = DomainIndex(())
+        self._mtime: float | None = None
+        self._checked_at = float("-inf")
+
+    def get(self) -> DomainIndex:
+        """Indice atual, recarregando o arquivo se ele mudou."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_seconds:
+            self._checked_at = now
+            self.reload()
+        return self._index
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarrega o arquivo se o mtime mudou (ou sempre, com force).
+
+        Em erro mantem o indice anterior. Returns: True se recarregou.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if not force and mtime == self._mtime:
+                return False
+            index = load_domain_index(self.path)
+        except OSError as e:
+            logger.warning("Lista de dominios descartaveis indisponivel (%s): %s", self.path, e)
+            return False
+
+        self._index = index
+        self._mtime = mtime
+        logger.info("Dominios descartaveis carregados: %d (%s)", len(index), self.path)
+        return True
+
+
+_disposable_domains: DisposableDomains | None = None
+
+
+def get_disposable_domains() -> DomainIndex:
+    """Indice de dominios descartaveis (arquivo de DISPOSABLE_DOMAINS_PATH ou o padrao)."""
+    global _disposable_domains
+    if _disposable_domains is None:
+        _disposable_domains = DisposableDomains(settings.disposable_domains_path or DEFAULT_DOMAINS_PATH)
+    return _disposable_domains.get()
@@ -3,20 +3,295 @@ Servico de envio de emails via Amazon SES.
 
 Utiliza aioboto3 para envio assincrono de emails transacionais,
 como confirmacao de newsletter e notificacoes.
+
+O cliente SES e de longa duracao: aberto no startup (`email_service.start()`
+no lifespan) e reaproveitado por todos os envios, com pool de conexoes
+(`email_max_connections`) e limite de envios simultaneos
+(`email_max_concurrency`). Fechado no shutdown (`close_email_service`).
+
+Com EMAIL_TRANSPORT=mbox os emails sao gravados em um arquivo mbox local
+(`email_mbox_path`) em vez de enviados, para desenvolvimento e benchmark
+de vazao sem SES.
 """
 
+import asyncio
+import json
 import logging
+import re
+from contextlib import AsyncExitStack
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from typing import Optional
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Protocol
+from urllib.parse import quote
 
 import aioboto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Destinos por chamada de SendBulkTemplatedEmail (limite do SES)
+BULK_MAX_DESTINATIONS = 50
+
+# Link de descadastro nos templates (triple-stash: sem escape HTML do valor)
+UNSUBSCRIBE_PLACEHOLDER = "{{{unsubscribe_url}}}"
+
+_TEMPLATE_TOKEN_RE = re.compile(r"\\\{\{|\{\{\{(\w+)\}\}\}")
+
+
+def escape_template(text: str) -> str:
+    """Escapa '{{' do conteudo para nao ser interpretado pelo template do SES."""
+    return text.replace("{{", "\\{{")
+
+
+def render_template(template: str, data: dict[str, str]) -> str:
+    """Renderiza localmente um template no formato usado com o SES."""
+    def replace(match: re.Match) -> str:
+        if match.group(1) is None:
+            return "{{"
+        return data.get(match.group(1), "")
+
+    return _TEMPLATE_TOKEN_RE.sub(replace, template)
+
+
+def newsletter_template_data(to_email: str) -> dict[str, str]:
+    """Dados por destinatario da newsletter (so o link de descadastro)."""
+    return {"unsubscribe_url": f"{settings.app_url}/newsletter/descadastro?email={quote(to_email)}"}
+
+
+class EmailTransport(Protocol):
+    """Destino dos emails montados pelo EmailService."""
+
+    @property
+    def configured(self) -> bool: ...
+
+    async def open(self) -> None: ...
+
+    async def send(
+        self, sender: str, to_email: str, subject: str, html_body: str, text_body: str
+    ) -> str: ...
+
+    async def put_template(
+        self, name: str, subject: str, html_body: str, text_body: str
+    ) -> None: ...
+
+    async def send_bulk(
+        self, sender: str, template_name: str, destinations: list[tuple[str, dict[str, str]]]
+    ) -> list[str | None]: ...
+
+    async def delete_template(self, name: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class SESTransport:
+    """
+    Cliente SES compartilhado entre os envios.
+
+    O cliente (e seu pool de conexoes) e criado na primeira chamada ou em
+    `open()` e fica aberto ate `close()`. Se o event loop mudar (testes,
+    scripts), um novo cliente e aberto no loop atual.
+    """
+
+    def __init__(self, session: aioboto3.Session, max_connections: int):
+        self.session = session
+        self.max_connections = max_connections
+        self._client: Any = None
+        self._stack: AsyncExitStack | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.aws_access_key_id and settings.aws_secret_access_key)
+
+    async def _get_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is loop:
+            return self._client
+        if self._loop is not loop:
+            # Cliente de outro loop nao pode ser reaproveitado
+            self._client, self._stack, self._loop = None, None, loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._client is None:
+                stack = AsyncExitStack()
+                self._client = await stack.enter_async_context(
+                    self.session.client(
+                        "ses",
+                        config=BotoConfig(
+                            max_pool_connections=self.max_connections,
+                            retries={"mode": "standard"},
+                        ),
+                    )
+                )
+                self._stack = stack
+                logger.info("Cliente SES aberto (pool de %d conexoes)", self.max_connections)
+        return self._client
+
+    async def open(self) -> None:
+        await self._get_client()
+
+    async def send(
+        self, sender: str, to_email: str, subject: str, html_body: str, text_body: str
+    ) -> str:
+        ses = await self._get_client()
+        response = await ses.send_email(
+            Source=sender,
+            Destination={
+                "ToAddresses": [to_email],
+            },
+            Message={
+                "Subject": {
+                    "Data": subject,
+                    "Charset": "UTF-8",
+                },
+                "Body": {
+                    "Text": {
+                        "Data": text_body,
+                        "Charset": "UTF-8",
+                    },
+                    "Html": {
+                        "Data": html_body,
+                        "Charset": "UTF-8",
+                    },
+                },
+            },
+        )
+        return response.get("MessageId", "unknown")
+
+    async def put_template(
+        self, name: str, subject: str, html_body: str, text_body: str
+    ) -> None:
+        ses = await self._get_client()
+        template = {
+            "TemplateName": name,
+            "SubjectPart": subject,
+            "HtmlPart": html_body,
+            "TextPart": text_body,
+        }
+        try:
+            await ses.create_template(Template=template)
+        except ClientError as e:
+            # Campanha retomada: o template ja existe
+            if e.response.get("Error", {}).get("Code") != "AlreadyExists":
+                raise
+            await ses.update_template(Template=template)
+
+    async def send_bulk(
+        self, sender: str, template_name: str, destinations: list[tuple[str, dict[str, str]]]
+    ) -> list[str | None]:
+        ses = await self._get_client()
+        response = await ses.send_bulk_templated_email(
+            Source=sender,
+            Template=template_name,
+            DefaultTemplateData="{}",
+            Destinations=[
+                {
+                    "Destination": {"ToAddresses": [email]},
+                    "ReplacementTemplateData": json.dumps(data),
+                }
+                for email, data in destinations
+            ],
+        )
+        # Um status por destino, na mesma ordem
+        return [
+            None if status.get("Status") == "Success"
+            else f"{status.get('Status')}: {status.get('Error', '')}".strip(": ")
+            for status in response.get("Status", [])
+        ]
+
+    async def delete_template(self, name: str) -> None:
+        ses = await self._get_client()
+        await ses.delete_template(TemplateName=name)
+
+    async def close(self) -> None:
+        stack, loop = self._stack, self._loop
+        self._client, self._stack, self._loop = None, None, None
+        if stack is not None and loop is asyncio.get_running_loop():
+            await stack.aclose()
+            logger.info("Cliente SES encerrado")
+
+
+class MboxTransport:
+    """
+    Grava os emails em um arquivo mbox local em vez de envia-los.
+
+    Para desenvolvimento e benchmark offline: o arquivo fica aberto em modo
+    append e cada email e escrito em uma thread (sem bloquear o loop).
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file: BinaryIO | None = None
+        self._lock = asyncio.Lock()
+        self._templates: dict[str, tuple[str, str, str]] = {}
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    async def open(self) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+
+    def _write(self, message: EmailMessage) -> None:
+        BytesGenerator(self._file, mangle_from_=True).flatten(message, unixfrom=True)
+        self._file.write(b"\n")
+        self._file.flush()
+
+    async def send(
+        self, sender: str, to_email: str, subject: str, html_body: str, text_body: str
+    ) -> str:
+        message = EmailMessage()
+        message_id = make_msgid(domain=settings.email_from_address.rpartition("@")[2] or None)
+        message["Message-ID"] = message_id
+        message["Date"] = formatdate(localtime=False)
+        message["From"] = sender
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_unixfrom(f"From {settings.email_from_address} {datetime.now().ctime()}")
+        message.set_content(text_body)
+        message.add_alternative(html_body, subtype="html")
+
+        async with self._lock:
+            await self.open()
+            await asyncio.to_thread(self._write, message)
+        return message_id
+
+    async def put_template(
+        self, name: str, subject: str, html_body: str, text_body: str
+    ) -> None:
+        self._templates[name] = (subject, html_body, text_body)
+
+    async def send_bulk(
+        self, sender: str, template_name: str, destinations: list[tuple[str, dict[str, str]]]
+    ) -> list[str | None]:
+        subject, html_body, text_body = self._templates[template_name]
+        for email, data in destinations:
+            await self.send(
+                sender,
+                email,
+                render_template(subject, data),
+                render_template(html_body, data),
+                render_template(text_body, data),
+            )
+        return [None] * len(destinations)
+
+    async def delete_template(self, name: str) -> None:
+        self._templates.pop(name, None)
+
+    async def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 
 class EmailService:
     """
@@ -26,8 +301,8 @@ class EmailService:
     Configurado para uso assincrono com FastAPI.
     """
 
-    def __init__(self) -> None:
-        """Inicializa o servico com as credenciais AWS."""
+    def __init__(self, transport: EmailTransport | None = None) -> None:
+        """Inicializa o servico com as credenciais AWS e o transporte configurado."""
         self.session = aioboto3.Session(
             aws_access_key_id=settings.aws_access_key_id,
             aws_secret_access_key=settings.aws_secret_access_key,
@@ -35,6 +310,33 @@ class EmailService:
         )
         self.from_address = settings.email_from_address
         self.from_name = settings.email_from_name
+        self.transport = transport or self._default_transport()
+        self.max_concurrency = max(1, settings.email_max_concurrency)
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def _default_transport(self) -> EmailTransport:
+        """Transporte conforme EMAIL_TRANSPORT (ses ou mbox)."""
+        if settings.email_transport == "mbox":
+            return MboxTransport(settings.email_mbox_path)
+        return SESTransport(self.session, settings.email_max_connections)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Limite de envios simultaneos do event loop atual."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_concurrency)}
+            semaphore = self._semaphores[loop]
+        return semaphore
+
+    async def start(self) -> None:
+        """Abre o transporte (cliente SES) antes do primeiro envio."""
+        if self.transport.configured:
+            await self.transport.open()
+
+    async def close(self) -> None:
+        """Fecha o transporte (shutdown da aplicacao)."""
+        await self.transport.close()
 
     def _format_sender(self) -> str:
         """Formata o remetente no padrao 'Nome <email>'."""
@@ -48,7 +350,7 @@ class EmailService:
         text_body: Optional[str] = None,
     ) -> bool:
         """
-        Envia um email via Amazon SES.
+        Envia um email pelo transporte configurado (SES ou mbox).
 
         Args:
             to_email: Email do destinatario
@@ -64,7 +366,7 @@ class EmailService:
             simplificada do HTML removendo as tags.
         """
         # Se nao tiver credenciais configuradas, loga warning e retorna
-        if not settings.aws_access_key_id or not settings.aws_secret_access_key:
+        if not self.transport.configured:
             logger.warning(
                 "Credenciais AWS nao configuradas. Email nao enviado para %s",
                 to_email,
@@ -74,42 +376,21 @@ class EmailService:
         # Gera texto plano se nao fornecido
         if text_body is None:
             # Remove tags HTML basicas para fallback
-            import re
             text_body = re.sub(r"<[^>]+>", "", html_body)
             text_body = re.sub(r"\s+", " ", text_body).strip()
 
         try:
-            async with self.session.client("ses") as ses:
-                response = await ses.send_email(
-                    Source=self._format_sender(),
-                    Destination={
-                        "ToAddresses": [to_email],
-                    },
-                    Message={
-                        "Subject": {
-                            "Data": subject,
-                            "Charset": "UTF-8",
-                        },
-                        "Body": {
-                            "Text": {
-                                "Data": text_body,
-                                "Charset": "UTF-8",
-                            },
-                            "Html": {
-                                "Data": html_body,
-                                "Charset": "UTF-8",
-                            },
-                        },
-                    },
+            async with self._semaphore():
+                message_id = await self.transport.send(
+                    self._format_sender(), to_email, subject, html_body, text_body
                 )
 
-                message_id = response.get("MessageId", "unknown")
-                logger.info(
-                    "Email enviado com sucesso. MessageId: %s, Destinatario: %s",
-                    message_id,
-                    to_email,
-                )
-                return True
+            logger.info(
+                "Email enviado com sucesso. MessageId: %s, Destinatario: %s",
+                message_id,
+                to_email,
+            )
+            return True
 
         except Exception as e:
             logger.error(
@@ -219,41 +500,35 @@ Para cancelar sua inscricao, acesse: {unsubscribe_url}
         )
 
 
-    async def send_newsletter_email(
+    def render_newsletter(
         self,
-        to_email: str,
         subject: str,
         heading: str,
         content_html: str,
         preview_text: Optional[str] = None,
         cta_text: Optional[str] = None,
         cta_url: Optional[str] = None,
-    ) -> bool:
+    ) -> tuple[str, str]:
         """
-        Envia email de newsletter para um destinatario.
+        Monta o HTML e o texto da newsletter uma unica vez.
 
-        Args:
-            to_email: Email do destinatario
-            subject: Assunto do email
-            heading: Titulo principal do email (H1)
-            content_html: Conteudo do email em HTML (ja convertido de Markdown)
-            preview_text: Texto de preview (aparece ao lado do assunto)
-            cta_text: Texto do botao de acao (opcional)
-            cta_url: URL do botao de acao (opcional)
+        O link de descadastro (unica parte que muda por destinatario) sai
+        como o placeholder UNSUBSCRIBE_PLACEHOLDER; o restante e escapado
+        para a sintaxe de template do SES (escape_template).
 
         Returns:
-            True se enviado com sucesso, False caso contrario
+            (html_body, text_body) no formato de template
         """
         current_year = datetime.now().year
-
-        # URL de descadastro com email pre-preenchido
-        from urllib.parse import quote
-        unsubscribe_url = f"{settings.app_url}/newsletter/descadastro?email={quote(to_email)}"
+        subject, heading, content_html = (
+            escape_template(subject), escape_template(heading), escape_template(content_html)
+        )
 
         # Monta o botao CTA se fornecido
         cta_html = ""
         cta_text_plain = ""
         if cta_text and cta_url:
+            cta_text, cta_url = escape_template(cta_text), escape_template(cta_url)
             cta_html = f"""
                 <div style="text-align: center; margin: 30px 0;">
                     <a href="{cta_url}"
@@ -269,7 +544,7 @@ Para cancelar sua inscricao, acesse: {unsubscribe_url}
         if preview_text:
             preview_html = f"""
                 <div style="display: none; max-height: 0px; overflow: hidden;">
-                    {preview_text}
+                    {escape_template(preview_text)}
                 </div>
             """
 
@@ -306,7 +581,7 @@ Para cancelar sua inscricao, acesse: {unsubscribe_url}
         <div style="text-align: center; padding: 20px; background: #f9fafb; color: #9ca3af; font-size: 12px;">
             <p style="margin: 0;">&copy; {current_year} geek.bidu.guru - Todos os direitos reservados</p>
             <p style="margin-top: 8px;">
-                <a href="{unsubscribe_url}" style="color: #9ca3af; text-decoration: underline;">Cancelar inscricao</a>
+                <a href="{UNSUBSCRIBE_PLACEHOLDER}" style="color: #9ca3af; text-decoration: underline;">Cancelar inscricao</a>
             </p>
         </div>
     </div>
@@ -315,7 +590,6 @@ Para cancelar sua inscricao, acesse: {unsubscribe_url}
 """
 
         # Versao texto plano (remove tags HTML do conteudo)
-        import re
         content_plain = re.sub(r"<[^>]+>", "", content_html)
         content_plain = re.sub(r"\s+", " ", content_plain).strip()
 
@@ -327,16 +601,122 @@ Para cancelar sua inscricao, acesse: {unsubscribe_url}
 ---
 (c) {current_year} geek.bidu.guru - Presentes Geek com Curadoria
 
-Para cancelar sua inscricao, acesse: {unsubscribe_url}
+Para cancelar sua inscricao, acesse: {UNSUBSCRIBE_PLACEHOLDER}
 """
+        return html_body, text_body
+
+    async def send_newsletter_email(
+        self,
+        to_email: str,
+        subject: str,
+        heading: str,
+        content_html: str,
+        preview_text: Optional[str] = None,
+        cta_text: Optional[str] = None,
+        cta_url: Optional[str] = None,
+    ) -> bool:
+        """
+        Envia email de newsletter para um destinatario.
+
+        Usado no email de teste do admin; campanhas usam
+        send_newsletter_bulk.
+
+        Args:
+            to_email: Email do destinatario
+            subject: Assunto do email
+            heading: Titulo principal do email (H1)
+            content_html: Conteudo do email em HTML (ja convertido de Markdown)
+            preview_text: Texto de preview (aparece ao lado do assunto)
+            cta_text: Texto do botao de acao (opcional)
+            cta_url: URL do botao de acao (opcional)
+
+        Returns:
+            True se enviado com sucesso, False caso contrario
+        """
+        html_body, text_body = self.render_newsletter(
+            subject, heading, content_html, preview_text, cta_text, cta_url
+        )
+        data = newsletter_template_data(to_email)
 
         return await self.send_email(
             to_email=to_email,
             subject=subject,
-            html_body=html_body,
-            text_body=text_body,
+            html_body=render_template(html_body, data),
+            text_body=render_template(text_body, data),
         )
 
+    async def create_newsletter_template(
+        self,
+        template_name: str,
+        subject: str,
+        heading: str,
+        content_html: str,
+        preview_text: Optional[str] = None,
+        cta_text: Optional[str] = None,
+        cta_url: Optional[str] = None,
+    ) -> None:
+        """
+        Registra a newsletter como template no transporte (SES CreateTemplate).
+
+        O HTML e montado uma vez aqui; os envios so mandam o link de
+        descadastro de cada destinatario.
+        """
+        html_body, text_body = self.render_newsletter(
+            subject, heading, content_html, preview_text, cta_text, cta_url
+        )
+        await self.transport.put_template(
+            template_name, escape_template(subject), html_body, text_body
+        )
+
+    async def send_newsletter_bulk(
+        self, template_name: str, emails: list[str]
+    ) -> dict[str, str | None]:
+        """
+        Envia o template para os emails, ate BULK_MAX_DESTINATIONS por chamada
+        (SES SendBulkTemplatedEmail).
+
+        Returns:
+            Erro por email (None quando aceito pelo SES)
+        """
+        if not self.transport.configured:
+            logger.warning(
+                "Credenciais AWS nao configuradas. Newsletter nao enviada para %d emails",
+                len(emails),
+            )
+            return {email: "Credenciais AWS nao configuradas" for email in emails}
+
+        results: dict[str, str | None] = {}
+        for i in range(0, len(emails), BULK_MAX_DESTINATIONS):
+            chunk = emails[i:i + BULK_MAX_DESTINATIONS]
+            destinations = [(email, newsletter_template_data(email)) for email in chunk]
+            try:
+                async with self._semaphore():
+                    errors = await self.transport.send_bulk(
+                        self._format_sender(), template_name, destinations
+                    )
+                results.update(zip(chunk, errors))
+                for email in chunk[len(errors):]:
+                    results[email] = "Sem status na resposta do envio em lote"
+            except Exception as e:
+                logger.error("Falha no envio em lote de %d emails: %s", len(chunk), str(e))
+                results.update((email, str(e) or type(e).__name__) for email in chunk)
+
+        sent = sum(error is None for error in results.values())
+        logger.info("Newsletter em lote: %d/%d aceitos (template %s)", sent, len(emails), template_name)
+        return results
+
+    async def delete_template(self, template_name: str) -> None:
+        """Remove o template do transporte (fim da campanha)."""
+        try:
+            await self.transport.delete_template(template_name)
+        except Exception as e:
+            logger.warning("Falha ao remover template %s: %s", template_name, str(e))
+
 
 # Instancia global do servico
 email_service = EmailService()
+
+
+async def close_email_service() -> None:
+    """Fecha o cliente SES compartilhado (shutdown da aplicacao)."""
+    await email_service.close()
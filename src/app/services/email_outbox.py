@@ -0,0 +1,153 @@
+"""
+Envio em background da fila de emails transacionais (email_outbox).
+
+O endpoint de inscricao grava o email de verificacao na fila junto com o
+token (EmailOutboxRepository.enqueue + commit), chama
+`notify_email_outbox()` e retorna; a latencia do SES sai da request.
+
+Uma task por processo (iniciada no startup):
+1. Pega os emails vencidos com lease (`claim_due`), ate
+   `email_outbox_batch_size` por vez, e envia pelo EmailService.
+2. Grava o resultado: falhas sao reagendadas com espera exponencial ate
+   `email_outbox_max_attempts`.
+3. Dorme ate o proximo `notify` ou ate `email_outbox_poll_seconds`
+   (retentativas e emails de processos que cairam com o lease vencido).
+"""
+
+import asyncio
+import logging
+from typing import Callable
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.email_outbox import EmailOutbox, OutboxKind
+from app.repositories.email_outbox import EmailOutboxRepository
+from app.services.email import EmailService, email_service
+
+logger = logging.getLogger(__name__)
+
+# Lease de um email pego por um worker (segundos)
+LEASE_SECONDS = 120
+
+# Tempo que o shutdown espera o lote em andamento antes de cancelar
+CLOSE_TIMEOUT_SECONDS = 10.0
+
+
+class EmailOutboxWorker:
+    """Envia os emails da fila em uma task de background."""
+
+    def __init__(
+        self,
+        session_factory: Callable = async_session_maker,
+        email: EmailService | None = None,
+        batch_size: int | None = None,
+        poll_seconds: float | None = None,
+        max_attempts: int | None = None,
+        retry_seconds: int | None = None,
+    ):
+        self.session_factory = session_factory
+        self.email = email or email_service
+        self.batch_size = batch_size or settings.email_outbox_batch_size
+        self.poll_seconds = poll_seconds or settings.email_outbox_poll_seconds
+        self.max_attempts = max_attempts or settings.email_outbox_max_attempts
+        self.retry_seconds = retry_seconds if retry_seconds is not None else settings.email_outbox_retry_seconds
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.loop = asyncio.get_running_loop()
+
+    def start(self) -> None:
+        """Inicia a task de envio (se ainda nao estiver rodando)."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    def notify(self) -> None:
+        """Acorda a task: ha email novo na fila."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                # Esvazia o que estiver vencido antes de dormir
+                while not self._stopping and await self.process_due() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Falha ao processar a fila de emails")
+            if self._stopping:
+                return
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_due(self) -> int:
+        """Envia um lote de emails vencidos. Retorna quantos foram pegos."""
+        async with self.session_factory() as db:
+            repo = EmailOutboxRepository(db)
+            messages = await repo.claim_due(self.batch_size, LEASE_SECONDS)
+            if not messages:
+                return 0
+
+            # O EmailService ja limita os envios simultaneos
+            errors = await asyncio.gather(*(self._send(message) for message in messages))
+            await repo.record_results(
+                {message.id: error for message, error in zip(messages, errors)},
+                self.max_attempts,
+                self.retry_seconds,
+            )
+
+        sent = errors.count(None)
+        logger.info(f"Fila de emails: {sent} enviados, {len(messages) - sent} com falha")
+        return len(messages)
+
+    async def _send(self, message: EmailOutbox) -> str | None:
+        """Envia um email da fila. Retorna o erro ou None."""
+        try:
+            if message.kind == OutboxKind.NEWSLETTER_VERIFICATION.value:
+                sent = await self.email.send_verification_email(
+                    to_email=message.to_email,
+                    verification_url=message.payload["verification_url"],
+                )
+            else:
+                return f"Tipo de email desconhecido: {message.kind}"
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        return None if sent else "Envio recusado ou SES nao configurado"
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT_SECONDS) -> None:
+        """Para a task; o lote em andamento termina ou e cancelado apos `timeout`."""
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                pass  # wait_for ja cancelou; o lease expira e outro processo envia
+        self._task = None
+
+
+_worker: EmailOutboxWorker | None = None
+
+
+def get_email_outbox() -> EmailOutboxWorker:
+    """Retorna o worker da fila do event loop atual, criando se necessario."""
+    global _worker
+    if _worker is None or _worker.loop is not asyncio.get_running_loop():
+        _worker = EmailOutboxWorker()
+    return _worker
+
+
+def notify_email_outbox() -> None:
+    """Avisa o worker (se estiver rodando neste processo) que ha email novo."""
+    if _worker is not None:
+        _worker.notify()
+
+
+async def close_email_outbox() -> None:
+    """Encerra o worker da fila (shutdown da aplicacao)."""
+    global _worker
+    if _worker is not None:
+        await _worker.close()
+        _worker = None
@@ -0,0 +1,352 @@
+"""
+Renderizacao de HTML em imagem com Playwright (browser compartilhado).
+
+Substitui o padrao "lanca um Chromium por imagem + sleep fixo" usado nos
+endpoints de Instagram por:
+- Um unico browser Chromium reaproveitado entre renderizacoes
+  (lancado sob demanda, relancado se cair)
+- Assets estaticos dos templates (fontes e imagens de fundo) carregados
+  uma unica vez em memoria e servidos ao browser via route interceptado
+- Espera deterministica: document.fonts.ready + decode() de todas as
+  imagens, em vez de wait_for_timeout(500) / networkidle
+
+Uso:
+    from app.services.html_renderer import render_html
+
+    png_bytes = await render_html(html, width=1080, height=1080)
+"""
+
+import asyncio
+import logging
+import mimetypes
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page, Playwright, Route
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuracoes
+# =============================================================================
+
+# Flags do Chromium para ambiente containerizado
+# NOTA: --single-process nao e usado pois causa crash ao criar multiplas paginas
+CHROMIUM_ARGS = [
+    "--no-sandbox",  # Necessario para rodar em containers
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",  # Usa /tmp em vez de /dev/shm
+    "--disable-gpu",  # GPU nao disponivel em containers
+    "--disable-software-rasterizer",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--no-zygote",  # Evita fork de processos
+]
+
+# Origem ficticia usada para renderizar HTML. Todas as requisicoes para ela
+# sao interceptadas (nunca saem para a rede), e URLs relativas como
+# /static/fonts/... nos templates resolvem contra ela.
+RENDER_ORIGIN = "http://render.local"
+
+# Diretorio de arquivos estaticos da aplicacao
+STATIC_DIR = Path(__file__).parent.parent / "static"
+
+# Assets usados pelos templates de Instagram, pre-carregados no startup
+PRELOADED_ASSETS = (
+    "fonts/Bungee-Regular.ttf",
+    "fonts/PressStart2P-Regular.ttf",
+    "images/template/instagram_01.png",
+    "images/template/instagram_02.png",
+    "logo/mascot-only.png",
+)
+
+# Maximo de paginas renderizando ao mesmo tempo no browser compartilhado
+MAX_CONCURRENT_PAGES = 4
+
+# Tempo maximo (ms) para carregar o documento e aguardar fontes/imagens
+RENDER_TIMEOUT_MS = 30000
+
+# Mensagem padrao quando o Playwright nao esta disponivel
+PLAYWRIGHT_MISSING_MESSAGE = (
+    "Playwright nao instalado. Execute: pip install playwright && playwright install chromium"
+)
+
+# Script executado na pagina apos o load: forca o carregamento de todas as
+# fontes declaradas (@font-face), aguarda document.fonts.ready e o decode
+# de todas as <img>. Falhas individuais sao ignoradas (imagem quebrada nao
+# deve travar a renderizacao).
+_READY_SCRIPT = """
+async () => {
+    await Promise.all(Array.from(document.fonts, (face) => face.load().catch(() => null)));
+    await document.fonts.ready;
+    await Promise.all(Array.from(document.images, (img) => img.decode().catch(() => null)));
+}
+"""
+
+
+class RendererUnavailableError(RuntimeError):
+    """Playwright/Chromium indisponivel no ambiente."""
+
+
+# =============================================================================
+# Estado Global (browser compartilhado)
+# =============================================================================
+
+_playwright: "Playwright | None" = None
+_browser: "Browser | None" = None
+_browser_lock = asyncio.Lock()
+_page_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+
+# Cache em memoria de assets estaticos: caminho relativo -> (conteudo, mime)
+_assets: dict[str, tuple[bytes, str]] = {}
+
+
+# =============================================================================
+# Assets Estaticos
+# =============================================================================
+
+
+def _load_asset(relative_path: str) -> tuple[bytes, str] | None:
+    """
+    Carrega asset de STATIC_DIR para o cache em memoria.
+
+    Args:
+        relative_path: Caminho relativo a STATIC_DIR (ex: 'fonts/Bungee-Regular.ttf')
+
+    Returns:
+        Tupla (conteudo, mime_type) ou None se nao existir
+    """
+    cached = _assets.get(relative_path)
+    if cached is not None:
+        return cached
+
+    file_path = (STATIC_DIR / relative_path).resolve()
+    # Impede path traversal para fora do diretorio static
+    if STATIC_DIR.resolve() not in file_path.parents or not file_path.is_file():
+        return None
+
+    mime_type, _ = mimetypes.guess_type(str(file_path))
+    if not mime_type and file_path.suffix.lower() == ".ttf":
+        mime_type = "font/ttf"
+
+    asset = (file_path.read_bytes(), mime_type or "application/octet-stream")
+    _assets[relative_path] = asset
+    return asset
+
+
+def preload_assets() -> int:
+    """
+    Carrega fontes e imagens dos templates em memoria.
+
+    Chamado no startup da aplicacao; evita leitura de disco (e o antigo
+    base64 de varios MB embutido no HTML) a cada renderizacao.
+
+    Returns:
+        Numero de assets carregados
+    """
+    return sum(1 for path in PRELOADED_ASSETS if _load_asset(path) is not None)
+
+
+async def _handle_route(
+    route: "Route",
+    document: str | None,
+    files: dict[str, tuple[Path, str]] | None = None,
+) -> None:
+    """
+    Atende requisicoes feitas para RENDER_ORIGIN.
+
+    - "/" retorna o HTML a renderizar (quando houver)
+    - Caminhos registrados em `files` retornam o arquivo local
+    - "/static/..." retorna o asset do cache em memoria
+    - Demais caminhos retornam 404
+    """
+    path = urlsplit(route.request.url).path
+
+    if path == "/" and document is not None:
+        await route.fulfill(
+            status=200,
+            content_type="text/html; charset=utf-8",
+            body=document,
+        )
+        return
+
+    if files and path in files:
+        file_path, content_type = files[path]
+        await route.fulfill(status=200, content_type=content_type, path=file_path)
+        return
+
+    if path.startswith("/static/"):
+        asset = _load_asset(path.removeprefix("/static/"))
+        if asset is not None:
+            body, mime_type = asset
+            await route.fulfill(
+                status=200,
+                content_type=mime_type,
+                body=body,
+                headers={"Cache-Control": "public, max-age=31536000, immutable"},
+            )
+            return
+
+    await route.fulfill(status=404, body="")
+
+
+# =============================================================================
+# Ciclo de Vida do Browser
+# =============================================================================
+
+
+async def get_browser() -> "Browser":
+    """
+    Retorna o browser Chromium compartilhado, lancando se necessario.
+
+    Returns:
+        Browser conectado
+
+    Raises:
+        RendererUnavailableError: Se o Playwright nao estiver instalado
+    """
+    global _playwright, _browser
+
+    if _browser is not None and _browser.is_connected():
+        return _browser
+
+    async with _browser_lock:
+        if _browser is not None and _browser.is_connected():
+            return _browser
+
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as e:
+            raise RendererUnavailableError(PLAYWRIGHT_MISSING_MESSAGE) from e
+
+        if _playwright is None:
+            _playwright = await async_playwright().start()
+
+        _browser = await _playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        logger.info("Chromium compartilhado iniciado para renderizacao HTML")
+        return _browser
+
+
+async def close_browser() -> None:
+    """Fecha o browser compartilhado e o Playwright (shutdown da aplicacao)."""
+    global _playwright, _browser
+
+    async with _browser_lock:
+        if _browser is not None:
+            try:
+                await _browser.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar Chromium: {e}")
+            _browser = None
+
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
+            logger.info("Chromium compartilhado encerrado")
+
+
+# =============================================================================
+# Renderizacao
+# =============================================================================
+
+
+async def _wait_until_ready(page: "Page") -> None:
+    """Aguarda fontes e imagens da pagina ficarem prontas para o screenshot."""
+    await asyncio.wait_for(
+        page.evaluate(_READY_SCRIPT),
+        timeout=RENDER_TIMEOUT_MS / 1000,
+    )
+
+
+async def render_html(
+    html: str,
+    width: int,
+    height: int,
+    image_type: Literal["png", "jpeg"] = "png",
+    files: dict[str, tuple[Path, str]] | None = None,
+) -> bytes:
+    """
+    Renderiza HTML e retorna screenshot do viewport.
+
+    O documento e servido a partir de RENDER_ORIGIN, entao referencias
+    relativas a /static/ sao atendidas pelo cache em memoria sem rede.
+    URLs externas (https://...) continuam sendo buscadas normalmente.
+
+    Args:
+        html: Documento HTML completo
+        width: Largura do viewport em pixels
+        height: Altura do viewport em pixels
+        image_type: Formato do screenshot ('png' ou 'jpeg')
+        files: Arquivos locais expostos ao documento, no formato
+            {"/caminho/na/origem": (Path, content_type)}. Permite referenciar
+            imagens grandes por URL em vez de data URI base64 no HTML.
+
+    Returns:
+        Bytes da imagem gerada
+
+    Raises:
+        RendererUnavailableError: Se o Playwright nao estiver instalado
+    """
+    browser = await get_browser()
+
+    async with _page_semaphore:
+        page = await browser.new_page(viewport={"width": width, "height": height})
+        try:
+            await page.route(
+                f"{RENDER_ORIGIN}/**",
+                lambda route: _handle_route(route, html, files),
+            )
+            await page.goto(
+                f"{RENDER_ORIGIN}/",
+                wait_until="load",
+                timeout=RENDER_TIMEOUT_MS,
+            )
+            await _wait_until_ready(page)
+            return await page.screenshot(type=image_type, full_page=False)
+        finally:
+            await page.close()
+
+
+async def render_url(
+    url: str,
+    width: int,
+    height: int,
+    cookies: list[dict[str, Any]] | None = None,
+    image_type: Literal["png", "jpeg"] = "png",
+) -> bytes:
+    """
+    Navega ate uma URL e retorna screenshot do viewport.
+
+    Cada chamada usa um contexto isolado (cookies nao vazam entre usuarios).
+
+    Args:
+        url: URL absoluta a renderizar
+        width: Largura do viewport em pixels
+        height: Altura do viewport em pixels
+        cookies: Cookies a adicionar ao contexto (formato Playwright)
+        image_type: Formato do screenshot ('png' ou 'jpeg')
+
+    Returns:
+        Bytes da imagem gerada
+
+    Raises:
+        RendererUnavailableError: Se o Playwright nao estiver instalado
+    """
+    browser = await get_browser()
+
+    async with _page_semaphore:
+        context = await browser.new_context(viewport={"width": width, "height": height})
+        try:
+            if cookies:
+                await context.add_cookies(cookies)
+            page = await context.new_page()
+            await page.goto(url, wait_until="load", timeout=RENDER_TIMEOUT_MS)
+            await _wait_until_ready(page)
+            return await page.screenshot(type=image_type, full_page=False)
+        finally:
+            await context.close()
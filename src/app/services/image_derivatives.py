@@ -0,0 +1,240 @@
+"""
+Derivados responsivos de imagens enviadas (WebP/AVIF em varias larguras).
+
+Cada upload processado (produto, categoria, header, post) gera, alem do
+JPEG original, versoes menores em formatos modernos:
+
+    abc123.jpg                      <- original (fallback para qualquer navegador)
+    abc123-320w.webp                <- derivados por largura
+    abc123-640w.webp
+    abc123-800w.webp                <- largura original (quando menor que 1024)
+    abc123-320w.avif                <- somente se o Pillow suportar AVIF
+    abc123.jpg.manifest.json        <- manifesto com as variantes geradas
+
+O manifesto e lido pelo helper Jinja `responsive_image` para emitir um
+<picture> com srcset, e o navegador escolhe a menor variante adequada
+a tela (mobile baixa 320/640px em vez do arquivo cheio).
+
+O processamento (decode + resize + encode) e CPU-bound e roda no executor
+de imagens (app.core.image_executor), fora do event loop.
+"""
+
+import io
+import json
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+from app.core.image_executor import run_image_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuracoes
+# =============================================================================
+
+# Larguras geradas (apenas as menores que a imagem original + a original)
+DERIVATIVE_WIDTHS = (320, 640, 1024)
+
+# Qualidade por formato (WebP/AVIF comprimem bem mais que JPEG na mesma qualidade)
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+# Sufixo do manifesto salvo ao lado do arquivo original
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Manifestos lidos mantidos em memoria (por processo)
+MANIFEST_CACHE_SIZE = 4096
+
+
+def avif_supported() -> bool:
+    """Retorna True se o Pillow instalado consegue gravar AVIF."""
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+
+# Formatos gerados: (mime type, formato Pillow, extensao, qualidade)
+# AVIF primeiro: o navegador usa o primeiro <source> que suportar
+DERIVATIVE_FORMATS = [
+    *([("image/avif", "AVIF", ".avif", AVIF_QUALITY)] if avif_supported() else []),
+    ("image/webp", "WEBP", ".webp", WEBP_QUALITY),
+]
+
+
+# =============================================================================
+# Geracao
+# =============================================================================
+
+
+def _url_to_path(url: str) -> Path | None:
+    """Converte URL de upload (/static/uploads/... ou /uploads/...) em caminho local."""
+    # Import tardio: app.services.upload importa este modulo
+    from app.services.upload import UPLOAD_DIR, UPLOAD_URL_PREFIX
+
+    for prefix in (f"{UPLOAD_URL_PREFIX}/", "/static/uploads/", "/uploads/"):
+        if url.startswith(prefix):
+            return UPLOAD_DIR / url[len(prefix):]
+    return None
+
+
+def build_derivatives(content: bytes, upload_path: Path, upload_url: str) -> dict:
+    """
+    Gera os derivados de uma imagem e grava o manifesto (sincrono, CPU-bound).
+
+    Args:
+        content: Bytes da imagem ja processada (ex: JPEG redimensionado)
+        upload_path: Caminho do arquivo original salvo
+        upload_url: URL publica do arquivo original
+
+    Returns:
+        Manifesto gerado:
+            {
+                "src": url original,
+                "width": largura, "height": altura,
+                "sources": {"image/webp": [{"url": ..., "width": 320}, ...]}
+            }
+    """
+    with Image.open(io.BytesIO(content)) as source:
+        source.load()
+        if source.mode in ("RGB", "RGBA"):
+            image = source.copy()
+        else:
+            # Paletas/escala de cinza com transparencia viram RGBA (WebP/AVIF suportam alpha)
+            has_alpha = source.mode in ("LA", "PA") or "transparency" in source.info
+            image = source.convert("RGBA" if has_alpha else "RGB")
+
+    widths = [w for w in DERIVATIVE_WIDTHS if w < image.width] + [image.width]
+    base_name = upload_path.stem
+    base_url = upload_url.rsplit("/", 1)[0]
+
+    sources: dict[str, list[dict]] = {}
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize(
+            (width, height), Image.Resampling.LANCZOS
+        )
+        for mime_type, pil_format, extension, quality in DERIVATIVE_FORMATS:
+            filename = f"{base_name}-{width}w{extension}"
+            resized.save(upload_path.parent / filename, format=pil_format, quality=quality)
+            sources.setdefault(mime_type, []).append(
+                {"url": f"{base_url}/{filename}", "width": width}
+            )
+
+    manifest = {
+        "src": upload_url,
+        "width": image.width,
+        "height": image.height,
+        "sources": sources,
+    }
+    manifest_path = upload_path.with_name(upload_path.name + MANIFEST_SUFFIX)
+    manifest_path.write_text(json.dumps(manifest))
+    return manifest
+
+
+async def generate_derivatives(content: bytes, upload_path: Path, upload_url: str) -> dict | None:
+    """
+    Gera derivados responsivos no executor de imagens.
+
+    Falhas nao interrompem o upload: o original continua valido e o helper
+    de template cai para um <img> simples.
+
+    Args:
+        content: Bytes da imagem ja processada
+        upload_path: Caminho do arquivo original salvo
+        upload_url: URL publica do arquivo original
+
+    Returns:
+        Manifesto gerado, ou None em caso de erro
+    """
+    try:
+        return await run_image_task(build_derivatives, content, upload_path, upload_url)
+    except Exception as e:
+        logger.warning(f"Falha ao gerar derivados de {upload_url}: {e}")
+        return None
+
+
+def delete_derivatives(image_url: str) -> int:
+    """
+    Remove derivados e manifesto de uma imagem.
+
+    Args:
+        image_url: URL publica do arquivo original
+
+    Returns:
+        Numero de arquivos removidos
+    """
+    upload_path = _url_to_path(image_url)
+    if upload_path is None or not upload_path.parent.exists():
+        return 0
+
+    count = 0
+    candidates = [upload_path.with_name(upload_path.name + MANIFEST_SUFFIX)]
+    candidates += upload_path.parent.glob(f"{upload_path.stem}-*w.*")
+    for path in candidates:
+        if path.exists():
+            path.unlink()
+            count += 1
+
+    _manifest_cache.pop(image_url, None)
+    return count
+
+
+# =============================================================================
+# Leitura (templates)
+# =============================================================================
+
+
+# URL -> (mtime do manifesto, manifesto)
+_manifest_cache: dict[str, tuple[int, dict]] = {}
+
+
+def clear_manifest_cache() -> None:
+    """Esvazia o cache de manifestos."""
+    _manifest_cache.clear()
+
+
+def get_manifest(image_url: str) -> dict | None:
+    """
+    Retorna o manifesto de derivados de uma imagem de upload.
+
+    O manifesto lido fica em cache, validado pelo mtime do arquivo (um
+    stat por chamada): manifesto gravado depois (por outro worker, ou
+    derivados regenerados) e removido sao vistos na proxima chamada, e a
+    ausencia do manifesto nunca fica em cache.
+
+    Args:
+        image_url: URL publica do arquivo original
+
+    Returns:
+        Manifesto ou None (imagem externa, antiga ou sem derivados)
+    """
+    if not image_url:
+        return None
+
+    upload_path = _url_to_path(image_url)
+    if upload_path is None:
+        return None
+
+    manifest_path = upload_path.with_name(upload_path.name + MANIFEST_SUFFIX)
+    try:
+        mtime = manifest_path.stat().st_mtime_ns
+    except OSError:
+        _manifest_cache.pop(image_url, None)
+        return None
+
+    cached = _manifest_cache.get(image_url)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if image_url not in _manifest_cache and len(_manifest_cache) >= MANIFEST_CACHE_SIZE:
+        # Descarta o mais antigo (dict mantem a ordem de insercao)
+        del _manifest_cache[next(iter(_manifest_cache))]
+    _manifest_cache[image_url] = (mtime, manifest)
+    return manifest
@@ -11,16 +11,21 @@ com template visual do Geek Bidu Guru incluindo:
 """
 
 import hashlib
+import json
 import math
+import os
 import random
-from io import BytesIO
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from uuid import uuid4
 
-import httpx
 from PIL import Image, ImageDraw, ImageFont
 
 from app.config import settings
+from app.core.image_executor import run_image_task
+from app.services.remote_image_cache import fetch_image
 
 
 # =============================================================================
@@ -31,6 +36,9 @@ from app.config import settings
 IG_WIDTH = 1080
 IG_HEIGHT = 1080
 
+# Lado maximo da imagem do produto no post
+PRODUCT_IMAGE_MAX_SIZE = 450
+
 # Cores do tema Geek Bidu Guru (baseado no PRD-design-system.md)
 COLORS = {
     # Cores principais
@@ -52,9 +60,23 @@ COLORS = {
 # Diretorios
 BASE_DIR = Path(__file__).parent.parent
 CACHE_DIR = BASE_DIR / "static" / "generated" / "instagram"
+CACHE_URL_PREFIX = "/static/generated/instagram"
 FONTS_DIR = BASE_DIR / "templates" / "instagram" / "fonts"
 LOGO_PATH = BASE_DIR / "static" / "logo" / "mascot-only.png"
 
+# Cache de imagens geradas
+# Nome do arquivo = hash do conteudo renderizado ({chave}.png), entao o mesmo
+# conteudo sempre gera o mesmo arquivo e a URL pode ser cacheada como imutavel.
+# Incremente TEMPLATE_VERSION ao mudar o layout para invalidar o cache.
+TEMPLATE_VERSION = "2"
+CACHE_INDEX_PATH = CACHE_DIR.parent / "instagram_index.sqlite3"
+# Indice JSON anterior (por processo), removido na primeira abertura do novo
+LEGACY_CACHE_INDEX_PATH = CACHE_DIR.parent / "instagram_index.json"
+# Espera maxima por outro worker gravando no indice (segundos)
+CACHE_INDEX_TIMEOUT = 5.0
+CACHE_MAX_BYTES = settings.instagram_cache_max_mb * 1024 * 1024
+CACHE_MAX_AGE_SECONDS = settings.instagram_cache_max_age_days * 24 * 3600
+
 # Icones geek para o pattern de fundo (caracteres Unicode)
 GEEK_ICONS = [
     "⚡", "🎮", "🕹️", "💻", "🖥️", "⌨️", "🖱️", "📱",
@@ -154,7 +176,7 @@ def _wrap_text(
 
 async def _download_image(url: str) -> Image.Image | None:
     """
-    Baixa imagem de URL externa.
+    Obtem imagem de URL externa (via cache local em disco).
 
     Args:
         url: URL da imagem
@@ -163,24 +185,45 @@ async def _download_image(url: str) -> Image.Image | None:
         Objeto Image ou None se falhar
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return Image.open(BytesIO(response.content))
+        cached = await fetch_image(url)
+        return await run_image_task(_load_product_image, cached.path)
     except Exception:
         return None
 
 
+def _load_product_image(path: Path) -> Image.Image:
+    """Decodifica imagem do produto ja reduzida ao tamanho usado no post."""
+    with Image.open(path) as image:
+        # JPEG: decodifica em escala reduzida (fotos de marketplace sao grandes)
+        image.draft("RGB", (PRODUCT_IMAGE_MAX_SIZE, PRODUCT_IMAGE_MAX_SIZE))
+        image.load()
+        return image.copy()
+
+
 def _generate_cache_key(
     product_name: str,
+    product_image_url: str,
     headline: str,
     title: str,
     badge_text: str,
     price: float,
+    hashtags: list[str],
 ) -> str:
-    """Gera chave de cache baseada no conteudo."""
-    content = f"{product_name}:{headline}:{title}:{badge_text}:{price}"
-    return hashlib.md5(content.encode()).hexdigest()[:16]
+    """Gera chave de cache baseada em todo o conteudo renderizado."""
+    content = json.dumps(
+        [
+            TEMPLATE_VERSION,
+            product_name,
+            product_image_url,
+            headline,
+            title,
+            badge_text,
+            price,
+            hashtags[:3],  # Apenas as 3 primeiras aparecem na imagem
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
 
 
 # =============================================================================
@@ -327,17 +370,15 @@ def _draw_headline(draw: ImageDraw.Draw, headline: str) -> None:
         y += 45
 
 
-async def _draw_product_image(
+def _draw_product_image(
     img: Image.Image,
-    product_image_url: str,
+    product_img: Image.Image | None,
 ) -> None:
     """
-    Baixa e desenha imagem do produto no centro.
+    Desenha imagem do produto (ja baixada) no centro.
 
     Imagem e redimensionada e posicionada com moldura.
     """
-    product_img = await _download_image(product_image_url)
-
     if product_img is None:
         # Desenha placeholder se imagem nao carregar
         draw = ImageDraw.Draw(img)
@@ -361,7 +402,7 @@ async def _draw_product_image(
         product_img = product_img.convert("RGBA")
 
     # Define area para imagem do produto (quadrado central)
-    max_size = 450
+    max_size = PRODUCT_IMAGE_MAX_SIZE
 
     # Redimensiona mantendo aspect ratio
     aspect = product_img.width / product_img.height
@@ -550,51 +591,20 @@ def _draw_footer(draw: ImageDraw.Draw, hashtags: list[str]) -> None:
 # =============================================================================
 
 
-async def generate_instagram_image(
-    product_name: str,
-    product_image_url: str,
-    price: float,
+def _render_instagram_image(
+    filepath: Path,
+    product_img: Image.Image | None,
     headline: str,
     title: str,
     badge_text: str,
+    price: float,
     hashtags: list[str],
-    use_cache: bool = True,
-) -> tuple[str, int]:
+) -> None:
     """
-    Gera imagem 1080x1080 para post no Instagram.
+    Desenha o post completo e salva em filepath (sincrono, CPU-bound).
 
-    Args:
-        product_name: Nome completo do produto (para cache)
-        product_image_url: URL da imagem do produto
-        price: Preco em reais (0 para "VER PREÇO")
-        headline: Frase de impacto (max 25 chars)
-        title: Titulo para exibicao (max 40 chars)
-        badge_text: Texto do badge (max 15 chars)
-        hashtags: Lista de hashtags (sem #)
-        use_cache: Se deve usar cache de imagens
-
-    Returns:
-        tuple[str, int]: (caminho_relativo, tamanho_kb)
-
-    Exemplo:
-        path, size = await generate_instagram_image(
-            product_name="Headset Gamer RGB",
-            product_image_url="https://...",
-            price=199.90,
-            headline="OFERTA IMPERDÍVEL!",
-            title="Headset Gamer RGB",
-            badge_text="NOVO!",
-            hashtags=["gamer", "headset", "rgb"],
-        )
+    Executado via run_image_task.
     """
-    # Verifica cache
-    cache_key = _generate_cache_key(product_name, headline, title, badge_text, price)
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
-    if use_cache:
-        for cached_file in CACHE_DIR.glob(f"{cache_key}_*.png"):
-            return f"/static/generated/instagram/{cached_file.name}", cached_file.stat().st_size // 1024
-
     # Cria imagem base RGBA
     img = Image.new("RGBA", (IG_WIDTH, IG_HEIGHT), _hex_to_rgb(COLORS["purple_dark"]))
 
@@ -617,8 +627,8 @@ async def generate_instagram_image(
     # 6. Desenha badge
     _draw_badge(draw, badge_text)
 
-    # 7. Baixa e desenha imagem do produto
-    await _draw_product_image(img, product_image_url)
+    # 7. Desenha imagem do produto
+    _draw_product_image(img, product_img)
 
     # Recriar draw apos modificar imagem
     draw = ImageDraw.Draw(img)
@@ -635,17 +645,75 @@ async def generate_instagram_image(
     # Converte para RGB (PNG nao precisa de alpha)
     img = img.convert("RGB")
 
-    # Gera nome unico
-    filename = f"{cache_key}_{uuid4().hex[:8]}.png"
-    filepath = CACHE_DIR / filename
+    # Salva imagem (escrita atomica: outro worker pode estar lendo o arquivo)
+    tmp_path = filepath.with_name(f"{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    img.save(tmp_path, "PNG", optimize=True)
+    os.replace(tmp_path, filepath)
+
+
+async def generate_instagram_image(
+    product_name: str,
+    product_image_url: str,
+    price: float,
+    headline: str,
+    title: str,
+    badge_text: str,
+    hashtags: list[str],
+    use_cache: bool = True,
+) -> tuple[str, int]:
+    """
+    Gera imagem 1080x1080 para post no Instagram.
 
-    # Salva imagem
-    img.save(filepath, "PNG", optimize=True)
+    Args:
+        product_name: Nome completo do produto (para cache)
+        product_image_url: URL da imagem do produto
+        price: Preco em reais (0 para "VER PREÇO")
+        headline: Frase de impacto (max 25 chars)
+        title: Titulo para exibicao (max 40 chars)
+        badge_text: Texto do badge (max 15 chars)
+        hashtags: Lista de hashtags (sem #)
+        use_cache: Se deve usar cache de imagens
 
-    file_size_kb = filepath.stat().st_size // 1024
-    relative_path = f"/static/generated/instagram/{filename}"
+    Returns:
+        tuple[str, int]: (caminho_relativo, tamanho_kb)
 
-    return relative_path, file_size_kb
+    Exemplo:
+        path, size = await generate_instagram_image(
+            product_name="Headset Gamer RGB",
+            product_image_url="https://...",
+            price=199.90,
+            headline="OFERTA IMPERDÍVEL!",
+            title="Headset Gamer RGB",
+            badge_text="NOVO!",
+            hashtags=["gamer", "headset", "rgb"],
+        )
+    """
+    # Verifica cache (lookup direto pelo nome do arquivo, sem varrer diretorio)
+    cache_key = _generate_cache_key(
+        product_name, product_image_url, headline, title, badge_text, price, hashtags
+    )
+    filename = f"{cache_key}.png"
+
+    if use_cache:
+        size = _cache_index.lookup(cache_key)
+        if size is not None:
+            return f"{CACHE_URL_PREFIX}/{filename}", size // 1024
+
+    # Baixa imagem do produto (I/O async); o desenho e a compressao PNG
+    # rodam no executor de imagens, fora do event loop
+    product_img = await _download_image(product_image_url)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    filepath = CACHE_DIR / filename
+    await run_image_task(
+        _render_instagram_image,
+        filepath, product_img, headline, title, badge_text, price, hashtags,
+    )
+
+    file_size = filepath.stat().st_size
+    _cache_index.add(cache_key, file_size)
+
+    return f"{CACHE_URL_PREFIX}/{filename}", file_size // 1024
 
 
 # =============================================================================
@@ -653,6 +721,190 @@ async def generate_instagram_image(
 # =============================================================================
 
 
+class _CacheIndex:
+    """
+    Indice das imagens geradas, em SQLite (CACHE_INDEX_PATH).
+
+    Mantem tamanho e datas de cada entrada (chave -> size, created_at,
+    accessed_at), permitindo lookup, estatisticas e eviction sem varrer o
+    diretorio nem fazer stat em todos os arquivos.
+
+    O indice e compartilhado pelos workers: gravacao e eviction rodam em
+    uma transacao (BEGIN IMMEDIATE), entao um worker nao sobrescreve as
+    entradas do outro e CACHE_MAX_BYTES vale para o cache inteiro.
+
+    O arquivo em disco continua sendo a fonte da verdade: entradas cujo
+    arquivo sumiu sao descartadas, e arquivos sem entrada (ex.: indice
+    apagado) sao adotados no primeiro lookup.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._ready = False
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=CACHE_INDEX_TIMEOUT, isolation_level=None)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _connect(self):
+        """Conexao em autocommit (cria o indice na primeira vez)."""
+        if not self._ready:
+            self._setup()
+        db = self._open()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Transacao com lock de escrita (serializa os workers)."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _setup(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._open()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            db.execute("BEGIN IMMEDIATE")
+            swept = db.execute("SELECT 1 FROM meta WHERE name = 'legacy_swept'").fetchone()
+            if swept is None:
+                self._sweep_legacy_files()
+                db.execute("INSERT INTO meta (name, value) VALUES ('legacy_swept', ?)", (str(time.time()),))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+        self._ready = True
+
+    @staticmethod
+    def _sweep_legacy_files() -> None:
+        """Remove (uma vez) os arquivos do formato anterior ({chave}_{uuid}.png) e o indice JSON."""
+        if CACHE_DIR.exists():
+            for file in CACHE_DIR.glob("*_*.png"):
+                file.unlink(missing_ok=True)
+        LEGACY_CACHE_INDEX_PATH.unlink(missing_ok=True)
+
+    @property
+    def entries(self) -> dict[str, dict]:
+        """Copia das entradas do indice (chave -> size, created_at, accessed_at)."""
+        with self._connect() as db:
+            rows = db.execute("SELECT key, size, created_at, accessed_at FROM entries").fetchall()
+        return {
+            key: {"size": size, "created_at": created_at, "accessed_at": accessed_at}
+            for key, size, created_at, accessed_at in rows
+        }
+
+    @property
+    def total_bytes(self) -> int:
+        """Tamanho total das entradas (todos os workers)."""
+        return self.stats()[1]
+
+    def stats(self) -> tuple[int, int]:
+        """Retorna (numero de entradas, tamanho total em bytes)."""
+        with self._connect() as db:
+            count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return count, total
+
+    def lookup(self, key: str) -> int | None:
+        """
+        Busca entrada valida no cache.
+
+        Returns:
+            Tamanho do arquivo em bytes, ou None se nao estiver em cache
+        """
+        filepath = CACHE_DIR / f"{key}.png"
+        now = time.time()
+
+        with self._connect() as db:
+            row = db.execute("SELECT size, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                size, created_at = row
+                if now - created_at > CACHE_MAX_AGE_SECONDS or not filepath.exists():
+                    self._remove(db, key, delete_file=True)
+                    return None
+                db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                return size
+
+        # Arquivo sem entrada no indice
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return None
+        self.add(key, stat.st_size, created_at=stat.st_mtime)
+        return stat.st_size
+
+    def add(self, key: str, size: int, created_at: float | None = None) -> None:
+        """Registra nova entrada e aplica eviction (na mesma transacao)."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, size, created_at or now, now),
+            )
+            self._evict(db, now)
+
+    @staticmethod
+    def _remove(db: sqlite3.Connection, key: str, delete_file: bool = False) -> None:
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if delete_file:
+            (CACHE_DIR / f"{key}.png").unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """
+        Remove entradas expiradas e, se o total exceder CACHE_MAX_BYTES,
+        as menos acessadas.
+
+        Returns:
+            Numero de arquivos removidos
+        """
+        with self._transaction() as db:
+            return self._evict(db, time.time())
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> int:
+        expired = db.execute(
+            "SELECT key FROM entries WHERE created_at < ?", (now - CACHE_MAX_AGE_SECONDS,)
+        ).fetchall()
+        for (key,) in expired:
+            self._remove(db, key, delete_file=True)
+
+        removed = len(expired)
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > CACHE_MAX_BYTES:
+            by_access = db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+            for key, size in by_access:
+                if total <= CACHE_MAX_BYTES:
+                    break
+                self._remove(db, key, delete_file=True)
+                total -= size
+                removed += 1
+
+        return removed
+
+    def clear(self) -> None:
+        """Esvazia o indice."""
+        with self._connect() as db:
+            db.execute("DELETE FROM entries")
+
+
+_cache_index = _CacheIndex(CACHE_INDEX_PATH)
+
+
 def clear_instagram_cache() -> int:
     """
     Limpa cache de imagens Instagram.
@@ -668,20 +920,16 @@ def clear_instagram_cache() -> int:
         file.unlink()
         count += 1
 
+    _cache_index.clear()
     return count
 
 
 def get_instagram_cache_stats() -> tuple[int, int]:
     """
-    Retorna estatisticas do cache.
+    Retorna estatisticas do cache (a partir do indice, sem stat nos arquivos).
 
     Returns:
         Tupla (numero_arquivos, tamanho_total_kb)
     """
-    if not CACHE_DIR.exists():
-        return 0, 0
-
-    files = list(CACHE_DIR.glob("*.png"))
-    total_size = sum(f.stat().st_size for f in files) // 1024
-
-    return len(files), total_size
+    count, total_bytes = _cache_index.stats()
+    return count, total_bytes // 1024
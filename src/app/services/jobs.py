@@ -11,7 +11,8 @@ Arquitetura (um unico "tick"):
 
 Para adicionar um job novo: escreva um handler async (db) -> dict e
 registre um JobDefinition em JOB_REGISTRY. A config aparece sozinha no
-admin no primeiro tick (get-or-create).
+admin no primeiro tick (get-or-create), habilitada ou nao conforme
+`default_enabled` (jobs com custo, como os de IA, nascem desligados).
 """
 
 import time
@@ -25,6 +26,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.logging import get_logger
 from app.models.scheduled_job import ScheduledJob
 from app.repositories.post import PostRepository
+from app.services.ai_enrichment import CatalogEnrichmentService
+from app.services.newsletter_campaigns import get_campaign_dispatcher
 
 logger = get_logger(__name__)
 
@@ -44,6 +47,7 @@ class JobDefinition:
     description: str
     default_interval_minutes: int
     handler: Callable[[AsyncSession], Awaitable[dict]]
+    default_enabled: bool = True
 
 
 # -----------------------------------------------------------------------------
@@ -61,6 +65,18 @@ async def _publish_scheduled_posts(db: AsyncSession) -> dict:
     }
 
 
+async def _enrich_catalog_with_ai(db: AsyncSession) -> dict:
+    """Preenche com IA descricoes e campos SEO vazios de produtos e posts."""
+    summary = await CatalogEnrichmentService(db).run()
+    return summary.as_dict()
+
+
+async def _resume_newsletter_campaigns(db: AsyncSession) -> dict:
+    """Retoma campanhas de newsletter interrompidas (lease expirado)."""
+    resumed = await get_campaign_dispatcher().resume_pending()
+    return {"resumed_campaigns": resumed}
+
+
 # -----------------------------------------------------------------------------
 # Registry
 # -----------------------------------------------------------------------------
@@ -76,6 +92,27 @@ JOB_REGISTRY: dict[str, JobDefinition] = {
         default_interval_minutes=60,
         handler=_publish_scheduled_posts,
     ),
+    "ai_catalog_enrichment": JobDefinition(
+        key="ai_catalog_enrichment",
+        name="Enriquecer catalogo com IA",
+        description=(
+            "Gera descricao longa de produtos e titulo/meta description SEO de "
+            "posts que estao vazios, usando as configuracoes de IA (gera custo)."
+        ),
+        default_interval_minutes=60,
+        handler=_enrich_catalog_with_ai,
+        default_enabled=False,
+    ),
+    "resume_newsletter_campaigns": JobDefinition(
+        key="resume_newsletter_campaigns",
+        name="Retomar campanhas de newsletter",
+        description=(
+            "Retoma o envio de campanhas de newsletter interrompidas "
+            "(deploy ou queda do processo que estava enviando)."
+        ),
+        default_interval_minutes=60,
+        handler=_resume_newsletter_campaigns,
+    ),
 }
 
 
@@ -95,7 +132,7 @@ async def _get_or_create_config(db: AsyncSession, definition: JobDefinition) ->
             key=definition.key,
             name=definition.name,
             description=definition.description,
-            enabled=True,
+            enabled=definition.default_enabled,
             interval_minutes=definition.default_interval_minutes,
         )
         db.add(job)
@@ -11,12 +11,19 @@ Funcionalidades:
 - Geracao de texto com system/user prompts
 - Geracao de conteudo estruturado (JSON)
 - Streaming de respostas
-- Retry automatico com backoff
-- Cache de respostas (opcional)
+- Retry automatico com backoff e jitter em erros transitorios
+- Failover entre providers (cadeia de modelos) e hedging opcional
+- Metricas de latencia/erro por modelo (ordenam a cadeia e o hedge)
+- Cache de respostas em Redis (requisicoes identicas nao chamam o provider)
 """
 
+import asyncio
 import json
 import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from typing import AsyncIterator, Literal
 
 import litellm
@@ -24,6 +31,13 @@ from litellm import acompletion
 from pydantic import BaseModel
 
 from app.config import settings
+from app.utils.cache import (
+    cache_llm_response,
+    get_cached_llm_response,
+    hash_llm_request,
+    invalidate_cached_llm_response,
+)
+from app.services.llm_telemetry import log_response_preview, record_llm_call
 
 logger = logging.getLogger(__name__)
 
@@ -54,8 +68,9 @@ if settings.openrouter_api_key:
 # Desabilita telemetria
 litellm.telemetry = False
 
-# Habilita logging em desenvolvimento
-if settings.is_development:
+# Log detalhado do LiteLLM (cada request/response) so quando pedido
+# explicitamente: em lote inunda o stdout
+if settings.llm_verbose:
     litellm.set_verbose = True
 
 
@@ -103,6 +118,101 @@ def get_api_key_for_model(model: str) -> str | None:
     return None
 
 
+# =============================================================================
+# Metricas por Provider/Modelo
+# =============================================================================
+
+# Erros transitorios: vale tentar de novo o mesmo modelo
+RETRYABLE_ERRORS = (
+    litellm.RateLimitError,
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.ServiceUnavailableError,
+    litellm.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+# Latencias guardadas por modelo e minimo para usar o p95 no hedge
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+@dataclass
+class ProviderStats:
+    """Latencia e erros recentes de um modelo (neste processo)."""
+
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    successes: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    last_error_at: float | None = None
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_errors = 0
+
+    def record_error(self) -> None:
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.last_error_at = time.monotonic()
+
+    def p95(self) -> float | None:
+        """p95 da latencia em segundos (None com poucas amostras)."""
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def hedge_delay(self) -> float:
+        """Quanto esperar pela resposta antes de disparar o proximo modelo."""
+        return self.p95() or settings.llm_hedge_default_delay
+
+    def is_degraded(self) -> bool:
+        """Falhou varias vezes seguidas ha pouco tempo."""
+        return (
+            self.last_error_at is not None
+            and self.consecutive_errors >= settings.llm_failover_error_threshold
+            and time.monotonic() - self.last_error_at < settings.llm_failover_cooldown_seconds
+        )
+
+
+_provider_stats: dict[str, ProviderStats] = {}
+
+
+def get_provider_stats(model: str) -> ProviderStats:
+    """Retorna as metricas do modelo, criando se necessario."""
+    if model not in _provider_stats:
+        _provider_stats[model] = ProviderStats()
+    return _provider_stats[model]
+
+
+def get_provider_metrics() -> list[dict]:
+    """Resumo das metricas por modelo (para o admin)."""
+    metrics = []
+    for model, stats in sorted(_provider_stats.items()):
+        total = stats.successes + stats.errors
+        p95 = stats.p95()
+        metrics.append({
+            "model": model,
+            "calls": total,
+            "errors": stats.errors,
+            "error_rate": stats.errors / total if total else 0.0,
+            "p95_ms": int(p95 * 1000) if p95 is not None else None,
+            "degraded": stats.is_degraded(),
+        })
+    return metrics
+
+
+def order_model_chain(chain: list[str]) -> list[str]:
+    """
+    Ordena a cadeia de failover: modelos degradados (erros seguidos
+    recentes) vao para o fim, mantendo a ordem configurada entre os demais.
+    """
+    unique = list(dict.fromkeys(chain))
+    return sorted(unique, key=lambda model: get_provider_stats(model).is_degraded())
+
+
 # =============================================================================
 # Modelos de Resposta
 # =============================================================================
@@ -115,6 +225,8 @@ class LLMResponse(BaseModel):
     model: str
     usage: dict[str, int] | None = None
     finish_reason: str | None = None
+    # True quando a resposta veio do cache (sem chamada ao provider, usage=None)
+    cached: bool = False
 
 
 class GeneratedPost(BaseModel):
@@ -161,6 +273,12 @@ class LLMService:
             prompt="Crie um post sobre Funko Pop",
             schema=GeneratedPost
         )
+
+        # Sem cache (conteudo criativo: cada chamada deve gerar algo novo)
+        response = await llm.generate("Escreva uma piada geek", use_cache=False)
+
+    Cache: requisicoes identicas (modelo, temperatura, max_tokens, system e
+    user prompt) reaproveitam a resposta por `cache_ttl_minutes`.
     """
 
     def __init__(
@@ -169,6 +287,10 @@ class LLMService:
         temperature: float | None = None,
         max_tokens: int | None = None,
         timeout: int | None = None,
+        cache_ttl_minutes: int | None = None,
+        fallback_models: list[str] | None = None,
+        hedge: bool = False,
+        use_case: str | None = None,
     ):
         """
         Inicializa o servico de LLM.
@@ -178,11 +300,43 @@ class LLMService:
             temperature: Criatividade (0.0 = determinista, 1.0 = criativo)
             max_tokens: Maximo de tokens na resposta
             timeout: Timeout em segundos
+            cache_ttl_minutes: TTL do cache de respostas (None = LLM_CACHE_TTL, 0 = sem cache)
+            fallback_models: Modelos tentados, em ordem, se o principal falhar
+            hedge: Se True, dispara o proximo modelo da cadeia quando o atual
+                passa do p95 de latencia sem responder (fica com o primeiro)
+            use_case: Rotulo do caso de uso na telemetria (ex: seo_title)
         """
         self.model = model or settings.llm_default_model
         self.temperature = temperature if temperature is not None else settings.llm_temperature
         self.max_tokens = max_tokens or settings.llm_max_tokens
         self.timeout = timeout or settings.llm_timeout
+        self.cache_ttl_minutes = (
+            cache_ttl_minutes if cache_ttl_minutes is not None else settings.llm_cache_ttl
+        )
+        self.fallback_models = list(fallback_models or [])
+        self.hedge = hedge
+        self.use_case = use_case
+        # Preenchidos ao final de generate_stream()
+        self.last_stream_usage: dict[str, int] | None = None
+        self.last_stream_finish_reason: str | None = None
+        self.last_stream_model: str | None = None
+
+    def _request_hash(
+        self,
+        prompt: str,
+        system: str | None,
+        model: str | None,
+        temperature: float | None,
+        max_tokens: int | None,
+    ) -> str:
+        """Hash da requisicao com os mesmos defaults usados na chamada."""
+        return hash_llm_request(
+            model or self.model,
+            temperature if temperature is not None else self.temperature,
+            max_tokens or self.max_tokens,
+            system,
+            prompt,
+        )
 
     async def generate(
         self,
@@ -191,6 +345,7 @@ class LLMService:
         model: str | None = None,
         temperature: float | None = None,
         max_tokens: int | None = None,
+        use_cache: bool = True,
     ) -> LLMResponse:
         """
         Gera texto a partir de um prompt.
@@ -201,13 +356,24 @@ class LLMService:
             model: Override do modelo
             temperature: Override da temperatura
             max_tokens: Override de max_tokens
+            use_cache: Se False, sempre chama o provider (conteudo criativo)
 
         Returns:
-            LLMResponse com conteudo gerado
+            LLMResponse com conteudo gerado (cached=True se veio do cache)
 
         Raises:
             LLMError: Se houver erro na geracao
         """
+        # Cache de respostas: requisicao identica dentro do TTL nao chama o provider
+        request_hash = None
+        if use_cache and self.cache_ttl_minutes > 0:
+            request_hash = self._request_hash(prompt, system, model, temperature, max_tokens)
+            cached = await get_cached_llm_response(request_hash)
+            if cached is not None:
+                logger.debug(f"LLM cache HIT - model: {cached.get('model')}")
+                record_llm_call(cached.get("model") or self.model, self.use_case, cached=True)
+                return LLMResponse(**cached, cached=True)
+
         messages = []
 
         if system:
@@ -215,62 +381,178 @@ class LLMService:
 
         messages.append({"role": "user", "content": prompt})
 
+        start_time = time.monotonic()
         try:
-            # Determina modelo e API key
-            use_model = model or self.model
-            api_key = get_api_key_for_model(use_model)
+            llm_response = await self._complete_with_failover(
+                self._model_chain(model), messages, temperature, max_tokens
+            )
+        except Exception as e:
+            record_llm_call(model or self.model, self.use_case, error=True)
+            logger.error(f"Erro ao gerar texto com LLM: {e}")
+            raise LLMError(f"Falha na geracao de texto: {str(e)}") from e
 
-            # Monta kwargs da chamada
-            tokens_value = max_tokens or self.max_tokens
-            is_gpt5 = "gpt-5" in use_model or "gpt-4.1" in use_model
+        usage = llm_response.usage or {}
+        record_llm_call(
+            llm_response.model,
+            self.use_case,
+            latency_ms=int((time.monotonic() - start_time) * 1000),
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+        )
 
-            call_kwargs = {
-                "model": use_model,
-                "messages": messages,
-                "timeout": self.timeout,
+        # Nao cacheia respostas vazias ou truncadas (finish_reason=length)
+        if request_hash and llm_response.content and llm_response.finish_reason != "length":
+            await cache_llm_response(
+                request_hash,
+                llm_response.model_dump(include={"content", "model", "finish_reason"}),
+                expire_minutes=self.cache_ttl_minutes,
+            )
+
+        return llm_response
+
+    def _model_chain(self, model: str | None) -> list[str]:
+        """Modelo principal seguido dos fallbacks, ordenados pelas metricas."""
+        if not self.fallback_models:
+            return [model or self.model]
+        return order_model_chain([model or self.model, *self.fallback_models])
+
+    async def _call_model(
+        self,
+        use_model: str,
+        messages: list[dict],
+        temperature: float | None,
+        max_tokens: int | None,
+    ) -> LLMResponse:
+        """
+        Uma chamada ao modelo, com retry e backoff exponencial (jitter) em
+        erros transitorios. Registra latencia/erros nas metricas do modelo.
+        """
+        api_key = get_api_key_for_model(use_model)
+
+        # Monta kwargs da chamada
+        tokens_value = max_tokens or self.max_tokens
+        is_gpt5 = "gpt-5" in use_model or "gpt-4.1" in use_model
+
+        call_kwargs = {
+            "model": use_model,
+            "messages": messages,
+            "timeout": self.timeout,
+        }
+
+        # GPT-5-nano so aceita temperature=1 (default), nao enviar o parametro
+        # https://platform.openai.com/docs/models/gpt-5-nano
+        if not is_gpt5:
+            call_kwargs["temperature"] = temperature if temperature is not None else self.temperature
+
+        # GPT-5 e modelos mais novos usam max_completion_tokens em vez de max_tokens
+        if is_gpt5:
+            call_kwargs["max_completion_tokens"] = tokens_value
+        else:
+            call_kwargs["max_tokens"] = tokens_value
+
+        # Adiciona API key se necessario (ex: OpenRouter)
+        if api_key:
+            call_kwargs["api_key"] = api_key
+
+        stats = get_provider_stats(use_model)
+        attempt = 0
+        while True:
+            start_time = time.monotonic()
+            try:
+                response = await acompletion(**call_kwargs)
+            except Exception as e:
+                stats.record_error()
+                if attempt >= settings.llm_max_retries or not isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                # Full jitter: espera aleatoria ate base * 2^tentativa
+                delay = random.uniform(0, settings.llm_retry_base_delay * (2 ** attempt))
+                attempt += 1
+                logger.warning(
+                    f"LLM {use_model} falhou ({type(e).__name__}), "
+                    f"tentativa {attempt} em {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            stats.record_success(time.monotonic() - start_time)
+            break
+
+        # Trata caso de content None
+        raw_content = response.choices[0].message.content
+        content = raw_content if raw_content is not None else ""
+
+        # Preview so em DEBUG ou amostrado (LLM_LOG_SAMPLE_RATE)
+        log_response_preview(logger, response.model, response.choices[0].finish_reason, content)
+
+        return LLMResponse(
+            content=content,
+            model=response.model,
+            usage={
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens,
             }
+            if response.usage
+            else None,
+            finish_reason=response.choices[0].finish_reason,
+        )
 
-            # GPT-5-nano so aceita temperature=1 (default), nao enviar o parametro
-            # https://platform.openai.com/docs/models/gpt-5-nano
-            if not is_gpt5:
-                call_kwargs["temperature"] = temperature if temperature is not None else self.temperature
+    async def _complete_with_failover(
+        self,
+        chain: list[str],
+        messages: list[dict],
+        temperature: float | None,
+        max_tokens: int | None,
+    ) -> LLMResponse:
+        """
+        Percorre a cadeia de modelos ate um responder.
 
-            # GPT-5 e modelos mais novos usam max_completion_tokens em vez de max_tokens
-            if is_gpt5:
-                call_kwargs["max_completion_tokens"] = tokens_value
-            else:
-                call_kwargs["max_tokens"] = tokens_value
+        Sem hedge, o proximo modelo so e chamado quando o atual falha. Com
+        hedge, tambem e disparado quando o atual passa do seu p95 sem
+        responder; vale a primeira resposta e as demais chamadas sao canceladas.
+        """
+        if len(chain) == 1:
+            return await self._call_model(chain[0], messages, temperature, max_tokens)
 
-            # Adiciona API key se necessario (ex: OpenRouter)
-            if api_key:
-                call_kwargs["api_key"] = api_key
+        remaining = list(chain)
+        pending: set[asyncio.Task] = set()
+        last_error: BaseException | None = None
 
-            response = await acompletion(**call_kwargs)
-
-            # Log para debug da resposta
-            raw_content = response.choices[0].message.content
-            logger.info(f"LLM Response - model: {response.model}, finish_reason: {response.choices[0].finish_reason}")
-            logger.info(f"LLM Response - raw_content type: {type(raw_content)}, value: {repr(raw_content)[:200]}")
-
-            # Trata caso de content None
-            content = raw_content if raw_content is not None else ""
-
-            return LLMResponse(
-                content=content,
-                model=response.model,
-                usage={
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                }
-                if response.usage
-                else None,
-                finish_reason=response.choices[0].finish_reason,
-            )
+        def start_next() -> str:
+            use_model = remaining.pop(0)
+            pending.add(asyncio.create_task(
+                self._call_model(use_model, messages, temperature, max_tokens)
+            ))
+            return use_model
 
-        except Exception as e:
-            logger.error(f"Erro ao gerar texto com LLM: {e}")
-            raise LLMError(f"Falha na geracao de texto: {str(e)}") from e
+        current = start_next()
+        try:
+            while pending:
+                hedge_after = (
+                    get_provider_stats(current).hedge_delay()
+                    if self.hedge and remaining
+                    else None
+                )
+                done, pending = await asyncio.wait(
+                    pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.info(f"LLM hedge: {current} sem resposta, disparando {remaining[0]}")
+                    current = start_next()
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM failover: modelo falhou ({last_error})")
+
+                if not pending and remaining:
+                    current = start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
 
     async def generate_structured(
         self,
@@ -279,6 +561,7 @@ class LLMService:
         system: str | None = None,
         model: str | None = None,
         temperature: float | None = None,
+        use_cache: bool = True,
     ) -> BaseModel:
         """
         Gera resposta estruturada (JSON) a partir de um prompt.
@@ -291,6 +574,7 @@ class LLMService:
             system: System prompt adicional
             model: Override do modelo
             temperature: Override da temperatura
+            use_cache: Se False, sempre chama o provider (conteudo criativo)
 
         Returns:
             Instancia do schema preenchida
@@ -309,13 +593,15 @@ O JSON deve seguir exatamente este schema:
 Responda apenas com o JSON, sem ```json ou qualquer outro texto."""
 
         full_system = f"{system}\n\n{json_instructions}" if system else json_instructions
+        use_temperature = temperature if temperature is not None else 0.3  # Mais determinista para JSON
 
         response = await self.generate(
             prompt=prompt,
             system=full_system,
             model=model,
-            temperature=temperature if temperature is not None else 0.3,  # Mais determinista para JSON
+            temperature=use_temperature,
             max_tokens=self.max_tokens,
+            use_cache=use_cache,
         )
 
         # Parse do JSON
@@ -332,12 +618,28 @@ Responda apenas com o JSON, sem ```json ou qualquer outro texto."""
 
         except json.JSONDecodeError as e:
             logger.error(f"JSON invalido retornado pelo LLM: {response.content}")
+            await self._discard_cached(prompt, full_system, model, use_temperature, use_cache)
             raise LLMError(f"LLM retornou JSON invalido: {str(e)}") from e
 
         except Exception as e:
             logger.error(f"Erro ao validar resposta do LLM: {e}")
+            await self._discard_cached(prompt, full_system, model, use_temperature, use_cache)
             raise LLMError(f"Erro ao processar resposta: {str(e)}") from e
 
+    async def _discard_cached(
+        self,
+        prompt: str,
+        system: str,
+        model: str | None,
+        temperature: float,
+        use_cache: bool,
+    ) -> None:
+        """Remove do cache uma resposta que nao passou na validacao do schema."""
+        if use_cache and self.cache_ttl_minutes > 0:
+            await invalidate_cached_llm_response(
+                self._request_hash(prompt, system, model, temperature, self.max_tokens)
+            )
+
     async def generate_stream(
         self,
         prompt: str,
@@ -359,10 +661,19 @@ Responda apenas com o JSON, sem ```json ou qualquer outro texto."""
         Yields:
             Chunks de texto conforme sao gerados
 
+        Ao final do stream, `last_stream_usage` (tokens, se o provider
+        informar), `last_stream_finish_reason` e `last_stream_model` (modelo
+        que respondeu, apos failover) ficam disponiveis na instancia, para
+        log/custo da geracao.
+
         Example:
             async for chunk in llm.generate_stream("Escreva um artigo sobre..."):
                 print(chunk, end="", flush=True)
         """
+        self.last_stream_usage = None
+        self.last_stream_finish_reason = None
+        self.last_stream_model = None
+
         messages = []
 
         if system:
@@ -370,9 +681,8 @@ Responda apenas com o JSON, sem ```json ou qualquer outro texto."""
 
         messages.append({"role": "user", "content": prompt})
 
-        try:
-            # Determina modelo e API key
-            use_model = model or self.model
+        chain = self._model_chain(model)
+        for index, use_model in enumerate(chain):
             api_key = get_api_key_for_model(use_model)
 
             # Monta kwargs da chamada
@@ -383,21 +693,57 @@ Responda apenas com o JSON, sem ```json ou qualquer outro texto."""
                 "max_tokens": max_tokens or self.max_tokens,
                 "timeout": self.timeout,
                 "stream": True,
+                # Chunk final com usage (tokens) para calcular custo
+                "stream_options": {"include_usage": True},
             }
 
             # Adiciona API key se necessario (ex: OpenRouter)
             if api_key:
                 call_kwargs["api_key"] = api_key
 
-            response = await acompletion(**call_kwargs)
-
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-
-        except Exception as e:
-            logger.error(f"Erro no streaming do LLM: {e}")
-            raise LLMError(f"Falha no streaming: {str(e)}") from e
+            stats = get_provider_stats(use_model)
+            start_time = time.monotonic()
+            started = False
+            try:
+                response = await acompletion(**call_kwargs)
+
+                async for chunk in response:
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        self.last_stream_usage = {
+                            "prompt_tokens": usage.prompt_tokens,
+                            "completion_tokens": usage.completion_tokens,
+                            "total_tokens": usage.total_tokens,
+                        }
+                    if not chunk.choices:
+                        continue
+                    if chunk.choices[0].finish_reason:
+                        self.last_stream_finish_reason = chunk.choices[0].finish_reason
+                    if chunk.choices[0].delta.content:
+                        started = True
+                        yield chunk.choices[0].delta.content
+
+            except Exception as e:
+                stats.record_error()
+                record_llm_call(use_model, self.use_case, error=True)
+                # Failover so antes do primeiro trecho (o cliente ja recebeu texto)
+                if not started and index < len(chain) - 1:
+                    logger.warning(f"LLM failover (stream): {use_model} falhou ({e})")
+                    continue
+                logger.error(f"Erro no streaming do LLM: {e}")
+                raise LLMError(f"Falha no streaming: {str(e)}") from e
+
+            stats.record_success(time.monotonic() - start_time)
+            usage = self.last_stream_usage or {}
+            record_llm_call(
+                use_model,
+                self.use_case,
+                latency_ms=int((time.monotonic() - start_time) * 1000),
+                prompt_tokens=usage.get("prompt_tokens") or 0,
+                completion_tokens=usage.get("completion_tokens") or 0,
+            )
+            self.last_stream_model = use_model
+            return
 
 
 # =============================================================================
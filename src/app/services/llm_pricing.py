@@ -0,0 +1,54 @@
+"""
+Precos dos modelos de LLM e calculo de custo por chamada.
+
+Usado no log de cada chamada (AISEOService) e na telemetria do LLMService.
+"""
+
+from decimal import Decimal
+
+
+# Precos por 1M tokens (em USD) - atualizado em Dez/2025
+# https://openai.com/api/pricing/
+MODEL_PRICING = {
+    # OpenAI GPT-5 Family
+    "gpt-5-nano": {"input": 0.05, "output": 0.40},
+    "gpt-5-mini": {"input": 0.15, "output": 0.60},
+    "gpt-5": {"input": 2.50, "output": 10.00},
+    # OpenAI Legacy
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
+    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+    # Gemini (via OpenRouter ou direto)
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+    "gemini-1.5-pro": {"input": 1.25, "output": 5.00},
+    "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
+    # Claude (via OpenRouter)
+    "claude-3-haiku": {"input": 0.25, "output": 1.25},
+    "claude-3-sonnet": {"input": 3.00, "output": 15.00},
+}
+
+
+def calculate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Decimal:
+    """
+    Calcula o custo em USD baseado no modelo e tokens usados.
+
+    Args:
+        model: Nome do modelo (ex: gpt-4o-mini)
+        prompt_tokens: Tokens do prompt (input)
+        completion_tokens: Tokens da resposta (output)
+
+    Returns:
+        Custo total em USD (Decimal com 6 casas)
+    """
+    # Normaliza nome do modelo (remove prefixos como openrouter/, gemini/)
+    model_key = model.split("/")[-1].split(":")[0]
+
+    # Busca preco do modelo ou usa um default conservador
+    pricing = MODEL_PRICING.get(model_key, {"input": 1.00, "output": 3.00})
+
+    # Calcula custo (precos sao por 1M tokens)
+    input_cost = (prompt_tokens / 1_000_000) * pricing["input"]
+    output_cost = (completion_tokens / 1_000_000) * pricing["output"]
+
+    return Decimal(str(round(input_cost + output_cost, 6)))
@@ -0,0 +1,126 @@
+"""
+Telemetria das chamadas ao LLM (em memoria, por processo).
+
+Substitui os logs por resposta no caminho quente: cada chamada so soma
+contadores e histogramas por (modelo, caso de uso). O resumo e exposto em
+GET /api/v1/dashboard/llm.
+
+Previews do conteudo gerado saem em DEBUG ou, em INFO, para uma amostra
+das chamadas (LLM_LOG_SAMPLE_RATE).
+"""
+
+import bisect
+import logging
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from app.config import settings
+from app.services.llm_pricing import calculate_cost
+
+# Limites superiores dos buckets dos histogramas (o ultimo e "acima de")
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+# Tamanho do preview do conteudo nos logs
+PREVIEW_CHARS = 200
+
+
+def _bucket_labels(bounds: tuple[int, ...]) -> list[str]:
+    return [f"le_{bound}" for bound in bounds] + ["inf"]
+
+
+@dataclass
+class LLMCallStats:
+    """Contadores e histogramas de um par (modelo, caso de uso)."""
+
+    calls: int = 0
+    errors: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: Decimal = Decimal("0")
+    latency_ms_total: int = 0
+    latency_hist: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    tokens_hist: list[int] = field(default_factory=lambda: [0] * (len(TOKEN_BUCKETS) + 1))
+
+    def as_dict(self) -> dict:
+        # Latencia so das chamadas respondidas pelo provider
+        answered = self.calls - self.cached - self.errors
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cached": self.cached,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": float(self.cost_usd),
+            "avg_latency_ms": self.latency_ms_total // answered if answered else 0,
+            "latency_ms": dict(zip(_bucket_labels(LATENCY_BUCKETS_MS), self.latency_hist)),
+            "total_tokens": dict(zip(_bucket_labels(TOKEN_BUCKETS), self.tokens_hist)),
+        }
+
+
+_stats: dict[tuple[str, str], LLMCallStats] = {}
+
+
+def record_llm_call(
+    model: str,
+    use_case: str | None,
+    *,
+    latency_ms: int = 0,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached: bool = False,
+    error: bool = False,
+) -> None:
+    """Soma uma chamada (ou erro) na telemetria do modelo/caso de uso."""
+    stats = _stats.get((model, use_case or "default"))
+    if stats is None:
+        stats = _stats[(model, use_case or "default")] = LLMCallStats()
+
+    stats.calls += 1
+    if error:
+        stats.errors += 1
+        return
+    if cached:
+        # Resposta do cache: sem latencia de provider, tokens nem custo
+        stats.cached += 1
+        return
+
+    total_tokens = prompt_tokens + completion_tokens
+    stats.prompt_tokens += prompt_tokens
+    stats.completion_tokens += completion_tokens
+    stats.cost_usd += calculate_cost(model, prompt_tokens, completion_tokens)
+    stats.latency_ms_total += latency_ms
+    stats.latency_hist[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+    stats.tokens_hist[bisect.bisect_left(TOKEN_BUCKETS, total_tokens)] += 1
+
+
+def get_llm_telemetry() -> list[dict]:
+    """Resumo por modelo e caso de uso, do maior custo para o menor."""
+    rows = [
+        {"model": model, "use_case": use_case, **stats.as_dict()}
+        for (model, use_case), stats in _stats.items()
+    ]
+    return sorted(rows, key=lambda row: (-row["cost_usd"], -row["calls"]))
+
+
+def log_response_preview(log: logging.Logger, model: str, finish_reason: str | None, content: str) -> None:
+    """
+    Preview da resposta: INFO para uma amostra das chamadas, DEBUG no resto.
+
+    Nada e formatado se o nivel nao estiver habilitado.
+    """
+    if settings.llm_log_sample_rate > 0 and random.random() < settings.llm_log_sample_rate:
+        level = logging.INFO
+    elif log.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    else:
+        return
+    log.log(
+        level,
+        "LLM Response - model: %s, finish_reason: %s, content: %r",
+        model,
+        finish_reason,
+        content[:PREVIEW_CHARS],
+    )
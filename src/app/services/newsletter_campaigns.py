@@ -0,0 +1,272 @@
+"""
+Envio de campanhas de newsletter em background.
+
+O admin cria a campanha (NewsletterCampaignRepository.create_with_recipients)
+e chama `get_campaign_dispatcher().start(campaign.id)`; a request retorna
+na hora e o progresso e acompanhado pela pagina da campanha.
+
+Uma task por campanha:
+1. Adquire o lease da campanha (so um processo envia de cada vez).
+2. Le os destinatarios pendentes em lotes (`newsletter_send_batch_size`),
+   paginando pela chave (email) em vez de carregar a lista inteira.
+3. Envia o lote com SendBulkTemplatedEmail (ate 50 destinos por chamada):
+   o HTML e registrado uma vez como template SES da campanha e cada
+   destino leva so o seu link de descadastro. Ate
+   `newsletter_send_concurrency` chamadas simultaneas, limitadas a
+   `newsletter_send_rate` emails/s (limite de envio do SES).
+4. Grava o resultado de cada bloco assim que o SES responde (falhas
+   voltam para a fila ate `newsletter_send_max_attempts`) e renova o
+   lease. Se a campanha foi cancelada ou o lease passou a outro processo,
+   a renovacao falha e os blocos seguintes nao sao enviados.
+
+Cada bloco e commitado: um processo interrompido reenvia no maximo os
+blocos em andamento. No shutdown nenhum bloco novo e enviado; os que ja
+sairam sao gravados e o lease e liberado. Campanhas sem lease valido sao
+retomadas no startup e pelo job `resume_newsletter_campaigns`.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Callable
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.newsletter_campaign import CampaignStatus, NewsletterCampaign
+from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+from app.services.email import BULK_MAX_DESTINATIONS, EmailService, email_service
+from app.utils.throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Espera antes de cada nova passada de retentativas (segundos)
+RETRY_DELAY_SECONDS = 5.0
+
+# Folga do shutdown, alem do tempo de um bloco no limite de envio, para
+# os blocos em andamento responderem e serem gravados antes de cancelar
+CLOSE_TIMEOUT_SECONDS = 10.0
+
+
+def campaign_template_name(campaign_id: uuid.UUID) -> str:
+    """Nome do template SES de uma campanha."""
+    return f"newsletter-campaign-{campaign_id}"
+
+
+@dataclass
+class _CampaignSend:
+    """Estado do envio de uma campanha, compartilhado pelos blocos."""
+
+    campaign_id: uuid.UUID
+    claim: uuid.UUID
+    template_name: str
+    repo: NewsletterCampaignRepository
+    bucket: TokenBucket
+    semaphore: asyncio.Semaphore
+    # A sessao do repo nao aceita uso concorrente pelos blocos
+    db_lock: asyncio.Lock
+    lease_held: bool = True
+
+
+class CampaignDispatcher:
+    """Envia campanhas de newsletter em tasks de background."""
+
+    def __init__(
+        self,
+        session_factory: Callable = async_session_maker,
+        email: EmailService | None = None,
+        concurrency: int | None = None,
+        rate_per_second: int | None = None,
+        batch_size: int | None = None,
+        max_attempts: int | None = None,
+        lease_seconds: int | None = None,
+        retry_delay: float = RETRY_DELAY_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.email = email or email_service
+        self.concurrency = max(1, concurrency or settings.newsletter_send_concurrency)
+        self.rate_per_second = max(1, rate_per_second or settings.newsletter_send_rate)
+        self.batch_size = batch_size or settings.newsletter_send_batch_size
+        self.max_attempts = max_attempts or settings.newsletter_send_max_attempts
+        self.lease_seconds = lease_seconds or settings.newsletter_campaign_lease_seconds
+        self.retry_delay = retry_delay
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+        self._stopping = False
+        self.loop = asyncio.get_running_loop()
+
+    @property
+    def close_timeout(self) -> float:
+        """Espera do shutdown: um bloco no limite de envio mais a folga."""
+        chunk = min(self.batch_size, BULK_MAX_DESTINATIONS)
+        return chunk / self.rate_per_second + CLOSE_TIMEOUT_SECONDS
+
+    def start(self, campaign_id: uuid.UUID) -> bool:
+        """
+        Inicia o envio da campanha em background.
+
+        Returns:
+            False se a campanha ja esta sendo enviada por este processo
+        """
+        if self._stopping or self.is_running(campaign_id):
+            return False
+        self._tasks[campaign_id] = asyncio.create_task(
+            self._run(campaign_id), name=f"newsletter-campaign-{campaign_id}"
+        )
+        return True
+
+    def is_running(self, campaign_id: uuid.UUID) -> bool:
+        """Se a campanha esta sendo enviada por este processo."""
+        task = self._tasks.get(campaign_id)
+        return task is not None and not task.done()
+
+    async def resume_pending(self) -> int:
+        """Retoma campanhas abertas sem lease valido. Retorna quantas iniciou."""
+        async with self.session_factory() as db:
+            campaign_ids = await NewsletterCampaignRepository(db).get_resumable_ids()
+        return sum(self.start(campaign_id) for campaign_id in campaign_ids)
+
+    async def _run(self, campaign_id: uuid.UUID) -> None:
+        try:
+            await self._dispatch(campaign_id)
+        except Exception:
+            # O lease expira e a campanha e retomada depois
+            logger.exception(f"Falha no envio da campanha {campaign_id}")
+
+    async def _dispatch(self, campaign_id: uuid.UUID) -> None:
+        """Envia a campanha lote a lote enquanto detiver o lease."""
+        async with self.session_factory() as db:
+            repo = NewsletterCampaignRepository(db)
+            claim = await repo.acquire_lease(campaign_id, self.lease_seconds)
+            if claim is None:
+                logger.info(f"Campanha {campaign_id} ja em envio ou encerrada")
+                return
+
+            campaign = await repo.get(campaign_id)
+            # HTML montado uma vez e registrado como template; cada envio so
+            # manda o link de descadastro do destinatario
+            template_name = campaign_template_name(campaign_id)
+            await self.email.create_newsletter_template(
+                template_name,
+                subject=campaign.subject,
+                heading=campaign.heading,
+                content_html=campaign.content_html,
+                preview_text=campaign.preview_text,
+                cta_text=campaign.cta_text,
+                cta_url=campaign.cta_url,
+            )
+            send = _CampaignSend(
+                campaign_id=campaign_id,
+                claim=claim,
+                template_name=template_name,
+                repo=repo,
+                bucket=TokenBucket(
+                    rate_per_minute=self.rate_per_second * 60, capacity=self.rate_per_second
+                ),
+                semaphore=asyncio.Semaphore(self.concurrency),
+                db_lock=asyncio.Lock(),
+            )
+            logger.info(f"Enviando campanha {campaign_id} ({campaign.total_recipients} destinatarios)")
+
+            # Passadas sobre os pendentes em ordem de email; as falhas que
+            # voltam para a fila sao retentadas na passada seguinte
+            after_email: str | None = None
+            while True:
+                emails = await repo.get_pending_batch(campaign_id, self.batch_size, after_email)
+                if not emails and after_email is not None:
+                    # Fim da passada: recomeca para as retentativas
+                    after_email = None
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                if not emails:
+                    if await repo.finish(campaign_id, claim):
+                        await self.email.delete_template(template_name)
+                        logger.info(f"Campanha {campaign_id} concluida")
+                    else:
+                        await self._lease_lost(repo, campaign, template_name)
+                    return
+                after_email = emails[-1]
+
+                await asyncio.gather(*(
+                    self._send_chunk(send, emails[i:i + BULK_MAX_DESTINATIONS])
+                    for i in range(0, len(emails), BULK_MAX_DESTINATIONS)
+                ))
+
+                if not send.lease_held:
+                    await self._lease_lost(repo, campaign, template_name)
+                    return
+                if self._stopping:
+                    await repo.release_lease(campaign_id, claim)
+                    logger.info(f"Campanha {campaign_id} interrompida (shutdown)")
+                    return
+
+    async def _lease_lost(
+        self, repo: NewsletterCampaignRepository, campaign: NewsletterCampaign, template_name: str
+    ) -> None:
+        """Encerra o envio sem o lease: cancelada pelo admin ou assumida por outro processo."""
+        await repo.db.refresh(campaign)
+        if campaign.status == CampaignStatus.CANCELLED.value:
+            await self.email.delete_template(template_name)
+            logger.info(f"Campanha {campaign.id} cancelada")
+        else:
+            # O template continua em uso por quem assumiu a campanha
+            logger.warning(f"Campanha {campaign.id}: lease perdido, envio interrompido")
+
+    async def _send_chunk(self, send: _CampaignSend, emails: list[str]) -> None:
+        """
+        Envia um bloco (uma chamada em lote), grava o resultado e renova o
+        lease. Nao envia se o dispatcher esta parando ou perdeu o lease.
+        """
+        async with send.semaphore:
+            # O limite de envio do SES conta destinatarios, nao chamadas
+            for _email in emails:
+                if self._stopping or not send.lease_held:
+                    return
+                await send.bucket.acquire()
+            if self._stopping or not send.lease_held:
+                return
+            results = await self.email.send_newsletter_bulk(send.template_name, emails)
+
+            sent = [email for email, error in results.items() if error is None]
+            failed = {email: error for email, error in results.items() if error is not None}
+            async with send.db_lock:
+                await send.repo.record_results(send.campaign_id, sent, failed, self.max_attempts)
+                if send.lease_held and not await send.repo.renew_lease(
+                    send.campaign_id, send.claim, self.lease_seconds
+                ):
+                    send.lease_held = False
+
+    async def close(self, timeout: float | None = None) -> None:
+        """
+        Encerra os envios: nenhum bloco novo sai, os blocos em andamento sao
+        gravados e cada campanha libera o lease. O que passar de `timeout`
+        (padrao: close_timeout) e cancelado e o lease expira.
+        """
+        self._stopping = True
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if tasks:
+            _done, pending = await asyncio.wait(
+                tasks, timeout=self.close_timeout if timeout is None else timeout
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks.clear()
+
+
+_dispatcher: CampaignDispatcher | None = None
+
+
+def get_campaign_dispatcher() -> CampaignDispatcher:
+    """Retorna o dispatcher de campanhas do event loop atual, criando se necessario."""
+    global _dispatcher
+    if _dispatcher is None or _dispatcher.loop is not asyncio.get_running_loop():
+        _dispatcher = CampaignDispatcher()
+    return _dispatcher
+
+
+async def close_campaign_dispatcher() -> None:
+    """Encerra os envios em andamento (shutdown da aplicacao)."""
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
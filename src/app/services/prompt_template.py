@@ -0,0 +1,65 @@
+"""
+Templates de prompt das configuracoes de IA (AIConfig.user_prompt).
+
+O template e compilado uma vez em segmentos fixos intercalados com slots
+nomeados ({{title}}, {{content}}, ...). Renderizar e so juntar os segmentos
+com os valores, sem varrer o texto a cada placeholder. A compilacao fica em
+cache pelo texto do template, entao editar a config gera uma nova entrada.
+
+Placeholders desconhecidos sao rejeitados ao salvar a config no admin
+(find_unknown_placeholders); em tempo de execucao ficam como texto literal.
+"""
+
+import re
+from functools import lru_cache
+
+# Placeholders aceitos nos templates
+PROMPT_PLACEHOLDERS = frozenset({
+    "title",
+    "subtitle",
+    "content",
+    "keywords",
+    "category",
+    "target_audience",
+    "product_name",
+    "price",
+    "platform",
+    "occasion_name",
+    "occasion_date",
+})
+
+_PLACEHOLDER_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+class CompiledPrompt:
+    """Template pre-dividido: literals[0] slot[0] literals[1] ... literals[n]."""
+
+    __slots__ = ("literals", "slots")
+
+    def __init__(self, template: str):
+        parts = _PLACEHOLDER_RE.split(template)
+        self.literals: tuple[str, ...] = tuple(parts[0::2])
+        self.slots: tuple[str, ...] = tuple(parts[1::2])
+
+    def render(self, values: dict[str, str]) -> str:
+        """Preenche os slots; slot sem valor fica como o placeholder original."""
+        out = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(slot)
+            out.append(value if value is not None else f"{{{{{slot}}}}}")
+            out.append(literal)
+        return "".join(out)
+
+
+@lru_cache(maxsize=256)
+def compile_prompt(template: str) -> CompiledPrompt:
+    """Compila o template (memorizado pelo texto)."""
+    return CompiledPrompt(template)
+
+
+def find_unknown_placeholders(template: str | None) -> list[str]:
+    """Placeholders do template que nao estao em PROMPT_PLACEHOLDERS."""
+    if not template:
+        return []
+    slots = compile_prompt(template).slots
+    return sorted({slot for slot in slots if slot not in PROMPT_PLACEHOLDERS})
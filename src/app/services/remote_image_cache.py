@@ -0,0 +1,283 @@
+"""
+Cache em disco de imagens remotas (imagens de produtos).
+
+As imagens de produtos ficam em CDNs externas (Amazon, Mercado Livre...)
+e eram baixadas novamente a cada renderizacao de post do Instagram. Este
+modulo mantem uma copia local por URL:
+
+- Chave: sha256 da URL -> <chave>.bin (conteudo) + <chave>.json (metadados)
+- Entrada recente (< image_cache_revalidate_seconds) e usada sem rede
+- Entrada antiga e revalidada com If-None-Match / If-Modified-Since
+  (304 apenas renova a validade, sem baixar de novo)
+- Falha de rede com copia local disponivel serve a copia (stale)
+- Download em streaming com limite por arquivo; limite total do cache
+  aplicado removendo as entradas menos usadas (varredura do diretorio em
+  thread, so quando o total acompanhado passa do limite)
+
+URLs relativas de uploads (/uploads/..., /static/...) sao resolvidas
+direto para o arquivo local, sem passar por HTTP.
+
+Uso:
+    from app.services.remote_image_cache import fetch_image
+
+    image = await fetch_image(product.main_image_url)
+    image.path          # Path do arquivo local
+    image.content_type  # ex: image/jpeg
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+from app.core.http_client import get_http_client
+from app.services.upload import UPLOAD_DIR, UPLOAD_URL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuracoes
+# =============================================================================
+
+if settings.image_cache_dir:
+    IMAGE_CACHE_DIR = Path(settings.image_cache_dir)
+else:
+    IMAGE_CACHE_DIR = Path(tempfile.gettempdir()) / "geek_bidu_image_cache"
+
+# Diretorio de arquivos estaticos (para URLs relativas /static/...)
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+MAX_CACHE_BYTES = settings.image_cache_max_mb * 1024 * 1024
+MAX_FILE_BYTES = settings.image_cache_max_file_mb * 1024 * 1024
+
+
+class ImageFetchError(Exception):
+    """Erro ao obter imagem remota (rede, status HTTP ou tamanho)."""
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    """Imagem disponivel em disco local."""
+
+    path: Path
+    content_type: str
+    size: int
+
+
+# =============================================================================
+# Utilitarios
+# =============================================================================
+
+
+def _entry_paths(url: str) -> tuple[Path, Path]:
+    """Retorna (arquivo de dados, arquivo de metadados) para a URL."""
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return IMAGE_CACHE_DIR / f"{key}.bin", IMAGE_CACHE_DIR / f"{key}.json"
+
+
+def _guess_content_type(name: str) -> str:
+    """Determina tipo MIME pela extensao (fallback image/png)."""
+    mime_type, _ = mimetypes.guess_type(name)
+    return mime_type or "image/png"
+
+
+def _resolve_local(url: str) -> CachedImage | None:
+    """
+    Resolve URL relativa de upload/static para o arquivo local.
+
+    Returns:
+        CachedImage apontando para o arquivo, ou None se nao for local
+    """
+    for prefix, base_dir in ((f"{UPLOAD_URL_PREFIX}/", UPLOAD_DIR), ("/static/", STATIC_DIR)):
+        if not url.startswith(prefix):
+            continue
+        base_dir = base_dir.resolve()
+        file_path = (base_dir / url[len(prefix):].split("?", 1)[0]).resolve()
+        if base_dir in file_path.parents and file_path.is_file():
+            return CachedImage(
+                path=file_path,
+                content_type=_guess_content_type(file_path.name),
+                size=file_path.stat().st_size,
+            )
+    return None
+
+
+def _read_meta(meta_path: Path) -> dict | None:
+    """Le metadados da entrada (None se inexistente ou corrompido)."""
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path: Path, meta: dict) -> None:
+    """Grava metadados de forma atomica."""
+    tmp_path = meta_path.with_name(f"{meta_path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(meta))
+    os.replace(tmp_path, meta_path)
+
+
+def _hit(data_path: Path, meta: dict) -> CachedImage:
+    """Marca uso da entrada (para LRU) e retorna a imagem em cache."""
+    try:
+        os.utime(data_path)
+    except OSError:
+        pass
+    return CachedImage(path=data_path, content_type=meta["content_type"], size=meta["size"])
+
+
+# Total do cache em bytes acompanhado por este processo: medido na
+# varredura e somado a cada gravacao (None = ainda nao medido). Gravacoes
+# de outros processos entram na proxima varredura.
+_tracked_bytes: int | None = None
+
+
+def _enforce_size_limit(keep: Path | None = None) -> tuple[int, int]:
+    """
+    Remove entradas menos usadas ate o cache caber em MAX_CACHE_BYTES.
+
+    Varre o diretorio (I/O bloqueante: rodar fora do event loop).
+
+    Args:
+        keep: Entrada que nunca e removida (a que acabou de ser gravada)
+
+    Returns:
+        (numero de entradas removidas, total restante em bytes)
+    """
+    entries = []
+    total = 0
+    for data_path in IMAGE_CACHE_DIR.glob("*.bin"):
+        try:
+            stat = data_path.stat()
+        except OSError:
+            continue
+        total += stat.st_size
+        if data_path != keep:
+            entries.append((stat.st_mtime, stat.st_size, data_path))
+
+    removed = 0
+    for _, size, data_path in sorted(entries):
+        if total <= MAX_CACHE_BYTES:
+            break
+        data_path.unlink(missing_ok=True)
+        data_path.with_suffix(".json").unlink(missing_ok=True)
+        total -= size
+        removed += 1
+
+    return removed, total
+
+
+async def _track_write(data_path: Path, added_bytes: int) -> None:
+    """Soma a gravacao ao total e, se passar do limite, remove entradas antigas."""
+    global _tracked_bytes
+    if _tracked_bytes is not None:
+        _tracked_bytes += added_bytes
+        if _tracked_bytes <= MAX_CACHE_BYTES:
+            return
+
+    removed, _tracked_bytes = await asyncio.to_thread(_enforce_size_limit, data_path)
+    if removed:
+        logger.info(f"Cache de imagens: {removed} entradas antigas removidas")
+
+
+# =============================================================================
+# API Publica
+# =============================================================================
+
+
+async def fetch_image(url: str) -> CachedImage:
+    """
+    Retorna imagem local para a URL, baixando/revalidando se necessario.
+
+    Args:
+        url: URL absoluta ou relativa (/uploads/..., /static/...)
+
+    Returns:
+        CachedImage com caminho local, tipo MIME e tamanho
+
+    Raises:
+        ImageFetchError: Se nao for possivel obter a imagem e nao houver copia
+    """
+    local = _resolve_local(url)
+    if local is not None:
+        return local
+
+    # Demais URLs relativas sao servidas pela propria aplicacao
+    if url.startswith("/"):
+        url = f"{settings.app_url}{url}"
+
+    IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _entry_paths(url)
+    meta = _read_meta(meta_path) if data_path.exists() else None
+
+    if meta and time.time() - meta["validated_at"] < settings.image_cache_revalidate_seconds:
+        return _hit(data_path, meta)
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    previous_size = meta["size"] if meta else 0
+    tmp_path = data_path.with_name(f"{data_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and meta:
+                meta["validated_at"] = time.time()
+                _write_meta(meta_path, meta)
+                return _hit(data_path, meta)
+
+            response.raise_for_status()
+
+            declared_size = int(response.headers.get("content-length") or 0)
+            if declared_size > MAX_FILE_BYTES:
+                raise ImageFetchError(f"Imagem excede {settings.image_cache_max_file_mb}MB: {url}")
+
+            size = 0
+            with open(tmp_path, "wb") as f:
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_FILE_BYTES:
+                        raise ImageFetchError(
+                            f"Imagem excede {settings.image_cache_max_file_mb}MB: {url}"
+                        )
+                    f.write(chunk)
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip()
+            if not content_type or content_type == "application/octet-stream":
+                content_type = _guess_content_type(url.split("?", 1)[0])
+
+            os.replace(tmp_path, data_path)
+            meta = {
+                "url": url,
+                "content_type": content_type,
+                "size": size,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "validated_at": time.time(),
+            }
+            _write_meta(meta_path, meta)
+
+    except httpx.HTTPError as e:
+        if meta:
+            logger.warning(f"Falha ao revalidar imagem, usando copia em cache [{url}]: {e}")
+            return _hit(data_path, meta)
+        raise ImageFetchError(str(e)) from e
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    await _track_write(data_path, meta["size"] - previous_size)
+
+    return _hit(data_path, meta)
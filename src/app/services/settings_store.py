@@ -12,6 +12,7 @@ from app.models.setting import Setting
 
 # Chaves conhecidas
 AMAZON_AFFILIATE_TAG = "amazon_affiliate_tag"
+AI_ENRICHMENT_CHECKPOINT = "ai_enrichment_checkpoint"
 
 
 async def get_setting(
@@ -17,6 +17,8 @@ from fastapi import HTTPException, UploadFile, status
 from PIL import Image
 
 from app.config import settings
+from app.core.image_executor import run_image_task
+from app.services.image_derivatives import delete_derivatives, generate_derivatives
 
 # Tipos de arquivo permitidos
 ALLOWED_IMAGE_TYPES = {
@@ -29,6 +31,9 @@ ALLOWED_IMAGE_TYPES = {
 # Tamanho maximo: 10MB (sera comprimido automaticamente)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# Tamanho dos blocos lidos do upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 # =============================================================================
 # Padroes de tamanho de imagens
 # =============================================================================
@@ -103,6 +108,43 @@ def validate_image(file: UploadFile) -> str:
     return ALLOWED_IMAGE_TYPES[file.content_type]
 
 
+async def read_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> bytes:
+    """
+    Le o upload em blocos, abortando assim que passar do tamanho maximo.
+
+    Evita carregar arquivos gigantes inteiros em memoria so para
+    rejeita-los depois.
+
+    Args:
+        file: Arquivo enviado
+        max_size: Tamanho maximo em bytes
+
+    Returns:
+        Conteudo completo do arquivo
+
+    Raises:
+        HTTPException 400: Se o arquivo exceder max_size
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Arquivo muito grande. Tamanho maximo: {max_size // (1024 * 1024)}MB",
+    )
+
+    # Tamanho declarado (quando disponivel) rejeita sem ler nada
+    if file.size is not None and file.size > max_size:
+        raise too_large
+
+    chunks = []
+    total = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_size:
+            raise too_large
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
 async def save_product_image(file: UploadFile, resize: bool = False) -> str:
     """
     Salva imagem de produto.
@@ -132,25 +174,25 @@ async def save_product_image(file: UploadFile, resize: bool = False) -> str:
     # Garante que diretorio existe
     upload_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Le conteudo e valida tamanho
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Arquivo muito grande. Tamanho maximo: {MAX_FILE_SIZE // (1024 * 1024)}MB",
-        )
+    # Le conteudo em blocos, abortando ao exceder o tamanho maximo
+    content = await read_upload(file)
 
     # Redimensiona se solicitado
     if resize:
-        content = resize_image(content, PRODUCT_IMAGE_SIZES["main"], "JPEG")
+        content = await run_image_task(resize_image, content, PRODUCT_IMAGE_SIZES["main"], "JPEG")
 
     # Salva arquivo
     with open(upload_path, "wb") as f:
         f.write(content)
 
+    url = get_upload_url("products", filename)
+
+    # Derivados responsivos (GIF fica de fora para nao perder a animacao)
+    if resize or extension != ".gif":
+        await generate_derivatives(content, upload_path, url)
+
     # Retorna URL relativa
-    return get_upload_url("products", filename)
+    return url
 
 
 def delete_product_image(image_url: str) -> bool:
@@ -177,6 +219,8 @@ def delete_product_image(image_url: str) -> bool:
     # Converte URL para caminho
     file_path = UPLOAD_DIR / relative_path
 
+    delete_derivatives(image_url)
+
     if file_path.exists():
         os.remove(file_path)
         return True
@@ -193,6 +237,8 @@ def resize_image(
     """
     Redimensiona imagem mantendo proporcao e preenchendo com fundo branco.
 
+    Sincrono e CPU-bound: em handlers async, execute via run_image_task.
+
     Inclui compressao inteligente: se a imagem processada ainda for maior que
     max_output_size, reduz a qualidade progressivamente ate atingir o limite.
 
@@ -208,6 +254,10 @@ def resize_image(
     # Abre imagem
     img = Image.open(io.BytesIO(content))
 
+    # JPEG: decodifica direto em escala reduzida (1/2, 1/4, 1/8) ainda maior
+    # ou igual ao alvo, evitando decodificar fotos enormes em resolucao cheia
+    img.draft("RGB", target_size)
+
     # Converte para RGB se necessario (para JPEG)
     if img.mode in ("RGBA", "P") and output_format == "JPEG":
         # Cria fundo branco
@@ -278,24 +328,23 @@ async def save_category_image(file: UploadFile) -> str:
     # Garante que diretorio existe
     upload_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Le conteudo e valida tamanho
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Arquivo muito grande. Tamanho maximo: {MAX_FILE_SIZE // (1024 * 1024)}MB",
-        )
+    # Le conteudo em blocos, abortando ao exceder o tamanho maximo
+    content = await read_upload(file)
 
     # Redimensiona imagem para tamanho padrao
-    resized_content = resize_image(content, CATEGORY_IMAGE_SIZE, "JPEG")
+    resized_content = await run_image_task(resize_image, content, CATEGORY_IMAGE_SIZE, "JPEG")
 
     # Salva arquivo
     with open(upload_path, "wb") as f:
         f.write(resized_content)
 
+    url = get_upload_url("categories", filename)
+
+    # Derivados responsivos (WebP/AVIF em varias larguras)
+    await generate_derivatives(resized_content, upload_path, url)
+
     # Retorna URL relativa
-    return get_upload_url("categories", filename)
+    return url
 
 
 async def save_category_header_image(file: UploadFile) -> str:
@@ -331,18 +380,13 @@ async def save_category_header_image(file: UploadFile) -> str:
     # Garante que diretorio existe
     upload_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Le conteudo e valida tamanho
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Arquivo muito grande. Tamanho maximo: {MAX_FILE_SIZE // (1024 * 1024)}MB",
-        )
+    # Le conteudo em blocos, abortando ao exceder o tamanho maximo
+    content = await read_upload(file)
 
     # Redimensiona imagem para tamanho padrao de header
     # Usa limite maior de tamanho de saida (800KB) por ser imagem maior
-    resized_content = resize_image(
+    resized_content = await run_image_task(
+        resize_image,
         content,
         CATEGORY_HEADER_IMAGE_SIZE,
         "JPEG",
@@ -353,8 +397,13 @@ async def save_category_header_image(file: UploadFile) -> str:
     with open(upload_path, "wb") as f:
         f.write(resized_content)
 
+    url = get_upload_url("categories/headers", filename)
+
+    # Derivados responsivos (WebP/AVIF em varias larguras)
+    await generate_derivatives(resized_content, upload_path, url)
+
     # Retorna URL relativa
-    return get_upload_url("categories/headers", filename)
+    return url
 
 
 async def save_post_image(file: UploadFile) -> str:
@@ -385,24 +434,23 @@ async def save_post_image(file: UploadFile) -> str:
     # Garante que diretorio existe
     upload_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Le conteudo e valida tamanho
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Arquivo muito grande. Tamanho maximo: {MAX_FILE_SIZE // (1024 * 1024)}MB",
-        )
+    # Le conteudo em blocos, abortando ao exceder o tamanho maximo
+    content = await read_upload(file)
 
     # Redimensiona imagem para tamanho padrao Open Graph
-    resized_content = resize_image(content, POST_FEATURED_IMAGE_SIZE, "JPEG")
+    resized_content = await run_image_task(resize_image, content, POST_FEATURED_IMAGE_SIZE, "JPEG")
 
     # Salva arquivo
     with open(upload_path, "wb") as f:
         f.write(resized_content)
 
+    url = get_upload_url("posts", filename)
+
+    # Derivados responsivos (WebP/AVIF em varias larguras)
+    await generate_derivatives(resized_content, upload_path, url)
+
     # Retorna URL relativa
-    return get_upload_url("posts", filename)
+    return url
 
 
 def delete_category_image(image_url: str) -> bool:
@@ -429,6 +477,8 @@ def delete_category_image(image_url: str) -> bool:
     # Converte URL para caminho
     file_path = UPLOAD_DIR / relative_path
 
+    delete_derivatives(image_url)
+
     if file_path.exists():
         os.remove(file_path)
         return True
@@ -343,6 +343,50 @@ async def get_cached_llm_response(prompt_hash: str) -> Optional[dict[str, Any]]:
     return await cache_get(key)
 
 
+async def invalidate_cached_llm_response(prompt_hash: str) -> bool:
+    """
+    Remove resposta cacheada de LLM (ex: resposta invalida para o schema).
+
+    Args:
+        prompt_hash: Hash da requisicao
+
+    Returns:
+        True se removeu, False se erro ou nao existia
+    """
+    key = cache_key("llm", "response", prompt_hash)
+    return await cache_delete(key)
+
+
+def hash_llm_request(
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    system: str | None,
+    user: str,
+) -> str:
+    """
+    Gera hash de uma requisicao ao LLM para cache de respostas.
+
+    Inclui todos os parametros que alteram a resposta: o mesmo prompt com
+    outro modelo/temperatura/limite de tokens nao compartilha entrada.
+
+    Args:
+        model: Modelo no formato LiteLLM
+        temperature: Temperatura
+        max_tokens: Limite de tokens da resposta
+        system: System prompt
+        user: User prompt
+
+    Returns:
+        Hash SHA-256 da requisicao
+    """
+    payload = json.dumps(
+        [model, temperature, max_tokens, system or "", user],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
 def hash_prompt(system: str, user: str) -> str:
     """
     Gera hash de prompt para cache de LLM.
@@ -0,0 +1,37 @@
+"""
+Limitador de taxa async (token bucket) para chamadas a APIs externas.
+
+Usado pelo enriquecimento com IA (limite por provider) e pelo envio de
+campanhas de newsletter (limite de envio do SES).
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket async: libera ate `rate_per_minute` chamadas por minuto,
+    com rajada de ate `capacity` chamadas.
+    """
+
+    def __init__(self, rate_per_minute: int, capacity: int = 1):
+        self.rate = max(1, rate_per_minute) / 60
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Aguarda ate haver um token disponivel e o consome."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
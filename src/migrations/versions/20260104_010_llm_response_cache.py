@@ -0,0 +1,49 @@
+"""Add LLM response cache columns.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+Suporte ao cache de respostas do LLM (Redis):
+
+- `ai_configs.cache_ttl_minutes`: TTL do cache por caso de uso.
+  NULL usa o padrao global (LLM_CACHE_TTL); 0 desabilita o cache
+  (casos de uso criativos, em que cada geracao deve ser diferente).
+- `ai_logs.cached`: indica que a resposta veio do cache (sem chamada
+  ao provider, custo 0).
+
+Idempotente via ADD COLUMN IF NOT EXISTS.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE ai_configs ADD COLUMN IF NOT EXISTS cache_ttl_minutes INTEGER"
+    )
+    op.execute(
+        "COMMENT ON COLUMN ai_configs.cache_ttl_minutes IS "
+        "'TTL do cache de respostas em minutos (NULL = padrao global, 0 = desabilitado)'"
+    )
+    op.execute(
+        "ALTER TABLE ai_logs ADD COLUMN IF NOT EXISTS cached BOOLEAN "
+        "NOT NULL DEFAULT false"
+    )
+    op.execute(
+        "COMMENT ON COLUMN ai_logs.cached IS "
+        "'Resposta servida pelo cache (sem chamada ao provider)'"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE ai_logs DROP COLUMN IF EXISTS cached")
+    op.execute("ALTER TABLE ai_configs DROP COLUMN IF EXISTS cache_ttl_minutes")
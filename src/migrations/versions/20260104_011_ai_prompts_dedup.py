@@ -0,0 +1,76 @@
+"""Deduplicate AI log system prompts into ai_prompts.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+Os system prompts se repetem em praticamente todas as chamadas de um caso
+de uso e eram gravados inline em cada linha de ai_logs. Agora ficam uma
+unica vez em `ai_prompts` (chave = sha256 do conteudo) e o log referencia
+pelo hash:
+
+- Cria `ai_prompts` (hash, content, created_at).
+- Adiciona `ai_logs.system_prompt_hash` (FK para ai_prompts.hash).
+- Migra os logs existentes: insere os prompts distintos, preenche o hash
+  e limpa a coluna inline `system_prompt`.
+
+Idempotente via IF NOT EXISTS / ON CONFLICT DO NOTHING.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ai_prompts (
+            hash VARCHAR(64) PRIMARY KEY,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+    """)
+    op.execute(
+        "COMMENT ON TABLE ai_prompts IS "
+        "'System prompts deduplicados dos logs de IA (chave = sha256 do conteudo)'"
+    )
+    op.execute(
+        "ALTER TABLE ai_logs ADD COLUMN IF NOT EXISTS system_prompt_hash VARCHAR(64) "
+        "REFERENCES ai_prompts(hash)"
+    )
+    op.execute(
+        "COMMENT ON COLUMN ai_logs.system_prompt_hash IS "
+        "'Hash do system prompt deduplicado em ai_prompts'"
+    )
+
+    # Migra os prompts inline existentes (sha256 nativo do PostgreSQL 11+)
+    op.execute("""
+        INSERT INTO ai_prompts (hash, content)
+        SELECT DISTINCT encode(sha256(convert_to(system_prompt, 'UTF8')), 'hex'), system_prompt
+        FROM ai_logs
+        WHERE system_prompt IS NOT NULL AND system_prompt <> ''
+        ON CONFLICT (hash) DO NOTHING
+    """)
+    op.execute("""
+        UPDATE ai_logs
+        SET system_prompt_hash = encode(sha256(convert_to(system_prompt, 'UTF8')), 'hex'),
+            system_prompt = NULL
+        WHERE system_prompt IS NOT NULL AND system_prompt <> ''
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE ai_logs
+        SET system_prompt = ai_prompts.content
+        FROM ai_prompts
+        WHERE ai_logs.system_prompt_hash = ai_prompts.hash
+    """)
+    op.execute("ALTER TABLE ai_logs DROP COLUMN IF EXISTS system_prompt_hash")
+    op.execute("DROP TABLE IF EXISTS ai_prompts")
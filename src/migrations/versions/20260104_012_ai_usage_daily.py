@@ -0,0 +1,77 @@
+"""Add daily AI usage rollup.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+Cria `ai_usage_daily` (dia x caso de uso x modelo) com contadores de
+chamadas, erros, cache, tokens, custo e latencia. A tabela e mantida
+incrementalmente pelo AILogRepository a cada log inserido; o dashboard
+/admin/ai-logs le os totais daqui em vez de agregar ai_logs inteira.
+
+O historico existente e agregado uma vez a partir de ai_logs.
+
+Idempotente via IF NOT EXISTS / ON CONFLICT DO NOTHING.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ai_usage_daily (
+            day DATE NOT NULL,
+            use_case VARCHAR(50) NOT NULL,
+            model VARCHAR(100) NOT NULL,
+            calls INTEGER NOT NULL DEFAULT 0,
+            success_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            cached_count INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+            latency_ms_total BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, use_case, model)
+        )
+    """)
+    op.execute(
+        "COMMENT ON TABLE ai_usage_daily IS "
+        "'Rollup diario de uso de IA (dia x caso de uso x modelo), mantido a cada log'"
+    )
+
+    # Backfill do historico (dia em UTC, como no rollup incremental)
+    op.execute("""
+        INSERT INTO ai_usage_daily (
+            day, use_case, model, calls, success_count, error_count, cached_count,
+            prompt_tokens, completion_tokens, total_tokens, cost_usd, latency_ms_total
+        )
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::date,
+            use_case,
+            model,
+            count(*),
+            count(*) FILTER (WHERE success),
+            count(*) FILTER (WHERE NOT success),
+            count(*) FILTER (WHERE cached),
+            coalesce(sum(prompt_tokens), 0),
+            coalesce(sum(completion_tokens), 0),
+            coalesce(sum(total_tokens), 0),
+            coalesce(sum(cost_usd) FILTER (WHERE success), 0),
+            coalesce(sum(latency_ms), 0)
+        FROM ai_logs
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, use_case, model) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS ai_usage_daily")
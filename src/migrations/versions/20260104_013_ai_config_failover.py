@@ -0,0 +1,46 @@
+"""Add provider failover settings to AI configs.
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+
+- `ai_configs.fallback_models`: lista JSON de modelos (formato LiteLLM)
+  tentados em ordem quando o modelo principal falha.
+- `ai_configs.hedge_requests`: dispara o proximo modelo da cadeia quando o
+  atual passa do p95 de latencia sem responder.
+
+Idempotente via ADD COLUMN IF NOT EXISTS.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE ai_configs ADD COLUMN IF NOT EXISTS fallback_models JSONB"
+    )
+    op.execute(
+        "COMMENT ON COLUMN ai_configs.fallback_models IS "
+        "'Modelos de fallback (formato LiteLLM), tentados em ordem'"
+    )
+    op.execute(
+        "ALTER TABLE ai_configs ADD COLUMN IF NOT EXISTS hedge_requests BOOLEAN "
+        "NOT NULL DEFAULT false"
+    )
+    op.execute(
+        "COMMENT ON COLUMN ai_configs.hedge_requests IS "
+        "'Dispara o fallback se o modelo passar do p95 de latencia'"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE ai_configs DROP COLUMN IF EXISTS hedge_requests")
+    op.execute("ALTER TABLE ai_configs DROP COLUMN IF EXISTS fallback_models")
@@ -0,0 +1,82 @@
+"""Add newsletter campaigns.
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19
+
+Cria `newsletter_campaigns` (conteudo, status, contadores de progresso e
+lease do dispatcher) e `newsletter_campaign_recipients` (um destinatario
+por linha, com status/tentativas do envio). O envio das campanhas roda em
+background e e retomado a partir das linhas pendentes.
+
+Idempotente via IF NOT EXISTS.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS newsletter_campaigns (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            subject VARCHAR(255) NOT NULL,
+            heading VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL DEFAULT '',
+            content_html TEXT NOT NULL DEFAULT '',
+            preview_text VARCHAR(255),
+            cta_text VARCHAR(100),
+            cta_url VARCHAR(500),
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            total_recipients INTEGER NOT NULL DEFAULT 0,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            created_by VARCHAR(255),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            locked_until TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_newsletter_campaigns_status "
+        "ON newsletter_campaigns (status)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_newsletter_campaigns_created_at "
+        "ON newsletter_campaigns (created_at)"
+    )
+    op.execute(
+        "COMMENT ON COLUMN newsletter_campaigns.locked_until IS "
+        "'Lease do dispatcher que esta enviando a campanha'"
+    )
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS newsletter_campaign_recipients (
+            campaign_id UUID NOT NULL
+                REFERENCES newsletter_campaigns (id) ON DELETE CASCADE,
+            email VARCHAR(255) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error VARCHAR(500),
+            sent_at TIMESTAMPTZ,
+            PRIMARY KEY (campaign_id, email)
+        )
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_newsletter_campaign_recipients_status "
+        "ON newsletter_campaign_recipients (campaign_id, status)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS newsletter_campaign_recipients")
+    op.execute("DROP TABLE IF EXISTS newsletter_campaigns")
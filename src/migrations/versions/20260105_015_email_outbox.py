@@ -0,0 +1,54 @@
+"""Add email outbox.
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19
+
+Cria `email_outbox`: emails transacionais (verificacao da newsletter)
+gravados na mesma transacao da inscricao e enviados em background pelo
+EmailOutboxWorker, com retentativas e lease por processo.
+
+Idempotente via IF NOT EXISTS.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "015"
+down_revision: Union[str, None] = "014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            kind VARCHAR(50) NOT NULL,
+            to_email VARCHAR(255) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error VARCHAR(500),
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_until TIMESTAMPTZ,
+            claimed_by UUID,
+            sent_at TIMESTAMPTZ,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_due "
+        "ON email_outbox (status, next_attempt_at)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_to_email "
+        "ON email_outbox (to_email, kind)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS email_outbox")
@@ -0,0 +1,37 @@
+"""Add lease owner to newsletter campaigns.
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19
+
+`newsletter_campaigns.claimed_by`: token do dispatcher que adquiriu o
+lease. Renovar, liberar e concluir a campanha exigem o token (como no
+`email_outbox`), entao um dispatcher que perdeu o lease para outro
+processo para de enviar em vez de disputar os mesmos destinatarios.
+
+Idempotente via ADD COLUMN IF NOT EXISTS.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "016"
+down_revision: Union[str, None] = "015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE newsletter_campaigns ADD COLUMN IF NOT EXISTS claimed_by UUID"
+    )
+    op.execute(
+        "COMMENT ON COLUMN newsletter_campaigns.claimed_by IS "
+        "'Token do dispatcher que detem o lease'"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE newsletter_campaigns DROP COLUMN IF EXISTS claimed_by")
@@ -246,6 +246,11 @@ async def async_engine(use_postgres):
     - Com --use-postgres: Usa DATABASE_URL (tabelas limpas no inicio da sessao)
     - Sem --use-postgres: Usa SQLite em memoria (padrao)
     """
+    from app.repositories.newsletter import invalidate_newsletter_stats
+
+    # Cache de estatisticas e por processo; cada teste tem um banco novo
+    invalidate_newsletter_stats()
+
     if use_postgres:
         # Usa PostgreSQL de dev
         from dotenv import load_dotenv
@@ -439,9 +444,11 @@ async def test_app(async_engine, use_postgres):
     from app.core.rate_limit import limiter
     from app.database import get_db
     from app.main import app
+    from app.services.antispam import MemoryRateLimitBackend, set_rate_limit_backend
 
     # Reset rate limiter para cada teste
     limiter.reset()
+    set_rate_limit_backend(MemoryRateLimitBackend())
 
     if use_postgres:
         # PostgreSQL: Limpa tabelas antes de cada teste
@@ -37,6 +37,24 @@ class TestNewsletterEndpoints:
         assert "verifique" in data["message"].lower() or "sucesso" in data["message"].lower()
         assert data["needs_verification"] is True
 
+    @pytest.mark.asyncio
+    async def test_subscribe_enqueues_verification_email(self, client, db_session):
+        """Email de verificacao vai para a fila; reenvio substitui o pendente."""
+        from app.models import EmailOutbox
+        from sqlalchemy import select
+
+        payload = {"email": "fila@example.com"}
+        await client.post("/api/v1/newsletter/subscribe", json=payload)
+        await client.post("/api/v1/newsletter/subscribe", json=payload)
+
+        result = await db_session.execute(
+            select(EmailOutbox).where(EmailOutbox.to_email == "fila@example.com")
+        )
+        [message] = result.scalars().all()
+        assert message.kind == "newsletter_verification"
+        assert message.status == "pending"
+        assert "/api/v1/newsletter/verify/" in message.payload["verification_url"]
+
     @pytest.mark.asyncio
     async def test_subscribe_already_subscribed_and_verified(self, client, db_session):
         """Deve retornar mensagem informativa para email ja verificado."""
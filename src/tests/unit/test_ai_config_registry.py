@@ -0,0 +1,112 @@
+"""
+Testes unitarios para o registro em memoria das configs de IA.
+
+Verifica:
+- Uma query carrega todas as configs ativas
+- Leituras seguintes nao acessam o banco ate o TTL expirar
+- invalidate() forca a recarga (edicao no admin)
+- Configs em cache sao desanexadas da sessao
+- Cliente LLM memorizado por versao da config
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.models.ai_config import AIConfig, AIEntity, AIProvider, AIUseCase
+from app.repositories.ai_config import AIConfigRepository
+from app.services import ai_seo
+from app.services.ai_config_registry import AIConfigRegistry
+
+
+async def _add_config(db_session, use_case: AIUseCase, **overrides) -> AIConfig:
+    data = {
+        "use_case": use_case,
+        "name": use_case.value,
+        "entity": AIEntity.POST,
+        "provider": AIProvider.OPENAI,
+        "model": "gpt-4o-mini",
+        "system_prompt": "Sistema",
+        "is_active": True,
+        **overrides,
+    }
+    config = AIConfig(**data)
+    db_session.add(config)
+    await db_session.commit()
+    return config
+
+
+class TestAIConfigRegistry:
+    """Testes para AIConfigRegistry."""
+
+    @pytest.mark.asyncio
+    async def test_loads_once_until_ttl(self, db_session):
+        """Varias leituras dentro do TTL fazem uma unica query."""
+        await _add_config(db_session, AIUseCase.POST_SEO_TITLE)
+        await _add_config(db_session, AIUseCase.POST_TAGS, is_active=False)
+        registry = AIConfigRegistry(ttl_seconds=60)
+
+        with patch.object(
+            AIConfigRepository, "get_all_active", wraps=AIConfigRepository(db_session).get_all_active
+        ) as mock_load:
+            title = await registry.get(db_session, AIUseCase.POST_SEO_TITLE)
+            many = await registry.get_many(
+                db_session, [AIUseCase.POST_SEO_TITLE, AIUseCase.POST_TAGS]
+            )
+
+        assert mock_load.call_count == 1
+        assert title.model == "gpt-4o-mini"
+        assert list(many) == [AIUseCase.POST_SEO_TITLE]
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads(self, db_session):
+        """Apos invalidate a proxima leitura ve a config editada."""
+        config = await _add_config(db_session, AIUseCase.POST_SEO_TITLE)
+        registry = AIConfigRegistry(ttl_seconds=60)
+        cached = await registry.get(db_session, AIUseCase.POST_SEO_TITLE)
+
+        config.model = "gpt-4o"
+        await db_session.commit()
+        assert (await registry.get(db_session, AIUseCase.POST_SEO_TITLE)).model == "gpt-4o-mini"
+
+        registry.invalidate()
+        assert (await registry.get(db_session, AIUseCase.POST_SEO_TITLE)).model == "gpt-4o"
+        # A copia antiga nao e alterada pela sessao
+        assert cached.model == "gpt-4o-mini"
+
+    @pytest.mark.asyncio
+    async def test_expired_ttl_reloads(self, db_session):
+        """TTL zero recarrega a cada leitura."""
+        await _add_config(db_session, AIUseCase.POST_SEO_TITLE)
+        registry = AIConfigRegistry(ttl_seconds=0)
+
+        with patch.object(
+            AIConfigRepository, "get_all_active", wraps=AIConfigRepository(db_session).get_all_active
+        ) as mock_load:
+            await registry.get(db_session, AIUseCase.POST_SEO_TITLE)
+            await registry.get(db_session, AIUseCase.POST_SEO_TITLE)
+
+        assert mock_load.call_count == 2
+
+
+class TestLLMClientMemo:
+    """Testes para o cliente LLM memorizado por config."""
+
+    def test_same_version_reuses_client(self, monkeypatch):
+        """Mesma config reaproveita o cliente; editar parametros cria outro."""
+        monkeypatch.setattr(ai_seo, "_llm_clients", {})
+        config = AIConfig(
+            use_case=AIUseCase.POST_SEO_TITLE,
+            provider=AIProvider.OPENAI,
+            model="gpt-4o-mini",
+            temperature=0.7,
+            max_tokens=100,
+        )
+
+        first = ai_seo._get_llm_client(config)
+        assert ai_seo._get_llm_client(config) is first
+
+        config.temperature = 0.2
+        edited = ai_seo._get_llm_client(config)
+        assert edited is not first
+        assert edited.temperature == 0.2
@@ -0,0 +1,207 @@
+"""
+Testes unitarios para o enriquecimento em lote do catalogo com IA.
+
+Verifica:
+- Token bucket por provider
+- Pool de workers com concorrencia limitada
+- Escrita em lote (um UPDATE executemany por alvo) e AILog por item
+- Avanco do checkpoint
+- Registro do job (nasce desabilitado)
+"""
+
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.ai_config import AIProvider, AIUseCase
+from app.services import ai_enrichment
+from app.services.ai_enrichment import (
+    ENRICHMENT_TARGETS,
+    CatalogEnrichmentService,
+    EnrichmentItem,
+    TokenBucket,
+)
+from app.services.jobs import JOB_REGISTRY
+
+PRODUCT_TARGET = ENRICHMENT_TARGETS[0]
+POST_TITLE_TARGET = ENRICHMENT_TARGETS[1]
+
+
+def _config(use_case: AIUseCase) -> MagicMock:
+    config = MagicMock()
+    config.use_case = use_case
+    config.provider = AIProvider.OPENAI
+    config.full_model_name = "gpt-4o-mini"
+    config.system_prompt = "system"
+    config.temperature = 0.7
+    config.max_tokens = 500
+    return config
+
+
+def _result(content: str = "Gerado") -> dict:
+    return {
+        "generated_content": content,
+        "model_used": "gpt-4o-mini",
+        "tokens_used": 30,
+        "prompt_tokens": 20,
+        "completion_tokens": 10,
+        "cost_usd": 0.0001,
+        "finish_reason": "stop",
+        "cached": False,
+        "_user_prompt": "prompt",
+        "_system_prompt": "system",
+        "_latency_ms": 5,
+    }
+
+
+@pytest.fixture
+def enrichment_settings(monkeypatch):
+    """Limites pequenos e rate limit folgado para os testes."""
+    monkeypatch.setattr(ai_enrichment.settings, "ai_enrichment_workers", 2)
+    monkeypatch.setattr(ai_enrichment.settings, "ai_enrichment_requests_per_minute", 60_000)
+    monkeypatch.setattr(ai_enrichment.settings, "ai_enrichment_write_batch", 2)
+    monkeypatch.setattr(ai_enrichment.settings, "ai_enrichment_max_items", 50)
+
+
+def _patch_configs(monkeypatch, configs: dict) -> None:
+    """Registro de configs de IA falso com as configs dadas."""
+    registry = MagicMock()
+    registry.get_many = AsyncMock(return_value=configs)
+    monkeypatch.setattr(ai_enrichment, "get_ai_config_registry", lambda: registry)
+
+
+def _service(items: list[EnrichmentItem], configs: dict) -> CatalogEnrichmentService:
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    service = CatalogEnrichmentService(db)
+    service._load_checkpoint = AsyncMock(return_value={})
+    service._save_checkpoint = AsyncMock()
+    service.select_pending = AsyncMock(return_value=items)
+    return service
+
+
+class TestTokenBucket:
+    """Testes para TokenBucket."""
+
+    @pytest.mark.asyncio
+    async def test_burst_up_to_capacity(self):
+        """Libera `capacity` chamadas sem esperar."""
+        bucket = TokenBucket(rate_per_minute=60, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.asyncio
+    async def test_waits_when_empty(self):
+        """Sem tokens, espera a taxa de reposicao."""
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 1 a cada 0.1s
+        await bucket.acquire()
+        start = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.08
+
+
+class TestCatalogEnrichmentRun:
+    """Testes para CatalogEnrichmentService.run."""
+
+    @pytest.mark.asyncio
+    async def test_worker_pool_is_bounded(self, monkeypatch, enrichment_settings):
+        """No maximo ai_enrichment_workers chamadas simultaneas."""
+        items = [EnrichmentItem(PRODUCT_TARGET, uuid.uuid4(), {}) for _ in range(6)]
+        service = _service(items, {})
+        _patch_configs(monkeypatch, {AIUseCase.PRODUCT_DESCRIPTION: _config(AIUseCase.PRODUCT_DESCRIPTION)})
+        in_flight = 0
+        peak = 0
+
+        async def fake_generate(config, **context):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _result()
+
+        service.ai_service.generate_with_config = fake_generate
+
+        summary = await service.run()
+
+        assert peak == 2
+        assert summary.updated == 6
+        assert summary.tokens_used == 180
+        # 6 resultados em lotes de 2 -> 3 commits
+        assert service.db.commit.await_count == 3
+        service._save_checkpoint.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failures_and_missing_config(self, monkeypatch, enrichment_settings):
+        """Falha em um item nao interrompe os demais; sem config e pulado."""
+        ok_id, fail_id = uuid.uuid4(), uuid.uuid4()
+        items = [
+            EnrichmentItem(PRODUCT_TARGET, ok_id, {"title": "ok"}),
+            EnrichmentItem(PRODUCT_TARGET, fail_id, {"title": "falha"}),
+            EnrichmentItem(POST_TITLE_TARGET, uuid.uuid4(), {}),
+        ]
+        service = _service(items, {})
+        _patch_configs(monkeypatch, {AIUseCase.PRODUCT_DESCRIPTION: _config(AIUseCase.PRODUCT_DESCRIPTION)})
+
+        async def fake_generate(config, **context):
+            if context["title"] == "falha":
+                raise RuntimeError("provider fora")
+            return _result()
+
+        service.ai_service.generate_with_config = fake_generate
+        add_many = AsyncMock()
+        monkeypatch.setattr(ai_enrichment.AILogRepository, "add_many", add_many)
+
+        summary = await service.run()
+
+        assert (summary.updated, summary.failed, summary.skipped_no_config) == (1, 1, 1)
+        logs = [
+            row for call in add_many.await_args_list for row in call.args[0]
+        ]
+        assert sorted(log["success"] for log in logs) == [False, True]
+
+
+class TestFlush:
+    """Testes para a escrita em lote."""
+
+    @pytest.mark.asyncio
+    async def test_single_executemany_per_target(self, monkeypatch):
+        """Um UPDATE por alvo com todas as linhas, valor truncado na coluna."""
+        service = _service([], {})
+        add_many = AsyncMock()
+        monkeypatch.setattr(ai_enrichment.AILogRepository, "add_many", add_many)
+        config = _config(AIUseCase.POST_SEO_TITLE)
+        outcomes = [
+            ai_enrichment.EnrichmentOutcome(
+                EnrichmentItem(POST_TITLE_TARGET, uuid.uuid4(), {}),
+                result=_result("x" * 100),
+            )
+            for _ in range(3)
+        ]
+        summary = ai_enrichment.EnrichmentSummary()
+
+        await service._flush(outcomes, {AIUseCase.POST_SEO_TITLE: config}, summary)
+
+        service.db.execute.assert_awaited_once()
+        rows = service.db.execute.await_args.args[1]
+        assert len(rows) == 3
+        assert all(len(row["b_value"]) == 60 for row in rows)
+        assert summary.updated == 3
+        assert len(add_many.await_args.args[0]) == 3
+        service.db.commit.assert_awaited_once()
+
+
+class TestEnrichmentJob:
+    """Testes para o registro do job."""
+
+    def test_registered_disabled_by_default(self):
+        """Job com custo de IA nasce desabilitado."""
+        definition = JOB_REGISTRY["ai_catalog_enrichment"]
+        assert definition.default_enabled is False
+        assert JOB_REGISTRY["publish_scheduled_posts"].default_enabled is True
@@ -0,0 +1,103 @@
+"""
+Testes unitarios para a fila de logs de IA (AILogSink).
+
+Verifica:
+- submit nao faz I/O (apenas enfileira)
+- Gravacao em lote por tamanho e por tempo
+- close grava os logs pendentes
+- Fila cheia descarta sem erro
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import ai_log_sink
+from app.services.ai_log_sink import AILogSink
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Substitui AILogRepository.add_many e registra os lotes gravados."""
+    batches: list[list[dict]] = []
+
+    async def fake_add_many(self, records):
+        batches.append(list(records))
+        return len(records)
+
+    monkeypatch.setattr(ai_log_sink.AILogRepository, "add_many", fake_add_many)
+    return batches
+
+
+@asynccontextmanager
+async def _fake_session():
+    session = MagicMock()
+    session.commit = AsyncMock()
+    yield session
+
+
+def _log(i: int) -> dict:
+    return {"use_case": "post_tags", "provider": "openai", "model": "m", "user_prompt": str(i)}
+
+
+class TestAILogSink:
+    """Testes para AILogSink."""
+
+    @pytest.mark.asyncio
+    async def test_submit_is_deferred(self, writes):
+        """submit so enfileira; a gravacao acontece depois."""
+        sink = AILogSink(_fake_session, batch_size=10, flush_seconds=0.05)
+        sink.submit(**_log(1))
+
+        assert writes == []
+        assert sink.pending() == 1
+
+        await asyncio.sleep(0.1)
+        assert [len(b) for b in writes] == [1]
+        await sink.close()
+
+    @pytest.mark.asyncio
+    async def test_flushes_by_batch_size(self, writes):
+        """Lote cheio grava sem esperar o intervalo."""
+        sink = AILogSink(_fake_session, batch_size=3, flush_seconds=10)
+        for i in range(7):
+            sink.submit(**_log(i))
+
+        await asyncio.sleep(0.05)
+        assert [len(b) for b in writes] == [3, 3]
+
+        await sink.close()
+        assert [len(b) for b in writes] == [3, 3, 1]
+        assert [r["user_prompt"] for b in writes for r in b] == [str(i) for i in range(7)]
+
+    @pytest.mark.asyncio
+    async def test_queue_full_drops(self, writes):
+        """Acima do limite da fila os logs sao descartados sem excecao."""
+        sink = AILogSink(_fake_session, batch_size=10, flush_seconds=10, max_queue=2)
+        for i in range(5):
+            sink.submit(**_log(i))
+
+        assert sink.pending() == 2
+        await sink.close()
+        assert sum(len(b) for b in writes) == 2
+
+    @pytest.mark.asyncio
+    async def test_write_error_does_not_stop_sink(self, monkeypatch):
+        """Falha ao gravar um lote nao derruba a task."""
+        calls = []
+
+        async def flaky_add_many(self, records):
+            calls.append(len(records))
+            if len(calls) == 1:
+                raise RuntimeError("banco fora")
+            return len(records)
+
+        monkeypatch.setattr(ai_log_sink.AILogRepository, "add_many", flaky_add_many)
+        sink = AILogSink(_fake_session, batch_size=1, flush_seconds=10)
+        sink.submit(**_log(1))
+        sink.submit(**_log(2))
+
+        await sink.close()
+        assert calls == [1, 1]
@@ -3,7 +3,8 @@ Testes unitarios para repositorios relacionados a IA.
 
 Testa:
 - AIConfigRepository: CRUD e buscas de configuracoes
-- AILogRepository: Criacao e consulta de logs
+- AILogRepository: Criacao e consulta de logs (prompts deduplicados)
+- AIUsageRepository: Rollup diario de uso/custo
 - OccasionRepository: CRUD e buscas de ocasioes
 """
 
@@ -13,12 +14,14 @@ from uuid import uuid4
 
 import pytest
 import pytest_asyncio
+from sqlalchemy import select
 
 from app.models.ai_config import AIConfig, AIEntity, AIProvider, AIUseCase
-from app.models.ai_log import AILog
+from app.models.ai_log import AILog, AIPrompt, AIUsageDaily
 from app.models.occasion import Occasion
 from app.repositories.ai_config import AIConfigRepository
-from app.repositories.ai_log import AILogRepository
+from app.repositories.ai_log import AILogRepository, hash_prompt
+from app.repositories.ai_usage import AIUsageRepository
 from app.repositories.occasion import OccasionRepository
 
 
@@ -298,6 +301,44 @@ class TestAILogRepository:
         assert log.success is False
         assert log.error_message == "Rate limit exceeded"
 
+    @pytest.mark.asyncio
+    async def test_create_deduplicates_system_prompt(self, repo):
+        """System prompt vai para ai_prompts e o log guarda so o hash."""
+        log = await repo.create(
+            use_case="post_tags",
+            provider="openai",
+            model="gpt-4o-mini",
+            user_prompt="Gere tags",
+            system_prompt="Instrucoes...",
+        )
+
+        assert log.system_prompt is None
+        assert log.system_prompt_hash == hash_prompt("Instrucoes...")
+        assert log.system_prompt_text == "Instrucoes..."
+
+    @pytest.mark.asyncio
+    async def test_add_many_stores_each_prompt_once(self, repo, db_session):
+        """Lote com o mesmo system prompt grava um unico AIPrompt."""
+        records = [
+            {
+                "use_case": "post_tags",
+                "provider": "openai",
+                "model": "gpt-4o-mini",
+                "user_prompt": f"Gere tags {i}",
+                "system_prompt": "Instrucoes...",
+                "success": True,
+            }
+            for i in range(3)
+        ]
+
+        assert await repo.add_many(records) == 3
+        assert await repo.add_many(records[:1]) == 1
+        await db_session.commit()
+
+        prompts = (await db_session.execute(select(AIPrompt))).scalars().all()
+        assert [p.content for p in prompts] == ["Instrucoes..."]
+        assert await repo.count() == 4
+
     # -------------------------------------------------------------------------
     # Testes de Listagem
     # -------------------------------------------------------------------------
@@ -540,6 +581,85 @@ class TestAILogRepository:
         assert total == Decimal("0")
 
 
+# =============================================================================
+# Testes do AIUsageRepository (rollup diario)
+# =============================================================================
+
+
+class TestAIUsageRepository:
+    """Testes para o rollup incremental de uso de IA."""
+
+    @staticmethod
+    def _record(use_case="post_tags", model="gpt-4o-mini", **fields):
+        return {
+            "use_case": use_case,
+            "provider": "openai",
+            "model": model,
+            "user_prompt": "prompt",
+            **fields,
+        }
+
+    @pytest.mark.asyncio
+    async def test_add_many_updates_rollup(self, db_session):
+        """Logs inseridos somam no rollup do dia, agrupados por caso x modelo."""
+        repo = AILogRepository(db_session)
+        await repo.add_many([
+            self._record(success=True, total_tokens=100, cost_usd=Decimal("0.001"), latency_ms=200),
+            self._record(success=True, cached=True, total_tokens=0, latency_ms=10),
+            self._record(success=False, cost_usd=Decimal("0.5"), latency_ms=90),
+            self._record(use_case="seo_title", success=True, total_tokens=50),
+        ])
+        await db_session.commit()
+
+        rows = (await db_session.execute(select(AIUsageDaily))).scalars().all()
+        assert len(rows) == 2
+
+        totals = await AIUsageRepository(db_session).get_totals(use_case="post_tags")
+        assert totals["calls"] == 3
+        assert totals["success_count"] == 2
+        assert totals["error_count"] == 1
+        assert totals["cached_count"] == 1
+        assert totals["total_tokens"] == 100
+        # Custo soma apenas chamadas com sucesso
+        assert totals["cost_usd"] == Decimal("0.001")
+        assert totals["avg_latency_ms"] == 100
+
+    @pytest.mark.asyncio
+    async def test_incremental_upsert(self, db_session):
+        """Lotes seguidos somam na mesma linha do dia."""
+        repo = AILogRepository(db_session)
+        await repo.add_many([self._record(success=True, total_tokens=10)])
+        await repo.create(use_case="post_tags", provider="openai", model="gpt-4o-mini",
+                          user_prompt="x", total_tokens=5, success=True)
+
+        totals = await AIUsageRepository(db_session).get_totals()
+        assert (totals["calls"], totals["total_tokens"]) == (2, 15)
+
+    @pytest.mark.asyncio
+    async def test_empty_totals_and_breakdown(self, db_session):
+        """Sem dados retorna zeros e breakdown vazio."""
+        usage = AIUsageRepository(db_session)
+        totals = await usage.get_totals()
+
+        assert totals["calls"] == 0
+        assert totals["cost_usd"] == Decimal("0")
+        assert await usage.get_breakdown() == []
+
+    @pytest.mark.asyncio
+    async def test_breakdown_orders_by_cost(self, db_session):
+        """Breakdown por caso x modelo, do mais caro para o mais barato."""
+        await AILogRepository(db_session).add_many([
+            self._record(use_case="post_tags", success=True, cost_usd=Decimal("0.01")),
+            self._record(use_case="post_content", success=True, cost_usd=Decimal("0.20")),
+            self._record(use_case="post_content", success=True, cost_usd=Decimal("0.10")),
+        ])
+
+        breakdown = await AIUsageRepository(db_session).get_breakdown(days=30)
+
+        assert [row["use_case"] for row in breakdown] == ["post_content", "post_tags"]
+        assert breakdown[0]["calls"] == 2
+
+
 # =============================================================================
 # Testes do OccasionRepository
 # =============================================================================
@@ -5,8 +5,11 @@ Testa:
 - AISEOService: Geracao de titulos, descricoes e keywords
 - calculate_cost: Calculo de custo baseado em tokens
 - Substituicao de placeholders em prompts
+- Geracao em lote (generate_batch) concorrente
+- Geracao em streaming (generate_stream)
 """
 
+import asyncio
 from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -14,7 +17,15 @@ import pytest
 import pytest_asyncio
 
 from app.models.ai_config import AIConfig, AIEntity, AIProvider, AIUseCase
+from app.services import ai_seo
 from app.services.ai_seo import AISEOService, calculate_cost
+from app.services.llm import LLMError, LLMResponse
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_clients(monkeypatch):
+    """Cada teste comeca sem clientes LLM memorizados."""
+    monkeypatch.setattr(ai_seo, "_llm_clients", {})
 
 
 # =============================================================================
@@ -129,7 +140,7 @@ class TestAISEOService:
     async def test_generate_success(self, service, sample_config):
         """Deve gerar conteudo com sucesso."""
         # Mock do repositorio
-        with patch.object(service.repo, "get_active_by_use_case", return_value=sample_config):
+        with patch.object(service.configs, "get", return_value=sample_config):
             # Mock do LLMService
             mock_response = MagicMock()
             mock_response.content = "Top 10 Presentes Geek para 2024"
@@ -157,10 +168,35 @@ class TestAISEOService:
         assert result["prompt_tokens"] == 50
         assert result["completion_tokens"] == 15
 
+    @pytest.mark.asyncio
+    async def test_generate_passes_cache_ttl_and_reports_cached(self, service, sample_config):
+        """Usa o TTL da configuracao e resposta do cache sai com custo 0."""
+        sample_config.cache_ttl_minutes = 120
+        with patch.object(service.configs, "get", return_value=sample_config):
+            mock_response = MagicMock()
+            mock_response.content = "Titulo do cache"
+            mock_response.model = "gpt-4o-mini"
+            mock_response.usage = None
+            mock_response.finish_reason = "stop"
+            mock_response.cached = True
+
+            with patch("app.services.ai_seo.LLMService") as MockLLM:
+                mock_llm = AsyncMock()
+                mock_llm.generate.return_value = mock_response
+                MockLLM.return_value = mock_llm
+
+                result = await service.generate(AIUseCase.SEO_TITLE, title="Presentes")
+
+        assert MockLLM.call_args.kwargs["cache_ttl_minutes"] == 120
+        assert mock_llm.generate.call_args.kwargs["use_cache"] is True
+        assert result["cached"] is True
+        assert result["cost_usd"] == 0
+        assert result["tokens_used"] == 0
+
     @pytest.mark.asyncio
     async def test_generate_no_config(self, service):
         """Deve lancar erro quando configuracao nao existe."""
-        with patch.object(service.repo, "get_active_by_use_case", return_value=None):
+        with patch.object(service.configs, "get", return_value=None):
             with pytest.raises(ValueError) as exc_info:
                 await service.generate(AIUseCase.TRANSLATION, title="Test")
 
@@ -169,7 +205,7 @@ class TestAISEOService:
     @pytest.mark.asyncio
     async def test_generate_with_cost_calculation(self, service, sample_config):
         """Deve calcular custo na resposta."""
-        with patch.object(service.repo, "get_active_by_use_case", return_value=sample_config):
+        with patch.object(service.configs, "get", return_value=sample_config):
             mock_response = MagicMock()
             mock_response.content = "Titulo gerado"
             mock_response.model = "gpt-4o-mini"
@@ -439,6 +475,156 @@ class TestAISEOService:
         assert len(prompt) < 10000
 
 
+# =============================================================================
+# Testes da geracao em lote
+# =============================================================================
+
+
+def _config(use_case: AIUseCase, provider: AIProvider = AIProvider.OPENROUTER) -> AIConfig:
+    return AIConfig(
+        use_case=use_case,
+        name=use_case.value,
+        provider=provider,
+        model="gpt-4o-mini",
+        system_prompt=f"Sistema {use_case.value}",
+        user_prompt="Gere para: {{title}}",
+        temperature=0.5,
+        max_tokens=100,
+        is_active=True,
+    )
+
+
+class TestGenerateBatch:
+    """Testes para AISEOService.generate_batch."""
+
+    USE_CASES = [AIUseCase.POST_SEO_TITLE, AIUseCase.POST_SEO_DESCRIPTION, AIUseCase.POST_TAGS]
+
+    @pytest.fixture
+    def service(self):
+        return AISEOService(AsyncMock())
+
+    @pytest.fixture
+    def fake_llm(self, monkeypatch):
+        """LLMService falso que registra concorrencia das chamadas."""
+        state = {"active": 0, "max_active": 0, "calls": 0}
+
+        class FakeLLM:
+            def __init__(self, **kwargs):
+                pass
+
+            async def generate(self, prompt, system=None, use_cache=True):
+                state["calls"] += 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+                if "falha" in system:
+                    raise LLMError("provider fora do ar")
+                return LLMResponse(
+                    content=f"  resposta {system}  ",
+                    model="gpt-4o-mini",
+                    usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                )
+
+        monkeypatch.setattr(ai_seo, "LLMService", FakeLLM)
+        monkeypatch.setattr(ai_seo, "_provider_semaphores", {})
+        return state
+
+    @pytest.mark.asyncio
+    async def test_loads_configs_once_and_runs_concurrently(self, service, fake_llm):
+        """Uma query para todas as configs e chamadas em paralelo."""
+        configs = {uc: _config(uc) for uc in self.USE_CASES}
+        with patch.object(service.configs, "get_many", return_value=configs) as mock_repo:
+            results = await service.generate_batch(self.USE_CASES, title="Caneca Zelda")
+
+        mock_repo.assert_called_once_with(service.db, self.USE_CASES)
+        assert list(results) == self.USE_CASES
+        assert results[AIUseCase.POST_TAGS]["generated_content"] == "resposta Sistema post_tags"
+        assert results[AIUseCase.POST_TAGS]["_user_prompt"] == "Gere para: Caneca Zelda"
+        assert fake_llm["max_active"] == 3
+
+    @pytest.mark.asyncio
+    async def test_respects_provider_limit(self, service, fake_llm, monkeypatch):
+        """Chamadas ao mesmo provider respeitam o limite de concorrencia."""
+        monkeypatch.setattr(ai_seo, "MAX_CONCURRENT_CALLS_PER_PROVIDER", 2)
+        configs = {uc: _config(uc) for uc in self.USE_CASES}
+        with patch.object(service.configs, "get_many", return_value=configs):
+            await service.generate_batch(self.USE_CASES, title="X")
+
+        assert fake_llm["calls"] == 3
+        assert fake_llm["max_active"] == 2
+
+    @pytest.mark.asyncio
+    async def test_partial_failures(self, service, fake_llm):
+        """Config ausente e erro do LLM nao impedem os demais campos."""
+        failing = _config(AIUseCase.POST_SEO_DESCRIPTION)
+        failing.system_prompt = "falha sempre"
+        configs = {
+            AIUseCase.POST_SEO_TITLE: _config(AIUseCase.POST_SEO_TITLE),
+            AIUseCase.POST_SEO_DESCRIPTION: failing,
+        }
+        with patch.object(service.configs, "get_many", return_value=configs):
+            results = await service.generate_batch(self.USE_CASES, title="X")
+
+        assert results[AIUseCase.POST_SEO_TITLE]["tokens_used"] == 15
+        assert isinstance(results[AIUseCase.POST_SEO_DESCRIPTION], LLMError)
+        assert isinstance(results[AIUseCase.POST_TAGS], ValueError)
+
+
+class TestGenerateStream:
+    """Testes para AISEOService.generate_stream."""
+
+    @pytest.fixture
+    def fake_llm(self, monkeypatch):
+        """LLMService falso que gera em streaming."""
+
+        class FakeLLM:
+            def __init__(self, model=None, **kwargs):
+                self.model = model
+                self.last_stream_usage = None
+                self.last_stream_finish_reason = None
+                self.last_stream_model = None
+
+            async def generate_stream(self, prompt, system=None):
+                for part in ["Caneca ", "geek ", "incrivel "]:
+                    yield part
+                self.last_stream_usage = {
+                    "prompt_tokens": 1000, "completion_tokens": 500, "total_tokens": 1500,
+                }
+                self.last_stream_finish_reason = "stop"
+
+        monkeypatch.setattr(ai_seo, "LLMService", FakeLLM)
+        monkeypatch.setattr(ai_seo, "_provider_semaphores", {})
+
+    @pytest.mark.asyncio
+    async def test_yields_deltas_then_result(self, fake_llm):
+        """Emite cada trecho e, ao final, o resultado com tokens e custo."""
+        service = AISEOService(AsyncMock())
+        config = _config(AIUseCase.PRODUCT_DESCRIPTION, provider=AIProvider.OPENAI)
+        with patch.object(service.configs, "get", return_value=config):
+            events = [
+                event async for event in service.generate_stream(
+                    AIUseCase.PRODUCT_DESCRIPTION, title="Caneca"
+                )
+            ]
+
+        assert [e["content"] for e in events[:-1]] == ["Caneca ", "geek ", "incrivel "]
+        result = events[-1]["result"]
+        assert events[-1]["type"] == "done"
+        assert result["generated_content"] == "Caneca geek incrivel"
+        assert result["tokens_used"] == 1500
+        assert result["cost_usd"] == 0.00045  # gpt-4o-mini
+        assert result["_user_prompt"] == "Gere para: Caneca"
+
+    @pytest.mark.asyncio
+    async def test_missing_config_raises_before_streaming(self, fake_llm):
+        """Sem config ativa levanta ValueError no primeiro evento."""
+        service = AISEOService(AsyncMock())
+        with patch.object(service.configs, "get", return_value=None):
+            with pytest.raises(ValueError):
+                await anext(service.generate_stream(AIUseCase.PRODUCT_DESCRIPTION))
+
+
 # =============================================================================
 # Testes de Schemas de AI Config
 # =============================================================================
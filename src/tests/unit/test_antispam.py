@@ -0,0 +1,183 @@
+"""
+Testes unitarios para o rate limiting do anti-spam.
+
+Verifica:
+- Contador em memoria por janela, com expiracao sem varrer as entradas
+- Backend Redis usa o script atomico e cai para a memoria sem Redis
+- Limites por IP e por email retornam 429
+- Indice de dominios descartaveis: subdominios, arquivo e recarga
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import antispam
+from app.services.disposable_domains import (
+    DEFAULT_DOMAINS_PATH,
+    DisposableDomains,
+    DomainIndex,
+    load_domain_index,
+)
+from app.services.antispam import (
+    MemoryRateLimitBackend,
+    RedisRateLimitBackend,
+    check_rate_limit_email,
+    check_rate_limit_ip,
+    set_rate_limit_backend,
+)
+
+
+class FakeClock:
+    """Relogio controlado pelo teste."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def memory_backend():
+    backend = MemoryRateLimitBackend()
+    set_rate_limit_backend(backend)
+    yield backend
+    set_rate_limit_backend(None)
+
+
+def _request(ip: str) -> MagicMock:
+    request = MagicMock()
+    request.client.host = "10.0.0.2"  # proxy reverso (rede privada)
+    request.headers = {"x-forwarded-for": ip}
+    return request
+
+
+class TestMemoryRateLimitBackend:
+    """Testes para o backend em memoria."""
+
+    @pytest.mark.asyncio
+    async def test_counts_within_window_and_resets(self):
+        """Conta na janela; depois dela a chave recomeca do zero."""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+
+        assert [await backend.hit("a", 60) for _ in range(3)] == [1, 2, 3]
+        clock.now += 61
+        assert await backend.hit("a", 60) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_keys_removed(self):
+        """Chaves vencidas saem na proxima chamada, em janelas diferentes."""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        for i in range(100):
+            await backend.hit(f"ip:{i}", 60)
+        await backend.hit("email:x", 3600)
+
+        clock.now += 61
+        await backend.hit("ip:new", 60)
+
+        assert set(backend._counters) == {"email:x", "ip:new"}
+        assert len(backend._expirations[60]) == 1
+
+
+class TestRedisRateLimitBackend:
+    """Testes para o backend Redis."""
+
+    @pytest.mark.asyncio
+    async def test_uses_script(self, monkeypatch):
+        """O contador vem do script Lua, com a chave prefixada."""
+        script = AsyncMock(return_value=4)
+        client = MagicMock()
+        client.register_script = MagicMock(return_value=script)
+        monkeypatch.setattr(antispam, "get_redis", AsyncMock(return_value=client))
+        backend = RedisRateLimitBackend()
+
+        assert await backend.hit("ip:abc", 3600) == 4
+        assert await backend.hit("ip:abc", 3600) == 4
+
+        client.register_script.assert_called_once()
+        script.assert_awaited_with(keys=["antispam:ip:abc"], args=[3600])
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_memory(self, monkeypatch):
+        """Sem Redis conta na memoria e nao tenta reconectar a cada chamada."""
+        get_redis = AsyncMock(side_effect=ConnectionError("down"))
+        monkeypatch.setattr(antispam, "get_redis", get_redis)
+        backend = RedisRateLimitBackend()
+
+        assert [await backend.hit("ip:abc", 60) for _ in range(3)] == [1, 2, 3]
+        assert get_redis.await_count == 1
+
+
+class TestRateLimitChecks:
+    """Testes para check_rate_limit_ip e check_rate_limit_email."""
+
+    @pytest.mark.asyncio
+    async def test_ip_limit(self, memory_backend):
+        """Acima do limite por IP retorna 429; outro IP nao e afetado."""
+        for _ in range(antispam.RATE_LIMIT_IP_MAX_REQUESTS):
+            await check_rate_limit_ip(_request("203.0.113.1"))
+
+        with pytest.raises(HTTPException) as exc:
+            await check_rate_limit_ip(_request("203.0.113.1"))
+        assert exc.value.status_code == 429
+        await check_rate_limit_ip(_request("203.0.113.2"))
+
+    @pytest.mark.asyncio
+    async def test_email_limit_case_insensitive(self, memory_backend):
+        """O limite por email ignora maiusculas e nao guarda o email em claro."""
+        for _ in range(antispam.RATE_LIMIT_EMAIL_MAX_REQUESTS):
+            await check_rate_limit_email("User@Example.com")
+
+        with pytest.raises(HTTPException) as exc:
+            await check_rate_limit_email("user@example.com")
+        assert exc.value.status_code == 429
+        assert not any("example.com" in key for key in memory_backend._counters)
+
+
+class TestDisposableDomains:
+    """Testes para o indice de dominios descartaveis."""
+
+    def test_suffix_matching(self):
+        """Dominio listado e seus subdominios; parecidos nao."""
+        index = DomainIndex({"mailinator.com", "temp-mail.org"})
+
+        assert "mailinator.com" in index
+        assert "a.b.mailinator.com" in index
+        assert "notmailinator.com" not in index
+        assert "mailinator.com.br" not in index
+        assert "gmail.com" not in index
+
+    def test_load_file(self, tmp_path):
+        """Ignora comentarios, linhas vazias e caixa."""
+        path = tmp_path / "domains.txt"
+        path.write_text("# lista\n\nYopmail.com\nmaildrop.cc  # comentario\n")
+
+        assert load_domain_index(path).domains == {"yopmail.com", "maildrop.cc"}
+        assert "mailinator.com" in load_domain_index(DEFAULT_DOMAINS_PATH)
+
+    def test_reload_when_file_changes(self, tmp_path):
+        """Arquivo alterado e recarregado; arquivo removido mantem o indice."""
+        path = tmp_path / "domains.txt"
+        path.write_text("old.com\n")
+        domains = DisposableDomains(path, check_seconds=0)
+        assert "old.com" in domains.get()
+
+        path.write_text("new.com\n")
+        os.utime(path, (1, 1))
+        assert "new.com" in domains.get()
+
+        path.unlink()
+        assert "new.com" in domains.get()
+
+    def test_check_disposable_email(self):
+        """Subdominio de servico descartavel e recusado com 400."""
+        with pytest.raises(HTTPException) as exc:
+            antispam.check_disposable_email("bot@x.mailinator.com")
+        assert exc.value.status_code == 400
+        antispam.check_disposable_email("pessoa@gmail.com")
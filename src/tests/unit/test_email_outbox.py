@@ -0,0 +1,141 @@
+"""
+Testes unitarios para a fila de emails transacionais (email_outbox).
+
+Verifica:
+- Reenvio substitui o email pendente em vez de duplicar
+- Worker envia os emails vencidos e marca como enviados
+- Falhas sao reagendadas com espera ate esgotar as tentativas
+- Emails com lease valido nao sao pegos por outro worker
+- notify acorda o worker para enviar na hora
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.base import utc_now
+from app.models.email_outbox import EmailOutbox, OutboxKind, OutboxStatus
+from app.repositories.email_outbox import EmailOutboxRepository
+from app.services.email_outbox import EmailOutboxWorker
+
+KIND = OutboxKind.NEWSLETTER_VERIFICATION.value
+
+
+@pytest.fixture
+def session_factory(async_engine):
+    """Sessoes proprias do worker, no mesmo banco do teste."""
+    return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class FakeEmail:
+    """EmailService falso: registra os emails de verificacao."""
+
+    def __init__(self, fail: set[str] | None = None):
+        self.sent: list[tuple[str, str]] = []
+        self.fail = fail or set()
+
+    async def send_verification_email(self, to_email, verification_url):
+        if to_email in self.fail:
+            return False
+        self.sent.append((to_email, verification_url))
+        return True
+
+
+async def _enqueue(db_session, email: str, url: str = "https://x/verify/1") -> None:
+    await EmailOutboxRepository(db_session).enqueue(KIND, email, {"verification_url": url})
+    await db_session.commit()
+
+
+async def _messages(db_session) -> dict[str, EmailOutbox]:
+    db_session.expire_all()
+    result = await db_session.execute(select(EmailOutbox))
+    return {message.to_email: message for message in result.scalars().all()}
+
+
+def _worker(session_factory, email, **overrides) -> EmailOutboxWorker:
+    options = {"batch_size": 10, "poll_seconds": 60, "max_attempts": 2, "retry_seconds": 0, **overrides}
+    return EmailOutboxWorker(session_factory, email=email, **options)
+
+
+class TestEnqueue:
+    """Testes para EmailOutboxRepository.enqueue."""
+
+    @pytest.mark.asyncio
+    async def test_resend_replaces_pending(self, db_session):
+        """Novo token substitui o email ainda pendente."""
+        await _enqueue(db_session, "a@example.com", "https://x/verify/old")
+        await _enqueue(db_session, "a@example.com", "https://x/verify/new")
+
+        messages = await _messages(db_session)
+        assert len(messages) == 1
+        assert messages["a@example.com"].payload == {"verification_url": "https://x/verify/new"}
+        assert await EmailOutboxRepository(db_session).count_pending() == 1
+
+
+class TestEmailOutboxWorker:
+    """Testes para EmailOutboxWorker."""
+
+    @pytest.mark.asyncio
+    async def test_sends_due_messages(self, db_session, session_factory):
+        """Emails vencidos sao enviados e marcados como enviados."""
+        await _enqueue(db_session, "a@example.com")
+        await _enqueue(db_session, "b@example.com")
+        email = FakeEmail()
+
+        assert await _worker(session_factory, email).process_due() == 2
+
+        assert sorted(to for to, _url in email.sent) == ["a@example.com", "b@example.com"]
+        messages = await _messages(db_session)
+        assert {m.status for m in messages.values()} == {OutboxStatus.SENT.value}
+        assert all(m.sent_at is not None and m.locked_until is None for m in messages.values())
+
+    @pytest.mark.asyncio
+    async def test_failures_retried_then_failed(self, db_session, session_factory):
+        """Falha volta para a fila com espera; na ultima tentativa vira failed."""
+        await _enqueue(db_session, "bad@example.com")
+        worker = _worker(session_factory, FakeEmail(fail={"bad@example.com"}), retry_seconds=3600)
+
+        await worker.process_due()
+        message = (await _messages(db_session))["bad@example.com"]
+        assert (message.status, message.attempts) == (OutboxStatus.PENDING.value, 1)
+        assert await worker.process_due() == 0  # ainda esperando o retry
+
+        message.next_attempt_at = utc_now() - timedelta(seconds=1)
+        await db_session.commit()
+        await worker.process_due()
+
+        message = (await _messages(db_session))["bad@example.com"]
+        assert (message.status, message.attempts) == (OutboxStatus.FAILED.value, 2)
+        assert message.last_error
+
+    @pytest.mark.asyncio
+    async def test_leased_messages_skipped(self, db_session, session_factory):
+        """Email pego por outro worker (lease valido) nao e enviado de novo."""
+        await _enqueue(db_session, "a@example.com")
+        claimed = await EmailOutboxRepository(db_session).claim_due(10, lease_seconds=60)
+        assert len(claimed) == 1
+
+        email = FakeEmail()
+        assert await _worker(session_factory, email).process_due() == 0
+        assert email.sent == []
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_worker(self, db_session, session_factory):
+        """Com o worker rodando, notify envia sem esperar o intervalo de varredura."""
+        email = FakeEmail()
+        worker = _worker(session_factory, email)
+        worker.start()
+        await asyncio.sleep(0.05)
+
+        await _enqueue(db_session, "a@example.com")
+        worker.notify()
+        for _ in range(50):
+            if email.sent:
+                break
+            await asyncio.sleep(0.02)
+        await worker.close()
+
+        assert [to for to, _url in email.sent] == ["a@example.com"]
@@ -0,0 +1,178 @@
+"""
+Testes unitarios para o EmailService e seus transportes.
+
+Verifica:
+- Cliente SES aberto uma vez e reaproveitado entre envios
+- Limite de envios simultaneos
+- Transporte mbox grava os emails em arquivo
+- Sem credenciais nao envia
+- Envio em lote com template (HTML montado uma vez)
+"""
+
+import asyncio
+import mailbox
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import email as email_module
+from app.services.email import EmailService, MboxTransport, SESTransport
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    monkeypatch.setattr(email_module.settings, "aws_access_key_id", "key")
+    monkeypatch.setattr(email_module.settings, "aws_secret_access_key", "secret")
+
+
+def _fake_session(client):
+    """Sessao aioboto3 falsa que conta quantos clientes foram abertos."""
+    session = MagicMock()
+    session.opened = 0
+
+    @asynccontextmanager
+    async def fake_client(service_name, config=None):
+        session.opened += 1
+        session.config = config
+        yield client
+
+    session.client = fake_client
+    return session
+
+
+class TestSESTransport:
+    """Testes para o cliente SES compartilhado."""
+
+    @pytest.mark.asyncio
+    async def test_client_reused_across_sends(self, aws_credentials):
+        """Varios envios usam o mesmo cliente, com pool configurado."""
+        client = MagicMock()
+        client.send_email = AsyncMock(return_value={"MessageId": "abc"})
+        session = _fake_session(client)
+        service = EmailService(transport=SESTransport(session, max_connections=7))
+
+        results = await asyncio.gather(*(
+            service.send_email(f"user{i}@example.com", "Assunto", "<p>Oi</p>") for i in range(5)
+        ))
+
+        assert results == [True] * 5
+        assert session.opened == 1
+        assert session.config.max_pool_connections == 7
+        assert client.send_email.await_count == 5
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, aws_credentials, monkeypatch):
+        """Nao passa de email_max_concurrency envios simultaneos."""
+        monkeypatch.setattr(email_module.settings, "email_max_concurrency", 2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send_email(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"MessageId": "abc"}
+
+        client = MagicMock()
+        client.send_email = send_email
+        service = EmailService(transport=SESTransport(_fake_session(client), max_connections=10))
+
+        await asyncio.gather(*(
+            service.send_email(f"user{i}@example.com", "Assunto", "<p>Oi</p>") for i in range(6)
+        ))
+
+        assert max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_without_credentials(self, monkeypatch):
+        """Sem credenciais AWS retorna False sem abrir cliente."""
+        monkeypatch.setattr(email_module.settings, "aws_access_key_id", None)
+        session = _fake_session(MagicMock())
+        service = EmailService(transport=SESTransport(session, max_connections=10))
+
+        assert await service.send_email("user@example.com", "Assunto", "<p>Oi</p>") is False
+        assert session.opened == 0
+
+
+class TestMboxTransport:
+    """Testes para o transporte mbox (envio offline)."""
+
+    @pytest.mark.asyncio
+    async def test_writes_messages(self, tmp_path):
+        """Cada envio vira uma mensagem multipart no arquivo mbox."""
+        path = tmp_path / "mail" / "outbox.mbox"
+        service = EmailService(transport=MboxTransport(path))
+
+        await service.send_email("a@example.com", "Primeiro", "<p>Oi</p>", "Oi")
+        await service.send_newsletter_email(
+            to_email="b@example.com",
+            subject="Segundo",
+            heading="Novidades",
+            content_html="<p>From the start</p>",
+        )
+        await service.close()
+
+        messages = list(mailbox.mbox(path))
+        assert [m["To"] for m in messages] == ["a@example.com", "b@example.com"]
+        assert messages[1]["Subject"] == "Segundo"
+        assert messages[1].get_content_type() == "multipart/alternative"
+
+
+class TestBulkTemplatedSend:
+    """Testes para o envio em lote com template (SendBulkTemplatedEmail)."""
+
+    @pytest.mark.asyncio
+    async def test_template_created_once_and_chunked(self, aws_credentials):
+        """HTML vai uma vez no template; envios em blocos de 50 destinos."""
+        client = MagicMock()
+        client.create_template = AsyncMock()
+        client.send_bulk_templated_email = AsyncMock(
+            side_effect=lambda **kw: {
+                "Status": [
+                    {"Status": "Success", "MessageId": "id"}
+                    if d["Destination"]["ToAddresses"][0] != "user3@example.com"
+                    else {"Status": "MessageRejected", "Error": "Address blacklisted"}
+                    for d in kw["Destinations"]
+                ]
+            }
+        )
+        service = EmailService(transport=SESTransport(_fake_session(client), max_connections=10))
+
+        await service.create_newsletter_template(
+            "newsletter-campaign-1", subject="Oi", heading="Novidades",
+            content_html="<p>Use {{cupom}}</p>",
+        )
+        emails = [f"user{i}@example.com" for i in range(120)]
+        results = await service.send_newsletter_bulk("newsletter-campaign-1", emails)
+
+        template = client.create_template.await_args.kwargs["Template"]
+        assert email_module.UNSUBSCRIBE_PLACEHOLDER in template["HtmlPart"]
+        assert "\\{{cupom}}" in template["HtmlPart"]  # conteudo escapado
+        calls = client.send_bulk_templated_email.await_args_list
+        assert [len(c.kwargs["Destinations"]) for c in calls] == [50, 50, 20]
+        assert '"unsubscribe_url"' in calls[0].kwargs["Destinations"][0]["ReplacementTemplateData"]
+        assert results["user3@example.com"] == "MessageRejected: Address blacklisted"
+        assert sum(error is None for error in results.values()) == 119
+
+    @pytest.mark.asyncio
+    async def test_mbox_renders_per_recipient(self, tmp_path):
+        """No mbox o template e renderizado com o link de cada destinatario."""
+        path = tmp_path / "outbox.mbox"
+        service = EmailService(transport=MboxTransport(path))
+
+        await service.create_newsletter_template(
+            "t", subject="Oi {{x}}", heading="Novidades", content_html="<p>{{cupom}}</p>"
+        )
+        results = await service.send_newsletter_bulk("t", ["a@example.com", "b@example.com"])
+        await service.close()
+
+        assert results == {"a@example.com": None, "b@example.com": None}
+        messages = list(mailbox.mbox(path))
+        assert messages[0]["Subject"] == "Oi {{x}}"
+        html = messages[1].get_payload()[1].get_payload(decode=True).decode()
+        assert "descadastro?email=b%40example.com" in html
+        assert "<p>{{cupom}}</p>" in html
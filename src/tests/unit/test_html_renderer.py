@@ -0,0 +1,99 @@
+"""
+Testes unitarios para o renderer HTML compartilhado (Playwright).
+
+Verifica:
+- Pre-carregamento de assets dos templates em memoria
+- Protecao contra path traversal no route de assets
+- Atendimento de requisicoes interceptadas (documento, assets, 404)
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services import html_renderer
+from app.services.html_renderer import (
+    PRELOADED_ASSETS,
+    RENDER_ORIGIN,
+    _handle_route,
+    _load_asset,
+    preload_assets,
+)
+
+
+def _make_route(path: str) -> SimpleNamespace:
+    """Cria route falso com request.url e fulfill assincrono."""
+    return SimpleNamespace(
+        request=SimpleNamespace(url=f"{RENDER_ORIGIN}{path}"),
+        fulfill=AsyncMock(),
+    )
+
+
+class TestAssets:
+    """Testes para o cache de assets estaticos."""
+
+    def test_preload_assets_loads_template_files(self):
+        """Deve carregar todas as fontes e imagens dos templates."""
+        html_renderer._assets.clear()
+        assert preload_assets() == len(PRELOADED_ASSETS)
+        for path in PRELOADED_ASSETS:
+            assert path in html_renderer._assets
+
+    def test_font_mime_type(self):
+        """Fontes TTF devem ter mime type de fonte."""
+        _, mime_type = _load_asset("fonts/Bungee-Regular.ttf")
+        assert mime_type.startswith("font/")
+
+    def test_load_asset_blocks_path_traversal(self):
+        """Nao deve servir arquivos fora do diretorio static."""
+        assert _load_asset("../config.py") is None
+
+    def test_load_asset_missing_file(self):
+        """Arquivo inexistente retorna None."""
+        assert _load_asset("fonts/inexistente.ttf") is None
+
+
+class TestHandleRoute:
+    """Testes para o handler de requisicoes interceptadas."""
+
+    @pytest.mark.asyncio
+    async def test_serves_document(self):
+        """Raiz da origem retorna o HTML a renderizar."""
+        route = _make_route("/")
+        await _handle_route(route, "<html></html>")
+        kwargs = route.fulfill.call_args.kwargs
+        assert kwargs["status"] == 200
+        assert kwargs["body"] == "<html></html>"
+
+    @pytest.mark.asyncio
+    async def test_serves_static_asset_from_memory(self):
+        """Assets /static/ sao servidos do cache com cache imutavel."""
+        route = _make_route("/static/fonts/PressStart2P-Regular.ttf")
+        await _handle_route(route, "<html></html>")
+        kwargs = route.fulfill.call_args.kwargs
+        assert kwargs["status"] == 200
+        assert kwargs["body"] == _load_asset("fonts/PressStart2P-Regular.ttf")[0]
+        assert "immutable" in kwargs["headers"]["Cache-Control"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_path_returns_404(self):
+        """Caminhos desconhecidos retornam 404 sem acessar a rede."""
+        route = _make_route("/api/v1/secret")
+        await _handle_route(route, "<html></html>")
+        assert route.fulfill.call_args.kwargs["status"] == 404
+
+    @pytest.mark.asyncio
+    async def test_serves_registered_local_file(self, tmp_path):
+        """Arquivos registrados sao entregues pelo caminho local."""
+        image_path = tmp_path / "produto.jpg"
+        image_path.write_bytes(b"\xff\xd8\xff")
+        route = _make_route("/render-assets/product-image")
+        await _handle_route(
+            route,
+            "<html></html>",
+            {"/render-assets/product-image": (image_path, "image/jpeg")},
+        )
+        kwargs = route.fulfill.call_args.kwargs
+        assert kwargs["path"] == image_path
+        assert kwargs["content_type"] == "image/jpeg"
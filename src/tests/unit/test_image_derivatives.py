@@ -0,0 +1,138 @@
+"""
+Testes unitarios para os derivados responsivos de uploads.
+
+Verifica:
+- Geracao de WebP (e AVIF quando suportado) nas larguras configuradas
+- Manifesto gravado ao lado do original
+- Remocao de derivados junto com a imagem
+- Helper de template responsive_image (<picture> vs <img>)
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.core.templates import responsive_image
+from app.services import image_derivatives, upload
+from app.services.image_derivatives import (
+    DERIVATIVE_FORMATS,
+    build_derivatives,
+    clear_manifest_cache,
+    delete_derivatives,
+    generate_derivatives,
+    get_manifest,
+)
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Diretorio de uploads isolado."""
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    clear_manifest_cache()
+    yield tmp_path
+    clear_manifest_cache()
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _save_original(directory, width=800, height=600):
+    """Grava um JPEG em products/ e retorna (conteudo, caminho, url)."""
+    content = _jpeg(width, height)
+    path = directory / "products" / "abc.jpg"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(content)
+    return content, path, f"{upload.UPLOAD_URL_PREFIX}/products/abc.jpg"
+
+
+class TestBuildDerivatives:
+    """Testes para build_derivatives."""
+
+    def test_generates_smaller_widths_and_original(self, upload_dir):
+        """Gera apenas larguras menores que a original, mais a original."""
+        content, path, url = _save_original(upload_dir)
+
+        manifest = build_derivatives(content, path, url)
+
+        webp = manifest["sources"]["image/webp"]
+        assert [v["width"] for v in webp] == [320, 640, 800]
+        assert (upload_dir / "products" / "abc-320w.webp").exists()
+        with Image.open(upload_dir / "products" / "abc-320w.webp") as image:
+            assert image.size == (320, 240)
+        assert len(manifest["sources"]) == len(DERIVATIVE_FORMATS)
+
+    def test_writes_manifest(self, upload_dir):
+        """Manifesto fica ao lado do original e e lido por get_manifest."""
+        content, path, url = _save_original(upload_dir)
+        build_derivatives(content, path, url)
+
+        manifest = get_manifest(url)
+        assert manifest["src"] == url
+        assert (manifest["width"], manifest["height"]) == (800, 600)
+
+    @pytest.mark.asyncio
+    async def test_generate_returns_none_on_invalid_image(self, upload_dir):
+        """Conteudo invalido nao levanta excecao (upload continua valido)."""
+        _, path, url = _save_original(upload_dir)
+        assert await generate_derivatives(b"nao e imagem", path, url) is None
+
+    def test_delete_derivatives(self, upload_dir):
+        """Remove derivados e manifesto, preservando o original."""
+        content, path, url = _save_original(upload_dir)
+        build_derivatives(content, path, url)
+
+        assert delete_derivatives(url) > 0
+        assert [p.name for p in (upload_dir / "products").iterdir()] == ["abc.jpg"]
+        assert get_manifest(url) is None
+
+    def test_manifest_written_later_is_seen(self, upload_dir):
+        """Sem manifesto nao fica em cache; manifesto gravado depois e lido."""
+        content, path, url = _save_original(upload_dir)
+        assert get_manifest(url) is None
+
+        build_derivatives(content, path, url)
+        assert get_manifest(url)["src"] == url
+
+        # Removido por outro processo (sem passar por delete_derivatives)
+        path.with_name(path.name + image_derivatives.MANIFEST_SUFFIX).unlink()
+        assert get_manifest(url) is None
+
+    def test_external_url_has_no_manifest(self, upload_dir):
+        """URLs externas nunca tem manifesto."""
+        assert get_manifest("https://cdn.example.com/x.jpg") is None
+        assert image_derivatives._url_to_path("https://cdn.example.com/x.jpg") is None
+
+
+class TestResponsiveImage:
+    """Testes para o helper Jinja responsive_image."""
+
+    def test_plain_img_without_manifest(self, upload_dir):
+        """Sem derivados gera <img> simples com atributos extras."""
+        html = responsive_image("https://cdn.example.com/x.jpg", "Caneca", loading="lazy")
+        assert html == '<img src="https://cdn.example.com/x.jpg" alt="Caneca" loading="lazy">'
+
+    def test_picture_with_sources(self, upload_dir):
+        """Com manifesto gera <picture> com srcset por formato."""
+        content, path, url = _save_original(upload_dir)
+        build_derivatives(content, path, url)
+
+        html = responsive_image(url, "Caneca", sizes="50vw", class_="foto")
+
+        assert html.startswith("<picture>")
+        assert 'type="image/webp"' in html
+        assert "abc-320w.webp 320w" in html
+        assert 'sizes="50vw"' in html
+        assert f'<img src="{url}" alt="Caneca" class="foto">' in html
+
+    def test_escapes_attributes(self, upload_dir):
+        """Alt com aspas/HTML e escapado."""
+        html = responsive_image("/x.jpg", '"><script>')
+        assert "<script>" not in html
+
+    def test_empty_src(self):
+        """Sem URL nao gera nada."""
+        assert responsive_image(None) == ""
@@ -0,0 +1,113 @@
+"""
+Testes unitarios para o processamento de imagens de upload.
+
+Verifica:
+- Leitura em blocos com limite de tamanho (read_upload)
+- Executor dedicado com concorrencia limitada (run_image_task)
+- resize_image com decode reduzido (draft) em JPEG grande
+"""
+
+import io
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.core import image_executor
+from app.core.image_executor import run_image_task
+from app.services.upload import read_upload, resize_image
+
+
+def _upload_file(content: bytes, size: int | None = None) -> MagicMock:
+    """Simula UploadFile que devolve o conteudo em blocos."""
+    stream = io.BytesIO(content)
+    file = MagicMock()
+    file.size = size
+    file.read = AsyncMock(side_effect=lambda n=-1: stream.read(n))
+    return file
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "blue").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class TestReadUpload:
+    """Testes para read_upload."""
+
+    @pytest.mark.asyncio
+    async def test_reads_full_content(self):
+        """Arquivo dentro do limite e lido por completo."""
+        content = b"x" * 200_000
+        assert await read_upload(_upload_file(content), max_size=300_000) == content
+
+    @pytest.mark.asyncio
+    async def test_aborts_when_exceeding_limit(self):
+        """Para de ler assim que passa do limite."""
+        file = _upload_file(b"x" * 1_000_000)
+
+        with pytest.raises(HTTPException) as exc:
+            await read_upload(file, max_size=100_000)
+
+        assert exc.value.status_code == 400
+        assert file.read.call_count < 5
+
+    @pytest.mark.asyncio
+    async def test_rejects_declared_size_without_reading(self):
+        """Tamanho declarado acima do limite rejeita sem ler o corpo."""
+        file = _upload_file(b"x", size=10_000_000)
+
+        with pytest.raises(HTTPException):
+            await read_upload(file, max_size=100)
+
+        file.read.assert_not_called()
+
+
+class TestImageExecutor:
+    """Testes para o executor de imagens."""
+
+    @pytest.mark.asyncio
+    async def test_runs_outside_event_loop_thread(self):
+        """Tarefa roda em thread do executor dedicado."""
+        thread_name = await run_image_task(lambda: threading.current_thread().name)
+        assert thread_name.startswith("image")
+
+    @pytest.mark.asyncio
+    async def test_passes_arguments(self):
+        """Repassa args e kwargs para a funcao."""
+        assert await run_image_task(pow, 2, exp=10) == 1024
+
+    def test_worker_count_from_settings(self, monkeypatch):
+        """Numero de threads vem de image_processing_workers."""
+        image_executor.shutdown_image_executor()
+        monkeypatch.setattr(image_executor.settings, "image_processing_workers", 3)
+        try:
+            assert image_executor.get_image_executor()._max_workers == 3
+        finally:
+            image_executor.shutdown_image_executor()
+
+
+class TestResizeImage:
+    """Testes para resize_image."""
+
+    def test_large_jpeg_resized_to_target(self):
+        """JPEG grande (decode reduzido via draft) chega no tamanho exato."""
+        result = resize_image(_jpeg(4000, 3000), (800, 800), "JPEG")
+
+        with Image.open(io.BytesIO(result)) as image:
+            assert image.size == (800, 800)
+            assert image.format == "JPEG"
+
+    def test_png_with_alpha(self):
+        """PNG com transparencia vira JPEG com fundo branco."""
+        buffer = io.BytesIO()
+        Image.new("RGBA", (100, 50), (255, 0, 0, 0)).save(buffer, format="PNG")
+
+        result = resize_image(buffer.getvalue(), (400, 400), "JPEG")
+
+        with Image.open(io.BytesIO(result)) as image:
+            assert image.size == (400, 400)
+            assert image.getpixel((200, 10))[0] > 240
@@ -0,0 +1,136 @@
+"""
+Testes unitarios para o cache de imagens geradas do Instagram.
+
+Verifica:
+- Chave de cache deterministica e sensivel a todo o conteudo
+- Lookup pelo indice (sem varrer diretorio)
+- Adocao de arquivos sem entrada no indice
+- Eviction por idade e por tamanho total
+- Indice compartilhado entre workers e limpeza do formato antigo
+- Estatisticas a partir do indice
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from app.services import instagram_image
+from app.services.instagram_image import _CacheIndex, _generate_cache_key
+
+
+@pytest.fixture
+def cache_index(tmp_path, monkeypatch):
+    """Indice isolado em diretorio temporario."""
+    monkeypatch.setattr(instagram_image, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(instagram_image, "LEGACY_CACHE_INDEX_PATH", tmp_path / "index.json")
+    return _CacheIndex(tmp_path / "index.sqlite3")
+
+
+def _write_png(directory, key: str, size: int = 100) -> None:
+    (directory / f"{key}.png").write_bytes(b"0" * size)
+
+
+class TestCacheKey:
+    """Testes para _generate_cache_key."""
+
+    def test_deterministic(self):
+        """Mesmo conteudo gera a mesma chave."""
+        args = ("Produto", "https://img/1.jpg", "OFERTA", "Titulo", "NOVO", 99.9, ["geek"])
+        assert _generate_cache_key(*args) == _generate_cache_key(*args)
+
+    def test_includes_image_and_hashtags(self):
+        """Imagem do produto e hashtags fazem parte da chave."""
+        base = ("Produto", "https://img/1.jpg", "OFERTA", "Titulo", "NOVO", 99.9, ["geek"])
+        other_image = ("Produto", "https://img/2.jpg", "OFERTA", "Titulo", "NOVO", 99.9, ["geek"])
+        other_tags = ("Produto", "https://img/1.jpg", "OFERTA", "Titulo", "NOVO", 99.9, ["nerd"])
+        assert _generate_cache_key(*base) != _generate_cache_key(*other_image)
+        assert _generate_cache_key(*base) != _generate_cache_key(*other_tags)
+
+
+class TestCacheIndex:
+    """Testes para o indice do cache."""
+
+    def test_lookup_miss(self, cache_index):
+        """Chave inexistente retorna None."""
+        assert cache_index.lookup("inexistente") is None
+
+    def test_add_and_lookup(self, cache_index, tmp_path):
+        """Entrada registrada e encontrada com seu tamanho."""
+        _write_png(tmp_path, "abc", 150)
+        cache_index.add("abc", 150)
+        assert cache_index.lookup("abc") == 150
+        assert (tmp_path / "index.sqlite3").exists()
+
+    def test_adopts_file_without_entry(self, cache_index, tmp_path):
+        """Arquivo existente fora do indice e adotado no lookup."""
+        _write_png(tmp_path, "outro", 80)
+        assert cache_index.lookup("outro") == 80
+        assert "outro" in cache_index.entries
+
+    def test_missing_file_invalidates_entry(self, cache_index, tmp_path):
+        """Entrada cujo arquivo sumiu e descartada."""
+        _write_png(tmp_path, "abc")
+        cache_index.add("abc", 100)
+        (tmp_path / "abc.png").unlink()
+        assert cache_index.lookup("abc") is None
+        assert cache_index.total_bytes == 0
+
+    def test_evicts_expired_entries(self, cache_index, tmp_path):
+        """Entradas acima da idade maxima sao removidas com o arquivo."""
+        _write_png(tmp_path, "velha")
+        cache_index.add("velha", 100, created_at=time.time() - instagram_image.CACHE_MAX_AGE_SECONDS - 1)
+        assert "velha" not in cache_index.entries
+        assert not (tmp_path / "velha.png").exists()
+
+    def test_evicts_least_accessed_over_size_limit(self, cache_index, tmp_path, monkeypatch):
+        """Acima do limite total remove as menos acessadas."""
+        monkeypatch.setattr(instagram_image, "CACHE_MAX_BYTES", 250)
+        for key in ("a", "b"):
+            _write_png(tmp_path, key)
+            cache_index.add(key, 100)
+        with sqlite3.connect(cache_index.path) as db:  # "a" usada recentemente
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = 'a'", (time.time() + 10,))
+
+        _write_png(tmp_path, "c")
+        cache_index.add("c", 100)
+
+        assert set(cache_index.entries) == {"a", "c"}
+        assert not (tmp_path / "b.png").exists()
+        assert cache_index.total_bytes == 200
+
+    def test_shared_between_workers(self, cache_index, tmp_path, monkeypatch):
+        """Outro worker (outra instancia) ve as entradas e o limite vale para o total."""
+        monkeypatch.setattr(instagram_image, "CACHE_MAX_BYTES", 250)
+        other = _CacheIndex(cache_index.path)
+        _write_png(tmp_path, "a")
+        cache_index.add("a", 100)
+        _write_png(tmp_path, "b")
+        other.add("b", 100)
+
+        assert cache_index.stats() == (2, 200)
+        assert other.lookup("a") == 100
+
+        _write_png(tmp_path, "c")
+        cache_index.add("c", 100)
+        assert other.total_bytes == 200
+        # "a" foi acessada pelo outro worker: "b" e a menos usada
+        assert set(other.entries) == {"a", "c"}
+        assert not (tmp_path / "b.png").exists()
+
+    def test_sweeps_legacy_files_once(self, tmp_path, monkeypatch):
+        """Arquivos {chave}_{uuid}.png e o indice JSON antigos saem na primeira abertura."""
+        monkeypatch.setattr(instagram_image, "CACHE_DIR", tmp_path)
+        monkeypatch.setattr(instagram_image, "LEGACY_CACHE_INDEX_PATH", tmp_path / "index.json")
+        _write_png(tmp_path, "abc_1a2b3c4d")
+        _write_png(tmp_path, "novo")
+        (tmp_path / "index.json").write_text("{}")
+
+        assert _CacheIndex(tmp_path / "index.sqlite3").lookup("novo") == 100
+        assert sorted(p.name for p in tmp_path.glob("*.png")) == ["novo.png"]
+        assert not (tmp_path / "index.json").exists()
+
+        # Ja varrido: arquivos com "_" criados depois nao sao mais tocados
+        _write_png(tmp_path, "x_y")
+        _CacheIndex(tmp_path / "index.sqlite3").lookup("novo")
+        assert (tmp_path / "x_y.png").exists()
@@ -9,12 +9,15 @@ Testa:
 - Prompts e personas
 """
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import litellm
 import pytest
 from pydantic import BaseModel
 
+from app.services import llm as llm_module
 from app.services.llm import (
     GeneratedPost,
     GeneratedProductDescription,
@@ -24,6 +27,8 @@ from app.services.llm import (
     get_api_key_for_model,
     get_llm_service,
     get_model_for_task,
+    get_provider_stats,
+    order_model_chain,
 )
 from app.services.prompts import (
     PERSONA_MODIFIERS,
@@ -36,6 +41,32 @@ from app.services.prompts import (
 )
 
 
+@pytest.fixture(autouse=True)
+def llm_cache(monkeypatch):
+    """
+    Substitui o cache Redis de respostas por um dict em memoria.
+
+    Isola os testes entre si (prompts iguais em testes diferentes nao
+    compartilham resposta) e nao depende de Redis.
+    """
+    store: dict[str, dict] = {}
+
+    async def get_cached(prompt_hash):
+        return store.get(prompt_hash)
+
+    async def cache_response(prompt_hash, response, expire_minutes=60):
+        store[prompt_hash] = response
+        return True
+
+    async def invalidate(prompt_hash):
+        return store.pop(prompt_hash, None) is not None
+
+    monkeypatch.setattr("app.services.llm.get_cached_llm_response", get_cached)
+    monkeypatch.setattr("app.services.llm.cache_llm_response", cache_response)
+    monkeypatch.setattr("app.services.llm.invalidate_cached_llm_response", invalidate)
+    return store
+
+
 # =============================================================================
 # Testes de Configuracao
 # =============================================================================
@@ -192,6 +223,192 @@ class TestLLMGenerate:
             assert "API Error" in str(exc_info.value)
 
 
+class TestLLMGenerateStream:
+    """Testes para geracao em streaming."""
+
+    @staticmethod
+    def _chunk(content=None, finish_reason=None, usage=None):
+        chunk = MagicMock()
+        if content is None and finish_reason is None:
+            chunk.choices = []
+        else:
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = content
+            chunk.choices[0].finish_reason = finish_reason
+        chunk.usage = usage
+        return chunk
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_chunks_and_records_usage(self):
+        """Repassa os trechos e guarda usage/finish_reason do final do stream."""
+        usage = MagicMock(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+        chunks = [
+            self._chunk("Ola"),
+            self._chunk(" mundo"),
+            self._chunk("", finish_reason="stop"),
+            self._chunk(usage=usage),  # chunk final sem choices
+        ]
+
+        async def fake_stream():
+            for chunk in chunks:
+                yield chunk
+
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = fake_stream()
+
+            service = LLMService()
+            parts = [part async for part in service.generate_stream("Prompt")]
+
+            assert parts == ["Ola", " mundo"]
+            assert service.last_stream_finish_reason == "stop"
+            assert service.last_stream_usage == {
+                "prompt_tokens": 12,
+                "completion_tokens": 3,
+                "total_tokens": 15,
+            }
+            assert mock.call_args.kwargs["stream_options"] == {"include_usage": True}
+
+
+def _completion(content: str, model: str) -> MagicMock:
+    """Resposta do LiteLLM com conteudo e modelo."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].finish_reason = "stop"
+    response.model = model
+    response.usage = None
+    return response
+
+
+class TestLLMFailover:
+    """Testes para retry, failover entre modelos e hedging."""
+
+    @pytest.fixture(autouse=True)
+    def fast_failover(self, monkeypatch):
+        """Metricas zeradas e sem espera no backoff."""
+        monkeypatch.setattr(llm_module, "_provider_stats", {})
+        monkeypatch.setattr(llm_module.settings, "llm_retry_base_delay", 0)
+        monkeypatch.setattr(llm_module.settings, "llm_max_retries", 2)
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_error(self):
+        """Erro transitorio (rate limit) e repetido no mesmo modelo."""
+        rate_limit = litellm.RateLimitError("limite", llm_provider="openai", model="gpt-4o-mini")
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.side_effect = [rate_limit, _completion("ok", "gpt-4o-mini")]
+
+            service = LLMService(model="gpt-4o-mini", cache_ttl_minutes=0)
+            result = await service.generate("Prompt")
+
+        assert result.content == "ok"
+        assert mock.call_count == 2
+        stats = get_provider_stats("gpt-4o-mini")
+        assert (stats.errors, stats.successes) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_next_model(self):
+        """Erro nao transitorio passa direto para o proximo modelo da cadeia."""
+
+        async def fake_completion(**kwargs):
+            if kwargs["model"] == "gpt-4o-mini":
+                raise Exception("chave invalida")
+            return _completion("do fallback", kwargs["model"])
+
+        with patch("app.services.llm.acompletion", side_effect=fake_completion) as mock:
+            service = LLMService(
+                model="gpt-4o-mini",
+                fallback_models=["claude-3-haiku-20240307"],
+                cache_ttl_minutes=0,
+            )
+            result = await service.generate("Prompt")
+
+        assert result.content == "do fallback"
+        assert result.model == "claude-3-haiku-20240307"
+        assert [c.kwargs["model"] for c in mock.call_args_list] == [
+            "gpt-4o-mini", "claude-3-haiku-20240307",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_all_models_fail(self):
+        """Sem nenhum modelo respondendo levanta LLMError com o ultimo erro."""
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.side_effect = Exception("fora do ar")
+
+            service = LLMService(fallback_models=["claude-3-haiku-20240307"], cache_ttl_minutes=0)
+            with pytest.raises(LLMError, match="fora do ar"):
+                await service.generate("Prompt")
+
+        assert mock.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_hedge_fires_fallback_when_slow(self, monkeypatch):
+        """Com hedge, o fallback e disparado se o principal demora e vence."""
+        monkeypatch.setattr(llm_module.settings, "llm_hedge_default_delay", 0.01)
+        cancelled = []
+
+        async def fake_completion(**kwargs):
+            if kwargs["model"] == "gpt-4o-mini":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(kwargs["model"])
+                    raise
+            return _completion("rapido", kwargs["model"])
+
+        with patch("app.services.llm.acompletion", side_effect=fake_completion):
+            service = LLMService(
+                model="gpt-4o-mini",
+                fallback_models=["claude-3-haiku-20240307"],
+                hedge=True,
+                cache_ttl_minutes=0,
+            )
+            result = await asyncio.wait_for(service.generate("Prompt"), timeout=1)
+            await asyncio.sleep(0)
+
+        assert result.model == "claude-3-haiku-20240307"
+        assert cancelled == ["gpt-4o-mini"]
+
+    def test_degraded_model_goes_last(self, monkeypatch):
+        """Modelo com erros seguidos recentes vai para o fim da cadeia."""
+        monkeypatch.setattr(llm_module.settings, "llm_failover_error_threshold", 2)
+        for _ in range(2):
+            get_provider_stats("gpt-4o-mini").record_error()
+
+        assert order_model_chain(["gpt-4o-mini", "claude-3-haiku-20240307"]) == [
+            "claude-3-haiku-20240307", "gpt-4o-mini",
+        ]
+
+    def test_p95_needs_samples(self):
+        """p95 so e usado com amostras suficientes."""
+        stats = get_provider_stats("gpt-4o-mini")
+        for i in range(10):
+            stats.record_success(i / 10)
+        assert stats.p95() is None
+
+        for i in range(90):
+            stats.record_success(1.0)
+        assert stats.p95() == 1.0
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_chunk(self):
+        """Streaming troca de modelo se falhar antes do primeiro trecho."""
+
+        async def fake_stream():
+            yield TestLLMGenerateStream._chunk("Ola", finish_reason="stop")
+
+        async def fake_completion(**kwargs):
+            if kwargs["model"] == "gpt-4o-mini":
+                raise Exception("fora do ar")
+            return fake_stream()
+
+        with patch("app.services.llm.acompletion", side_effect=fake_completion):
+            service = LLMService(fallback_models=["claude-3-haiku-20240307"])
+            parts = [part async for part in service.generate_stream("Prompt")]
+
+        assert parts == ["Ola"]
+        assert service.last_stream_model == "claude-3-haiku-20240307"
+
+
 # =============================================================================
 # Testes de Geracao Estruturada
 # =============================================================================
@@ -289,6 +506,133 @@ class TestLLMGenerateStructured:
             assert "JSON invalido" in str(exc_info.value)
 
 
+# =============================================================================
+# Testes de Cache de Respostas
+# =============================================================================
+
+
+class TestLLMCache:
+    """Testes para o cache de respostas do LLM."""
+
+    @pytest.fixture
+    def mock_llm_response(self):
+        """Mock de resposta do LiteLLM."""
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = '{"title": "Cacheado", "items": []}'
+        response.choices[0].finish_reason = "stop"
+        response.model = "gpt-4o-mini"
+        response.usage = MagicMock()
+        response.usage.prompt_tokens = 50
+        response.usage.completion_tokens = 100
+        response.usage.total_tokens = 150
+        return response
+
+    @pytest.mark.asyncio
+    async def test_identical_request_served_from_cache(self, mock_llm_response):
+        """Segunda chamada identica nao chama o provider e vem sem usage."""
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            service = LLMService(cache_ttl_minutes=60)
+            first = await service.generate("Titulo SEO", system="SEO")
+            second = await service.generate("Titulo SEO", system="SEO")
+
+        mock.assert_called_once()
+        assert first.cached is False
+        assert second.cached is True
+        assert second.content == first.content
+        assert second.usage is None
+
+    @pytest.mark.asyncio
+    async def test_key_includes_generation_parameters(self, mock_llm_response):
+        """Temperatura, max_tokens, modelo e system diferentes nao compartilham cache."""
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            service = LLMService(cache_ttl_minutes=60)
+            await service.generate("Prompt")
+            await service.generate("Prompt", temperature=0.1)
+            await service.generate("Prompt", max_tokens=50)
+            await service.generate("Prompt", model="gpt-4o")
+            await service.generate("Prompt", system="Outro")
+
+        assert mock.call_count == 5
+
+    @pytest.mark.asyncio
+    async def test_opt_out(self, mock_llm_response, llm_cache):
+        """use_cache=False sempre chama o provider e nao grava no cache."""
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            service = LLMService(cache_ttl_minutes=60)
+            await service.generate("Piada geek", use_cache=False)
+            await service.generate("Piada geek", use_cache=False)
+
+        assert mock.call_count == 2
+        assert llm_cache == {}
+
+    @pytest.mark.asyncio
+    async def test_ttl_zero_disables_cache(self, mock_llm_response, llm_cache):
+        """cache_ttl_minutes=0 desabilita o cache."""
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            service = LLMService(cache_ttl_minutes=0)
+            await service.generate("Prompt")
+            await service.generate("Prompt")
+
+        assert mock.call_count == 2
+        assert llm_cache == {}
+
+    @pytest.mark.asyncio
+    async def test_truncated_response_not_cached(self, mock_llm_response, llm_cache):
+        """Resposta truncada (finish_reason=length) nao e cacheada."""
+        mock_llm_response.choices[0].finish_reason = "length"
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+            await LLMService(cache_ttl_minutes=60).generate("Prompt")
+
+        assert llm_cache == {}
+
+    @pytest.mark.asyncio
+    async def test_structured_uses_cache(self, mock_llm_response):
+        """generate_structured reaproveita a resposta cacheada."""
+
+        class Schema(BaseModel):
+            title: str
+            items: list[str]
+
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            service = LLMService(cache_ttl_minutes=60)
+            first = await service.generate_structured(prompt="Lista", schema=Schema)
+            second = await service.generate_structured(prompt="Lista", schema=Schema)
+
+        mock.assert_called_once()
+        assert first == second
+
+    @pytest.mark.asyncio
+    async def test_structured_invalid_response_is_discarded(self, mock_llm_response, llm_cache):
+        """Resposta que nao passa no schema e removida do cache."""
+
+        class Schema(BaseModel):
+            title: str
+            items: list[str]
+
+        mock_llm_response.choices[0].message.content = "Nao e JSON"
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_llm_response
+
+            with pytest.raises(LLMError):
+                await LLMService(cache_ttl_minutes=60).generate_structured(
+                    prompt="Lista", schema=Schema
+                )
+
+        assert llm_cache == {}
+
+
 # =============================================================================
 # Testes de Prompts
 # =============================================================================
@@ -485,6 +829,7 @@ class TestMultiProvider:
                 mock_settings.llm_temperature = 0.7
                 mock_settings.llm_max_tokens = 2000
                 mock_settings.llm_timeout = 60
+                mock_settings.llm_cache_ttl = 0
 
                 service = LLMService(model="openrouter/mistralai/mistral-7b-instruct")
                 await service.generate("Teste")
@@ -0,0 +1,106 @@
+"""
+Testes unitarios para a telemetria das chamadas ao LLM.
+
+Verifica:
+- Contadores e histogramas por modelo e caso de uso
+- Erros e respostas do cache nao entram na latencia/custo
+- Preview das respostas so em DEBUG ou amostrado
+- LLMService.generate registra a chamada
+"""
+
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import llm_telemetry
+from app.services.llm import LLMService
+from app.services.llm_telemetry import (
+    get_llm_telemetry,
+    log_response_preview,
+    record_llm_call,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats(monkeypatch):
+    """Cada teste comeca com a telemetria zerada."""
+    monkeypatch.setattr(llm_telemetry, "_stats", {})
+
+
+class TestRecordLLMCall:
+    """Testes para record_llm_call/get_llm_telemetry."""
+
+    def test_counters_and_histograms(self):
+        """Soma tokens/custo e distribui latencia e tokens nos buckets."""
+        record_llm_call("gpt-4o-mini", "seo_title", latency_ms=300, prompt_tokens=1000, completion_tokens=500)
+        record_llm_call("gpt-4o-mini", "seo_title", latency_ms=40000, prompt_tokens=80, completion_tokens=0)
+
+        [row] = get_llm_telemetry()
+        assert (row["model"], row["use_case"], row["calls"]) == ("gpt-4o-mini", "seo_title", 2)
+        assert row["prompt_tokens"] == 1080
+        assert row["cost_usd"] == pytest.approx(0.00045 + 0.000012)
+        assert row["avg_latency_ms"] == 20150
+        assert row["latency_ms"]["le_500"] == 1
+        assert row["latency_ms"]["inf"] == 1
+        assert row["total_tokens"]["le_100"] == 1
+        assert row["total_tokens"]["le_2000"] == 1
+
+    def test_errors_and_cached(self):
+        """Erro e cache contam como chamada, sem latencia nem custo."""
+        record_llm_call("gpt-4o-mini", None, error=True)
+        record_llm_call("gpt-4o-mini", None, cached=True)
+
+        [row] = get_llm_telemetry()
+        assert row["use_case"] == "default"
+        assert (row["calls"], row["errors"], row["cached"]) == (2, 1, 1)
+        assert row["avg_latency_ms"] == 0
+        assert row["cost_usd"] == 0
+
+
+class TestLogResponsePreview:
+    """Testes para log_response_preview."""
+
+    def test_silent_without_debug_or_sampling(self, monkeypatch):
+        """Sem DEBUG e sem amostragem nao loga."""
+        monkeypatch.setattr(llm_telemetry.settings, "llm_log_sample_rate", 0.0)
+        log = MagicMock()
+        log.isEnabledFor.return_value = False
+
+        log_response_preview(log, "gpt-4o-mini", "stop", "texto")
+
+        log.log.assert_not_called()
+
+    def test_sampled_logs_at_info(self, monkeypatch):
+        """Chamada amostrada sai em INFO com preview truncado."""
+        monkeypatch.setattr(llm_telemetry.settings, "llm_log_sample_rate", 1.0)
+        log = MagicMock()
+
+        log_response_preview(log, "gpt-4o-mini", "stop", "x" * 1000)
+
+        level, _msg, *args = log.log.call_args.args
+        assert level == logging.INFO
+        assert len(args[-1]) == llm_telemetry.PREVIEW_CHARS
+
+
+class TestServiceRecordsCalls:
+    """Testes da integracao com LLMService."""
+
+    @pytest.mark.asyncio
+    async def test_generate_records_call(self):
+        """generate() registra modelo, caso de uso e tokens."""
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Texto"
+        response.choices[0].finish_reason = "stop"
+        response.model = "gpt-4o-mini"
+        response.usage = MagicMock(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+
+        with patch("app.services.llm.acompletion", new_callable=AsyncMock) as mock:
+            mock.return_value = response
+            service = LLMService(cache_ttl_minutes=0, use_case="post_tags")
+            await service.generate("Prompt")
+
+        [row] = get_llm_telemetry()
+        assert (row["model"], row["use_case"], row["calls"]) == ("gpt-4o-mini", "post_tags", 1)
+        assert row["completion_tokens"] == 5
@@ -0,0 +1,411 @@
+"""
+Testes unitarios para as campanhas de newsletter.
+
+Verifica:
+- Destinatarios copiados dos inscritos verificados na criacao
+- Dispatcher envia em lote via template, respeita a concorrencia e
+  conclui a campanha
+- Falhas sao retentadas ate o limite e podem ser reenfileiradas
+- Lease impede dois envios da mesma campanha; quem perde o lease para
+- Cancelamento para o envio no fim do bloco; shutdown para entre blocos
+- Lotes de pendentes paginados pela chave e selecao/acoes em massa por IN
+- Estatisticas dos inscritos em uma consulta, com cache invalidado
+"""
+
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import NewsletterSignup
+from app.models.base import utc_now
+from app.models.newsletter_campaign import (
+    CampaignStatus,
+    NewsletterCampaign,
+    NewsletterCampaignRecipient,
+    RecipientStatus,
+)
+from app.repositories.newsletter import NewsletterRepository
+from app.repositories.newsletter_campaign import NewsletterCampaignRepository
+from app.services import newsletter_campaigns
+from app.services.newsletter_campaigns import CampaignDispatcher, campaign_template_name
+
+MESSAGE = {"subject": "Novidades", "heading": "Oi!", "content": "**Ofertas**", "content_html": "<p>Ofertas</p>"}
+
+
+@pytest.fixture
+def session_factory(async_engine):
+    """Sessoes proprias do dispatcher, no mesmo banco do teste."""
+    return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _add_subscribers(db_session, count: int, **overrides) -> list[NewsletterSignup]:
+    signups = [
+        NewsletterSignup(
+            email=f"{overrides.get('prefix', 'user')}{i}@example.com",
+            is_active=overrides.get("is_active", True),
+            email_verified=overrides.get("email_verified", True),
+        )
+        for i in range(count)
+    ]
+    db_session.add_all(signups)
+    await db_session.commit()
+    return signups
+
+
+class FakeEmail:
+    """EmailService falso: registra templates e envios em lote."""
+
+    def __init__(self, send=None):
+        self.templates: dict[str, dict] = {}
+        self.deleted: list[str] = []
+        self.bulk_calls: list[list[str]] = []
+        # send(email) -> erro ou None
+        self._send = send or (lambda email: None)
+
+    async def create_newsletter_template(self, template_name, **message):
+        self.templates[template_name] = message
+
+    async def send_newsletter_bulk(self, template_name, emails):
+        self.bulk_calls.append(list(emails))
+        results = {}
+        for email in emails:
+            outcome = self._send(email)
+            if asyncio.iscoroutine(outcome):
+                outcome = await outcome
+            results[email] = outcome
+        return results
+
+    async def delete_template(self, template_name):
+        self.deleted.append(template_name)
+
+
+def _dispatcher(session_factory, email, **overrides) -> CampaignDispatcher:
+    options = {
+        "concurrency": 2,
+        "rate_per_second": 1000,
+        "batch_size": 3,
+        "max_attempts": 2,
+        "lease_seconds": 60,
+        "retry_delay": 0,
+        **overrides,
+    }
+    return CampaignDispatcher(session_factory, email=email, **options)
+
+
+async def _statuses(db_session, campaign_id) -> dict[str, str]:
+    result = await db_session.execute(
+        select(NewsletterCampaignRecipient.email, NewsletterCampaignRecipient.status)
+        .where(NewsletterCampaignRecipient.campaign_id == campaign_id)
+    )
+    return dict(result.all())
+
+
+class TestCreateCampaign:
+    """Testes para NewsletterCampaignRepository.create_with_recipients."""
+
+    @pytest.mark.asyncio
+    async def test_copies_verified_subscribers(self, db_session):
+        """So inscritos ativos e verificados viram destinatarios."""
+        await _add_subscribers(db_session, 3)
+        await _add_subscribers(db_session, 2, prefix="pending", email_verified=False)
+        await _add_subscribers(db_session, 1, prefix="gone", is_active=False)
+
+        campaign = await NewsletterCampaignRepository(db_session).create_with_recipients(MESSAGE)
+
+        assert campaign.total_recipients == 3
+        assert campaign.status == CampaignStatus.QUEUED.value
+        statuses = await _statuses(db_session, campaign.id)
+        assert sorted(statuses) == [f"user{i}@example.com" for i in range(3)]
+        assert set(statuses.values()) == {RecipientStatus.PENDING.value}
+
+    @pytest.mark.asyncio
+    async def test_selected_and_empty(self, db_session):
+        """Filtra pelos IDs selecionados; sem destinatarios nao cria nada."""
+        signups = await _add_subscribers(db_session, 3)
+        repo = NewsletterCampaignRepository(db_session)
+
+        campaign = await repo.create_with_recipients(MESSAGE, subscriber_ids=[signups[1].id])
+        assert campaign.total_recipients == 1
+
+        assert await repo.create_with_recipients(MESSAGE, subscriber_ids=[]) is None
+        assert len(await repo.get_recent()) == 1
+
+
+class TestCampaignDispatcher:
+    """Testes para CampaignDispatcher."""
+
+    @pytest.mark.asyncio
+    async def test_sends_all_in_bulk_with_bounded_concurrency(
+        self, db_session, session_factory, monkeypatch
+    ):
+        """Um template por campanha; envios em blocos, sem passar da concorrencia."""
+        monkeypatch.setattr(newsletter_campaigns, "BULK_MAX_DESTINATIONS", 2)
+        await _add_subscribers(db_session, 7)
+        campaign = await NewsletterCampaignRepository(db_session).create_with_recipients(MESSAGE)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send(email):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        email = FakeEmail(send)
+        dispatcher = _dispatcher(session_factory, email, batch_size=7)
+        assert dispatcher.start(campaign.id) is True
+        assert dispatcher.start(campaign.id) is False  # ja em envio
+        await dispatcher._tasks[campaign.id]
+
+        template = campaign_template_name(campaign.id)
+        assert email.templates[template]["content_html"] == "<p>Ofertas</p>"
+        assert [len(call) for call in email.bulk_calls] == [2, 2, 2, 1]
+        assert max_in_flight == 2  # newsletter_send_concurrency (chamadas em lote)
+        assert email.deleted == [template]
+
+        await db_session.refresh(campaign)
+        assert campaign.status == CampaignStatus.COMPLETED.value
+        assert (campaign.sent_count, campaign.failed_count) == (7, 0)
+        assert campaign.finished_at is not None
+        assert campaign.locked_until is None
+
+    @pytest.mark.asyncio
+    async def test_failures_retried_until_max_attempts(self, db_session, session_factory):
+        """Falha transitoria e reenviada; falha persistente esgota as tentativas."""
+        await _add_subscribers(db_session, 3)
+        repo = NewsletterCampaignRepository(db_session)
+        campaign = await repo.create_with_recipients(MESSAGE)
+        calls: dict[str, int] = {}
+
+        def send(email):
+            calls[email] = calls.get(email, 0) + 1
+            if email == "user0@example.com":
+                return "MessageRejected: Email address is not verified"
+            if email == "user1@example.com" and calls[email] == 1:
+                return "Throttling"
+            return None
+
+        dispatcher = _dispatcher(session_factory, FakeEmail(send))
+        dispatcher.start(campaign.id)
+        await dispatcher._tasks[campaign.id]
+
+        assert calls == {"user0@example.com": 2, "user1@example.com": 2, "user2@example.com": 1}
+        await db_session.refresh(campaign)
+        assert (campaign.sent_count, campaign.failed_count) == (2, 1)
+        [failed] = await repo.get_failed_recipients(campaign.id)
+        assert (failed.email, failed.attempts) == ("user0@example.com", 2)
+        assert failed.last_error.startswith("MessageRejected")
+
+        # Reenvio das falhas reabre a campanha
+        assert await repo.retry_failed(campaign.id) == 1
+        await db_session.refresh(campaign)
+        assert campaign.status == CampaignStatus.QUEUED.value
+        assert campaign.failed_count == 0
+
+    @pytest.mark.asyncio
+    async def test_lease_blocks_second_dispatcher(self, db_session, session_factory):
+        """Campanha com lease valido nao e enviada nem retomada por outro."""
+        await _add_subscribers(db_session, 2)
+        repo = NewsletterCampaignRepository(db_session)
+        campaign = await repo.create_with_recipients(MESSAGE)
+        assert await repo.acquire_lease(campaign.id, lease_seconds=60) is not None
+
+        email = FakeEmail()
+        dispatcher = _dispatcher(session_factory, email)
+        assert await dispatcher.resume_pending() == 0
+        dispatcher.start(campaign.id)
+        await dispatcher._tasks[campaign.id]
+
+        assert email.bulk_calls == []
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_stops_sending(self, db_session, session_factory, monkeypatch):
+        """Lease assumido por outro processo: a renovacao falha e o envio para."""
+        monkeypatch.setattr(newsletter_campaigns, "BULK_MAX_DESTINATIONS", 1)
+        await _add_subscribers(db_session, 6)
+        repo = NewsletterCampaignRepository(db_session)
+        campaign = await repo.create_with_recipients(MESSAGE)
+        other_claim = None
+
+        async def send(email):
+            nonlocal other_claim
+            if other_claim is None:
+                # Lote travado alem do lease: outro worker retoma a campanha
+                await db_session.execute(
+                    update(NewsletterCampaign)
+                    .where(NewsletterCampaign.id == campaign.id)
+                    .values(locked_until=utc_now() - timedelta(seconds=1))
+                )
+                await db_session.commit()
+                other_claim = await repo.acquire_lease(campaign.id, lease_seconds=60)
+
+        email = FakeEmail(send)
+        dispatcher = _dispatcher(session_factory, email, concurrency=1)
+        dispatcher.start(campaign.id)
+        await dispatcher._tasks[campaign.id]
+
+        assert email.bulk_calls == [["user0@example.com"]]
+        assert email.deleted == []  # template em uso pelo novo dono
+        await db_session.refresh(campaign)
+        assert campaign.status == CampaignStatus.SENDING.value
+        assert campaign.claimed_by == other_claim
+        assert campaign.sent_count == 1
+        # O antigo dono nao renova, libera nem conclui o lease do novo
+        assert await repo.renew_lease(campaign.id, uuid.uuid4(), 60) is False
+        assert await repo.finish(campaign.id, uuid.uuid4()) is False
+        assert await repo.renew_lease(campaign.id, other_claim, 60) is True
+
+    @pytest.mark.asyncio
+    async def test_shutdown_stops_between_chunks(self, db_session, session_factory, monkeypatch):
+        """No shutdown os blocos enviados sao gravados, o resto fica pendente e o lease e liberado."""
+        monkeypatch.setattr(newsletter_campaigns, "BULK_MAX_DESTINATIONS", 2)
+        await _add_subscribers(db_session, 6)
+        campaign = await NewsletterCampaignRepository(db_session).create_with_recipients(MESSAGE)
+        first_chunk = asyncio.Event()
+        closing = asyncio.Event()
+
+        async def send(email):
+            first_chunk.set()
+            await closing.wait()
+
+        email = FakeEmail(send)
+        dispatcher = _dispatcher(session_factory, email, batch_size=6, concurrency=1)
+        dispatcher.start(campaign.id)
+        await first_chunk.wait()
+        close = asyncio.create_task(dispatcher.close())
+        await asyncio.sleep(0)
+        closing.set()
+        await close
+
+        assert email.bulk_calls == [["user0@example.com", "user1@example.com"]]
+        statuses = await _statuses(db_session, campaign.id)
+        assert [e for e, status in sorted(statuses.items()) if status == "sent"] == [
+            "user0@example.com", "user1@example.com",
+        ]
+        await db_session.refresh(campaign)
+        assert campaign.status == CampaignStatus.SENDING.value
+        assert (campaign.locked_until, campaign.claimed_by) == (None, None)
+
+    @pytest.mark.asyncio
+    async def test_close_timeout_covers_a_chunk(self, session_factory):
+        """A espera do shutdown cobre um bloco no limite de envio."""
+        dispatcher = _dispatcher(session_factory, FakeEmail(), rate_per_second=14, batch_size=200)
+        assert dispatcher.close_timeout > newsletter_campaigns.BULK_MAX_DESTINATIONS / 14
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_after_batch(self, db_session, session_factory):
+        """Cancelamento e percebido na renovacao do lease, apos o bloco atual."""
+        await _add_subscribers(db_session, 6)
+        repo = NewsletterCampaignRepository(db_session)
+        campaign = await repo.create_with_recipients(MESSAGE)
+        sent = []
+
+        async def send(email):
+            sent.append(email)
+            if len(sent) == 1:
+                await repo.cancel(campaign.id)
+
+        email = FakeEmail(send)
+        dispatcher = _dispatcher(session_factory, email)
+        dispatcher.start(campaign.id)
+        await dispatcher._tasks[campaign.id]
+
+        assert len(sent) == 3  # um lote
+        assert email.deleted == [campaign_template_name(campaign.id)]
+        await db_session.refresh(campaign)
+        assert campaign.status == CampaignStatus.CANCELLED.value
+        assert campaign.sent_count == 3
+
+
+class TestRecipientSelection:
+    """Testes para a leitura incremental e a selecao por IDs."""
+
+    @pytest.mark.asyncio
+    async def test_pending_batches_keyset(self, db_session):
+        """Lotes continuam apos o ultimo email do lote anterior."""
+        await _add_subscribers(db_session, 5)
+        repo = NewsletterCampaignRepository(db_session)
+        campaign = await repo.create_with_recipients(MESSAGE)
+
+        first = await repo.get_pending_batch(campaign.id, 2)
+        second = await repo.get_pending_batch(campaign.id, 2, after_email=first[-1])
+        last = await repo.get_pending_batch(campaign.id, 2, after_email=second[-1])
+
+        assert first + second + last == [f"user{i}@example.com" for i in range(5)]
+        assert await repo.get_pending_batch(campaign.id, 2, after_email=last[-1]) == []
+
+    @pytest.mark.asyncio
+    async def test_selected_ids_and_bulk_actions(self, db_session):
+        """Selecao filtra verificados; desinscricao e remocao em um comando."""
+        signups = await _add_subscribers(db_session, 3)
+        pending = await _add_subscribers(db_session, 1, prefix="pending", email_verified=False)
+        repo = NewsletterRepository(db_session)
+        ids = [s.id for s in signups + pending]
+
+        selected = await repo.get_verified_by_ids(ids)
+        assert [s.email for s in selected] == [f"user{i}@example.com" for i in range(3)]
+        assert await repo.get_verified_by_ids([]) == []
+
+        assert await repo.unsubscribe_by_ids(ids[:2]) == 2
+        assert [s.email for s in await repo.get_verified_by_ids(ids)] == ["user2@example.com"]
+        assert await repo.delete_by_ids(ids) == 4
+        assert await repo.count_active() == 0
+
+
+class TestNewsletterStats:
+    """Testes para as estatisticas agregadas dos inscritos."""
+
+    @pytest.mark.asyncio
+    async def test_counters_from_single_query(self, db_session, async_engine):
+        """Todos os contadores saem de uma unica consulta."""
+        await _add_subscribers(db_session, 3)
+        await _add_subscribers(db_session, 2, prefix="pending", email_verified=False)
+        await _add_subscribers(db_session, 1, prefix="gone", is_active=False)
+        repo = NewsletterRepository(db_session)
+
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            stats = await repo.get_stats(use_cache=False)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert stats == {
+            "total_subscribers": 6,
+            "active_subscribers": 5,
+            "verified_subscribers": 3,
+            "pending_verification": 2,
+            "unsubscribed": 1,
+            "subscriptions_today": 6,
+            "subscriptions_week": 6,
+            "subscriptions_month": 6,
+        }
+
+    @pytest.mark.asyncio
+    async def test_cache_invalidated_on_changes(self, db_session):
+        """Cache reaproveitado; inscricao e desinscricao pelo repositorio o invalidam."""
+        await _add_subscribers(db_session, 2)
+        repo = NewsletterRepository(db_session)
+        assert (await repo.get_stats())["active_subscribers"] == 2
+
+        # Alteracao fora do repositorio: o cache ainda vale
+        await _add_subscribers(db_session, 1, prefix="direct")
+        assert (await repo.get_stats())["active_subscribers"] == 2
+
+        await repo.create({"email": "new@example.com"})
+        assert (await repo.get_stats())["active_subscribers"] == 4
+
+        await repo.unsubscribe("user0@example.com")
+        stats = await repo.get_stats()
+        assert stats["active_subscribers"] == 3
+        assert stats["unsubscribed"] == 1
@@ -0,0 +1,143 @@
+"""
+Testes unitarios para a importacao e exportacao de inscritos em CSV.
+
+Verifica:
+- Normalizacao/validacao de emails (caminho rapido e email_validator)
+- Importacao em lotes: cabecalho, separador, repetidos, existentes e invalidos
+- Exportacao em pedacos por lote, com celulas seguras para planilhas
+"""
+
+import csv
+import io
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import NewsletterSignup
+from app.repositories.newsletter import NewsletterRepository
+from app.services.newsletter_csv import (
+    export_subscribers_csv,
+    import_subscribers_csv,
+    normalize_email,
+    upload_size,
+)
+
+
+def _csv(content: str) -> io.BytesIO:
+    return io.BytesIO(content.encode("utf-8"))
+
+
+class TestNormalizeEmail:
+    """Testes para normalize_email."""
+
+    def test_valid_and_invalid(self):
+        """Dominio em minusculas; invalidos e descartaveis viram None."""
+        assert normalize_email(" Joao.Silva@Example.COM ") == "Joao.Silva@example.com"
+        assert normalize_email("user@example") is None
+        assert normalize_email("sem-arroba") is None
+        assert normalize_email("a..b@example.com") is None
+        assert normalize_email("bot@mailinator.com") is None
+
+    def test_unicode_uses_validator(self):
+        """Enderecos fora do caminho rapido passam pelo email_validator."""
+        assert normalize_email("jose@exemplo.com.br") == "jose@exemplo.com.br"
+        assert normalize_email("jose@a\u00e7\u00e3o.com.br") == "jose@a\u00e7\u00e3o.com.br"
+
+
+class TestImportSubscribers:
+    """Testes para import_subscribers_csv."""
+
+    @pytest.mark.asyncio
+    async def test_import_with_header(self, db_session):
+        """Colunas por nome, separador ';', BOM e linhas em branco."""
+        repo = NewsletterRepository(db_session)
+        content = "\ufeffNome;E-mail\nAna;ana@example.com\n\nBruno;bruno@example.com\n"
+
+        result = await import_subscribers_csv(repo, _csv(content), batch_size=1)
+
+        assert (result.imported, result.duplicates, result.invalid) == (2, 0, 0)
+        ana = await repo.get_by_email("ana@example.com")
+        assert ana.name == "Ana"
+        assert ana.source == "import"
+        assert ana.is_active and not ana.email_verified
+
+    @pytest.mark.asyncio
+    async def test_duplicates_existing_and_invalid(self, db_session):
+        """Existentes nao sao alterados; repetidos e invalidos sao contados."""
+        db_session.add(NewsletterSignup(email="old@example.com", name="Antigo", is_active=False))
+        await db_session.commit()
+        repo = NewsletterRepository(db_session)
+        content = (
+            "old@example.com,Novo\n"
+            "new@example.com,Novo\n"
+            "new@example.com,Repetido\n"
+            "invalido,X\n"
+            "other@example.com\n"
+        )
+
+        result = await import_subscribers_csv(repo, _csv(content), verified=True, batch_size=2)
+
+        assert (result.imported, result.duplicates, result.invalid) == (2, 2, 1)
+        old = await repo.get_by_email("old@example.com")
+        await db_session.refresh(old)
+        assert old.name == "Antigo" and not old.is_active
+        new = await repo.get_by_email("new@example.com")
+        assert new.email_verified and new.verified_at is not None
+        assert (await repo.get_stats())["verified_subscribers"] == 2
+
+    @pytest.mark.asyncio
+    async def test_keeps_upload_open(self, db_session):
+        """O arquivo do upload nao e fechado pela importacao."""
+        file = _csv("email\nana@example.com\n")
+        await import_subscribers_csv(NewsletterRepository(db_session), file)
+        assert not file.closed
+
+    def test_upload_size_measured(self):
+        """Tamanho medido pelo arquivo, sem ler nem mover a posicao."""
+        file = _csv("email\nana@example.com\n")
+        file.read(3)
+        assert upload_size(file) == 22
+        assert file.tell() == 3
+
+
+class TestExportSubscribers:
+    """Testes para export_subscribers_csv."""
+
+    @pytest.mark.asyncio
+    async def test_export_in_batches(self, db_session, async_engine):
+        """Um pedaco por lote, em ordem de email, com status e datas."""
+        db_session.add_all([
+            NewsletterSignup(email=f"user{i}@example.com", email_verified=i % 2 == 0)
+            for i in range(5)
+        ])
+        db_session.add(NewsletterSignup(email="zz@example.com", name="=HYPERLINK(1)", is_active=False))
+        await db_session.commit()
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+        chunks = [chunk async for chunk in export_subscribers_csv(session_factory, batch_size=2)]
+
+        assert len(chunks) == 4
+        rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+        assert [row["email"] for row in rows] == [f"user{i}@example.com" for i in range(5)] + ["zz@example.com"]
+        assert [row["status"] for row in rows] == ["verified", "pending"] * 2 + ["verified", "unsubscribed"]
+        assert rows[-1]["name"] == "'=HYPERLINK(1)"
+        assert rows[0]["subscribed_at"] and rows[0]["verified_at"] == ""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip(self, db_session, async_engine):
+        """O CSV exportado (com emails/nomes protegidos) pode ser importado de volta."""
+        db_session.add(NewsletterSignup(email="ana@example.com", name="Ana"))
+        db_session.add(NewsletterSignup(email="=cmd@example.com", name="-Bia"))
+        await db_session.commit()
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        exported = "".join([chunk async for chunk in export_subscribers_csv(session_factory)])
+        assert "'=cmd@example.com,'-Bia" in exported
+
+        await db_session.execute(NewsletterSignup.__table__.delete())
+        await db_session.commit()
+        result = await import_subscribers_csv(NewsletterRepository(db_session), _csv(exported))
+
+        assert result.imported == 2
+        rows = (await db_session.execute(select(NewsletterSignup.email, NewsletterSignup.name))).all()
+        assert sorted(rows) == [("=cmd@example.com", "-Bia"), ("ana@example.com", "Ana")]
@@ -0,0 +1,56 @@
+"""
+Testes unitarios para os templates de prompt compilados.
+
+Verifica:
+- Divisao em segmentos fixos e slots
+- Renderizacao (slot sem valor fica literal)
+- Cache da compilacao pelo texto do template
+- Validacao de placeholders desconhecidos (usada no admin)
+"""
+
+from app.services.prompt_template import (
+    compile_prompt,
+    find_unknown_placeholders,
+)
+
+
+class TestCompiledPrompt:
+    """Testes para compile_prompt/CompiledPrompt."""
+
+    def test_splits_literals_and_slots(self):
+        """Segmentos fixos intercalados com os slots."""
+        compiled = compile_prompt("Titulo: {{title}}\nConteudo: {{content}}")
+
+        assert compiled.slots == ("title", "content")
+        assert compiled.literals == ("Titulo: ", "\nConteudo: ", "")
+
+    def test_render_fills_slots(self):
+        """Preenche slots; desconhecidos ficam como o placeholder."""
+        compiled = compile_prompt("{{title}} - {{outro}}")
+
+        assert compiled.render({"title": "Caneca"}) == "Caneca - {{outro}}"
+
+    def test_values_are_not_substituted_again(self):
+        """Valor contendo placeholder nao e expandido."""
+        compiled = compile_prompt("{{title}}|{{content}}")
+
+        assert compiled.render({"title": "{{content}}", "content": "x"}) == "{{content}}|x"
+
+    def test_compilation_is_cached(self):
+        """Mesmo texto reaproveita o template compilado."""
+        assert compile_prompt("Gere para: {{title}}") is compile_prompt("Gere para: {{title}}")
+
+
+class TestFindUnknownPlaceholders:
+    """Testes para find_unknown_placeholders."""
+
+    def test_known_placeholders(self):
+        """Template so com placeholders suportados e valido."""
+        assert find_unknown_placeholders("{{title}} {{price}} {{occasion_date}}") == []
+        assert find_unknown_placeholders(None) == []
+
+    def test_reports_unknown(self):
+        """Lista placeholders fora do suportado (ordenados, sem repeticao)."""
+        template = "{{titulo}} {{title}} {{preco}} {{titulo}}"
+
+        assert find_unknown_placeholders(template) == ["preco", "titulo"]
@@ -1,10 +1,23 @@
 """
 Testes para rate limiting.
 
-Verifica que endpoints protegidos tem rate limiting.
+Verifica que endpoints protegidos tem rate limiting, a chave por IP
+atras de proxy, o fallback em memoria sem Redis e as metricas por rota.
 """
 
+from unittest.mock import MagicMock
+
 import pytest
+from limits import parse
+from limits.strategies import MovingWindowRateLimiter
+
+from app.core import rate_limit
+from app.core.rate_limit import (
+    FailoverRedisStorage,
+    get_client_ip,
+    get_rate_limit_metrics,
+    rate_limit_key,
+)
 
 
 class TestRateLimiting:
@@ -49,3 +62,56 @@ class TestRateLimiting:
 
         # Deve retornar 401 (token invalido) ou 429 (rate limit), nao 404 ou 405
         assert response.status_code in [401, 429]
+
+
+def _request(peer: str, headers: dict | None = None) -> MagicMock:
+    request = MagicMock()
+    request.client.host = peer
+    request.headers = headers or {}
+    request.scope = {"route": MagicMock(path="/api/v1/auth/login")}
+    return request
+
+
+class TestClientIp:
+    """Testes para a chave por IP com proxies confiaveis."""
+
+    def test_forwarded_for_from_trusted_proxy(self):
+        """Atras do proxy usa o ultimo IP que nao e proxy (o resto pode ser forjado)."""
+        request = _request("172.18.0.5", {"x-forwarded-for": "1.2.3.4, 203.0.113.9, 10.0.0.7"})
+        assert get_client_ip(request) == "203.0.113.9"
+
+    def test_headers_ignored_from_untrusted_peer(self):
+        """Conexao direta nao pode escolher o proprio IP via header."""
+        request = _request("198.51.100.1", {"x-forwarded-for": "1.2.3.4", "x-real-ip": "1.2.3.4"})
+        assert get_client_ip(request) == "198.51.100.1"
+
+    def test_real_ip_fallback(self):
+        """Sem X-Forwarded-For usa o X-Real-IP do proxy."""
+        request = _request("127.0.0.1", {"x-real-ip": "203.0.113.9"})
+        assert get_client_ip(request) == "203.0.113.9"
+
+
+class TestFailoverRedisStorage:
+    """Testes para o storage Redis com fallback em memoria."""
+
+    def test_falls_back_and_keeps_limits(self):
+        """Sem Redis os limites continuam valendo, contados em memoria."""
+        storage = FailoverRedisStorage("failover+redis://127.0.0.1:1/0", socket_connect_timeout=0.1)
+        strategy = MovingWindowRateLimiter(storage)
+        limit = parse("2/minute")
+
+        assert [strategy.hit(limit, "ip", "/login") for _ in range(3)] == [True, True, False]
+        assert storage.degraded is True
+
+    def test_route_metrics(self):
+        """A chave conta verificacoes e o handler de 429 conta bloqueios."""
+        rate_limit._route_stats.clear()
+        request = _request("203.0.113.1")
+
+        rate_limit_key(request)
+        rate_limit_key(request)
+        rate_limit._route_stats_for(request).blocked += 1
+
+        [route] = get_rate_limit_metrics()["routes"]
+        assert route == {"route": "/api/v1/auth/login", "checked": 2, "blocked": 1}
+        rate_limit._route_stats.clear()
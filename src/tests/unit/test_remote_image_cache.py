@@ -0,0 +1,161 @@
+"""
+Testes unitarios para o cache em disco de imagens remotas.
+
+Verifica:
+- Download e reaproveitamento da copia local (sem nova requisicao)
+- Revalidacao condicional (ETag -> 304)
+- Copia antiga servida quando a origem falha
+- Limite de tamanho por arquivo e limite total do cache
+- Resolucao de URLs relativas para arquivos locais
+"""
+
+import httpx
+import pytest
+
+from app.services import remote_image_cache
+from app.services.remote_image_cache import ImageFetchError, fetch_image
+
+IMAGE_URL = "https://cdn.example.com/produto.jpg"
+IMAGE_BYTES = b"\xff\xd8\xff" + b"0" * 1024
+
+
+@pytest.fixture
+def cache_env(tmp_path, monkeypatch):
+    """Isola o cache em diretorio temporario e captura as requisicoes."""
+    requests: list[httpx.Request] = []
+    state = {"handler": None}
+
+    def transport_handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return state["handler"](request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(transport_handler))
+    monkeypatch.setattr(remote_image_cache, "IMAGE_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(remote_image_cache, "_tracked_bytes", None)
+    monkeypatch.setattr(remote_image_cache, "get_http_client", lambda: client)
+    return state, requests
+
+
+def _ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        content=IMAGE_BYTES,
+        headers={"content-type": "image/jpeg", "etag": '"v1"'},
+    )
+
+
+class TestFetchImage:
+    """Testes para fetch_image."""
+
+    @pytest.mark.asyncio
+    async def test_downloads_and_reuses_local_copy(self, cache_env):
+        """Segunda chamada dentro da validade nao acessa a rede."""
+        state, requests = cache_env
+        state["handler"] = _ok
+
+        first = await fetch_image(IMAGE_URL)
+        second = await fetch_image(IMAGE_URL)
+
+        assert len(requests) == 1
+        assert first.path == second.path
+        assert first.path.read_bytes() == IMAGE_BYTES
+        assert first.content_type == "image/jpeg"
+
+    @pytest.mark.asyncio
+    async def test_revalidates_with_etag(self, cache_env, monkeypatch):
+        """Entrada expirada e revalidada com If-None-Match (304 reaproveita)."""
+        state, requests = cache_env
+        state["handler"] = _ok
+        await fetch_image(IMAGE_URL)
+
+        monkeypatch.setattr(remote_image_cache.settings, "image_cache_revalidate_seconds", 0)
+        state["handler"] = lambda request: httpx.Response(304)
+        cached = await fetch_image(IMAGE_URL)
+
+        assert requests[-1].headers["if-none-match"] == '"v1"'
+        assert cached.path.read_bytes() == IMAGE_BYTES
+
+    @pytest.mark.asyncio
+    async def test_serves_stale_copy_on_network_error(self, cache_env, monkeypatch):
+        """Falha de rede com copia local retorna a copia."""
+        state, _ = cache_env
+        state["handler"] = _ok
+        await fetch_image(IMAGE_URL)
+
+        monkeypatch.setattr(remote_image_cache.settings, "image_cache_revalidate_seconds", 0)
+
+        def fail(request):
+            raise httpx.ConnectError("offline")
+
+        state["handler"] = fail
+        cached = await fetch_image(IMAGE_URL)
+        assert cached.path.read_bytes() == IMAGE_BYTES
+
+    @pytest.mark.asyncio
+    async def test_error_without_cached_copy(self, cache_env):
+        """Erro HTTP sem copia local levanta ImageFetchError."""
+        state, _ = cache_env
+        state["handler"] = lambda request: httpx.Response(404)
+
+        with pytest.raises(ImageFetchError):
+            await fetch_image(IMAGE_URL)
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_file(self, cache_env, monkeypatch):
+        """Imagem acima do limite por arquivo e rejeitada e nao fica em disco."""
+        state, _ = cache_env
+        state["handler"] = _ok
+        monkeypatch.setattr(remote_image_cache, "MAX_FILE_BYTES", 100)
+
+        with pytest.raises(ImageFetchError):
+            await fetch_image(IMAGE_URL)
+        assert list(remote_image_cache.IMAGE_CACHE_DIR.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_evicts_oldest_entries_over_total_limit(self, cache_env, monkeypatch):
+        """Cache acima do limite total remove as entradas mais antigas."""
+        state, _ = cache_env
+        state["handler"] = _ok
+        monkeypatch.setattr(remote_image_cache, "MAX_CACHE_BYTES", len(IMAGE_BYTES) * 2)
+
+        for i in range(3):
+            await fetch_image(f"https://cdn.example.com/{i}.jpg")
+
+        assert len(list(remote_image_cache.IMAGE_CACHE_DIR.glob("*.bin"))) == 2
+        assert remote_image_cache._tracked_bytes == len(IMAGE_BYTES) * 2
+
+    @pytest.mark.asyncio
+    async def test_sweeps_only_over_limit_and_keeps_new_entry(self, cache_env, monkeypatch):
+        """Abaixo do limite nao varre o disco; a entrada recem-gravada nunca sai."""
+        state, _ = cache_env
+        state["handler"] = _ok
+        sweeps = []
+        enforce = remote_image_cache._enforce_size_limit
+
+        def counting_enforce(keep=None):
+            sweeps.append(keep)
+            return enforce(keep)
+
+        monkeypatch.setattr(remote_image_cache, "_enforce_size_limit", counting_enforce)
+        monkeypatch.setattr(remote_image_cache, "MAX_CACHE_BYTES", len(IMAGE_BYTES) * 2)
+
+        await fetch_image("https://cdn.example.com/0.jpg")  # primeira medicao
+        await fetch_image("https://cdn.example.com/1.jpg")
+        assert len(sweeps) == 1
+
+        # Limite menor que uma imagem: so a nova continua em disco
+        monkeypatch.setattr(remote_image_cache, "MAX_CACHE_BYTES", 10)
+        latest = await fetch_image("https://cdn.example.com/2.jpg")
+        assert len(sweeps) == 2
+        assert list(remote_image_cache.IMAGE_CACHE_DIR.glob("*.bin")) == [latest.path]
+
+    @pytest.mark.asyncio
+    async def test_relative_static_url_resolves_locally(self, cache_env):
+        """URL relativa /static/ aponta para o arquivo local, sem rede."""
+        _, requests = cache_env
+
+        cached = await fetch_image("/static/logo/mascot-only.png")
+
+        assert requests == []
+        assert cached.path.name == "mascot-only.png"
+        assert cached.content_type == "image/png"